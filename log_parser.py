@@ -8,13 +8,15 @@ Developed by the IONSec Research Team.
 Usage:
     python log_parser.py              # Interactive mode
     python log_parser.py -help       # Show help
+    python log_parser.py firewall traffic.log -o out.csv --workers 8
+    python log_parser.py follow fortigate.log -o live/ --interval 10
 """
 
-import re
 import sys
 import os
+from datetime import timedelta
 from pathlib import Path
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict, Callable
 import argparse
 
 try:
@@ -23,12 +25,43 @@ except ImportError:
     print("Error: pandas is required. Install with: pip install pandas")
     sys.exit(1)
 
-import ipaddress
+# Parsing primitives are shared with the web backend
+BACKEND_DIR = Path(__file__).resolve().parent / 'web_app' / 'backend'
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from parse_engine import (  # noqa: E402
+    run_analyses,
+    stream_analysis,
+    RowAnalysis,
+    create_analysis,
+    ANALYSIS_ALIASES,
+    VPNLoginAnalysis,
+    FirewallAnalysis,
+    FirewallTimelineAnalysis,
+    ShutdownAnalysis,
+    StatisticsAnalysis,
+)
+from shutdown_index import ShutdownIndexStore  # noqa: E402
+from dataset_cache import DatasetCache  # noqa: E402
+from evidence_bundle import parse_bundle  # noqa: E402
+from result_writer import ExportResult, OUTPUT_FORMATS, open_writer, resolve_format, write_result  # noqa: E402
+from ip_classifier import is_not_private_ip  # noqa: E402
+from result_pages import open_pages  # noqa: E402
+from result_query import ResultQuery  # noqa: E402
+from log_time import bucket_seconds  # noqa: E402
+from log_follower import DEFAULT_INTERVAL, LogFollower  # noqa: E402
+from scan_progress import ScanProgress  # noqa: E402
 
 
 __version__ = "1.0.0"
 __author__ = "IONSec Research Team"
 
+# Default for --cache-dir
+CACHE_DIR_ENV = 'FORTI_DFIR_CACHE_DIR'
+# Default for query --pages-dir; otherwise .pages next to the result
+PAGES_DIR_ENV = 'FORTI_DFIR_PAGES_DIR'
+
 
 def print_banner() -> None:
     """Print ASCII art banner."""
@@ -60,6 +93,16 @@ Forti-DFIR - Fortinet Log Parser CLI Tool v{}
 Usage:
     python log_parser.py              # Interactive mode
     python log_parser.py -help        # Show this help message
+    python log_parser.py [--workers N]                     # Interactive, N processes
+    python log_parser.py vpn INPUT -o OUTPUT [--workers N]
+    python log_parser.py firewall INPUT -o OUTPUT [--top K [--approximate]] [--workers N]
+    python log_parser.py firewall-timeline INPUT -o OUTPUT [--bucket hour] [--workers N]
+    python log_parser.py vpn-shutdown INPUT -u USER -o OUTPUT [--workers N] [--index-dir DIR]
+    python log_parser.py vpn-shutdown INPUT --all-users -o OUTPUT [--index-dir DIR]
+    python log_parser.py combined INPUT -a vpn,firewall -o OUTPUT_DIR [--workers N]
+    python log_parser.py bundle INPUT [INPUT ...] -a vpn,firewall -o OUTPUT_DIR [--workers N]
+    python log_parser.py query RESULT [-u USER] [--ip CIDR] [--start DATE] [--end DATE] [-m TEXT] [-o OUTPUT]
+    python log_parser.py follow INPUT -a vpn,firewall -o OUTPUT_DIR [--interval SECONDS] [--once]
 
 Options:
     1. Parse VPN logs
@@ -70,15 +113,29 @@ Options:
        - Aggregates traffic by destination IP
        - Filters out private/local IP addresses
        - Calculates total bytes and size in MB
+       - firewall-timeline: sent and received bytes per destination
+         and time bucket (minute, hour, day or e.g. 15m), in one pass
        
     3. Parse VPN shutdown sessions
        - Extracts session termination logs
        - Filters by username (case-insensitive)
        - Calculates sent bytes and size in MB
+       - All users are indexed in one pass; further users on the same
+         file are looked up without rescanning (--index-dir keeps the
+         index between runs)
 
 Input/Output:
     - Input files: .txt, .log, or .csv format
-    - Output: CSV file with parsed data
+    - bundle: several files, directories or .zip/.tar(.gz) archives;
+      each file is format-detected and the results are merged
+    - query: filters a saved result by user, IP/CIDR, time range and
+      message; the first query indexes the result (--pages-dir), later
+      ones read only the matching rows
+    - follow: parses only what was appended to a growing log since the
+      last poll and rewrites the results; a checkpoint in OUTPUT_DIR
+      lets a restarted follower continue without reparsing, and log
+      rotation and truncation are detected
+- Output: CSV file with parsed data
 
 Examples:
     # Parse VPN logs
@@ -90,7 +147,8 @@ Examples:
 Tips:
     - Use forward slashes or escaped backslashes in file paths
     - Output directories are created automatically if they don't exist
-    - Large files may take longer to process
+    - Large files may take longer to process; use --workers to parse
+      a single file on several CPU cores
 
 For more information, visit: https://github.com/ionsec/Forti-DFIR
     """.format(__version__)
@@ -141,12 +199,28 @@ def ensure_output_path(output_path: str) -> Path:
     return path
 
 
-def parse_vpn_logs(file_path: Path) -> pd.DataFrame:
+def print_progress(progress: ScanProgress) -> None:
+    """Print parse progress on one line, overwritten by the next update."""
+    parts = [f"{progress.lines_processed:,} lines", f"{progress.lines_matched:,} matches"]
+    if progress.percent is not None:
+        parts.insert(0, f"{progress.percent:5.1f}%")
+    parts.append(f"{progress.bytes_per_second / (1024 * 1024):,.1f} MB/s")
+    
+    if progress.done:
+        parts.append(f"in {timedelta(seconds=round(progress.elapsed))}")
+    elif progress.eta_seconds is not None:
+        parts.append(f"ETA {timedelta(seconds=round(progress.eta_seconds))}")
+    
+    print(f"   ⏳ {', '.join(parts)}    ", end='\n' if progress.done else '\r', flush=True)
+
+
+def parse_vpn_logs(file_path: Path, workers: int = 1) -> pd.DataFrame:
     """
     Parse VPN logs and extract successful login details.
     
     Args:
         file_path: Path to the VPN log file
+        workers: Number of worker processes (1 parses in this process)
         
     Returns:
         DataFrame with columns: date, time, user, tunneltype, remip, reason, msg
@@ -157,62 +231,12 @@ def parse_vpn_logs(file_path: Path) -> pd.DataFrame:
     """
     print(f"\n📄 Parsing VPN logs from: {file_path}")
     
-    # Regex patterns for Fortinet log format
-    patterns = {
-        'date': re.compile(r'date=(\S+)'),
-        'time': re.compile(r'time=(\S+)'),
-        'user': re.compile(r'user="([^"]+)"'),
-        'tunneltype': re.compile(r'tunneltype="([^"]+)"'),
-        'remip': re.compile(r'remip=([\d\.]+)'),
-        'reason': re.compile(r'reason="([^"]+)"'),
-        'msg': re.compile(r'msg="([^"]+)"')
-    }
-    
-    extracted_data: List[List[str]] = []
-    lines_processed = 0
-    lines_matched = 0
+    analysis = VPNLoginAnalysis()
+    stats = run_analyses(str(file_path), [analysis], workers=workers, progress=print_progress)
     
-    try:
-        with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
-            for line in file:
-                lines_processed += 1
-                
-                # Extract all fields
-                matches = {key: pattern.search(line) for key, pattern in patterns.items()}
-                
-                # Check if all required fields exist
-                if all(matches.values()):
-                    reason = matches['reason'].group(1)
-                    
-                    # Only keep successful logins
-                    if reason.lower() == "login successfully":
-                        extracted_data.append([
-                            matches['date'].group(1),
-                            matches['time'].group(1),
-                            matches['user'].group(1),
-                            matches['tunneltype'].group(1),
-                            matches['remip'].group(1),
-                            reason,
-                            matches['msg'].group(1)
-                        ])
-                        lines_matched += 1
-                        
-                        # Progress indicator for large files
-                        if lines_processed % 10000 == 0:
-                            print(f"   Processed {lines_processed:,} lines...", end='\r')
-    
-    except UnicodeDecodeError:
-        print("   ⚠️  Warning: Some characters couldn't be decoded")
-        # Continue with what we have
-    
-    print(f"   ✅ Processed {lines_processed:,} lines, found {lines_matched:,} successful logins")
-    
-    df = pd.DataFrame(
-        extracted_data, 
-        columns=['date', 'time', 'user', 'tunneltype', 'remip', 'reason', 'msg']
-    )
+    print(f"   ✅ Processed {stats.lines_processed:,} lines, found {analysis.lines_matched:,} successful logins")
     
-    return df
+    return analysis.to_dataframe()
 
 
 def is_public_ip(ip: str) -> bool:
@@ -225,21 +249,27 @@ def is_public_ip(ip: str) -> bool:
     Returns:
         True if IP is public, False otherwise
     """
-    try:
-        return not ipaddress.ip_address(ip).is_private
-    except ValueError:
-        return False
+    return is_not_private_ip(ip)
 
 
-def parse_firewall_logs(file_path: Path) -> pd.DataFrame:
+def parse_firewall_logs(
+    file_path: Path,
+    workers: int = 1,
+    top: Optional[int] = None,
+    approximate: bool = False
+) -> pd.DataFrame:
     """
     Parse firewall logs and aggregate traffic by destination IP.
     
     Args:
         file_path: Path to the firewall log file
+        workers: Number of worker processes (1 parses in this process)
+        top: Keep only the K destinations with the most bytes sent
+        approximate: Count in a fixed-size summary (requires top)
         
     Returns:
-        DataFrame with columns: dstip, total_sentbyte, size_mb
+        DataFrame with columns: dstip, total_sentbyte, size_mb (and
+        max_overcount when approximate)
         
     Raises:
         FileNotFoundError: If input file doesn't exist
@@ -247,63 +277,63 @@ def parse_firewall_logs(file_path: Path) -> pd.DataFrame:
     """
     print(f"\n📄 Parsing firewall logs from: {file_path}")
     
-    # Regex patterns
-    dstip_pattern = re.compile(r'dstip=([\d\.]+)')
-    sentbyte_pattern = re.compile(r'sentbyte=(\d+)')
+    analysis = FirewallAnalysis(ip_filter=is_not_private_ip, top=top, approximate=approximate)
+    stats = run_analyses(str(file_path), [analysis], workers=workers, progress=print_progress)
     
-    data: dict = {}
-    lines_processed = 0
-    lines_matched = 0
-    private_ips_skipped = 0
+    print(f"   ✅ Processed {stats.lines_processed:,} lines")
+    print(f"   📊 Found {analysis.lines_matched:,} public IP entries")
+    print(f"   🔒 Skipped {analysis.private_ips_skipped:,} private IP entries")
+    if approximate:
+        print(
+            f"   📐 Approximate top {top:,} from {analysis.sketch.capacity:,} counters; "
+            f"totals overstated by at most {analysis.sketch.max_error:,} bytes"
+        )
     
-    try:
-        with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
-            for line in file:
-                lines_processed += 1
-                
-                dstip_match = dstip_pattern.search(line)
-                sentbyte_match = sentbyte_pattern.search(line)
-                
-                if dstip_match and sentbyte_match:
-                    dstip = dstip_match.group(1)
-                    
-                    # Validate IP format
-                    if not dstip.replace('.', '').isdigit():
-                        continue
-                    
-                    # Skip private IPs
-                    if is_public_ip(dstip):
-                        sentbyte = int(sentbyte_match.group(1))
-                        data[dstip] = data.get(dstip, 0) + sentbyte
-                        lines_matched += 1
-                    else:
-                        private_ips_skipped += 1
-                
-                # Progress indicator
-                if lines_processed % 10000 == 0:
-                    print(f"   Processed {lines_processed:,} lines...", end='\r')
+    return analysis.to_dataframe()
+
+
+def parse_firewall_timeline(file_path: Path, bucket: str = 'hour', workers: int = 1) -> pd.DataFrame:
+    """
+    Parse firewall logs into traffic per destination IP and time bucket.
     
-    except UnicodeDecodeError:
-        print("   ⚠️  Warning: Some characters couldn't be decoded")
+    Args:
+        file_path: Path to the firewall log file
+        bucket: Bucket size: 'minute', 'hour', 'day' or a size such as '15m'
+        workers: Number of worker processes (1 parses in this process)
     
-    print(f"   ✅ Processed {lines_processed:,} lines")
-    print(f"   📊 Found {lines_matched:,} public IP entries")
-    print(f"   🔒 Skipped {private_ips_skipped:,} private IP entries")
+    Returns:
+        DataFrame with columns: bucket, epoch, dstip, total_sentbyte,
+        total_rcvdbyte, lines, size_mb
+    """
+    print(f"\n📄 Building {bucket} firewall timeline from: {file_path}")
     
-    df = pd.DataFrame(list(data.items()), columns=['dstip', 'total_sentbyte'])
-    df['size_mb'] = df['total_sentbyte'] / (1024 * 1024)
-    df = df.sort_values(by='total_sentbyte', ascending=False)
+    analysis = FirewallTimelineAnalysis(bucket, ip_filter=is_not_private_ip)
+    stats = run_analyses(str(file_path), [analysis], workers=workers, progress=print_progress)
     
-    return df
+    print(f"   ✅ Processed {stats.lines_processed:,} lines")
+    print(f"   📊 Found {analysis.lines_matched:,} public IP entries in {len(analysis.groups):,} buckets")
+    print(f"   🔒 Skipped {analysis.private_ips_skipped:,} private IP entries")
+    if analysis.untimed_skipped:
+        print(f"   ⏱️  Skipped {analysis.untimed_skipped:,} entries without a valid time")
+    
+    return analysis.to_dataframe()
 
 
-def parse_vpn_shutdown_sentbytes(file_path: Path, target_user: str) -> pd.DataFrame:
+def parse_vpn_shutdown_sentbytes(
+    file_path: Path,
+    target_user: str,
+    workers: int = 1,
+    index_store: Optional[ShutdownIndexStore] = None
+) -> pd.DataFrame:
     """
     Parse VPN shutdown sessions for a specific user.
     
     Args:
         file_path: Path to the VPN log file
         target_user: Username to filter (case-insensitive)
+        workers: Number of worker processes (1 parses in this process)
+        index_store: Optional all-users index store; repeated lookups on the
+            same file are answered from its index instead of a rescan
         
     Returns:
         DataFrame with columns: date, time, user, sentbyte, sent_bytes_in_MB
@@ -315,85 +345,326 @@ def parse_vpn_shutdown_sentbytes(file_path: Path, target_user: str) -> pd.DataFr
     print(f"\n📄 Parsing VPN shutdown sessions from: {file_path}")
     print(f"   Filtering for user: {target_user}")
     
-    # Regex patterns
-    patterns = {
-        'date': re.compile(r'date=(\S+)'),
-        'time': re.compile(r'time=(\S+)'),
-        'user': re.compile(r'user="([^"]+)"', flags=re.IGNORECASE),
-        'sentbyte': re.compile(r'sentbyte=(\d+)'),
-        'msg': re.compile(r'msg="([^"]+)"')
-    }
-    
-    extracted_data: List[List[str]] = []
-    lines_processed = 0
-    lines_matched = 0
-    target_user_lower = target_user.lower().strip()
-    
-    if not target_user_lower:
+    if not target_user.strip():
         raise ValueError("Username cannot be empty")
     
-    try:
-        with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
-            for line in file:
-                lines_processed += 1
-                
-                msg_match = patterns['msg'].search(line)
-                
-                # Only process shutdown messages
-                if msg_match and msg_match.group(1) == "SSL tunnel shutdown":
-                    user_match = patterns['user'].search(line)
-                    
-                    # Filter by user
-                    if user_match and user_match.group(1).lower() == target_user_lower:
-                        date_match = patterns['date'].search(line)
-                        time_match = patterns['time'].search(line)
-                        sentbyte_match = patterns['sentbyte'].search(line)
-                        
-                        if all([date_match, time_match, sentbyte_match]):
-                            sentbyte = int(sentbyte_match.group(1))
-                            extracted_data.append([
-                                date_match.group(1),
-                                time_match.group(1),
-                                user_match.group(1),
-                                sentbyte,
-                                sentbyte / (1024 * 1024)
-                            ])
-                            lines_matched += 1
-                
-                # Progress indicator
-                if lines_processed % 10000 == 0:
-                    print(f"   Processed {lines_processed:,} lines...", end='\r')
+    if index_store is not None:
+        df = index_store.get(str(file_path), workers=workers, progress=print_progress).lookup(target_user)
+        print(f"   📊 Found {len(df):,} shutdown sessions for user '{target_user}' (indexed)")
+        return df
     
-    except UnicodeDecodeError:
-        print("   ⚠️  Warning: Some characters couldn't be decoded")
+    analysis = ShutdownAnalysis(target_user)
+    stats = run_analyses(str(file_path), [analysis], workers=workers, progress=print_progress)
     
-    print(f"   ✅ Processed {lines_processed:,} lines")
-    print(f"   📊 Found {lines_matched:,} shutdown sessions for user '{target_user}'")
+    print(f"   ✅ Processed {stats.lines_processed:,} lines")
+    print(f"   📊 Found {analysis.lines_matched:,} shutdown sessions for user '{target_user}'")
     
-    df = pd.DataFrame(
-        extracted_data, 
-        columns=['date', 'time', 'user', 'sentbyte', 'sent_bytes_in_MB']
-    )
+    return analysis.to_dataframe()
+
+
+def parse_vpn_shutdown_all_users(
+    file_path: Path,
+    workers: int = 1,
+    index_store: Optional[ShutdownIndexStore] = None
+) -> pd.DataFrame:
+    """
+    Summarize VPN shutdown sessions for every user in one pass.
+    
+    Args:
+        file_path: Path to the VPN log file
+        workers: Number of worker processes (1 parses in this process)
+        index_store: Optional index store to build or reuse the index in
+    
+    Returns:
+        DataFrame with columns: user, sessions, sentbyte, sent_bytes_in_MB
+    """
+    print(f"\n📄 Indexing VPN shutdown sessions for all users from: {file_path}")
+    
+    store = index_store or ShutdownIndexStore()
+    df = store.get(str(file_path), workers=workers, progress=print_progress).totals()
+    
+    print(f"   📊 Found shutdown sessions for {len(df):,} users")
+    
+    return df
+
+
+def parse_combined(
+    file_path: Path,
+    analyses: List[str],
+    target_user: Optional[str] = None,
+    workers: int = 1
+) -> Dict[str, pd.DataFrame]:
+    """
+    Run several analyses over a log file in a single pass.
+    
+    Args:
+        file_path: Path to the log file
+        analyses: Analysis names: vpn, firewall, vpn-shutdown
+        target_user: Username to filter shutdown sessions by (required for vpn-shutdown)
+        workers: Number of worker processes (1 parses in this process)
+    
+    Returns:
+        Dictionary mapping each analysis name to its result DataFrame
+    
+    Raises:
+        ValueError: If an analysis name is unknown or repeated
+    """
+    print(f"\n📄 Parsing {', '.join(analyses)} from: {file_path}")
+    
+    runners = [
+        create_analysis(name, target_user=target_user, ip_filter=is_not_private_ip)
+        for name in analyses
+    ]
+    names = [runner.name for runner in runners]
+    
+    if not runners or len(set(names)) != len(names):
+        raise ValueError("Analyses must be a non-empty list without duplicates")
+    
+    stats = run_analyses(str(file_path), runners, workers=workers, progress=print_progress)
+    
+    print(f"   ✅ Processed {stats.lines_processed:,} lines")
+    for runner in runners:
+        print(f"   📊 {runner.name}: {runner.lines_matched:,} matching entries")
+    
+    return {runner.name: runner.to_dataframe() for runner in runners}
+
+
+def parse_evidence_bundle(
+    inputs: List[str],
+    analyses: List[str],
+    target_user: Optional[str] = None,
+    workers: int = 1
+) -> Dict[str, pd.DataFrame]:
+    """
+    Run several analyses over files, directories and zip/tar archives.
+    
+    Args:
+        inputs: Paths to log files, CSV exports, directories or archives
+        analyses: Analysis names: vpn, firewall, vpn-shutdown
+        target_user: Username to filter shutdown sessions by (required for vpn-shutdown)
+        workers: Number of worker processes; files are parsed in parallel
+    
+    Returns:
+        Dictionary mapping each analysis name to its merged result DataFrame
+    
+    Raises:
+        FileNotFoundError: If an input doesn't exist
+        ValueError: If an analysis name is unknown or repeated
+    """
+    print(f"\n📦 Parsing {', '.join(analyses)} from {len(inputs)} inputs")
+    
+    result = parse_bundle(inputs, analyses, target_user=target_user, workers=workers, ip_filter=is_not_private_ip)
     
+    for member in result.members:
+        if member.error:
+            print(f"   ❌ {member.name}: {member.error}")
+        else:
+            print(f"   ✅ {member.name} ({member.file_format})")
+    
+    print(f"   📁 Parsed {len(result.members) - len(result.failed):,} of {len(result.members):,} files")
+    for name, df in result.frames.items():
+        print(f"   📊 {name}: {len(df):,} records")
+    
+    return result.frames
+
+
+def result_cache_key(
+    cache: DatasetCache,
+    file_path: Path,
+    name: str,
+    target_user: Optional[str] = None,
+    bucket: Optional[str] = None,
+    top: Optional[int] = None,
+    approximate: bool = False
+) -> str:
+    """
+    Build the dataset cache key for a CLI analysis.
+    
+    Args:
+        cache: Dataset cache
+        file_path: Path to the log file
+        name: Analysis name
+        target_user: Username filter, part of the key for vpn_shutdown
+        bucket: Bucket size, part of the key for firewall_timeline
+        top: Top-K size, part of the key for firewall
+        approximate: Approximate top-K, part of the key for firewall
+    
+    Returns:
+        Cache key
+    """
+    params = {'format': 'fortinet'}
+    if name in ('firewall', 'firewall_timeline'):
+        # The CLI keeps every non-private destination, unlike the web service
+        params['ip_filter'] = 'not_private'
+    if name == 'firewall' and top is not None:
+        params['top'] = top
+        params['approximate'] = approximate
+    if name == 'firewall_timeline':
+        params['bucket'] = bucket_seconds(bucket or 'hour')
+    if name == 'vpn_shutdown' and target_user is not None:
+        params['user'] = target_user.strip().lower()
+    
+    return cache.key(str(file_path), name, params)
+
+
+def load_or_parse(
+    cache: Optional[DatasetCache],
+    file_path: Path,
+    name: str,
+    parse: Callable[[], pd.DataFrame],
+    target_user: Optional[str] = None,
+    bucket: Optional[str] = None,
+    top: Optional[int] = None,
+    approximate: bool = False
+) -> pd.DataFrame:
+    """
+    Load an analysis result from the cache, or parse and cache it.
+    
+    Args:
+        cache: Dataset cache, or None to always parse
+        file_path: Path to the log file
+        name: Analysis name
+        parse: Callable running the analysis
+        target_user: Username filter, part of the cache key for vpn_shutdown
+        bucket: Bucket size, part of the cache key for firewall_timeline
+        top: Top-K size, part of the cache key for firewall
+        approximate: Approximate top-K, part of the cache key for firewall
+    
+    Returns:
+        The analysis result
+    """
+    if cache is None:
+        return parse()
+    
+    key = result_cache_key(cache, file_path, name, target_user, bucket, top, approximate)
+    df = cache.load(key)
+    
+    if df is not None:
+        print(f"\n♻️  Loaded {name} results for {file_path} from cache")
+        return df
+    
+    df = parse()
+    cache.store(key, df)
     return df
 
 
-def save_results(df: pd.DataFrame, output_path: Path) -> None:
+def stream_results(
+    cache: Optional[DatasetCache],
+    file_path: Path,
+    analysis: RowAnalysis,
+    output_path: Path,
+    workers: int = 1,
+    target_user: Optional[str] = None,
+    output_format: Optional[str] = None
+) -> ExportResult:
     """
-    Save DataFrame to CSV file.
+    Parse a row analysis straight into the output file.
+    
+    Rows are written in batches while the file is parsed, so large results
+    are never held in memory as a whole; their statistics are accumulated
+    in the same pass. A cached result is written out instead of parsing; a
+    new result is cached batch by batch as it is written.
+    
+    Args:
+        cache: Dataset cache, or None to always parse
+        file_path: Path to the log file
+        analysis: Fresh VPN login or shutdown analysis
+        output_path: Path to output file
+        workers: Number of worker processes (1 parses in this process)
+        target_user: Username filter, part of the cache key for vpn_shutdown
+        output_format: Output format, or None to use the suffix of output_path
+    
+    Returns:
+        ExportResult with the record count, preview rows and, if the log was
+        parsed, statistics
+    """
+    key = entry = None
+    if cache is not None:
+        key = result_cache_key(cache, file_path, analysis.name, target_user)
+        df = cache.load(key)
+        
+        if df is not None:
+            print(f"\n♻️  Loaded {analysis.name} results for {file_path} from cache")
+            return save_results(df, output_path, output_format)
+        
+        entry = cache.writer(key)
+    
+    print(f"\n📄 Parsing {analysis.name} results from: {file_path}")
+    
+    summary = StatisticsAnalysis(analysis.name, getattr(analysis, 'target_user', None))
+    with open_writer(output_path, analysis.columns, output_format, mirror=entry) as writer:
+        stats, df = stream_analysis(
+            str(file_path), analysis, writer, workers=workers, progress=print_progress, alongside=[summary]
+        )
+    
+    print(f"   ✅ Processed {stats.lines_processed:,} lines, found {analysis.lines_matched:,} records")
+    
+    if entry is not None and not entry.batches and df is not None:
+        # Empty results write no batches
+        cache.store(key, df)
+    
+    result = writer.result(df)
+    result.statistics = summary.statistics()
+    if result.records:
+        report_statistics(result.statistics)
+        report_saved(result)
+    
+    return result
+
+
+def report_statistics(statistics: Dict) -> None:
+    """Print the distinct counts and byte totals of streamed statistics."""
+    if 'unique_users' in statistics:
+        print(f"   👥 About {statistics['unique_users']:,} distinct users")
+    if 'unique_ips' in statistics:
+        print(f"   🌐 About {statistics['unique_ips']:,} distinct source IPs")
+    if 'total_mb' in statistics:
+        print(f"   📦 {statistics['total_mb']:,.2f} MB sent in total")
+
+
+def save_results(df: pd.DataFrame, output_path: Path, output_format: Optional[str] = None) -> ExportResult:
+    """
+    Save DataFrame to a CSV, NDJSON, Parquet or Feather file.
     
     Args:
         df: DataFrame to save
         output_path: Path to output file
+        output_format: Output format, or None to use the suffix of output_path
+            (CSV for other suffixes)
+    
+    Returns:
+        ExportResult for the written file
     """
-    df.to_csv(output_path, index=False)
+    result = write_result(df, output_path, output_format)
+    report_saved(result)
+    return result
+
+
+def report_saved(result: ExportResult) -> None:
+    """Print where a result was saved and how large it is."""
+    output_path = Path(result.path)
     print(f"\n💾 Results saved to: {output_path}")
     print(f"   📁 File size: {output_path.stat().st_size:,} bytes")
-    print(f"   📊 Records: {len(df):,}")
+    print(f"   📊 Records: {result.records:,}")
 
 
-def interactive_mode() -> None:
-    """Run the CLI in interactive mode."""
+def interactive_mode(
+    workers: int = 1,
+    index_dir: Optional[str] = None,
+    cache_dir: Optional[str] = None
+) -> None:
+    """
+    Run the CLI in interactive mode.
+    
+    Args:
+        workers: Number of worker processes used for parsing
+        index_dir: Optional directory to persist VPN shutdown indexes in
+        cache_dir: Optional directory to cache parsed results in
+    """
+    # Shutdown lookups for several users of the same file share one index
+    index_store = ShutdownIndexStore(index_dir)
+    cache = DatasetCache(cache_dir) if cache_dir else None
+    
     print_banner()
     print("Forti-DFIR - Fortinet Log Parser CLI Tool")
     print("=" * 50)
@@ -448,11 +719,31 @@ def interactive_mode() -> None:
         # Parse based on choice
         try:
             if choice == '1':
-                df = parse_vpn_logs(input_file)
+                # Rows are written to the output file while parsing
+                result = stream_results(cache, input_file, VPNLoginAnalysis(), output_file, workers=workers)
+                
+                if not result.records:
+                    output_file.unlink(missing_ok=True)
+                    print("\n⚠️  Warning: No matching records found.")
+                    print("   The file may be empty or contain no matching entries.")
+                    continue
+                
+                print("\n📋 Preview (first 5 records):")
+                print(pd.DataFrame(result.preview).head().to_string(index=False))
+                continue
             elif choice == '2':
-                df = parse_firewall_logs(input_file)
+                df = load_or_parse(
+                    cache, input_file, 'firewall',
+                    lambda: parse_firewall_logs(input_file, workers=workers)
+                )
             elif choice == '3':
-                df = parse_vpn_shutdown_sentbytes(input_file, target_user)
+                df = load_or_parse(
+                    cache, input_file, 'vpn_shutdown',
+                    lambda: parse_vpn_shutdown_sentbytes(
+                        input_file, target_user, workers=workers, index_store=index_store
+                    ),
+                    target_user=target_user
+                )
             
             if df.empty:
                 print("\n⚠️  Warning: No matching records found.")
@@ -471,6 +762,475 @@ def interactive_mode() -> None:
             continue
 
 
+def positive_int(value: str) -> int:
+    """Validate a positive integer argument for argparse."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: {value}")
+    return number
+
+
+def bucket_arg(value: str) -> str:
+    """Validate a --bucket value for argparse."""
+    try:
+        bucket_seconds(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    """
+    Build the command-line argument parser.
+    
+    Returns:
+        ArgumentParser with one subcommand per analysis
+    """
+    parser = argparse.ArgumentParser(
+        prog='forti-dfir',
+        description='Fortinet Log Parser for DFIR Investigations',
+    )
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help='Worker processes used to parse a single file (default: 1)',
+    )
+    parser.add_argument(
+        '--index-dir',
+        help='Directory to keep VPN shutdown indexes in, reused across runs',
+    )
+    parser.add_argument(
+        '--cache-dir', default=os.environ.get(CACHE_DIR_ENV),
+        help=f'Directory to cache parsed results in, keyed by file content (default: ${CACHE_DIR_ENV})',
+    )
+    
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('input', help='Path to the log file')
+    common.add_argument('-o', '--output', required=True, help='Path to save the parsed logs')
+    common.add_argument(
+        '-f', '--format', choices=list(OUTPUT_FORMATS),
+        help='Output format (default: from the output file suffix, else csv)',
+    )
+    common.add_argument(
+        '-w', '--workers', type=int, default=argparse.SUPPRESS,
+        help='Worker processes used to parse a single file (default: 1)',
+    )
+    common.add_argument(
+        '--cache-dir', default=argparse.SUPPRESS,
+        help='Directory to cache parsed results in, keyed by file content',
+    )
+    
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('vpn', parents=[common], help='Parse VPN logs')
+    firewall = subparsers.add_parser('firewall', parents=[common], help='Parse and aggregate firewall logs')
+    firewall.add_argument(
+        '-k', '--top', type=positive_int,
+        help='Keep only the K destinations with the most bytes sent',
+    )
+    firewall.add_argument(
+        '--approximate', action='store_true',
+        help='With --top, count in a fixed-size summary instead of one total per destination',
+    )
+    timeline = subparsers.add_parser(
+        'firewall-timeline', parents=[common], help='Aggregate firewall traffic per destination and time bucket'
+    )
+    timeline.add_argument(
+        '-b', '--bucket', type=bucket_arg, default='hour',
+        help='Bucket size: minute, hour, day or a size such as 15m, 6h or 30s (default: hour)',
+    )
+    shutdown = subparsers.add_parser(
+        'vpn-shutdown', parents=[common], help='Parse VPN shutdown sessions for a user'
+    )
+    shutdown_target = shutdown.add_mutually_exclusive_group(required=True)
+    shutdown_target.add_argument('-u', '--user', help='Username to filter by')
+    shutdown_target.add_argument(
+        '--all-users', action='store_true',
+        help='Write per-user session counts and byte totals for every user',
+    )
+    shutdown.add_argument(
+        '--index-dir', default=argparse.SUPPRESS,
+        help='Directory to keep VPN shutdown indexes in, reused across runs',
+    )
+    
+    combined = subparsers.add_parser(
+        'combined', help='Run several analyses in a single pass over the file'
+    )
+    combined.add_argument('input', help='Path to the log file')
+    combined.add_argument(
+        '-o', '--output', required=True,
+        help='Directory to save one <analysis> result file per analysis',
+    )
+    combined.add_argument(
+        '-a', '--analyses', default='vpn,firewall',
+        help='Comma-separated analyses: vpn, firewall, firewall-timeline, vpn-shutdown (default: vpn,firewall)',
+    )
+    combined.add_argument('-u', '--user', help='Username to filter shutdown sessions by')
+    combined.add_argument(
+        '-f', '--format', choices=list(OUTPUT_FORMATS), default='csv',
+        help='Output format of the result files (default: csv)',
+    )
+    combined.add_argument(
+        '-w', '--workers', type=int, default=argparse.SUPPRESS,
+        help='Worker processes used to parse a single file (default: 1)',
+    )
+    combined.add_argument(
+        '--cache-dir', default=argparse.SUPPRESS,
+        help='Directory to cache parsed results in, keyed by file content',
+    )
+    
+    bundle = subparsers.add_parser(
+        'bundle', help='Run analyses over several files, directories or zip/tar archives'
+    )
+    bundle.add_argument('inputs', nargs='+', help='Log files, CSV exports, directories or archives')
+    bundle.add_argument(
+        '-o', '--output', required=True,
+        help='Directory to save one merged <analysis> result file per analysis',
+    )
+    bundle.add_argument(
+        '-a', '--analyses', default='vpn,firewall',
+        help='Comma-separated analyses: vpn, firewall, firewall-timeline, vpn-shutdown (default: vpn,firewall)',
+    )
+    bundle.add_argument('-u', '--user', help='Username to filter shutdown sessions by')
+    bundle.add_argument(
+        '-f', '--format', choices=list(OUTPUT_FORMATS), default='csv',
+        help='Output format of the result files (default: csv)',
+    )
+    bundle.add_argument(
+        '-w', '--workers', type=int, default=argparse.SUPPRESS,
+        help='Worker processes; files are parsed in parallel (default: 1)',
+    )
+    
+    query = subparsers.add_parser('query', help='Find rows of a saved result by user, IP, time or message')
+    query.add_argument('result', help='Result file written by another command')
+    query.add_argument('-u', '--user', help='Username (case-insensitive)')
+    query.add_argument('--ip', help='IP address or CIDR network, e.g. 203.0.113.0/24')
+    query.add_argument('--start', help='First date or time, e.g. 2024-03-01 or "2024-03-01 08:00:00"')
+    query.add_argument('--end', help='Last date or time; a bare date includes the whole day')
+    query.add_argument('-m', '--message', help='Text the message contains (case-insensitive)')
+    query.add_argument(
+        '-n', '--limit', type=int, default=20,
+        help='Matching rows to print (default: 20)',
+    )
+    query.add_argument('-o', '--output', help='Save all matching rows to this file instead of printing them')
+    query.add_argument(
+        '-f', '--format', choices=list(OUTPUT_FORMATS),
+        help='Output format (default: from the output file suffix, else csv)',
+    )
+    query.add_argument(
+        '--pages-dir', default=os.environ.get(PAGES_DIR_ENV),
+        help=f'Directory to keep result indexes in (default: ${PAGES_DIR_ENV}, else .pages next to the result)',
+    )
+    
+    follow = subparsers.add_parser(
+        'follow', help='Keep results up to date while a log file grows'
+    )
+    follow.add_argument('input', help='Log file being written to')
+    follow.add_argument(
+        '-o', '--output', required=True,
+        help='Directory to keep one <analysis> result file per analysis in',
+    )
+    follow.add_argument(
+        '-a', '--analyses', default='vpn,firewall',
+        help='Comma-separated analyses: vpn, firewall, firewall-timeline, vpn-shutdown (default: vpn,firewall)',
+    )
+    follow.add_argument('-u', '--user', help='Username to filter shutdown sessions by')
+    follow.add_argument(
+        '-f', '--format', choices=list(OUTPUT_FORMATS), default='csv',
+        help='Output format of the result files (default: csv)',
+    )
+    follow.add_argument(
+        '--interval', type=float, default=DEFAULT_INTERVAL,
+        help=f'Seconds between polls (default: {DEFAULT_INTERVAL:g})',
+    )
+    follow.add_argument(
+        '--checkpoint',
+        help='Checkpoint file to resume from (default: .follow.ckpt in the output directory)',
+    )
+    follow.add_argument('--once', action='store_true', help='Poll once and exit')
+    
+    return parser
+
+
+def run_command(args: argparse.Namespace) -> int:
+    """
+    Run a single non-interactive command.
+    
+    Args:
+        args: Parsed command-line arguments
+    
+    Returns:
+        Process exit code
+    """
+    if args.command == 'combined':
+        return run_combined(args)
+    if args.command == 'bundle':
+        return run_bundle(args)
+    if args.command == 'query':
+        return run_query(args)
+    if args.command == 'follow':
+        return run_follow(args)
+    
+    try:
+        input_file = validate_file_path(args.input, must_exist=True)
+        output_file = ensure_output_path(args.output)
+        output_format = resolve_format(args.format, output_file)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    
+    cache = DatasetCache(args.cache_dir) if args.cache_dir else None
+    # Row results are written to the output file while parsing
+    streamed = None
+    
+    if args.command == 'vpn':
+        streamed = stream_results(
+            cache, input_file, VPNLoginAnalysis(), output_file,
+            workers=args.workers, output_format=output_format
+        )
+    elif args.command == 'firewall':
+        if args.approximate and args.top is None:
+            print("❌ Error: --approximate requires --top")
+            return 1
+        df = load_or_parse(
+            cache, input_file, 'firewall',
+            lambda: parse_firewall_logs(input_file, args.workers, args.top, args.approximate),
+            top=args.top, approximate=args.approximate
+        )
+    elif args.command == 'firewall-timeline':
+        df = load_or_parse(
+            cache, input_file, 'firewall_timeline',
+            lambda: parse_firewall_timeline(input_file, args.bucket, workers=args.workers),
+            bucket=args.bucket
+        )
+    else:
+        index_store = ShutdownIndexStore(args.index_dir) if args.index_dir else None
+        if args.all_users:
+            df = load_or_parse(
+                cache, input_file, 'vpn_shutdown_users',
+                lambda: parse_vpn_shutdown_all_users(input_file, workers=args.workers, index_store=index_store)
+            )
+        elif index_store is None:
+            streamed = stream_results(
+                cache, input_file, ShutdownAnalysis(args.user), output_file,
+                workers=args.workers, target_user=args.user, output_format=output_format
+            )
+        else:
+            df = load_or_parse(
+                cache, input_file, 'vpn_shutdown',
+                lambda: parse_vpn_shutdown_sentbytes(
+                    input_file, args.user, workers=args.workers, index_store=index_store
+                ),
+                target_user=args.user
+            )
+    
+    if streamed is not None:
+        if not streamed.records:
+            output_file.unlink(missing_ok=True)
+            print("\n⚠️  Warning: No matching records found.")
+        return 0
+    
+    if df.empty:
+        print("\n⚠️  Warning: No matching records found.")
+        return 0
+    
+    save_results(df, output_file, output_format)
+    return 0
+
+
+def run_combined(args: argparse.Namespace) -> int:
+    """
+    Run the combined single-pass command.
+    
+    Args:
+        args: Parsed command-line arguments
+    
+    Returns:
+        Process exit code
+    """
+    analyses = [
+        ANALYSIS_ALIASES.get(name.strip().lower(), name.strip())
+        for name in args.analyses.split(',') if name.strip()
+    ]
+    cache = DatasetCache(args.cache_dir) if args.cache_dir else None
+    
+    try:
+        output_format = resolve_format(args.format)
+        input_file = validate_file_path(args.input, must_exist=True)
+        output_dir = Path(args.output).resolve()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Only analyses without a cached result are parsed
+        results: Dict[str, pd.DataFrame] = {}
+        cache_keys = {}
+        if cache is not None:
+            for name in analyses:
+                cache_keys[name] = result_cache_key(cache, input_file, name, args.user)
+                df = cache.load(cache_keys[name])
+                if df is not None:
+                    print(f"\n♻️  Loaded {name} results for {input_file} from cache")
+                    results[name] = df
+        
+        missing = [name for name in analyses if name not in results]
+        if missing:
+            parsed = parse_combined(input_file, missing, args.user, workers=args.workers)
+            for name, df in parsed.items():
+                if cache is not None:
+                    cache.store(cache_keys[name], df)
+                results[name] = df
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    
+    results = {name: results[name] for name in analyses}
+    
+    for name, df in results.items():
+        if df.empty:
+            print(f"\n⚠️  Warning: No matching records found for {name}.")
+            continue
+        save_results(df, output_dir / f'{name}{OUTPUT_FORMATS[output_format]}', output_format)
+    
+    return 0
+
+
+def run_bundle(args: argparse.Namespace) -> int:
+    """
+    Run the multi-file bundle command.
+    
+    Args:
+        args: Parsed command-line arguments
+    
+    Returns:
+        Process exit code
+    """
+    analyses = [
+        ANALYSIS_ALIASES.get(name.strip().lower(), name.strip())
+        for name in args.analyses.split(',') if name.strip()
+    ]
+    
+    try:
+        output_format = resolve_format(args.format)
+        output_dir = Path(args.output).resolve()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        results = parse_evidence_bundle(args.inputs, analyses, args.user, workers=args.workers)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    
+    for name, df in results.items():
+        if df.empty:
+            print(f"\n⚠️  Warning: No matching records found for {name}.")
+            continue
+        save_results(df, output_dir / f'{name}{OUTPUT_FORMATS[output_format]}', output_format)
+    
+    return 0
+
+
+def run_query(args: argparse.Namespace) -> int:
+    """
+    Run the query command over a saved result.
+    
+    Args:
+        args: Parsed command-line arguments
+    
+    Returns:
+        Process exit code
+    """
+    try:
+        result_file = validate_file_path(args.result, must_exist=True)
+        pages_dir = Path(args.pages_dir) if args.pages_dir else result_file.parent / '.pages'
+        
+        pages = open_pages(result_file, pages_dir)
+        rows = ResultQuery(pages).match(
+            user=args.user, ip=args.ip, start=args.start, end=args.end, message=args.message
+        )
+        
+        output_file = ensure_output_path(args.output) if args.output else None
+        output_format = resolve_format(args.format, output_file) if output_file else None
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    
+    print(f"\n🔎 {len(rows):,} of {pages.rows:,} rows match")
+    
+    if not len(rows):
+        return 0
+    
+    if output_file is not None:
+        save_results(pd.DataFrame(pages.records(rows), columns=pages.column_names), output_file, output_format)
+        return 0
+    
+    shown = pd.DataFrame(pages.records(rows[:args.limit]), columns=pages.column_names)
+    print(shown.to_string(index=False))
+    if len(rows) > args.limit:
+        print(f"   ... {len(rows) - args.limit:,} more (use -n or -o to see them)")
+    
+    return 0
+
+
+def run_follow(args: argparse.Namespace) -> int:
+    """
+    Run the follow command until interrupted.
+    
+    Args:
+        args: Parsed command-line arguments
+    
+    Returns:
+        Process exit code
+    """
+    analyses = [
+        ANALYSIS_ALIASES.get(name.strip().lower(), name.strip())
+        for name in args.analyses.split(',') if name.strip()
+    ]
+    
+    try:
+        output_format = resolve_format(args.format)
+        input_file = validate_file_path(args.input, must_exist=True)
+        output_dir = Path(args.output).resolve()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        checkpoint = Path(args.checkpoint) if args.checkpoint else output_dir / '.follow.ckpt'
+        
+        runners = [
+            create_analysis(name, target_user=args.user, ip_filter=is_not_private_ip)
+            for name in dict.fromkeys(analyses)
+        ]
+        follower = LogFollower(str(input_file), runners, str(checkpoint))
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    
+    print(f"\n👀 Following {input_file} (every {args.interval:g}s, Ctrl+C to stop)")
+    if follower.state.lines_processed:
+        print(f"   ♻️  Resumed at line {follower.state.lines_processed:,} from {checkpoint}")
+    
+    try:
+        for poll in follower.follow(args.interval, max_polls=1 if args.once else None):
+            if not poll.changed:
+                continue
+            if poll.rotated or poll.truncated:
+                print(f"\n🔄 {input_file} was {'rotated' if poll.rotated else 'truncated'}")
+            
+            for name, df in follower.results().items():
+                output_path = output_dir / f'{name}{OUTPUT_FORMATS[output_format]}'
+                # Readers of the result never see a half-written file
+                temp_path = output_path.with_name(f'.{output_path.name}.tmp')
+                write_result(df, temp_path, output_format)
+                os.replace(temp_path, output_path)
+            
+            print(
+                f"   📈 +{poll.lines_processed:,} lines "
+                f"({follower.state.lines_processed:,} total, byte {poll.offset:,})"
+            )
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    except KeyboardInterrupt:
+        print(f"\n⏹️  Stopped; resume with the same command (checkpoint: {checkpoint})")
+    
+    return 0
+
+
 def main() -> None:
     """Main entry point."""
     # Check for help flag
@@ -484,9 +1244,14 @@ def main() -> None:
         print(f"Forti-DFIR v{__version__}")
         sys.exit(0)
     
-    # Run in interactive mode
+    args = build_arg_parser().parse_args()
+    
     try:
-        interactive_mode()
+        if args.command:
+            sys.exit(run_command(args))
+        
+        # Run in interactive mode
+        interactive_mode(workers=args.workers, index_dir=args.index_dir, cache_dir=args.cache_dir)
     except KeyboardInterrupt:
         print("\n\n👋 Operation cancelled. Goodbye!")
         sys.exit(0)
@@ -0,0 +1,29 @@
+"""
+Fixtures shared by the test modules.
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+import parse_engine
+
+
+@pytest.fixture(scope='session')
+def firewall_log(tmp_path_factory):
+    """A firewall log spanning several read blocks, ending with one VPN login."""
+    path = tmp_path_factory.mktemp('logs') / 'fortigate.log'
+    lines = [
+        f'date=2024-01-15 time=10:00:00 dstip=8.{i % 7}.{i % 251}.1 sentbyte={i % 9000} action=accept\n'
+        for i in range(160000)
+    ]
+    lines.append(
+        'date=2024-01-15 time=10:00:00 tunneltype="ssl-web" remip=203.0.113.5 user="alice" '
+        'reason="login successfully" msg="SSL tunnel established"\n'
+    )
+    path.write_text(''.join(lines))
+    assert path.stat().st_size > 2 * parse_engine.READ_BLOCK_SIZE
+    return path
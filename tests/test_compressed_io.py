@@ -0,0 +1,132 @@
+"""
+Unit tests for reading compressed evidence files.
+"""
+
+import bz2
+import gzip
+import lzma
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+import parse_engine
+from compressed_io import detect_compression, open_text, strip_compression_suffix
+from parse_engine import run_analyses, split_gzip_members, VPNLoginAnalysis, FirewallAnalysis, ShutdownAnalysis
+from csv_parser_service import CSVParserService
+
+
+COMPRESSORS = {
+    'gzip': gzip.compress,
+    'bz2': bz2.compress,
+    'xz': lzma.compress,
+}
+
+
+@pytest.fixture
+def log_bytes():
+    """Build log content mixing VPN, firewall and shutdown lines."""
+    lines = []
+    for i in range(400):
+        lines.append(
+            f'date=2024-01-15 time=10:{i % 60:02d}:00 user="user{i % 7}" tunneltype="ssl-web" '
+            f'remip=203.0.113.{i % 250} reason="login successfully" msg="SSL tunnel established"'
+        )
+        lines.append(f'date=2024-01-15 time=11:00:00 dstip={["8.8.8.8", "1.1.1.1"][i % 2]} sentbyte={i}')
+        lines.append(f'date=2024-01-15 time=12:00:00 user="user{i % 3}" sentbyte={i * 100} msg="SSL tunnel shutdown"')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+@pytest.fixture
+def plain_log(tmp_path, log_bytes):
+    """Write the log uncompressed."""
+    path = tmp_path / 'plain.log'
+    path.write_bytes(log_bytes)
+    return str(path)
+
+
+def gzip_members(data: bytes, size: int) -> bytes:
+    """Compress data as concatenated gzip members of about size bytes each."""
+    return b''.join(gzip.compress(data[i:i + size]) for i in range(0, len(data), size))
+
+
+def run_all(file_path, workers=1):
+    """Run the three analyses and return their results."""
+    analyses = [VPNLoginAnalysis(), FirewallAnalysis(), ShutdownAnalysis('user1')]
+    stats = run_analyses(file_path, analyses, workers=workers)
+    return analyses[0].rows, analyses[1].totals, analyses[2].rows, stats.lines_processed
+
+
+class TestDetection:
+    """Tests for compression detection."""
+    
+    @pytest.mark.parametrize('compression', sorted(COMPRESSORS))
+    def test_detect_by_content(self, tmp_path, log_bytes, compression):
+        """Test detection uses magic bytes, not the file name."""
+        path = tmp_path / 'renamed.log'
+        path.write_bytes(COMPRESSORS[compression](log_bytes))
+        
+        assert detect_compression(str(path)) == compression
+        with open_text(str(path)) as handle:
+            assert handle.read().encode('utf-8') == log_bytes
+    
+    def test_plain_file(self, plain_log):
+        """Test uncompressed files are not detected as compressed."""
+        assert detect_compression(plain_log) is None
+    
+    def test_strip_suffix(self):
+        """Test compression suffixes are removed case-insensitively."""
+        assert strip_compression_suffix('traffic.csv.GZ') == 'traffic.csv'
+        assert strip_compression_suffix('vpn.log') == 'vpn.log'
+
+
+class TestCompressedParsing:
+    """Tests for parsing compressed log files."""
+    
+    @pytest.mark.parametrize('compression', sorted(COMPRESSORS))
+    def test_matches_plain(self, tmp_path, plain_log, log_bytes, compression):
+        """Test compressed files give the same results as the plain file."""
+        path = tmp_path / f'log.{compression}'
+        path.write_bytes(COMPRESSORS[compression](log_bytes))
+        
+        assert run_all(str(path)) == run_all(plain_log)
+    
+    def test_parallel_gzip_members(self, tmp_path, plain_log, log_bytes, monkeypatch):
+        """Test multi-member gzip is split at members and merged in order."""
+        monkeypatch.setattr(parse_engine, 'MIN_COMPRESSED_CHUNK_SIZE', 512)
+        path = tmp_path / 'members.log.gz'
+        # Member size not aligned to lines, so lines span members
+        path.write_bytes(gzip_members(log_bytes, 5000))
+        
+        assert len(split_gzip_members(str(path), 4)) > 1
+        assert run_all(str(path), workers=3) == run_all(plain_log)
+    
+    def test_bad_boundary_falls_back(self, tmp_path, plain_log, log_bytes, monkeypatch):
+        """Test a false member candidate falls back to sequential decompression."""
+        monkeypatch.setattr(parse_engine, 'MIN_COMPRESSED_CHUNK_SIZE', 512)
+        path = tmp_path / 'single.log.gz'
+        data = gzip.compress(log_bytes)
+        path.write_bytes(data)
+        monkeypatch.setattr(parse_engine, 'gzip_member_candidates', lambda _: [0, len(data) // 2])
+        
+        assert len(split_gzip_members(str(path), 4)) == 2
+        assert run_all(str(path), workers=2) == run_all(plain_log)
+
+
+class TestCompressedCSV:
+    """Tests for compressed CSV exports."""
+    
+    def test_csv_gz(self, tmp_path):
+        """Test gzip-compressed CSV is detected and parsed."""
+        content = 'dstip,sentbyte\n8.8.8.8,1500\n1.1.1.1,2500\n8.8.8.8,3000\n'
+        path = tmp_path / 'firewall.csv.gz'
+        path.write_bytes(gzip.compress(content.encode('utf-8')))
+        parser = CSVParserService()
+        
+        assert parser.detect_format(str(path)) == 'csv'
+        
+        df = parser.parse_csv_firewall_logs(str(path))
+        assert df['dstip'].tolist() == ['8.8.8.8', '1.1.1.1']
+        assert df['total_sentbyte'].tolist() == [4500, 2500]
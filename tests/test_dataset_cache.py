@@ -0,0 +1,180 @@
+"""
+Unit tests for the content-addressed dataset cache.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+import dataset_cache
+from dataset_cache import DatasetCache, CACHE_SUFFIX
+from log_parser_service import LogParserService
+from parse_engine import STREAM_BATCH_ROWS
+from result_pages import PageWriter
+
+
+@pytest.fixture
+def small_firewall_log(tmp_path):
+    """Create a small firewall log file."""
+    lines = [
+        f'date=2024-01-15 dstip={ip} sentbyte={i * 100}'
+        for i, ip in enumerate(['8.8.8.8', '1.1.1.1', '10.0.0.1'] * 20)
+    ]
+    log_file = tmp_path / "firewall.log"
+    log_file.write_text('\n'.join(lines) + '\n')
+    return str(log_file)
+
+
+class TestDatasetCache:
+    """Tests for DatasetCache."""
+    
+    def test_roundtrip_preserves_dtypes_and_missing(self, tmp_path, small_firewall_log):
+        """Test cached frames come back equal, including NaN in text columns."""
+        cache = DatasetCache(str(tmp_path / 'cache'))
+        df = pd.DataFrame({
+            'user': ['alice', None, 'bob', 'alice'],
+            'sentbyte': np.array([1, 2, 3, 4], dtype=np.int64),
+            'size_mb': [0.5, np.nan, 1.5, 2.0],
+        })
+        
+        key = cache.key(small_firewall_log, 'test')
+        cache.store(key, df)
+        
+        assert cache.load(key).equals(df)
+    
+    def test_hit_miss_counters(self, tmp_path, small_firewall_log):
+        """Test repeated analyses are loaded instead of recomputed."""
+        cache = DatasetCache(str(tmp_path / 'cache'))
+        parser = LogParserService()
+        calls = []
+        
+        def parse():
+            calls.append(1)
+            return parser.parse_firewall_logs(small_firewall_log)
+        
+        first = cache.get_or_compute(small_firewall_log, 'firewall', {'format': 'fortinet'}, parse)
+        second = cache.get_or_compute(small_firewall_log, 'firewall', {'format': 'fortinet'}, parse)
+        
+        assert len(calls) == 1
+        assert second.equals(first)
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+    
+    def test_key_depends_on_content_and_params(self, tmp_path, small_firewall_log):
+        """Test keys follow file content, parser version and parameters, not the path."""
+        cache = DatasetCache(str(tmp_path / 'cache'))
+        copy = tmp_path / 'renamed.log'
+        copy.write_bytes(Path(small_firewall_log).read_bytes())
+        
+        key = cache.key(small_firewall_log, 'vpn_shutdown', {'user': 'alice'})
+        
+        assert cache.key(str(copy), 'vpn_shutdown', {'user': 'alice'}) == key
+        assert cache.key(small_firewall_log, 'vpn_shutdown', {'user': 'bob'}) != key
+        
+        with open(copy, 'a') as handle:
+            handle.write('dstip=9.9.9.9 sentbyte=1\n')
+        assert cache.key(str(copy), 'vpn_shutdown', {'user': 'alice'}) != key
+    
+    def test_parser_version_invalidates(self, tmp_path, small_firewall_log, monkeypatch):
+        """Test a new parser version misses existing entries."""
+        cache = DatasetCache(str(tmp_path / 'cache'))
+        key = cache.key(small_firewall_log, 'vpn')
+        
+        monkeypatch.setattr(dataset_cache, 'PARSER_VERSION', 'next')
+        
+        assert cache.key(small_firewall_log, 'vpn') != key
+    
+    def test_lru_eviction(self, tmp_path, small_firewall_log):
+        """Test least recently used entries are evicted past the size bound."""
+        cache = DatasetCache(str(tmp_path / 'cache'))
+        df = pd.DataFrame({'value': np.arange(1000, dtype=np.int64)})
+        
+        keys = [cache.key(small_firewall_log, f'analysis{i}') for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.store(key, df)
+            os.utime(cache.directory / f'{key}{CACHE_SUFFIX}', ns=(i * 10**9, i * 10**9))
+        
+        # Touch the oldest entry, then shrink the cache to two entries
+        assert cache.load(keys[0]) is not None
+        entry_size = (cache.directory / f'{keys[0]}{CACHE_SUFFIX}').stat().st_size
+        cache.max_bytes = 2 * entry_size
+        
+        assert cache.evict() == 1
+        assert cache.load(keys[1]) is None
+        assert cache.load(keys[0]) is not None
+        assert cache.load(keys[2]) is not None
+    
+    def test_batches_roundtrip(self, tmp_path, small_firewall_log):
+        """Test entries written batch by batch load as one frame."""
+        cache = DatasetCache(str(tmp_path / 'cache'))
+        df = pd.DataFrame({
+            'user': pd.Categorical(['alice', 'bob', 'alice', 'carol']),
+            'sentbyte': np.array([1, 2, 3, 4], dtype=np.int64),
+            'epoch': pd.array([1, None, 3, 4], dtype='Int64'),
+        })
+        
+        key = cache.key(small_firewall_log, 'test')
+        entry = cache.writer(key)
+        entry.write(df.iloc[:2])
+        assert cache.load(key) is None
+        entry.write(df.iloc[2:])
+        entry.close()
+        
+        assert cache.load(key).equals(df)
+    
+    def test_discarded_entry_not_cached(self, tmp_path, small_firewall_log):
+        """Test an entry of an incomplete result never reaches the cache."""
+        cache = DatasetCache(str(tmp_path / 'cache'))
+        key = cache.key(small_firewall_log, 'test')
+        
+        entry = cache.writer(key)
+        entry.write(pd.DataFrame({'value': [1, 2]}))
+        entry.discard()
+        
+        assert cache.load(key) is None
+        assert not list(cache.directory.iterdir())
+
+
+def test_streamed_export_is_cached(tmp_path):
+    """Test a row result streamed in several batches is a cache hit on the next export."""
+    log = tmp_path / 'vpn.log'
+    with open(log, 'w') as handle:
+        for i in range(STREAM_BATCH_ROWS + 1):
+            handle.write(
+                f'date=2024-01-15 time=10:00:00 tunneltype="ssl-web" remip=203.0.113.{i % 250} '
+                f'user="user{i % 97}" reason="login successfully" msg="SSL tunnel established"\n'
+            )
+    cache = DatasetCache(str(tmp_path / 'cache'))
+    parser = LogParserService()
+    exports = []
+    
+    def export(path):
+        def run(mirror):
+            exports.append(path)
+            return parser.export_results(str(log), 'vpn', str(path), 'csv', mirror=mirror)
+        return run
+    
+    first = cache.get_or_export(
+        str(log), 'vpn', {}, tmp_path / 'first.csv', 'csv', export(tmp_path / 'first.csv'),
+        mirror=PageWriter(tmp_path / 'pages')
+    )
+    second = cache.get_or_export(
+        str(log), 'vpn', {}, tmp_path / 'second.csv', 'csv', export(tmp_path / 'second.csv')
+    )
+    
+    assert first.frame is None
+    assert exports == [tmp_path / 'first.csv']
+    assert cache.stats()['hits'] == 1
+    assert second.records == first.records == STREAM_BATCH_ROWS + 1
+    assert (tmp_path / 'second.csv').read_bytes() == (tmp_path / 'first.csv').read_bytes()
+    assert (tmp_path / 'pages').is_dir()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
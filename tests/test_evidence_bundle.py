@@ -0,0 +1,139 @@
+"""
+Unit tests for archive and multi-file evidence ingestion.
+"""
+
+import gzip
+import io
+import tarfile
+import zipfile
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+from evidence_bundle import collect_members, parse_bundle
+from log_parser_service import LogParserService
+
+
+def fortinet_lines(start, count):
+    """Build VPN login and firewall lines."""
+    lines = []
+    for i in range(start, start + count):
+        lines.append(
+            f'date=2024-01-15 time=10:{i % 60:02d}:00 user="user{i % 4}" tunneltype="ssl-web" '
+            f'remip=203.0.113.{i % 250} reason="login successfully" msg="SSL tunnel established"'
+        )
+        lines.append(f'date=2024-01-15 time=11:00:00 dstip={["8.8.8.8", "1.1.1.1"][i % 2]} sentbyte={i}')
+        lines.append('date=2024-01-15 time=11:00:00 dstip=10.0.0.1 sentbyte=5')
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def rotated_logs(tmp_path):
+    """Three rotated log files, one of them gzip-compressed, plus the full log."""
+    parts = [fortinet_lines(0, 50), fortinet_lines(50, 50), fortinet_lines(100, 50)]
+    (tmp_path / 'fw.log.2').write_text(parts[0])
+    (tmp_path / 'fw.log.1.gz').write_bytes(gzip.compress(parts[1].encode('utf-8')))
+    (tmp_path / 'fw.log').write_text(parts[2])
+    
+    full = tmp_path / 'full.log'
+    full.write_text(''.join(parts))
+    
+    names = ['fw.log.2', 'fw.log.1.gz', 'fw.log']
+    return tmp_path, names, str(full)
+
+
+class TestCollectMembers:
+    """Tests for expanding inputs into evidence files."""
+    
+    def test_zip_members_stay_in_work_dir(self, tmp_path):
+        """Test traversal names and metadata entries are handled safely."""
+        archive_path = tmp_path / 'evil.zip'
+        with zipfile.ZipFile(archive_path, 'w') as archive:
+            archive.writestr('../../escape.log', 'a=1\n')
+            archive.writestr('__MACOSX/._escape.log', 'junk')
+            archive.writestr('logs/', '')
+        work_dir = tmp_path / 'work'
+        
+        members = collect_members([str(archive_path)], str(work_dir))
+        
+        assert [member.name for member in members] == ['../../escape.log']
+        assert Path(members[0].path).parent == work_dir
+        assert not (tmp_path.parent / 'escape.log').exists()
+    
+    def test_extract_limit(self, tmp_path):
+        """Test archives expanding beyond the limit are refused."""
+        archive_path = tmp_path / 'bomb.zip'
+        with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('big.log', 'x' * 100000)
+        
+        with pytest.raises(ValueError):
+            collect_members([str(archive_path)], str(tmp_path / 'work'), max_bytes=1000)
+    
+    def test_missing_input(self, tmp_path):
+        """Test a missing input raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            collect_members([str(tmp_path / 'missing.zip')], str(tmp_path / 'work'))
+
+
+class TestParseBundle:
+    """Tests for parsing and merging bundles."""
+    
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_zip_matches_single_file(self, rotated_logs, workers):
+        """Test a zip of rotated logs merges to the results of one concatenated file."""
+        directory, names, full = rotated_logs
+        archive_path = directory / 'bundle.zip'
+        with zipfile.ZipFile(archive_path, 'w') as archive:
+            for name in names:
+                archive.write(directory / name, name)
+        
+        result = parse_bundle([str(archive_path)], ['vpn', 'firewall'], workers=workers)
+        expected = LogParserService().analyze(full, ['vpn', 'firewall'])
+        
+        assert [member.name for member in result.members] == names
+        assert all(member.file_format == 'fortinet' for member in result.members)
+        assert result.frames['vpn'].equals(expected['vpn'])
+        assert result.frames['firewall'].equals(expected['firewall'])
+    
+    def test_tar_and_csv_members(self, rotated_logs):
+        """Test tar.gz bundles with a CSV export are merged per analysis."""
+        directory, names, full = rotated_logs
+        csv_data = b'dstip,sentbyte\n8.8.8.8,1000000\n9.9.9.9,5\n'
+        archive_path = directory / 'bundle.tar.gz'
+        with tarfile.open(archive_path, 'w:gz') as archive:
+            archive.add(directory / 'fw.log', 'fw.log')
+            info = tarfile.TarInfo('export.csv')
+            info.size = len(csv_data)
+            archive.addfile(info, io.BytesIO(csv_data))
+        
+        result = parse_bundle([str(archive_path)], ['vpn', 'firewall'])
+        firewall = dict(zip(result.frames['firewall']['dstip'], result.frames['firewall']['total_sentbyte']))
+        
+        assert [member.file_format for member in result.members] == ['fortinet', 'csv']
+        # The firewall export has no VPN columns, so it only feeds the firewall result
+        assert result.members[1].analyses == ['firewall']
+        assert result.failed == []
+        assert firewall['8.8.8.8'] == 1000000 + sum(i for i in range(100, 150) if i % 2 == 0)
+        assert firewall['9.9.9.9'] == 5
+        assert result.frames['firewall']['dstip'].iloc[0] == '8.8.8.8'
+        assert len(result.frames['vpn']) == 50
+    
+    def test_directory_input(self, rotated_logs):
+        """Test directories contribute their files in name order."""
+        directory, names, full = rotated_logs
+        (directory / 'full.log').unlink()
+        
+        result = parse_bundle([str(directory)], ['firewall'])
+        
+        assert [Path(member.name).name for member in result.members] == sorted(names)
+        assert result.frames['firewall']['total_sentbyte'].sum() == sum(range(150))
+    
+    def test_shutdown_requires_user(self, rotated_logs):
+        """Test vpn_shutdown without a username is rejected before parsing."""
+        directory, names, full = rotated_logs
+        
+        with pytest.raises(ValueError):
+            parse_bundle([full], ['vpn_shutdown'])
@@ -0,0 +1,137 @@
+"""
+Unit tests for time-bucketed firewall traffic rollups.
+"""
+
+import io
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+from log_parser_service import LogParserService
+from log_time import bucket_seconds, line_epoch
+from parse_engine import FirewallTimelineAnalysis, create_analysis, run_analyses
+
+
+LINES = [
+    # Two lines to one destination in the 10:00 UTC hour, one written in +0200
+    'date=2024-01-15 time=10:05:00 dstip=8.8.8.8 sentbyte=100 rcvdbyte=10 action=accept',
+    'date=2024-01-15 time=12:59:59 tz="+0200" dstip=8.8.8.8 sentbyte=50 rcvdbyte=5 action=accept',
+    # eventtime wins over date and time; rcvdbyte is optional
+    'date=1999-01-01 time=00:00:00 eventtime=1705316400000000000 dstip=8.8.8.8 sentbyte=7 action=accept',
+    'date=2024-01-15 time=10:30:00 dstip=1.1.1.1 sentbyte=500 rcvdbyte=1 action=accept',
+    # Private destinations and unreadable times are skipped
+    'date=2024-01-15 time=10:30:00 dstip=10.0.0.1 sentbyte=900 rcvdbyte=9 action=accept',
+    'date=2024-13-45 time=10:30:00 dstip=8.8.8.8 sentbyte=900 rcvdbyte=9 action=accept',
+]
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    """Write a small firewall log."""
+    path = tmp_path / 'firewall.log'
+    path.write_text('\n'.join(LINES) + '\n')
+    return path
+
+
+class TestFirewallTimelineAnalysis:
+    """Tests for FirewallTimelineAnalysis."""
+    
+    def test_hour_buckets(self, log_file):
+        """Test bytes are summed per UTC hour and destination."""
+        analysis = FirewallTimelineAnalysis('hour')
+        run_analyses(str(log_file), [analysis])
+        df = analysis.to_dataframe()
+        
+        assert df[['bucket', 'dstip', 'total_sentbyte', 'total_rcvdbyte', 'lines']].values.tolist() == [
+            ['2024-01-15 10:00:00', '1.1.1.1', 500, 1, 1],
+            ['2024-01-15 10:00:00', '8.8.8.8', 150, 15, 2],
+            ['2024-01-15 11:00:00', '8.8.8.8', 7, 0, 1],
+        ]
+        assert df['epoch'].tolist()[0] == 1705312800
+        assert analysis.private_ips_skipped == 1
+        assert analysis.untimed_skipped == 1
+    
+    def test_day_bucket(self, log_file):
+        """Test a day bucket folds the hours together."""
+        analysis = create_analysis('firewall-timeline', bucket='day')
+        run_analyses(str(log_file), [analysis])
+        df = analysis.to_dataframe()
+        
+        assert df[['bucket', 'dstip', 'total_sentbyte']].values.tolist() == [
+            ['2024-01-15 00:00:00', '1.1.1.1', 500],
+            ['2024-01-15 00:00:00', '8.8.8.8', 157],
+        ]
+    
+    def test_parallel_matches_sequential(self, tmp_path):
+        """Test worker partials merge into the sequential result."""
+        path = tmp_path / 'big.log'
+        with open(path, 'w') as f:
+            for i in range(6000):
+                f.write(
+                    f'date=2024-01-{1 + i % 3:02d} time={i % 24:02d}:{i % 60:02d}:00 '
+                    f'dstip=8.8.{i % 7}.{i % 5} sentbyte={i} rcvdbyte={i % 13} action=accept\n'
+                )
+        sequential = FirewallTimelineAnalysis('15m')
+        parallel = FirewallTimelineAnalysis('15m')
+        
+        run_analyses(str(path), [sequential])
+        run_analyses(str(path), [parallel], workers=3)
+        
+        assert parallel.to_dataframe().equals(sequential.to_dataframe())
+
+
+class TestBuckets:
+    """Tests for bucket sizes and line times."""
+    
+    @pytest.mark.parametrize('bucket,seconds', [
+        ('minute', 60), ('Hour', 3600), ('day', 86400), ('15m', 900), ('6h', 21600), ('30s', 30), ('120', 120), (7, 7),
+    ])
+    def test_bucket_seconds(self, bucket, seconds):
+        """Test bucket names and sizes."""
+        assert bucket_seconds(bucket) == seconds
+    
+    @pytest.mark.parametrize('bucket', ['week', '0m', 'm', '1.5h', 0])
+    def test_invalid_bucket(self, bucket):
+        """Test unknown or empty buckets are rejected."""
+        with pytest.raises(ValueError):
+            bucket_seconds(bucket)
+        with pytest.raises(ValueError):
+            FirewallTimelineAnalysis(bucket)
+    
+    def test_line_epoch(self):
+        """Test single lines follow the epoch column rules."""
+        assert line_epoch('2024-01-15', '10:00:00') == 1705312800
+        assert line_epoch('2024-01-15', '10:00:00', '+0100') == 1705309200
+        assert line_epoch('bad', '10:00:00', None, '1705312800123') == 1705312800
+        assert line_epoch('2024-01-15', '99:00:00') is None
+
+
+def test_service_parse_firewall_timeline(log_file):
+    """Test the service builds the timeline for public destinations."""
+    df = LogParserService().parse_firewall_timeline(str(log_file), bucket='day')
+    
+    assert list(df.columns) == list(FirewallTimelineAnalysis.columns)
+    assert df['total_sentbyte'].sum() == 657
+
+
+def test_simple_app_rejects_csv(tmp_path, monkeypatch):
+    """Test the simple app refuses CSV exports for timelines instead of returning no records."""
+    monkeypatch.chdir(tmp_path)
+    simple_app = pytest.importorskip('simple_app')
+    (tmp_path / 'uploads').mkdir(exist_ok=True)
+    csv_export = io.BytesIO(b'date,time,dstip,sentbyte\n2024-01-15,10:00:00,8.8.8.8,100\n')
+    
+    response = simple_app.app.test_client().post(
+        '/api/parse/firewall-timeline', data={'file': (csv_export, 'export.csv')}
+    )
+    
+    assert response.status_code == 400
+    assert 'Fortinet' in response.get_json()['error']
+    assert not list((tmp_path / 'uploads').iterdir())
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,148 @@
+"""
+Unit tests for exact and approximate top-K destinations.
+"""
+
+import random
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+from heavy_hitters import SpaceSaving, top_items
+from log_parser_service import LogParserService
+from parse_engine import FirewallAnalysis, run_analyses
+
+
+def skewed_stream(seed=7, items=20000):
+    """A few heavy keys hidden among many light ones."""
+    rng = random.Random(seed)
+    stream = []
+    for _ in range(items):
+        if rng.random() < 0.3:
+            stream.append((f'heavy-{rng.randint(0, 9)}', rng.randint(500, 1000)))
+        else:
+            stream.append((f'light-{rng.randint(0, 5000)}', rng.randint(1, 50)))
+    return stream
+
+
+def exact_totals(stream):
+    """Sum a stream per key."""
+    totals = {}
+    for key, weight in stream:
+        totals[key] = totals.get(key, 0) + weight
+    return totals
+
+
+class TestSpaceSaving:
+    """Tests for the Space-Saving summary."""
+    
+    def test_exact_while_counters_are_free(self):
+        """Test counts are exact until the summary is full."""
+        sketch = SpaceSaving(10)
+        for key, weight in [('a', 5), ('b', 3), ('a', 2)]:
+            sketch.add(key, weight)
+        
+        assert sketch.top(5) == [('a', 7, 0), ('b', 3, 0)]
+        assert sketch.min_count() == 0
+    
+    def test_error_bounds(self):
+        """Test every count brackets the true total within N / capacity."""
+        stream = skewed_stream()
+        totals = exact_totals(stream)
+        sketch = SpaceSaving(100)
+        for key, weight in stream:
+            sketch.add(key, weight)
+        
+        assert len(sketch) == 100
+        for key, count, error in sketch.top(100):
+            assert count - error <= totals[key] <= count
+            assert error <= sketch.max_error
+        # Every key heavier than N / capacity is kept
+        heavy = {key for key, total in totals.items() if total > sketch.max_error}
+        assert heavy <= set(sketch.counts)
+        assert [key for key, _, _ in sketch.top(10)] == [key for key, _ in top_items(totals, 10)]
+    
+    def test_merge_keeps_bounds(self):
+        """Test summaries of two halves merge into one with the same guarantees."""
+        stream = skewed_stream()
+        totals = exact_totals(stream)
+        left, right = SpaceSaving(100), SpaceSaving(100)
+        for key, weight in stream[:9000]:
+            left.add(key, weight)
+        for key, weight in stream[9000:]:
+            right.add(key, weight)
+        
+        left.merge(right)
+        
+        assert left.total == sum(totals.values())
+        assert len(left) == 100
+        for key, count, error in left.top(100):
+            assert count - error <= totals[key] <= count
+            assert error <= left.max_error
+    
+    def test_invalid_capacity(self):
+        """Test summaries need at least one counter."""
+        with pytest.raises(ValueError):
+            SpaceSaving(0)
+
+
+class TestFirewallTopK:
+    """Tests for top-K firewall results."""
+    
+    @pytest.fixture
+    def log_file(self, tmp_path):
+        """Write a firewall log with a few heavy and many light destinations."""
+        path = tmp_path / 'firewall.log'
+        with open(path, 'w') as f:
+            for i, (key, weight) in enumerate(skewed_stream()):
+                number = int(key.split('-')[1])
+                dstip = f'8.8.8.{number}' if key.startswith('heavy') else f'9.{number // 250}.{number % 250}.{i % 3}'
+                f.write(f'date=2024-01-15 time=10:00:00 dstip={dstip} sentbyte={weight} action=accept\n')
+        return path
+    
+    def test_exact_top_matches_full_sort(self, log_file):
+        """Test the exact top-K is the head of the fully sorted result."""
+        full = FirewallAnalysis()
+        top = FirewallAnalysis(top=25)
+        
+        run_analyses(str(log_file), [full, top])
+        
+        expected = full.to_dataframe().head(25)
+        assert top.to_dataframe()['total_sentbyte'].tolist() == expected['total_sentbyte'].tolist()
+    
+    def test_approximate_top(self, log_file):
+        """Test approximate results bracket the exact totals, in parallel too."""
+        full = FirewallAnalysis()
+        run_analyses(str(log_file), [full])
+        totals = dict(full.totals)
+        
+        for workers in (1, 3):
+            approximate = FirewallAnalysis(top=10, approximate=True, counters=200)
+            run_analyses(str(log_file), [approximate], workers=workers)
+            df = approximate.to_dataframe()
+            
+            assert list(df.columns) == list(FirewallAnalysis.approximate_columns)
+            assert len(approximate.sketch) <= 200
+            assert set(df['dstip']) == {f'8.8.8.{i}' for i in range(10)}
+            for dstip, count, error in df[['dstip', 'total_sentbyte', 'max_overcount']].values:
+                assert count - error <= totals[dstip] <= count
+    
+    def test_invalid_options(self):
+        """Test approximate mode needs a positive top size."""
+        with pytest.raises(ValueError):
+            FirewallAnalysis(approximate=True)
+        with pytest.raises(ValueError):
+            FirewallAnalysis(top=0)
+    
+    def test_service_top(self, log_file):
+        """Test the service passes top-K options through."""
+        df = LogParserService().parse_firewall_logs(str(log_file), top=3, approximate=True)
+        
+        assert len(df) == 3
+        assert 'max_overcount' in df.columns
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,76 @@
+"""
+Unit tests for the range-table IP classifier.
+"""
+
+import ipaddress
+import random
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+import ip_classifier
+from ip_classifier import ipv4_to_int, is_not_private_ip, is_public_ip
+
+
+def reference(ip):
+    """Classify with ipaddress: (strict public, not private)."""
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False, False
+    strict = not (
+        address.is_private or
+        address.is_loopback or
+        address.is_link_local or
+        address.is_multicast or
+        address.is_reserved
+    )
+    return strict, not address.is_private
+
+
+class TestClassifier:
+    """Tests comparing the classifier with ipaddress."""
+    
+    def test_range_edges(self):
+        """Test addresses around every range edge."""
+        for start in ip_classifier._RANGE_STARTS:
+            for value in (start - 1, start, start + 1):
+                if 0 <= value < 2 ** 32:
+                    ip = str(ipaddress.IPv4Address(value))
+                    assert (is_public_ip(ip), is_not_private_ip(ip)) == reference(ip), ip
+    
+    def test_random_addresses(self):
+        """Test random IPv4 addresses."""
+        rng = random.Random(42)
+        for _ in range(20000):
+            ip = str(ipaddress.IPv4Address(rng.getrandbits(32)))
+            assert (is_public_ip(ip), is_not_private_ip(ip)) == reference(ip), ip
+    
+    @pytest.mark.parametrize('ip', [
+        '01.2.3.4', '1.2.3', '1.2.3.4.5', '256.1.1.1', ' 8.8.8.8', '8.8.8.8\n',
+        '+8.8.8.8', '8_8.8.8.8', '', 'invalid',
+        '::1', '2001:db8::1', '2607:f8b0:4005::200e', '::ffff:8.8.8.8', 'fe80::1%eth0',
+    ])
+    def test_non_dotted_quads(self, ip):
+        """Test IPv6 and malformed input fall back to ipaddress semantics."""
+        assert (is_public_ip(ip), is_not_private_ip(ip)) == reference(ip)
+    
+    def test_ipv4_to_int(self):
+        """Test only canonical dotted quads are converted."""
+        assert ipv4_to_int('10.0.0.1') == 167772161
+        assert ipv4_to_int('255.255.255.255') == 2 ** 32 - 1
+        assert ipv4_to_int('010.0.0.1') is None
+        assert ipv4_to_int('10.0.0') is None
+    
+    def test_memo_bounded(self, monkeypatch):
+        """Test the memo is cleared instead of growing without bound."""
+        monkeypatch.setattr(ip_classifier, 'MAX_MEMO_ENTRIES', 10)
+        ip_classifier._PUBLIC_MEMO.clear()
+        
+        for i in range(25):
+            is_public_ip(f'8.8.8.{i}')
+        
+        assert len(ip_classifier._PUBLIC_MEMO) <= 10
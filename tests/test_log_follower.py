@@ -0,0 +1,151 @@
+"""
+Unit tests for following a growing log file.
+"""
+
+import gzip
+import os
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+from log_follower import LogFollower
+from log_parser_service import LogParserService
+from parse_engine import FirewallAnalysis, VPNLoginAnalysis, run_analyses
+
+
+def firewall_line(i):
+    """One accepted firewall flow."""
+    return f'date=2024-01-15 time=10:00:00 dstip=8.8.{i % 5}.1 sentbyte={i} action=accept\n'
+
+
+def append(path, text):
+    """Append text to a file, as a syslog collector would."""
+    with open(path, 'a') as f:
+        f.write(text)
+
+
+def totals(follower):
+    """Bytes per destination in the firewall result."""
+    df = follower.results()['firewall']
+    return dict(zip(df['dstip'], df['total_sentbyte']))
+
+
+class TestLogFollower:
+    """Tests for incremental parsing."""
+    
+    @pytest.fixture
+    def log_file(self, tmp_path):
+        """An empty log file."""
+        path = tmp_path / 'fortigate.log'
+        path.touch()
+        return path
+    
+    def test_incremental_polls(self, log_file):
+        """Test each poll parses only the appended lines."""
+        follower = LogFollower(str(log_file), [FirewallAnalysis()])
+        
+        append(log_file, ''.join(firewall_line(i) for i in range(10)))
+        first = follower.poll()
+        append(log_file, ''.join(firewall_line(i) for i in range(10, 25)))
+        second = follower.poll()
+        third = follower.poll()
+        
+        assert (first.lines_processed, second.lines_processed) == (10, 15)
+        assert not third.changed
+        assert third.offset == log_file.stat().st_size
+        
+        full = FirewallAnalysis()
+        run_analyses(str(log_file), [full])
+        assert totals(follower) == dict(full.totals)
+    
+    def test_partial_line_waits(self, log_file):
+        """Test a line still being written is parsed once it is complete."""
+        follower = LogFollower(str(log_file), [FirewallAnalysis()])
+        line = firewall_line(7)
+        
+        append(log_file, firewall_line(1) + line[:20])
+        assert follower.poll().lines_processed == 1
+        
+        append(log_file, line[20:])
+        assert follower.poll().lines_processed == 1
+        assert totals(follower) == {'8.8.1.1': 1, '8.8.2.1': 7}
+    
+    def test_resume_from_checkpoint(self, log_file, tmp_path):
+        """Test a new follower continues from the checkpoint without reparsing."""
+        checkpoint = tmp_path / 'follow.ckpt'
+        append(log_file, ''.join(firewall_line(i) for i in range(10)))
+        LogFollower(str(log_file), [FirewallAnalysis()], str(checkpoint)).poll()
+        
+        append(log_file, ''.join(firewall_line(i) for i in range(10, 20)))
+        resumed = LogFollower(str(log_file), [FirewallAnalysis()], str(checkpoint))
+        poll = resumed.poll()
+        
+        assert poll.lines_processed == 10
+        assert resumed.state.lines_processed == 20
+        assert sum(totals(resumed).values()) == sum(range(20))
+    
+    def test_checkpoint_for_other_analyses(self, log_file, tmp_path):
+        """Test a checkpoint is not reused for different analyses."""
+        checkpoint = tmp_path / 'follow.ckpt'
+        append(log_file, firewall_line(1))
+        LogFollower(str(log_file), [FirewallAnalysis()], str(checkpoint)).poll()
+        
+        with pytest.raises(ValueError, match='other analyses'):
+            LogFollower(str(log_file), [VPNLoginAnalysis()], str(checkpoint))
+    
+    def test_rotation_by_rename(self, log_file):
+        """Test the rest of the rotated file is read before the new one."""
+        follower = LogFollower(str(log_file), [FirewallAnalysis()])
+        append(log_file, firewall_line(1))
+        follower.poll()
+        
+        append(log_file, firewall_line(2))
+        os.rename(log_file, f'{log_file}.1')
+        append(log_file, firewall_line(3))
+        poll = follower.poll()
+        
+        assert poll.rotated
+        assert poll.lines_processed == 2
+        assert totals(follower) == {'8.8.1.1': 1, '8.8.2.1': 2, '8.8.3.1': 3}
+    
+    def test_truncation(self, log_file):
+        """Test a truncated log is read again from the start."""
+        follower = LogFollower(str(log_file), [FirewallAnalysis()])
+        append(log_file, firewall_line(1) + firewall_line(2))
+        follower.poll()
+        
+        with open(log_file, 'w') as f:
+            f.write(firewall_line(4))
+        poll = follower.poll()
+        
+        assert poll.truncated
+        assert poll.lines_processed == 1
+        assert follower.state.rotations == 1
+        assert totals(follower)['8.8.4.1'] == 4
+    
+    def test_compressed_log(self, tmp_path):
+        """Test compressed logs are rejected."""
+        path = tmp_path / 'fortigate.log.gz'
+        with gzip.open(path, 'wt') as f:
+            f.write(firewall_line(1))
+        
+        with pytest.raises(ValueError, match='uncompressed'):
+            LogFollower(str(path), [FirewallAnalysis()]).poll()
+
+
+def test_service_follow(tmp_path):
+    """Test the service yields results only for polls with new lines."""
+    log_file = tmp_path / 'fortigate.log'
+    log_file.write_text(''.join(firewall_line(i) for i in range(5)))
+    
+    updates = list(LogParserService().follow(str(log_file), ['firewall'], interval=0, max_polls=3))
+    
+    assert len(updates) == 1
+    assert updates[0]['firewall']['total_sentbyte'].sum() == sum(range(5))
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,155 @@
+"""
+Unit tests for epoch timestamps and the time index.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+from log_time import NO_EPOCH, TimeIndex, epoch_seconds, offset_seconds, parse_time
+from log_parser_service import LogParserService
+from parse_engine import ShutdownAnalysis, VPNLoginAnalysis, run_analyses
+
+
+def utc(value):
+    """Epoch seconds of a UTC time string."""
+    return pd.Timestamp(value).value // 10**9
+
+
+class TestEpochSeconds:
+    """Tests for epoch_seconds."""
+    
+    def test_date_and_time_in_offset(self):
+        """Test local times are shifted by their UTC offset."""
+        epochs = epoch_seconds(
+            ['2024-01-15', '2024-01-15', '2024/01/15', '2024-01-15'],
+            ['10:00:00', '10:00:00', '10:00:00', '10:00:00'],
+            zones=['+0200', '-05:00', None, 'bogus'],
+        )
+        
+        assert epochs.tolist() == [
+            utc('2024-01-15 08:00'), utc('2024-01-15 15:00'), utc('2024-01-15 10:00'), utc('2024-01-15 10:00')
+        ]
+    
+    @pytest.mark.parametrize('eventtime', ['1705312800', '1705312800123', '1705312800123456', '1705312800123456789'])
+    def test_eventtime_units(self, eventtime):
+        """Test eventtime wins over date and time, whatever its unit."""
+        epochs = epoch_seconds(['1999-01-01'], ['00:00:00'], zones=['+0100'], eventtimes=[eventtime])
+        
+        assert epochs.tolist() == [1705312800]
+    
+    def test_invalid_values(self):
+        """Test rows without a readable date or time get NO_EPOCH."""
+        epochs = epoch_seconds(['2024-13-45', None, '2024-01-15'], ['10:00:00', '10:00:00', '25:00:00'])
+        
+        assert epochs.tolist() == [NO_EPOCH] * 3
+    
+    def test_categorical_input(self):
+        """Test categoricals are converted per category and gathered per row."""
+        dates = pd.Categorical(['2024-01-02', '2024-01-01', '2024-01-02'])
+        times = pd.Categorical(['00:00:01'] * 3)
+        
+        assert epoch_seconds(dates, times).tolist() == [
+            utc('2024-01-02 00:00:01'), utc('2024-01-01 00:00:01'), utc('2024-01-02 00:00:01')
+        ]
+    
+    def test_offsets(self):
+        """Test UTC offset spellings."""
+        assert offset_seconds('+0530') == 19800
+        assert offset_seconds('"-08:00"') == -28800
+        assert offset_seconds('UTC') == 0
+        assert offset_seconds('Europe/Paris') is None
+
+
+class TestTimeIndex:
+    """Tests for TimeIndex."""
+    
+    @pytest.fixture
+    def index(self):
+        """Index rows with shuffled times and one missing time."""
+        return TimeIndex(np.array([50, 10, NO_EPOCH, 30, 10, 40], dtype=np.int64))
+    
+    def test_select(self, index):
+        """Test ranges include both ends and come back in row or time order."""
+        assert index.select(10, 40).tolist() == [1, 3, 4, 5]
+        assert index.select(10, 40, in_time_order=True).tolist() == [1, 4, 3, 5]
+        assert index.count(11, 39) == 1
+    
+    def test_open_ranges_skip_missing_times(self, index):
+        """Test open ranges never include rows without a time."""
+        assert index.select().tolist() == [0, 1, 3, 4, 5]
+        assert index.select(end=10).tolist() == [1, 4]
+        assert index.count(start=45) == 1
+    
+    def test_contains(self, index):
+        """Test range checks of given rows."""
+        assert index.contains(np.array([0, 2, 3]), 20, 50).tolist() == [True, False, True]
+
+
+def test_parse_time():
+    """Test time bounds are read as seconds, with bare end dates closing the day."""
+    assert parse_time('1970-01-02') == 86400
+    assert parse_time('1970-01-01', end=True) == 86399
+    assert parse_time('1970-01-01T01:00:00+01:00') == 0
+
+
+@pytest.mark.parametrize('value, last', [
+    ('2024', '2024-12-31 23:59:59'),
+    ('2024-02', '2024-02-29 23:59:59'),
+    ('2024/03/01', '2024-03-01 23:59:59'),
+    ('2024-03-01 13', '2024-03-01 13:59:59'),
+    ('2024-03-01 13:45', '2024-03-01 13:45:59'),
+    ('2024-03-01 13:45:10', '2024-03-01 13:45:10'),
+    ('2024-03-01T13:45+02:00', '2024-03-01 11:45:59'),
+])
+def test_parse_time_end_of_period(value, last):
+    """Test range ends are rounded up to the precision given."""
+    assert parse_time(value, end=True) == utc(last)
+
+
+def test_analyses_add_epoch(tmp_path):
+    """Test parsed rows carry epoch seconds from eventtime, tz or plain date and time."""
+    log = tmp_path / 'vpn.log'
+    log.write_text(
+        'date=2024-01-15 time=10:00:00 eventtime=1705312800000000000 tz="+0200" tunneltype="ssl-web" '
+        'remip=203.0.113.1 user="alice" reason="login successfully" msg="SSL tunnel established"\n'
+        'date=2024-01-15 time=10:00:00 tz="+0200" tunneltype="ssl-web" '
+        'remip=203.0.113.1 user="alice" reason="login successfully" msg="SSL tunnel established"\n'
+        'date=2024-01-15 time=10:00:00 user="alice" sentbyte=10 msg="SSL tunnel shutdown"\n'
+    )
+    vpn = VPNLoginAnalysis()
+    shutdown = ShutdownAnalysis(None)
+    
+    run_analyses(str(log), [vpn, shutdown])
+    
+    assert vpn.to_dataframe()['epoch'].tolist() == [1705312800, utc('2024-01-15 08:00')]
+    assert shutdown.to_dataframe()['epoch'].tolist() == [utc('2024-01-15 10:00')]
+
+
+def test_unreadable_time_is_missing_in_results(tmp_path):
+    """Test rows with an unreadable date have no epoch in results, not the internal sentinel."""
+    log = tmp_path / 'vpn.log'
+    log.write_text(
+        'date=2024-13-45 time=10:00:00 tunneltype="ssl-web" remip=203.0.113.1 user="alice" '
+        'reason="login successfully" msg="SSL tunnel established"\n'
+        'date=2024-01-15 time=10:00:00 tunneltype="ssl-web" remip=203.0.113.1 user="bob" '
+        'reason="login successfully" msg="SSL tunnel established"\n'
+    )
+    output = tmp_path / 'vpn.csv'
+    
+    result = LogParserService().export_results(str(log), 'vpn', str(output))
+    df = LogParserService().parse_vpn_logs(str(log))
+    
+    assert df['epoch'].isna().tolist() == [True, False]
+    assert TimeIndex.from_frame(df).select(utc('2024-01-15 00:00')).tolist() == [1]
+    assert [row['epoch'] for row in result.preview] == [None, utc('2024-01-15 10:00')]
+    assert output.read_text().splitlines()[1].endswith(',')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
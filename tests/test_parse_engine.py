@@ -0,0 +1,185 @@
+"""
+Unit tests for the chunked parse engine.
+"""
+
+import io
+import pickle
+import pytest
+import pandas as pd
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+import parse_engine
+from parse_engine import (
+    iter_line_blocks,
+    split_offsets,
+    run_analyses,
+    VPNLoginAnalysis,
+    FirewallAnalysis,
+    ShutdownAnalysis,
+    create_analysis,
+    DictionaryColumn,
+)
+from log_parser_service import LogParserService
+
+
+@pytest.fixture
+def mixed_log(tmp_path):
+    """Create a log file mixing VPN, shutdown and firewall lines."""
+    public_ips = ['8.8.8.8', '9.9.9.9', '1.1.1.1']
+    lines = []
+    for i in range(300):
+        lines.append(
+            f'date=2024-01-15 time=10:{i % 60:02d}:00 user="user{i % 7}" tunneltype="ssl-web" '
+            f'remip=203.0.113.{i % 250} reason="login successfully" msg="SSL tunnel established"'
+        )
+        lines.append(
+            f'date=2024-01-15 time=11:{i % 60:02d}:00 srcip=192.168.1.{i % 200} '
+            f'dstip={public_ips[i % 3]} sentbyte={i * 10} action=accept'
+        )
+        lines.append(
+            f'date=2024-01-15 time=12:{i % 60:02d}:00 user="USER{i % 5}" '
+            f'sentbyte={i * 1000} msg="SSL tunnel shutdown"'
+        )
+        lines.append('date=2024-01-15 time=13:00:00 srcip=10.0.0.1 dstip=10.0.0.2 sentbyte=5')
+    log_file = tmp_path / "mixed.log"
+    log_file.write_text('\n'.join(lines) + '\n')
+    return str(log_file)
+
+
+class TestLineBlocks:
+    """Tests for block-wise line reading."""
+    
+    def test_lines_without_trailing_newline(self):
+        """Test the last line is returned without a trailing newline."""
+        data = io.BytesIO(b'a=1\nb=2\nc=3')
+        lines = [line for block, _ in iter_line_blocks(data, block_size=4) for line in block]
+        
+        assert lines == ['a=1', 'b=2', 'c=3']
+    
+    def test_multibyte_characters_not_split(self):
+        """Test UTF-8 characters spanning a block boundary are decoded intact."""
+        data = io.BytesIO('user="josé"\nuser="über"\n'.encode('utf-8'))
+        lines = [line for block, _ in iter_line_blocks(data, block_size=3) for line in block]
+        
+        assert lines == ['user="josé"', 'user="über"']
+    
+    def test_byte_counts(self):
+        """Test consumed byte counts add up to the range size."""
+        payload = b'x=1\ny=22\nz=333\n'
+        consumed = sum(size for _, size in iter_line_blocks(io.BytesIO(payload), block_size=5))
+        
+        assert consumed == len(payload)
+
+
+class TestDictionaryColumn:
+    """Tests for dictionary-encoded result columns."""
+    
+    def test_extend_and_pickle(self):
+        """Test merged and unpickled columns keep values and first-appearance order."""
+        first = DictionaryColumn()
+        second = DictionaryColumn()
+        for value in ['b', 'a', 'b']:
+            first.append(value)
+        for value in ['c', 'a']:
+            second.append(value)
+        
+        first.extend(pickle.loads(pickle.dumps(second)))
+        first.append('c')
+        
+        assert list(first) == ['b', 'a', 'b', 'c', 'a', 'c']
+        assert first.values == ['b', 'a', 'c']
+        assert list(first.to_categorical()) == list(first)
+    
+    def test_vpn_columns_are_categorical(self, mixed_log):
+        """Test VPN results use categoricals and shutdown bytes stay integers."""
+        vpn = VPNLoginAnalysis()
+        shutdown = ShutdownAnalysis('user1')
+        run_analyses(mixed_log, [vpn, shutdown])
+        
+        df = vpn.to_dataframe()
+        sessions = shutdown.to_dataframe()
+        
+        assert all(isinstance(df[name].dtype, pd.CategoricalDtype) for name in VPNLoginAnalysis.fields)
+        assert str(df['epoch'].dtype) == 'Int64'
+        assert df['user'].cat.categories.tolist() == [f'user{i}' for i in range(7)]
+        assert str(sessions['sentbyte'].dtype) == 'int64'
+
+
+class TestChunking:
+    """Tests for newline-aligned chunk splitting."""
+    
+    def test_split_offsets_on_line_boundaries(self, mixed_log):
+        """Test every chunk starts at the beginning of a line."""
+        ranges = split_offsets(mixed_log, 7)
+        data = Path(mixed_log).read_bytes()
+        
+        assert ranges[0][0] == 0
+        assert ranges[-1][1] == len(data)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start
+            assert data[start - 1:start] == b'\n'
+    
+    def test_parallel_matches_sequential(self, mixed_log, monkeypatch):
+        """Test parallel parsing merges to the same results as one worker."""
+        monkeypatch.setattr(parse_engine, 'MIN_CHUNK_SIZE', 1024)
+        
+        sequential = [VPNLoginAnalysis(), FirewallAnalysis(), ShutdownAnalysis('user1')]
+        parallel = [analysis.spawn() for analysis in sequential]
+        
+        seq_stats = run_analyses(mixed_log, sequential, workers=1)
+        par_stats = run_analyses(mixed_log, parallel, workers=3)
+        
+        assert par_stats.chunks > 1
+        assert par_stats.lines_processed == seq_stats.lines_processed == 1200
+        assert par_stats.bytes_read == seq_stats.bytes_read
+        
+        # Row results keep file order, aggregates are equal
+        assert parallel[0].rows == sequential[0].rows
+        assert parallel[1].totals == sequential[1].totals
+        assert parallel[1].private_ips_skipped == sequential[1].private_ips_skipped
+        assert parallel[2].rows == sequential[2].rows
+        assert len(parallel[2].rows) == 60
+    
+    def test_service_workers(self, mixed_log, monkeypatch):
+        """Test LogParserService accepts a worker count."""
+        monkeypatch.setattr(parse_engine, 'MIN_CHUNK_SIZE', 1024)
+        parser = LogParserService()
+        
+        df = parser.parse_firewall_logs(mixed_log, workers=2)
+        
+        assert df['dstip'].tolist() == ['1.1.1.1', '9.9.9.9', '8.8.8.8']
+        assert df['total_sentbyte'].sum() == sum(i * 10 for i in range(300))
+
+
+class TestCombinedAnalysis:
+    """Tests for running several analyses in one pass."""
+    
+    def test_matches_individual_parsers(self, mixed_log):
+        """Test the combined pass returns the same frames as separate parses."""
+        parser = LogParserService()
+        
+        results = parser.analyze(mixed_log, ['vpn', 'firewall', 'vpn-shutdown'], target_user='user1')
+        
+        assert list(results) == ['vpn', 'firewall', 'vpn_shutdown']
+        assert results['vpn'].equals(parser.parse_vpn_logs(mixed_log))
+        assert results['firewall'].equals(parser.parse_firewall_logs(mixed_log))
+        assert results['vpn_shutdown'].equals(parser.parse_vpn_shutdown_sentbytes(mixed_log, 'user1'))
+    
+    @pytest.mark.parametrize('analyses', [[], ['vpn', 'vpn'], ['vpn', 'dns']])
+    def test_invalid_analyses(self, mixed_log, analyses):
+        """Test empty, duplicate and unknown analysis lists are rejected."""
+        with pytest.raises(ValueError):
+            LogParserService().analyze(mixed_log, analyses)
+    
+    def test_shutdown_requires_user(self):
+        """Test the shutdown analysis needs a username."""
+        with pytest.raises(ValueError):
+            create_analysis('vpn_shutdown')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -12,6 +12,7 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
 
 from log_parser_service import LogParserService
+import csv_parser_service
 from csv_parser_service import CSVParserService
 
 
@@ -242,6 +243,77 @@ class TestCSVParserService:
         eight_eight = df[df['dstip'] == '8.8.8.8']
         assert eight_eight.iloc[0]['total_sentbyte'] == 4500
     
+    def test_parse_csv_firewall_logs_messy_values(self, parser, tmp_path):
+        """Test truncation and invalid values in CSV firewall aggregation."""
+        csv_content = '''dstip,sentbyte
+1.1.1.1,10.9
+8.8.8.8,11
+9.9.9.9,abc
+,7
+10.0.0.1,99
+1.1.1.1,0.5
+'''
+        csv_file = tmp_path / "firewall_messy.csv"
+        csv_file.write_text(csv_content)
+        
+        df = parser.parse_csv_firewall_logs(str(csv_file))
+        
+        # Fractional bytes are truncated per row before summing
+        assert list(df.columns) == ['dstip', 'total_sentbyte', 'size_mb']
+        assert df['dstip'].tolist() == ['8.8.8.8', '1.1.1.1']
+        assert df['total_sentbyte'].tolist() == [11, 10]
+    
+    def test_chunked_parsing_matches_whole_file(self, tmp_path):
+        """Test small row batches give the same results as one batch."""
+        csv_content = '''Date,Time,Username,Status,Message,Bytes_Sent,dstip
+2024-01-15,10:30:00,john.doe,success,SSL tunnel shutdown,100,8.8.8.8
+2024-01-15,10:31:00,JOHN.DOE,failed,,200,1.1.1.1
+2024-01-15,10:32:00,jane,success,,abc,8.8.8.8
+2024-01-15,10:33:00,john.doe,success,,400,10.0.0.1
+2024-01-15,10:34:00,john.doe,success,SSL tunnel shutdown,500,1.1.1.1
+'''
+        csv_file = tmp_path / "mixed.csv"
+        csv_file.write_text(csv_content)
+        whole = CSVParserService()
+        chunked = CSVParserService(chunk_rows=2)
+        
+        assert chunked.parse_csv_vpn_logs(str(csv_file)).equals(whole.parse_csv_vpn_logs(str(csv_file)))
+        assert chunked.parse_csv_firewall_logs(str(csv_file)).equals(whole.parse_csv_firewall_logs(str(csv_file)))
+        assert chunked.parse_csv_vpn_shutdown_logs(str(csv_file), 'john.doe').equals(
+            whole.parse_csv_vpn_shutdown_logs(str(csv_file), 'john.doe')
+        )
+    
+    def test_header_only_csv(self, parser, tmp_path):
+        """Test a CSV without rows gives an empty result."""
+        csv_file = tmp_path / "header.csv"
+        csv_file.write_text('dstip,sentbyte\n')
+        
+        df = parser.parse_csv_firewall_logs(str(csv_file))
+        
+        assert df.empty
+        assert list(df.columns) == ['dstip', 'total_sentbyte', 'size_mb']
+    
+    def test_projection_reads_text_columns(self, parser, tmp_path):
+        """Test only the aliased columns are read, as text."""
+        csv_file = tmp_path / "wide.csv"
+        csv_file.write_text(
+            'Extra,Username,Date,Time,Other,Status\n'
+            'x,007,2024-01-15,10:00:00,1,success\n'
+        )
+        
+        df = parser.parse_csv_vpn_logs(str(csv_file))
+        
+        assert 'extra' not in df.columns
+        assert df.iloc[0]['user'] == '007'
+    
+    def test_engine_fallback(self, monkeypatch):
+        """Test the C engine is used when pyarrow is not installed."""
+        monkeypatch.setattr(csv_parser_service, 'pa_csv', None)
+        
+        assert CSVParserService().engine == 'c'
+        with pytest.raises(ValueError):
+            CSVParserService(engine='pyarrow')
+    
     def test_parse_csv_vpn_shutdown_logs_success(self, parser, tmp_path):
         """Test successful CSV VPN shutdown parsing."""
         csv_content = '''date,time,user,sentbyte,msg
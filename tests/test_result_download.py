@@ -0,0 +1,73 @@
+"""
+Unit tests for result file downloads.
+"""
+
+import gzip
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+flask = pytest.importorskip('flask')
+
+from result_download import send_result
+from result_writer import write_result
+
+
+@pytest.fixture
+def client(tmp_path):
+    """Create a test client serving one gzip-compressed result."""
+    path = tmp_path / 'vpn_parsed.csv.gz'
+    write_result(pd.DataFrame({'user': ['alice', 'bob'] * 500, 'sentbyte': range(1000)}), path)
+    
+    app = flask.Flask(__name__)
+    app.add_url_rule('/download', 'download', lambda: send_result(path))
+    return app.test_client(), path
+
+
+class TestSendResult:
+    """Tests for send_result."""
+    
+    def test_gzip_client_gets_stored_bytes(self, client):
+        """Test clients accepting gzip get the stored file with Content-Encoding."""
+        test_client, path = client
+        
+        response = test_client.get('/download', headers={'Accept-Encoding': 'gzip'})
+        
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Content-Type'].startswith('text/csv')
+        assert 'filename=vpn_parsed.csv' in response.headers['Content-Disposition']
+        assert response.data == path.read_bytes()
+    
+    def test_identity_client_gets_decompressed_file(self, client):
+        """Test clients not accepting gzip get the decompressed file."""
+        test_client, path = client
+        
+        response = test_client.get('/download', headers={'Accept-Encoding': 'identity'})
+        
+        assert 'Content-Encoding' not in response.headers
+        assert response.data == gzip.decompress(path.read_bytes())
+    
+    def test_conditional_get(self, client):
+        """Test a matching ETag is answered with 304, per encoding."""
+        test_client, _ = client
+        etag = test_client.get('/download', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+        
+        cached = test_client.get('/download', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        other_encoding = test_client.get('/download', headers={'If-None-Match': etag})
+        
+        assert cached.status_code == 304
+        assert other_encoding.status_code == 200
+    
+    def test_range_resumes_download(self, client):
+        """Test byte ranges apply to the stored bytes."""
+        test_client, path = client
+        
+        response = test_client.get('/download', headers={'Accept-Encoding': 'gzip', 'Range': 'bytes=100-'})
+        
+        assert response.status_code == 206
+        assert response.data == path.read_bytes()[100:]
@@ -0,0 +1,128 @@
+"""
+Unit tests for paged result access.
+"""
+
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+from result_pages import PageWriter, ResultPages, open_pages, pages_path
+from result_writer import open_writer, write_result
+
+
+@pytest.fixture
+def result_frame():
+    """Create a result with text, integer, float and missing values."""
+    return pd.DataFrame({
+        'dstip': [f'10.0.{i % 7}.{i}' for i in range(95)],
+        'total_sentbyte': [(i * 7919) % 1000 for i in range(95)],
+        'size_mb': [None if i % 10 == 0 else i / 3 for i in range(95)],
+        'user': ['ünïcode' if i % 2 else 'bob' for i in range(95)],
+    })
+
+
+@pytest.fixture
+def pages(result_frame, tmp_path):
+    """Write the result to a column store in uneven batches."""
+    with PageWriter(tmp_path / 'pages' / 'result.csv') as writer:
+        for start in range(0, len(result_frame), 13):
+            writer.write(result_frame.iloc[start:start + 13])
+    return ResultPages(tmp_path / 'pages' / 'result.csv')
+
+
+def records(df):
+    """Page records expected for rows of a frame."""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+class TestResultPages:
+    """Tests for ResultPages."""
+    
+    def test_pages_in_result_order(self, pages, result_frame):
+        """Test pages hold consecutive rows and report the page count."""
+        page = pages.page(3, page_size=20)
+        
+        assert page['rows'] == 95
+        assert page['pages'] == 5
+        assert page['columns'] == list(result_frame.columns)
+        assert page['records'] == records(result_frame.iloc[40:60])
+        assert len(pages.page(5, page_size=20)['records']) == 15
+    
+    @pytest.mark.parametrize('column', ['total_sentbyte', 'dstip', 'user'])
+    @pytest.mark.parametrize('descending', [False, True])
+    def test_sorted_pages(self, pages, result_frame, column, descending):
+        """Test sorted pages match sorting the whole result."""
+        expected = result_frame.sort_values(column, kind='stable')[column].tolist()
+        if descending:
+            expected.reverse()
+        
+        rows = [
+            record[column]
+            for number in range(1, 5)
+            for record in pages.page(number, page_size=25, sort=column, descending=descending)['records']
+        ]
+        
+        assert rows == expected
+        assert (pages.directory / f'{pages.column_names.index(column)}.order.npy').exists()
+    
+    def test_page_past_the_end_is_empty(self, pages):
+        """Test a page after the last one has no records."""
+        assert pages.page(100, page_size=10)['records'] == []
+    
+    @pytest.mark.parametrize('args', [
+        {'page': 0},
+        {'page_size': 0},
+        {'page_size': 5000},
+        {'sort': 'missing'},
+    ])
+    def test_invalid_arguments(self, pages, args):
+        """Test invalid page, page size and sort column are rejected."""
+        with pytest.raises(ValueError):
+            pages.page(**args)
+
+
+class TestStoreBuilding:
+    """Tests for filling column stores."""
+    
+    def test_writer_mirror(self, result_frame, tmp_path):
+        """Test a result writer mirrors its batches to the store."""
+        directory = tmp_path / 'pages' / 'out.csv'
+        
+        with open_writer(tmp_path / 'out.csv', result_frame.columns, mirror=PageWriter(directory)) as writer:
+            writer.write(result_frame.iloc[:50])
+            writer.write(result_frame.iloc[50:])
+        
+        assert ResultPages(directory).page(1, page_size=100)['records'] == records(result_frame)
+    
+    def test_failed_write_leaves_no_store(self, result_frame, tmp_path):
+        """Test a write that fails does not publish a partial store."""
+        mirror = PageWriter(tmp_path / 'pages' / 'out.csv')
+        
+        with pytest.raises(RuntimeError):
+            with open_writer(tmp_path / 'out.csv', result_frame.columns, mirror=mirror) as writer:
+                writer.write(result_frame)
+                raise RuntimeError('parse failed')
+        
+        assert list((tmp_path / 'pages').iterdir()) == []
+    
+    def test_store_built_for_saved_result(self, result_frame, tmp_path):
+        """Test results without a store get one on first access."""
+        path = tmp_path / 'result.csv.gz'
+        write_result(result_frame, path)
+        
+        pages = open_pages(path, tmp_path / 'pages')
+        
+        assert pages_path(tmp_path / 'pages', path).is_dir()
+        assert pages.page(1, page_size=5, sort='total_sentbyte', descending=True)['records'] == records(
+            result_frame.sort_values('total_sentbyte', kind='stable').iloc[::-1].head(5)
+        )
+        assert pages.page(1)['records'][0]['size_mb'] is None
+    
+    def test_missing_result(self, tmp_path):
+        """Test opening the store of a missing result fails."""
+        with pytest.raises(FileNotFoundError):
+            open_pages(tmp_path / 'missing.csv', tmp_path / 'pages')
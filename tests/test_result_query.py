@@ -0,0 +1,140 @@
+"""
+Unit tests for indexed result queries.
+"""
+
+import ipaddress
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+from result_pages import PageWriter, ResultPages
+from result_query import ResultQuery
+
+
+@pytest.fixture
+def logins():
+    """Create a VPN login result spread over several months."""
+    rows = []
+    for i in range(400):
+        rows.append({
+            'date': f'2024-{1 + i % 4:02d}-{1 + i % 28:02d}',
+            'time': f'{i % 24:02d}:{i % 60:02d}:00',
+            'user': ['alice', 'Bob', 'BOB', 'carol'][i % 4] if i % 9 else 'dave',
+            'tunneltype': 'ssl-web',
+            'remip': f'10.{i % 3}.{i % 5}.{i % 200}' if i % 11 else f'203.0.113.{i % 250}',
+            'reason': 'login successfully',
+            'msg': 'SSL tunnel established' if i % 2 else 'SSL tunnel shutdown',
+        })
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def query(logins, tmp_path):
+    """Write the result to a column store in several batches."""
+    with PageWriter(tmp_path / 'pages' / 'vpn.csv') as writer:
+        for start in range(0, len(logins), 64):
+            writer.write(logins.iloc[start:start + 64])
+    return ResultQuery(ResultPages(tmp_path / 'pages' / 'vpn.csv'))
+
+
+def expected_rows(df, user=None, network=None, start=None, end=None, message=None):
+    """Filter a frame the slow way."""
+    mask = pd.Series(True, index=df.index)
+    if user:
+        mask &= df['user'].str.lower() == user.lower()
+    if network:
+        network = ipaddress.ip_network(network, strict=False)
+        mask &= df['remip'].map(lambda ip: ipaddress.ip_address(ip) in network)
+    times = pd.to_datetime(df['date'] + ' ' + df['time'])
+    if start:
+        mask &= times >= pd.Timestamp(start)
+    if end:
+        mask &= times <= pd.Timestamp(end)
+    if message:
+        mask &= df['msg'].str.lower().str.contains(message.lower(), regex=False)
+    return df.index[mask].tolist()
+
+
+class TestResultQuery:
+    """Tests for ResultQuery."""
+    
+    @pytest.mark.parametrize('filters', [
+        {'user': 'bob'},
+        {'network': '10.1.0.0/16'},
+        {'network': '203.0.113.7'},
+        {'start': '2024-02-01', 'end': '2024-03-15 12:00:00'},
+        {'message': 'ESTABLISHED'},
+        {'user': 'Alice', 'network': '10.0.0.0/8', 'start': '2024-01-10', 'message': 'tunnel'},
+        {'user': 'nobody'},
+    ])
+    def test_matches_full_scan(self, query, logins, filters):
+        """Test indexed queries find the rows a full scan finds, in result order."""
+        expected = expected_rows(logins, **filters)
+        
+        rows = query.match(
+            user=filters.get('user'),
+            ip=filters.get('network'),
+            start=filters.get('start'),
+            end=filters.get('end'),
+            message=filters.get('message'),
+        )
+        
+        assert rows.tolist() == expected
+    
+    def test_bare_end_date_includes_the_day(self, query, logins):
+        """Test a bare end date includes every time of that day."""
+        rows = query.match(start='2024-02-05', end='2024-02-05')
+        
+        assert rows.tolist() == logins.index[logins['date'] == '2024-02-05'].tolist()
+    
+    def test_query_pages(self, query, logins):
+        """Test query results are paged like result pages."""
+        expected = expected_rows(logins, user='bob')
+        
+        found = query.query(user='bob', page=2, page_size=50)
+        
+        assert found['matches'] == len(expected)
+        assert found['pages'] == 4
+        assert found['records'] == logins.loc[expected[50:100]].to_dict('records')
+    
+    def test_no_filters_match_everything(self, query, logins):
+        """Test a query without filters returns every row."""
+        assert len(query.match()) == len(logins)
+    
+    @pytest.mark.parametrize('filters', [
+        {'ip': 'not-an-ip'},
+        {'start': 'yesterday-ish'},
+        {'start': '2024-03-01', 'end': '2024-02-01'},
+    ])
+    def test_invalid_filters(self, query, filters):
+        """Test invalid filters are rejected."""
+        with pytest.raises(ValueError):
+            query.match(**filters)
+    
+    def test_epoch_column_is_used(self, logins, tmp_path):
+        """Test results with an epoch column are filtered on it, not on date and time."""
+        # Local times two hours ahead of UTC
+        local = pd.to_datetime(logins['date'] + ' ' + logins['time'])
+        logins['epoch'] = (local - pd.Timestamp('1970-01-01')).dt.total_seconds().astype('int64') - 7200
+        with PageWriter(tmp_path / 'epoch') as writer:
+            writer.write(logins)
+        query = ResultQuery(ResultPages(tmp_path / 'epoch'))
+        
+        rows = query.match(start='2024-01-31 22:00:00', end='2024-03-15 10:00:00')
+        
+        assert rows.tolist() == expected_rows(logins, start='2024-02-01', end='2024-03-15 12:00:00')
+    
+    def test_missing_column(self, tmp_path):
+        """Test filters on columns the result lacks are rejected."""
+        with PageWriter(tmp_path / 'firewall') as writer:
+            writer.write(pd.DataFrame({'dstip': ['8.8.8.8'], 'total_sentbyte': [10]}))
+        query = ResultQuery(ResultPages(tmp_path / 'firewall'))
+        
+        assert query.match(ip='8.8.0.0/16').tolist() == [0]
+        with pytest.raises(ValueError, match='user'):
+            query.match(user='alice')
+
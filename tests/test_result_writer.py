@@ -0,0 +1,208 @@
+"""
+Unit tests for streaming CSV result output.
+"""
+
+import gzip
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+from parse_engine import VPNLoginAnalysis, ShutdownAnalysis, run_analyses, stream_analysis
+import result_writer
+from result_writer import (
+    CsvResultWriter,
+    open_writer,
+    read_result,
+    resolve_format,
+    write_csv,
+    write_result,
+)
+from log_parser_service import LogParserService
+
+
+@pytest.fixture
+def vpn_log(tmp_path):
+    """Create a log file with VPN logins and shutdown sessions."""
+    lines = []
+    for i in range(250):
+        lines.append(
+            f'date=2024-01-15 time=10:{i % 60:02d}:00 user="user{i % 7}" tunneltype="ssl-web" '
+            f'remip=203.0.113.{i % 250} reason="login successfully" msg="SSL tunnel established"'
+        )
+        lines.append(
+            f'date=2024-01-15 time=12:{i % 60:02d}:00 user="USER{i % 5}" '
+            f'sentbyte={i * 1000} msg="SSL tunnel shutdown"'
+        )
+    log_file = tmp_path / "vpn.log"
+    log_file.write_text('\n'.join(lines) + '\n')
+    return str(log_file)
+
+
+def expected_csv(file_path, analysis, tmp_path):
+    """Write the in-memory result of an analysis and return the file text."""
+    run_analyses(file_path, [analysis])
+    path = tmp_path / 'expected.csv'
+    analysis.to_dataframe().to_csv(path, index=False)
+    return path.read_text()
+
+
+class TestCsvResultWriter:
+    """Tests for CsvResultWriter."""
+    
+    def test_batches_match_single_write(self, tmp_path):
+        """Test writing in batches gives the same file, preview and sums as one write."""
+        df = pd.DataFrame({'user': [f'u{i}' for i in range(25)], 'sentbyte': range(25)})
+        expected = tmp_path / 'expected.csv'
+        df.to_csv(expected, index=False)
+        
+        result = write_csv(df, tmp_path / 'out.csv', batch_rows=4)
+        
+        assert (tmp_path / 'out.csv').read_text() == expected.read_text()
+        assert result.records == 25
+        assert result.preview == df.head(10).to_dict('records')
+        assert result.sums == {'sentbyte': sum(range(25))}
+    
+    def test_empty_result_has_header(self, tmp_path):
+        """Test an empty result still writes the header."""
+        with CsvResultWriter(tmp_path / 'out.csv', ['date', 'user']) as writer:
+            writer.write(pd.DataFrame(columns=['date', 'user']))
+        
+        assert (tmp_path / 'out.csv').read_text() == 'date,user\n'
+        assert writer.result().records == 0
+
+
+class TestStreamAnalysis:
+    """Tests for streaming row analyses to a sink."""
+    
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_streamed_vpn_rows_match_in_memory(self, vpn_log, tmp_path, workers):
+        """Test rows streamed in small batches give the in-memory CSV."""
+        expected = expected_csv(vpn_log, VPNLoginAnalysis(), tmp_path)
+        
+        with CsvResultWriter(tmp_path / 'out.csv', VPNLoginAnalysis.columns) as writer:
+            stats, df = stream_analysis(vpn_log, VPNLoginAnalysis(), writer, workers=workers, batch_rows=16)
+        
+        assert df is None
+        assert writer.rows_written == 250
+        assert (tmp_path / 'out.csv').read_text() == expected
+    
+    def test_small_result_is_returned(self, vpn_log, tmp_path):
+        """Test a result that fits in one batch is written and returned."""
+        analysis = ShutdownAnalysis('user3')
+        expected = expected_csv(vpn_log, ShutdownAnalysis('user3'), tmp_path)
+        
+        with CsvResultWriter(tmp_path / 'out.csv', analysis.columns) as writer:
+            stats, df = stream_analysis(vpn_log, analysis, writer)
+        
+        assert len(df) == 50
+        assert (tmp_path / 'out.csv').read_text() == expected
+    
+    def test_service_export_sums(self, vpn_log, tmp_path):
+        """Test the service export reports the totals of the streamed rows."""
+        parser = LogParserService()
+        result = parser.export_results(
+            vpn_log, 'vpn-shutdown', str(tmp_path / 'out.csv'), target_user='user1', batch_rows=8
+        )
+        df = parser.parse_vpn_shutdown_sentbytes(vpn_log, 'user1')
+        
+        assert result.frame is None
+        assert result.records == len(df)
+        assert result.sums['sentbyte'] == df['sentbyte'].sum()
+        assert result.preview[0]['user'] == 'USER1'
+
+
+class TestOutputFormats:
+    """Tests for the NDJSON, Parquet and Feather outputs."""
+    
+    def test_resolve_format(self):
+        """Test formats are taken from the name or the output suffix."""
+        assert resolve_format(None, 'out/vpn.parquet') == 'parquet'
+        assert resolve_format(None, 'out/vpn.txt') == 'csv'
+        assert resolve_format('JSONL') == 'ndjson'
+        
+        with pytest.raises(ValueError):
+            resolve_format('xlsx')
+    
+    def test_arrow_formats_need_pyarrow(self, monkeypatch):
+        """Test Parquet and Feather are rejected when pyarrow is not installed."""
+        monkeypatch.setattr(result_writer, 'pa', None)
+        
+        assert result_writer.available_formats() == ['csv', 'ndjson']
+        with pytest.raises(ValueError, match='pyarrow'):
+            resolve_format('parquet')
+    
+    def test_ndjson_roundtrip(self, tmp_path):
+        """Test NDJSON keeps integer columns and reads repeated text as categoricals."""
+        df = pd.DataFrame({'user': ['alice', 'bob'] * 5, 'sentbyte': range(10)})
+        
+        result = write_result(df, tmp_path / 'out.ndjson', batch_rows=3)
+        back = read_result(tmp_path / 'out.ndjson')
+        
+        assert result.output_format == 'ndjson'
+        assert back['sentbyte'].tolist() == list(range(10))
+        assert back['sentbyte'].dtype == 'int64'
+        assert isinstance(back['user'].dtype, pd.CategoricalDtype)
+    
+    @pytest.mark.parametrize('output_format', ['parquet', 'feather'])
+    def test_streamed_columnar_keeps_dtypes(self, vpn_log, tmp_path, output_format):
+        """Test batches with different categories are stored as one typed result."""
+        pytest.importorskip('pyarrow')
+        path = tmp_path / f'out.{output_format}'
+        expected = ShutdownAnalysis(None)
+        run_analyses(vpn_log, [expected])
+        
+        with open_writer(path, ShutdownAnalysis.columns, output_format) as writer:
+            stream_analysis(vpn_log, ShutdownAnalysis(None), writer, batch_rows=7)
+        back = read_result(path)
+        
+        pd.testing.assert_frame_equal(back, expected.to_dataframe(), check_categorical=False)
+        assert back['sentbyte'].dtype == 'int64'
+        assert isinstance(back['user'].dtype, pd.CategoricalDtype)
+    
+    def test_gzip_text_output(self, tmp_path):
+        """Test .gz CSV results are compressed and read back like plain ones."""
+        df = pd.DataFrame({'user': ['alice', 'bob'] * 5, 'sentbyte': range(10)})
+        path = tmp_path / f"out{result_writer.output_suffix('csv', compress=True)}"
+        
+        write_result(df, path, batch_rows=3)
+        
+        assert path.name == 'out.csv.gz'
+        assert gzip.decompress(path.read_bytes()).decode() == df.to_csv(index=False)
+        assert read_result(path)['sentbyte'].tolist() == list(range(10))
+        assert result_writer.convert_result(path, 'ndjson').name == 'out.ndjson.gz'
+    
+    def test_conversion_keeps_text_columns(self, tmp_path):
+        """Test numeric-looking usernames stay text when a CSV result is converted."""
+        df = pd.DataFrame({
+            'user': ['00123', '456', 'NA'],
+            'sentbyte': [1, 2, 3],
+            'epoch': pd.array([1705312800, None, 1705312801], dtype='Int64'),
+        })
+        path = tmp_path / 'out.csv'
+        write_result(df, path)
+        
+        converted = read_result(result_writer.convert_result(path, 'ndjson'))
+        
+        assert converted['user'].tolist() == ['00123', '456', 'NA']
+        assert converted['sentbyte'].dtype == 'int64'
+        assert converted['epoch'].dtype == 'Int64'
+        assert converted['epoch'].isna().tolist() == [False, True, False]
+    
+    def test_failed_conversion_leaves_no_file(self, tmp_path, monkeypatch):
+        """Test a conversion is only visible under its name once complete."""
+        path = tmp_path / 'out.csv'
+        write_result(pd.DataFrame({'user': ['alice'], 'sentbyte': [1]}), path)
+        
+        def fail(df, target, output_format):
+            Path(target).write_text('partial')
+            raise OSError('disk full')
+        
+        monkeypatch.setattr(result_writer, 'write_result', fail)
+        with pytest.raises(OSError):
+            result_writer.convert_result(path, 'ndjson')
+        
+        assert sorted(item.name for item in tmp_path.iterdir()) == ['out.csv']
@@ -0,0 +1,146 @@
+"""
+Unit tests for resumable, checkpointed scans.
+"""
+
+import os
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+import parse_engine
+from log_parser_service import LogParserService
+from parse_engine import FirewallAnalysis, VPNLoginAnalysis, run_analyses
+from scan_checkpoint import ScanCheckpoint
+
+
+class WorkerKilled(Exception):
+    """Stands in for a worker dying in the middle of a scan."""
+
+
+class CrashingCheckpoint(ScanCheckpoint):
+    """Checkpoint that saves after every block and dies after a few saves."""
+    
+    def __init__(self, path, crash_after):
+        super().__init__(str(path), interval=0)
+        self.crash_after = crash_after
+    
+    def save(self, *args):
+        super().save(*args)
+        if self.saves == self.crash_after:
+            raise WorkerKilled()
+
+
+def full_result(firewall_log):
+    """Firewall result of an uninterrupted scan."""
+    analysis = FirewallAnalysis()
+    stats = run_analyses(str(firewall_log), [analysis])
+    return analysis, stats
+
+
+class TestScanCheckpoint:
+    """Tests for resuming interrupted scans."""
+    
+    def test_resume_after_crash(self, firewall_log, tmp_path):
+        """Test a scan killed after a checkpoint resumes to the same result."""
+        checkpoint_path = tmp_path / 'job.ckpt'
+        with pytest.raises(WorkerKilled):
+            run_analyses(str(firewall_log), [FirewallAnalysis()], checkpoint=CrashingCheckpoint(checkpoint_path, 1))
+        
+        checkpoint = ScanCheckpoint(str(checkpoint_path))
+        resumed = FirewallAnalysis()
+        stats = run_analyses(str(firewall_log), [resumed], checkpoint=checkpoint)
+        expected, expected_stats = full_result(firewall_log)
+        
+        assert 0 < checkpoint.resumed_from < firewall_log.stat().st_size
+        assert resumed.totals == expected.totals
+        assert resumed.lines_matched == expected.lines_matched
+        assert stats.lines_processed == expected_stats.lines_processed
+        assert stats.bytes_read == expected_stats.bytes_read
+    
+    def test_resume_in_parallel(self, firewall_log, tmp_path, monkeypatch):
+        """Test chunked scans checkpoint merged chunks and resume from them."""
+        monkeypatch.setattr(parse_engine, 'MIN_CHUNK_SIZE', 1024 * 1024)
+        checkpoint_path = tmp_path / 'job.ckpt'
+        with pytest.raises(WorkerKilled):
+            run_analyses(
+                str(firewall_log), [FirewallAnalysis()], workers=2, checkpoint=CrashingCheckpoint(checkpoint_path, 3)
+            )
+        
+        checkpoint = ScanCheckpoint(str(checkpoint_path))
+        resumed = FirewallAnalysis()
+        run_analyses(str(firewall_log), [resumed], workers=2, checkpoint=checkpoint)
+        
+        assert checkpoint.resumed_from > 0
+        assert resumed.totals == full_result(firewall_log)[0].totals
+    
+    def test_stale_checkpoints_are_discarded(self, firewall_log, tmp_path):
+        """Test checkpoints of other analyses, other files or damaged ones start over."""
+        checkpoint_path = tmp_path / 'job.ckpt'
+        with pytest.raises(WorkerKilled):
+            run_analyses(str(firewall_log), [FirewallAnalysis()], checkpoint=CrashingCheckpoint(checkpoint_path, 1))
+        
+        checkpoint = ScanCheckpoint(str(checkpoint_path))
+        assert checkpoint.restore(str(firewall_log), [VPNLoginAnalysis()])[0] == 0
+        assert not checkpoint_path.exists()
+        
+        checkpoint_path.write_bytes(b'not a pickle')
+        assert checkpoint.restore(str(firewall_log), [FirewallAnalysis()])[0] == 0
+        assert not checkpoint_path.exists()
+    
+    def test_changed_file_starts_over(self, tmp_path):
+        """Test a checkpoint is not applied to a file that changed since."""
+        log = tmp_path / 'firewall.log'
+        log.write_text('date=2024-01-15 time=10:00:00 dstip=8.8.8.8 sentbyte=10 action=accept\n')
+        checkpoint = ScanCheckpoint(str(tmp_path / 'job.ckpt'))
+        checkpoint.save(str(log), log.stat().st_size, [FirewallAnalysis()], parse_engine.ScanStats())
+        
+        with open(log, 'a') as f:
+            f.write('date=2024-01-15 time=10:00:01 dstip=8.8.8.8 sentbyte=5 action=accept\n')
+        os.utime(log, ns=(0, 0))
+        analysis = FirewallAnalysis()
+        run_analyses(str(log), [analysis], checkpoint=checkpoint)
+        
+        assert checkpoint.resumed_from == 0
+        assert analysis.totals == {'8.8.8.8': 15}
+    
+    def test_interval(self, tmp_path):
+        """Test saves are only due once the interval has passed."""
+        now = [0.0]
+        checkpoint = ScanCheckpoint(str(tmp_path / 'job.ckpt'), interval=60, clock=lambda: now[0])
+        
+        now[0] = 59
+        assert not checkpoint.due()
+        now[0] = 60
+        assert checkpoint.due()
+    
+    def test_attempts(self, tmp_path):
+        """Test runs are counted across instances until the checkpoint is removed."""
+        path = str(tmp_path / 'job.ckpt')
+        
+        assert ScanCheckpoint(path).start_attempt() == 1
+        assert ScanCheckpoint(path).start_attempt() == 2
+        
+        checkpoint = ScanCheckpoint(path)
+        assert checkpoint.start_attempt() == 3
+        checkpoint.remove()
+        
+        assert not list(tmp_path.iterdir())
+        assert ScanCheckpoint(path).start_attempt() == 1
+
+
+def test_service_checkpoint(firewall_log, tmp_path):
+    """Test the service resumes a firewall parse from a checkpoint."""
+    checkpoint_path = tmp_path / 'job.ckpt'
+    with pytest.raises(WorkerKilled):
+        LogParserService().parse_firewall_logs(str(firewall_log), checkpoint=CrashingCheckpoint(checkpoint_path, 1))
+    
+    df = LogParserService().parse_firewall_logs(str(firewall_log), checkpoint=ScanCheckpoint(str(checkpoint_path)))
+    
+    assert df.equals(full_result(firewall_log)[0].to_dataframe())
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,111 @@
+"""
+Unit tests for parse progress reporting.
+"""
+
+import gzip
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+import parse_engine
+from log_parser_service import LogParserService
+from parse_engine import FirewallAnalysis, VPNLoginAnalysis, run_analyses
+from scan_progress import ProgressReporter, ScanProgress
+
+
+class TestProgressReporter:
+    """Tests for throttled progress updates."""
+    
+    def test_throttling(self):
+        """Test updates are reported at most once per interval, and always at the end."""
+        now = [0.0]
+        reports = []
+        reporter = ProgressReporter(reports.append, total_bytes=1000, interval=1, clock=lambda: now[0])
+        
+        for step in range(1, 11):
+            now[0] = step * 0.25
+            reporter.update(step * 50, step * 5, step)
+        reporter.finish(1000, 100, 20)
+        
+        assert [report.bytes_read for report in reports] == [50, 250, 450, 1000]
+        assert reports[-1].done
+    
+    def test_rates_and_eta(self):
+        """Test throughput and ETA exclude bytes restored from a checkpoint."""
+        now = [0.0]
+        reports = []
+        reporter = ProgressReporter(reports.append, total_bytes=1000, clock=lambda: now[0])
+        reporter.resume_from(400, 40)
+        
+        now[0] = 2
+        reporter.update(600, 60, 6)
+        progress = reports[0]
+        
+        assert progress.percent == 60
+        assert progress.bytes_per_second == 100
+        assert progress.lines_per_second == 10
+        assert progress.eta_seconds == 4
+        assert progress.to_dict()['eta_seconds'] == 4
+    
+    def test_unknown_total(self):
+        """Test progress without a known size has no percentage or ETA."""
+        progress = ScanProgress(10, None, 1, 0, 1.0, 10.0, 1.0)
+        
+        assert progress.percent is None
+        assert progress.eta_seconds is None
+        assert progress.to_dict()['percent'] is None
+
+
+class TestRunAnalysesProgress:
+    """Tests for progress reported by the parse engine."""
+    
+    def test_sequential(self, firewall_log):
+        """Test the final report covers the whole file and every match."""
+        reports = []
+        analyses = [FirewallAnalysis(), VPNLoginAnalysis()]
+        stats = run_analyses(str(firewall_log), analyses, progress=reports.append)
+        
+        final = reports[-1]
+        assert final.done
+        assert final.bytes_read == final.total_bytes == firewall_log.stat().st_size
+        assert final.lines_processed == stats.lines_processed
+        assert final.lines_matched == stats.lines_processed
+        assert [report.done for report in reports].count(True) == 1
+    
+    def test_parallel(self, firewall_log, monkeypatch):
+        """Test chunked scans report as chunks are merged."""
+        monkeypatch.setattr(parse_engine, 'MIN_CHUNK_SIZE', 1024 * 1024)
+        reports = []
+        run_analyses(str(firewall_log), [FirewallAnalysis()], workers=2, progress=reports.append)
+        
+        offsets = [report.bytes_read for report in reports]
+        assert offsets == sorted(offsets)
+        assert reports[-1].percent == 100
+    
+    def test_compressed(self, firewall_log, tmp_path):
+        """Test compressed files report decompressed bytes without a total."""
+        compressed = tmp_path / 'fortigate.log.gz'
+        compressed.write_bytes(gzip.compress(firewall_log.read_bytes()))
+        reports = []
+        run_analyses(str(compressed), [FirewallAnalysis()], progress=reports.append)
+        
+        assert reports[-1].total_bytes is None
+        assert reports[-1].bytes_read == firewall_log.stat().st_size
+
+
+def test_service_export_progress(firewall_log, tmp_path):
+    """Test streamed exports report progress too."""
+    reports = []
+    LogParserService().export_results(
+        str(firewall_log), 'vpn', str(tmp_path / 'vpn.csv'), progress=reports.append
+    )
+    
+    assert reports[-1].done
+    assert reports[-1].lines_matched == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
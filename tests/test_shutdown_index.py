@@ -0,0 +1,104 @@
+"""
+Unit tests for the all-users VPN shutdown index.
+"""
+
+import os
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+import shutdown_index
+from shutdown_index import ShutdownIndex, ShutdownIndexStore, INDEX_SUFFIX
+from log_parser_service import LogParserService
+
+
+@pytest.fixture
+def shutdown_log(tmp_path):
+    """Create a log file with shutdown sessions for several users."""
+    lines = []
+    for i in range(60):
+        lines.append(
+            f'date=2024-01-15 time=12:{i:02d}:00 user="{["Alice", "bob", "carol"][i % 3]}" '
+            f'sentbyte={(i + 1) * 1000} msg="SSL tunnel shutdown"'
+        )
+        lines.append(f'date=2024-01-15 time=12:{i:02d}:30 user="alice" msg="SSL tunnel established"')
+    log_file = tmp_path / "vpn.log"
+    log_file.write_text('\n'.join(lines) + '\n')
+    return str(log_file)
+
+
+class TestShutdownIndex:
+    """Tests for ShutdownIndex and ShutdownIndexStore."""
+    
+    def test_lookup_matches_single_user_scan(self, shutdown_log):
+        """Test index lookups equal a filtered scan for every user."""
+        parser = LogParserService()
+        index = ShutdownIndex.build(shutdown_log)
+        
+        assert index.users == ['alice', 'bob', 'carol']
+        for user in ['ALICE', 'bob', 'Carol', 'dave']:
+            assert index.lookup(user).equals(parser.parse_vpn_shutdown_sentbytes(shutdown_log, user))
+    
+    def test_totals(self, shutdown_log):
+        """Test per-user totals."""
+        totals = ShutdownIndex.build(shutdown_log).totals()
+        
+        assert totals['user'].tolist() == ['carol', 'bob', 'alice']
+        assert totals['sessions'].tolist() == [20, 20, 20]
+        assert totals['sentbyte'].sum() == sum((i + 1) * 1000 for i in range(60))
+    
+    def test_store_scans_once(self, shutdown_log, tmp_path, monkeypatch):
+        """Test repeated lookups, and a new store on the same directory, reuse the index."""
+        builds = []
+        original_build = ShutdownIndex.build.__func__
+        
+        def counting_build(cls, *args, **kwargs):
+            builds.append(args)
+            return original_build(cls, *args, **kwargs)
+        
+        monkeypatch.setattr(ShutdownIndex, 'build', classmethod(counting_build))
+        index_dir = tmp_path / 'indexes'
+        
+        parser = LogParserService(shutdown_index=ShutdownIndexStore(str(index_dir)))
+        first = parser.parse_vpn_shutdown_sentbytes(shutdown_log, 'alice')
+        parser.parse_vpn_shutdown_sentbytes(shutdown_log, 'bob')
+        
+        reloaded = ShutdownIndexStore(str(index_dir)).get(shutdown_log).lookup('alice')
+        
+        assert len(builds) == 1
+        assert len(list(index_dir.glob(f'*{INDEX_SUFFIX}'))) == 1
+        assert reloaded.equals(first)
+    
+    def test_stale_version_rebuilt(self, shutdown_log, tmp_path, monkeypatch):
+        """Test indexes written by another version are ignored."""
+        index_dir = tmp_path / 'indexes'
+        ShutdownIndexStore(str(index_dir)).get(shutdown_log)
+        
+        monkeypatch.setattr(shutdown_index, 'INDEX_VERSION', shutdown_index.INDEX_VERSION + 1)
+        path = next(index_dir.glob(f'*{INDEX_SUFFIX}'))
+        
+        assert ShutdownIndex.load(path) is None
+        assert len(ShutdownIndexStore(str(index_dir)).get(shutdown_log).lookup('bob')) == 20
+    
+    def test_lru_eviction(self, shutdown_log, tmp_path):
+        """Test persisted indexes beyond max_bytes are evicted, least recently used first."""
+        index_dir = tmp_path / 'indexes'
+        ShutdownIndexStore(str(index_dir)).get(shutdown_log)
+        first = next(index_dir.glob(f'*{INDEX_SUFFIX}'))
+        os.utime(first, ns=(0, 0))
+        
+        other_log = tmp_path / 'other.log'
+        other_log.write_text(Path(shutdown_log).read_text().replace('Alice', 'dave'))
+        store = ShutdownIndexStore(str(index_dir), max_bytes=first.stat().st_size + 1)
+        store.get(str(other_log))
+        
+        assert not first.exists()
+        assert len(list(index_dir.glob(f'*{INDEX_SUFFIX}'))) == 1
+        assert len(store.get(str(other_log)).lookup('dave')) == 20
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,210 @@
+"""
+Unit tests for streaming statistics.
+"""
+
+import numpy as np
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+from log_parser_service import LogParserService
+from parse_engine import StatisticsAnalysis, run_analyses
+from stream_stats import HyperLogLog, QuantileSketch, RunningStats, StreamStatistics
+
+
+class TestHyperLogLog:
+    """Tests for distinct counts."""
+    
+    @pytest.mark.parametrize('distinct', [0, 1, 50, 5000, 200000])
+    def test_estimate(self, distinct):
+        """Test estimates are close to the true distinct count."""
+        counter = HyperLogLog()
+        for i in range(distinct):
+            counter.add(f'user{i}')
+            counter.add(f'user{i}')
+        
+        assert abs(counter.count() - distinct) <= max(1, distinct * 0.03)
+    
+    def test_merge(self):
+        """Test merged counters count the union."""
+        left, right = HyperLogLog(), HyperLogLog()
+        for i in range(3000):
+            left.add(f'10.0.{i // 256}.{i % 256}')
+        for i in range(2000, 5000):
+            right.add(f'10.0.{i // 256}.{i % 256}')
+        
+        left.merge(right)
+        
+        assert abs(left.count() - 5000) <= 150
+        with pytest.raises(ValueError):
+            left.merge(HyperLogLog(10))
+
+
+class TestQuantileSketch:
+    """Tests for quantile sketches."""
+    
+    def test_relative_error(self):
+        """Test quantiles are within the relative accuracy, also after a merge."""
+        values = np.random.default_rng(3).lognormal(8, 2, 20000).astype(int)
+        left, right = QuantileSketch(), QuantileSketch()
+        for i, value in enumerate(values.tolist()):
+            (left if i % 2 else right).add(value)
+        
+        left.merge(right)
+        
+        assert left.count == len(values)
+        for q in (0.1, 0.5, 0.9, 0.99):
+            expected = np.quantile(values, q, method='lower')
+            assert abs(left.quantile(q) - expected) <= 0.011 * expected + 1
+        assert left.quantile(0) == values.min()
+        assert left.quantile(1) == values.max()
+    
+    def test_empty_and_zero(self):
+        """Test empty sketches and zero values."""
+        sketch = QuantileSketch()
+        assert sketch.quantile(0.5) is None
+        
+        for value in (0, 0, 0, 10):
+            sketch.add(value)
+        assert sketch.quantile(0.5) == 0
+        with pytest.raises(ValueError):
+            sketch.quantile(1.5)
+
+
+def test_running_stats_and_summary():
+    """Test running totals and the combined summary merge exactly."""
+    left, right = StreamStatistics(), StreamStatistics()
+    for value in (5, 1, 9):
+        left.add_value('sentbyte', value)
+        left.add_top('user', 'alice')
+    right.add_value('sentbyte', 20)
+    right.add_top('user', 'bob')
+    right.add_distinct('user', 'bob')
+    
+    left.merge(right)
+    summary = left.summary()
+    
+    assert summary['values']['sentbyte']['sum'] == 35
+    assert summary['values']['sentbyte']['min'] == 1
+    assert summary['values']['sentbyte']['max'] == 20
+    assert summary['values']['sentbyte']['mean'] == 8.75
+    assert summary['top']['user'] == {'alice': 3, 'bob': 1}
+    assert summary['distinct']['user'] == 1
+    assert RunningStats().mean is None
+
+
+# Distinct counts, and the averages derived from them, are sketch estimates
+ESTIMATED = {'unique_users', 'unique_ips', 'unique_destinations', 'avg_bytes_per_ip'}
+
+
+class TestStatisticsAnalysis:
+    """Tests for statistics accumulated during parsing."""
+    
+    @pytest.fixture
+    def log_file(self, tmp_path):
+        """Write VPN logins, shutdowns and firewall traffic."""
+        path = tmp_path / 'fortigate.log'
+        users = ['alice', 'bob', 'carol', 'dave']
+        with open(path, 'w') as f:
+            for i in range(3000):
+                user = users[i % 7 % 4]
+                f.write(
+                    f'date=2024-01-15 time={i % 24:02d}:00:00 tunneltype="ssl-web" remip=203.0.113.{i % 97} '
+                    f'user="{user}" reason="login successfully" msg="SSL tunnel established"\n'
+                )
+                f.write(f'date=2024-01-15 time=10:00:00 user="{user}" sentbyte={i * 37} msg="SSL tunnel shutdown"\n')
+                f.write(
+                    f'date=2024-01-15 time={i % 24:02d}:30:00 dstip=8.{i % 11}.{i % 13}.1 '
+                    f'sentbyte={i % 500} rcvdbyte=1 action=accept\n'
+                )
+                f.write(f'date=2024-01-15 time=10:00:00 dstip=10.0.0.{i % 200} sentbyte=99 action=accept\n')
+        return path
+    
+    @pytest.mark.parametrize('log_type', ['vpn', 'firewall', 'firewall_timeline', 'vpn_shutdown'])
+    def test_matches_dataframe_statistics(self, log_file, log_type):
+        """Test streamed statistics agree with statistics of the full result."""
+        parser = LogParserService()
+        df = parser.analyze(str(log_file), [log_type], target_user='bob' if log_type == 'vpn_shutdown' else None)
+        expected = parser.get_statistics(df[log_type], log_type)
+        
+        streamed = parser.stream_statistics(
+            str(log_file), log_type, target_user='bob' if log_type == 'vpn_shutdown' else None
+        )
+        
+        for key, value in expected.items():
+            if key in ESTIMATED or log_type.startswith('firewall') and key == 'total_records':
+                assert streamed[key] == pytest.approx(value, rel=0.02, abs=1), key
+            elif key == 'top_destinations':
+                # Few enough destinations for every total to be exact
+                assert [{**top, 'max_overcount_mb': 0.0} for top in value] == streamed[key]
+            elif isinstance(value, float):
+                assert streamed[key] == pytest.approx(value), key
+            else:
+                assert streamed[key] == value, key
+    
+    def test_parallel_matches_sequential(self, log_file):
+        """Test statistics of worker chunks merge into the sequential ones."""
+        sequential = StatisticsAnalysis('firewall')
+        parallel = StatisticsAnalysis('firewall')
+        
+        run_analyses(str(log_file), [sequential])
+        run_analyses(str(log_file), [parallel], workers=3)
+        
+        assert parallel.statistics() == sequential.statistics()
+        assert parallel.private_ips_skipped == 3000
+    
+    def test_top_destinations_in_long_tail(self, tmp_path):
+        """Test destinations whose totals are mostly overcount are not reported."""
+        mb = 1024 * 1024
+        path = tmp_path / 'firewall.log'
+        heavy = {'8.8.8.8': 40 * mb, '1.1.1.1': 30 * mb, '9.9.9.9': 20 * mb}
+        with open(path, 'w') as f:
+            for i in range(30000):
+                f.write(f'date=2024-01-15 time=10:00:00 dstip=5.{i // 65536}.{i // 256 % 256}.{i % 256} sentbyte=100000\n')
+                if i % 1500 == 0:
+                    for dstip, total in heavy.items():
+                        f.write(f'date=2024-01-15 time=10:00:00 dstip={dstip} sentbyte={total // 20}\n')
+        
+        parser = LogParserService()
+        streamed = parser.stream_statistics(str(path), 'firewall')['top_destinations']
+        exact = parser.get_statistics(parser.parse_firewall_logs(str(path)), 'firewall')['top_destinations']
+        exact_mb = {top['dstip']: top['size_mb'] for top in exact}
+        
+        assert [top['dstip'] for top in streamed] == list(heavy)
+        for top in streamed:
+            assert top['size_mb'] - top['max_overcount_mb'] <= exact_mb[top['dstip']] <= top['size_mb']
+    
+    @pytest.mark.parametrize('log_type', ['vpn', 'vpn_shutdown'])
+    def test_streamed_export_statistics(self, log_file, tmp_path, log_type):
+        """Test streamed exports summarize their rows in the same pass."""
+        parser = LogParserService()
+        target_user = 'bob' if log_type == 'vpn_shutdown' else None
+        exported = parser.export_results(
+            str(log_file), log_type, str(tmp_path / 'result.csv'), target_user=target_user,
+            batch_rows=100, statistics=True
+        )
+        
+        assert exported.frame is None
+        assert exported.statistics['total_records'] == exported.records
+        assert exported.statistics == parser.stream_statistics(str(log_file), log_type, target_user)
+    
+    def test_export_statistics_of_frame(self, log_file, tmp_path):
+        """Test results held in memory get exact statistics, and only on request."""
+        parser = LogParserService()
+        exported = parser.export_results(str(log_file), 'firewall', str(tmp_path / 'result.csv'), statistics=True)
+        plain = parser.export_results(str(log_file), 'firewall', str(tmp_path / 'plain.csv'))
+        
+        assert exported.statistics == parser.get_statistics(exported.frame, 'firewall')
+        assert plain.statistics is None
+    
+    def test_unknown_log_type(self):
+        """Test unknown analyses are rejected."""
+        with pytest.raises(ValueError, match='Unknown analysis'):
+            StatisticsAnalysis('dns')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
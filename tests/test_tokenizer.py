@@ -0,0 +1,87 @@
+"""
+Unit tests for the shared Fortinet field extractor.
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+from fortinet_tokenizer import (
+    FieldExtractor,
+    vpn_login_extractor,
+    firewall_extractor,
+    shutdown_extractor,
+)
+
+
+VPN_LINE = (
+    'date=2024-01-15 time=10:30:00 devname="FGT60E" logid="0101039947" type="event" '
+    'subtype="vpn" tunneltype="ssl-web" remip=203.0.113.1 user="john.doe" '
+    'reason="login successfully" msg="SSL tunnel established"'
+)
+
+SHUTDOWN_LINE = (
+    'date=2024-01-15 time=11:00:00 user="John.Doe" tunneltype="ssl-tunnel" '
+    'sentbyte=600000000 rcvdbyte=1200 msg="SSL tunnel shutdown"'
+)
+
+
+class TestFieldExtractor:
+    """Tests for FieldExtractor."""
+    
+    def test_vpn_login_fields_in_output_order(self):
+        """Test VPN login values come back in column order."""
+        values = vpn_login_extractor().extract(VPN_LINE)
+        
+        assert values == [
+            '2024-01-15', '10:30:00', 'john.doe', 'ssl-web',
+            '203.0.113.1', 'login successfully', 'SSL tunnel established', None, None
+        ]
+    
+    def test_optional_timestamp_fields(self):
+        """Test tz and eventtime are read when present without being required."""
+        line = VPN_LINE.replace('devname=', 'eventtime=1705311000123456789 tz="+0100" devname=')
+        
+        assert vpn_login_extractor().extract(line)[-2:] == ['+0100', '1705311000123456789']
+        assert shutdown_extractor().extract(SHUTDOWN_LINE + ' tz=-0500')[-2:] == ['-0500', None]
+    
+    def test_vpn_login_rejects_failed_login(self):
+        """Test failed logins are rejected by the reason predicate."""
+        line = VPN_LINE.replace('login successfully', 'login failed')
+        assert vpn_login_extractor().extract(line) is None
+    
+    def test_vpn_login_missing_field(self):
+        """Test lines missing a required field are rejected."""
+        line = VPN_LINE.replace('tunneltype="ssl-web" ', '')
+        assert vpn_login_extractor().extract(line) is None
+    
+    def test_firewall_fields(self):
+        """Test firewall extraction of dstip and sentbyte."""
+        line = 'srcip=192.168.1.100 dstip=8.8.8.8 sentbyte=1500 rcvdbyte=10'
+        assert firewall_extractor().extract(line) == ['8.8.8.8', '1500']
+        assert firewall_extractor().extract('srcip=192.168.1.100 dstip=8.8.8.8') is None
+    
+    def test_shutdown_user_filter_case_insensitive(self):
+        """Test shutdown extraction filters by user case-insensitively."""
+        values = shutdown_extractor('john.doe').extract(SHUTDOWN_LINE)
+        
+        assert values == ['2024-01-15', '11:00:00', 'John.Doe', '600000000', 'SSL tunnel shutdown', None, None]
+        assert shutdown_extractor('jane.smith').extract(SHUTDOWN_LINE) is None
+        assert shutdown_extractor().extract(SHUTDOWN_LINE) is not None
+    
+    def test_shutdown_requires_shutdown_message(self):
+        """Test non-shutdown messages are rejected."""
+        line = SHUTDOWN_LINE.replace('SSL tunnel shutdown', 'SSL tunnel established')
+        assert shutdown_extractor('john.doe').extract(line) is None
+    
+    def test_unknown_field(self):
+        """Test unknown field names raise ValueError."""
+        with pytest.raises(ValueError):
+            FieldExtractor(('dstip', 'nosuchfield'))
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
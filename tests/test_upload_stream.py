@@ -0,0 +1,116 @@
+"""
+Unit tests for parsing uploads while they are received.
+"""
+
+import bz2
+import hashlib
+import io
+import pytest
+from pathlib import Path
+import sys
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'web_app' / 'backend'))
+
+from utils.security import UploadStream, SNIFF_SIZE
+from compressed_io import wrap_decompressor
+from log_parser_service import LogParserService
+from csv_parser_service import CSVParserService
+
+
+class TrickleStream(io.BytesIO):
+    """Stream returning at most a few bytes per read, like a slow socket."""
+    
+    def read(self, size=-1):
+        return super().read(min(size, 7) if size and size > 0 else 7)
+
+
+@pytest.fixture
+def log_bytes():
+    """Fortinet log content larger than the sniff buffer."""
+    lines = []
+    for i in range(2000):
+        lines.append(
+            f'date=2024-01-15 time=10:{i % 60:02d}:00 user="user{i % 4}" tunneltype="ssl-web" '
+            f'remip=203.0.113.{i % 250} reason="login successfully" msg="SSL tunnel established"'
+        )
+        lines.append(f'date=2024-01-15 dstip=8.8.{i % 3}.8 sentbyte={i}')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class TestUploadStream:
+    """Tests for UploadStream."""
+    
+    def test_read_returns_all_bytes_and_digest(self, log_bytes, tmp_path):
+        """Test sniffed bytes are replayed and the digest and copy cover the whole body."""
+        copy_path = tmp_path / 'copy.log'
+        upload = UploadStream(io.BytesIO(log_bytes), 'fw.log', copy_path=str(copy_path))
+        
+        head = upload.sniff()
+        body = upload.read()
+        upload.close()
+        
+        assert len(log_bytes) > SNIFF_SIZE
+        assert head == log_bytes[:SNIFF_SIZE]
+        assert body == log_bytes
+        assert upload.bytes_received == len(log_bytes)
+        assert upload.hexdigest() == hashlib.sha256(log_bytes).hexdigest()
+        assert copy_path.read_bytes() == log_bytes
+    
+    def test_size_limit(self, log_bytes):
+        """Test uploads beyond the limit are rejected while reading."""
+        upload = UploadStream(io.BytesIO(log_bytes), 'fw.log', max_size=1000)
+        
+        with pytest.raises(ValueError):
+            upload.sniff()
+    
+    def test_rejects_extension(self, log_bytes):
+        """Test disallowed extensions are rejected by sniff()."""
+        with pytest.raises(ValueError):
+            UploadStream(io.BytesIO(log_bytes), 'fw.exe').sniff()
+
+
+class TestStreamParsing:
+    """Tests for LogParserService.analyze_stream."""
+    
+    def test_stream_matches_file(self, log_bytes, tmp_path):
+        """Test parsing a trickling stream equals parsing the saved file."""
+        log_file = tmp_path / 'fw.log'
+        log_file.write_bytes(log_bytes)
+        parser = LogParserService()
+        
+        upload = UploadStream(TrickleStream(log_bytes), 'fw.log')
+        upload.sniff()
+        streamed = parser.analyze_stream(upload, ['vpn', 'firewall'])
+        from_file = parser.analyze(str(log_file), ['vpn', 'firewall'])
+        
+        assert streamed['vpn'].equals(from_file['vpn'])
+        assert streamed['firewall'].equals(from_file['firewall'])
+        assert upload.hexdigest() == hashlib.sha256(log_bytes).hexdigest()
+    
+    def test_digest_after_drain_covers_whole_upload(self, log_bytes):
+        """Test draining after a parse that stopped early hashes the full body."""
+        # Decompression stops at the end of the bz2 stream and ignores the padding
+        body = bz2.compress(log_bytes) + b'\0' * 100000
+        upload = UploadStream(io.BytesIO(body), 'fw.log.bz2')
+        upload.sniff()
+        
+        LogParserService().analyze_stream(wrap_decompressor(upload, 'bz2'), ['vpn'])
+        parsed = upload.bytes_received
+        upload.drain()
+        
+        assert parsed < len(body)
+        assert upload.bytes_received == len(body)
+        assert upload.hexdigest() == hashlib.sha256(body).hexdigest()
+    
+    def test_detect_format_sample(self):
+        """Test format detection from the start of an upload."""
+        csv_parser = CSVParserService()
+        
+        assert csv_parser.detect_format_sample('date=2024-01-15 time=10:00:00 x=1\n', 'a.log') == 'fortinet'
+        assert csv_parser.detect_format_sample('date,time,user\n2024,10,a\n', 'a.txt') == 'csv'
+        assert csv_parser.detect_format_sample('dstip,sentbyte\n8.8.8.8,1\n', 'a.csv') == 'csv'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -5,7 +5,7 @@ This is the production-ready Flask application with security hardening,
 proper configuration, and async processing support.
 """
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
@@ -14,10 +14,11 @@ from flask_talisman import Talisman
 from werkzeug.utils import secure_filename
 from werkzeug.security import check_password_hash, generate_password_hash
 import os
+import uuid
 import logging
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any, Tuple
 
 # Import configuration and utilities
 from config import Config, get_config, get_security_config
@@ -25,12 +26,31 @@ from utils.security import (
     sanitize_filename,
     sanitize_username,
     secure_save_file,
+    UploadStream,
     get_secure_headers,
     ALLOWED_EXTENSIONS,
+    ARCHIVE_EXTENSIONS,
 )
 from utils.input_validation import validate_password
 from utils.logging_config import setup_logger, SecurityLogger
 from log_parser_service import LogParserService
+from shutdown_index import ShutdownIndexStore
+from dataset_cache import DatasetCache
+from result_writer import (
+    ExportResult,
+    available_formats,
+    convert_result,
+    output_suffix,
+    resolve_format,
+    write_result,
+)
+from result_download import send_result
+from result_pages import DEFAULT_PAGE_SIZE, PageWriter, open_pages, pages_path, remove_pages
+from result_query import ResultQuery
+from log_time import bucket_seconds
+from scan_checkpoint import ScanCheckpoint
+from scan_progress import ScanProgress
+from compressed_io import detect_compression_bytes, wrap_decompressor
 from csv_parser_service import CSVParserService
 from celery import Celery
 
@@ -118,15 +138,157 @@ def init_admin_user() -> None:
 init_admin_user()
 
 # Initialize services
-log_parser = LogParserService()
+# Shutdown lookups for different users of the same file share one index
+log_parser = LogParserService(
+    shutdown_index=ShutdownIndexStore(config.INDEX_FOLDER, max_bytes=config.INDEX_MAX_MB * 1024 * 1024)
+)
 csv_parser = CSVParserService()
 
+# Parsed results by file content, so re-uploaded evidence is not reparsed
+dataset_cache = DatasetCache(config.CACHE_FOLDER, max_bytes=config.CACHE_MAX_MB * 1024 * 1024)
+
+# Analyses accepted by /api/parse/combined
+COMBINED_ANALYSES = ('vpn', 'firewall', 'vpn_shutdown')
+
 
 def allowed_file(filename: str) -> bool:
     """Check if file extension is allowed."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def parse_analysis_names(value: str) -> list:
+    """Split a comma-separated analysis list ("vpn,firewall,vpn-shutdown")."""
+    return [name.strip().lower().replace('-', '_') for name in value.split(',') if name.strip()]
+
+
+def parse_top(form: Dict[str, str]) -> Tuple[Optional[int], bool]:
+    """
+    Read the firewall top-K form fields ``top`` and ``approximate``.
+    
+    Raises:
+        ValueError: If top is not a positive integer, or approximate is set
+            without top
+    """
+    top = form.get('top') or None
+    approximate = str(form.get('approximate', 'false')).lower() == 'true'
+    
+    if top is not None:
+        if not str(top).isdigit() or int(top) < 1:
+            raise ValueError('top must be a positive integer')
+        top = int(top)
+    if approximate and top is None:
+        raise ValueError('approximate requires top')
+    
+    return top, approximate
+
+
+def task_checkpoint(task: Any) -> ScanCheckpoint:
+    """
+    Progress checkpoint of a parse task, named after its task id.
+    
+    A task redelivered after its worker died has the same id, so it
+    resumes from the last checkpoint instead of reparsing the whole file.
+    Runs are counted, so a task whose worker dies every time (e.g. out of
+    memory on the aggregate itself) fails after TASK_MAX_ATTEMPTS runs
+    instead of being redelivered forever.
+    
+    Raises:
+        RuntimeError: If the task has already run TASK_MAX_ATTEMPTS times
+    """
+    checkpoint = ScanCheckpoint(
+        str(Path(config.CHECKPOINT_FOLDER) / f'{task.request.id}.ckpt'),
+        interval=config.CHECKPOINT_INTERVAL
+    )
+    
+    attempts = checkpoint.start_attempt()
+    if attempts > config.TASK_MAX_ATTEMPTS:
+        checkpoint.remove()
+        logger.error(f"Task {task.request.id} given up after {attempts - 1} runs whose worker died")
+        raise RuntimeError(f"Parsing was interrupted {attempts - 1} times; the file may be too large to process")
+    if attempts > 1:
+        logger.warning(f"Task {task.request.id} redelivered, run {attempts} of {config.TASK_MAX_ATTEMPTS}")
+    
+    return checkpoint
+
+
+def task_progress(task: Any, status: str) -> Callable[[ScanProgress], None]:
+    """
+    Progress callback that publishes a parse task's progress in its state.
+    
+    get_task_status returns it as ``progress``: bytes and lines read,
+    matches, percent of the file, throughput and ETA. The parse engine
+    throttles the calls, so each one can write to the result backend.
+    """
+    def report(progress: ScanProgress) -> None:
+        task.update_state(state='PROCESSING', meta={'status': status, 'progress': progress.to_dict()})
+    
+    return report
+
+
+def parse_output_format(value: Optional[str]) -> Optional[str]:
+    """Resolve a requested output format ("csv" when not given); None if it is not supported."""
+    try:
+        return resolve_format(value or 'csv')
+    except ValueError:
+        return None
+
+
+def invalid_output_format() -> tuple:
+    """Error response for an unsupported output format."""
+    return jsonify({'error': f"Valid output format required: {', '.join(available_formats())}"}), 400
+
+
+def save_analysis_results(frames: Dict[str, Any], user: str, output_format: str = 'csv') -> Dict[str, Any]:
+    """Save one result file per analysis and build the per-analysis summary."""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    results: Dict[str, Any] = {}
+    
+    for name, df in frames.items():
+        if df.empty:
+            results[name] = {'records': 0, 'filename': None, 'preview': []}
+            continue
+        
+        result_filename = f'{name}_parsed_{user}_{timestamp}{output_suffix(output_format, config.COMPRESS_RESULTS)}'
+        result_path = Path('results') / result_filename
+        exported = write_result(
+            df, result_path, output_format, mirror=PageWriter(pages_path(config.PAGES_FOLDER, result_path))
+        )
+        
+        results[name] = {
+            'records': exported.records,
+            'filename': result_filename,
+            'preview': exported.preview
+        }
+        
+        if name == 'vpn_shutdown':
+            results[name]['total_mb'] = round(exported.sums.get('sent_bytes_in_MB', 0), 2)
+    
+    return results
+
+
+def export_analysis(
+    filepath: str,
+    analysis: str,
+    params: Dict[str, Any],
+    result_path: Path,
+    output_format: str,
+    export: Callable[[Any], ExportResult]
+) -> ExportResult:
+    """
+    Write an analysis result file, reusing the dataset cache.
+    
+    On a cache hit the cached frame is written out. On a miss export(mirror)
+    parses the file straight into result_path, and the written rows are
+    cached as they go, including row results streamed during parsing (see
+    DatasetCache.get_or_export). Either way the rows are mirrored to the
+    result's paged column store.
+    """
+    return dataset_cache.get_or_export(
+        filepath, analysis, params, result_path, output_format, export,
+        mirror=PageWriter(pages_path(config.PAGES_FOLDER, result_path))
+    )
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check() -> tuple:
     """Health check endpoint for monitoring."""
@@ -277,6 +439,10 @@ def parse_vpn() -> tuple:
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
+    output_format = parse_output_format(request.form.get('format'))
+    if output_format is None:
+        return invalid_output_format()
+    
     if file and allowed_file(file.filename):
         try:
             filepath, original_name = secure_save_file(file, app.config['UPLOAD_FOLDER'])
@@ -289,7 +455,7 @@ def parse_vpn() -> tuple:
                 get_remote_address()
             )
             
-            task = process_vpn_logs.delay(filepath, current_user, original_name)
+            task = process_vpn_logs.delay(filepath, current_user, original_name, output_format)
             
             return jsonify({
                 'task_id': task.id,
@@ -317,6 +483,15 @@ def parse_firewall() -> tuple:
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
+    output_format = parse_output_format(request.form.get('format'))
+    if output_format is None:
+        return invalid_output_format()
+    
+    try:
+        top, approximate = parse_top(request.form)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     if file and allowed_file(file.filename):
         try:
             filepath, original_name = secure_save_file(file, app.config['UPLOAD_FOLDER'])
@@ -329,7 +504,9 @@ def parse_firewall() -> tuple:
                 get_remote_address()
             )
             
-            task = process_firewall_logs.delay(filepath, current_user, original_name)
+            task = process_firewall_logs.delay(
+                filepath, current_user, original_name, output_format, top, approximate
+            )
             
             return jsonify({
                 'task_id': task.id,
@@ -345,6 +522,56 @@ def parse_firewall() -> tuple:
     return jsonify({'error': 'Invalid file type'}), 400
 
 
+@app.route('/api/parse/firewall-timeline', methods=['POST'])
+@jwt_required()
+@limiter.limit(security_config.RATELIMIT_PARSE)
+def parse_firewall_timeline() -> tuple:
+    """Parse firewall logs into traffic per destination and time bucket, asynchronously."""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    
+    output_format = parse_output_format(request.form.get('format'))
+    if output_format is None:
+        return invalid_output_format()
+    
+    bucket = request.form.get('bucket') or 'hour'
+    try:
+        bucket_seconds(bucket)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if file and allowed_file(file.filename):
+        try:
+            filepath, original_name = secure_save_file(file, app.config['UPLOAD_FOLDER'])
+            current_user = get_jwt_identity()
+            
+            security_logger.log_file_upload(
+                current_user,
+                original_name,
+                os.path.getsize(filepath),
+                get_remote_address()
+            )
+            
+            task = process_firewall_timeline_logs.delay(filepath, current_user, original_name, output_format, bucket)
+            
+            return jsonify({
+                'task_id': task.id,
+                'status': 'processing',
+                'message': 'Firewall timeline parsing started'
+            }), 202
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            logger.error(f"Firewall timeline parse error: {e}")
+            return jsonify({'error': 'Failed to process file'}), 500
+    
+    return jsonify({'error': 'Invalid file type'}), 400
+
+
 @app.route('/api/parse/vpn-shutdown', methods=['POST'])
 @jwt_required()
 @limiter.limit(security_config.RATELIMIT_PARSE)
@@ -364,6 +591,10 @@ def parse_vpn_shutdown() -> tuple:
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
+    output_format = parse_output_format(request.form.get('format'))
+    if output_format is None:
+        return invalid_output_format()
+    
     if file and allowed_file(file.filename):
         try:
             filepath, original_name = secure_save_file(file, app.config['UPLOAD_FOLDER'])
@@ -376,7 +607,9 @@ def parse_vpn_shutdown() -> tuple:
                 get_remote_address()
             )
             
-            task = process_vpn_shutdown_logs.delay(filepath, username_filter, current_user, original_name)
+            task = process_vpn_shutdown_logs.delay(
+                filepath, username_filter, current_user, original_name, output_format
+            )
             
             return jsonify({
                 'task_id': task.id,
@@ -392,6 +625,271 @@ def parse_vpn_shutdown() -> tuple:
     return jsonify({'error': 'Invalid file type'}), 400
 
 
+@app.route('/api/parse/combined', methods=['POST'])
+@jwt_required()
+@limiter.limit(security_config.RATELIMIT_PARSE)
+def parse_combined() -> tuple:
+    """Run several analyses over one file in a single pass."""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    
+    analyses = parse_analysis_names(request.form.get('analyses', ''))
+    unknown = [name for name in analyses if name not in COMBINED_ANALYSES]
+    
+    if not analyses or unknown:
+        return jsonify({
+            'error': f"Valid analyses required: {', '.join(COMBINED_ANALYSES)}"
+        }), 400
+    
+    username_filter = None
+    if 'vpn_shutdown' in analyses:
+        username_filter = sanitize_username(request.form.get('username', ''))
+        if not username_filter:
+            return jsonify({'error': 'Valid username filter is required'}), 400
+    
+    output_format = parse_output_format(request.form.get('format'))
+    if output_format is None:
+        return invalid_output_format()
+    
+    if file and allowed_file(file.filename):
+        try:
+            filepath, original_name = secure_save_file(file, app.config['UPLOAD_FOLDER'])
+            current_user = get_jwt_identity()
+            
+            security_logger.log_file_upload(
+                current_user,
+                original_name,
+                os.path.getsize(filepath),
+                get_remote_address()
+            )
+            
+            task = process_combined_logs.delay(
+                filepath, analyses, username_filter, current_user, original_name, output_format
+            )
+            
+            return jsonify({
+                'task_id': task.id,
+                'status': 'processing',
+                'message': f"Combined parsing started: {', '.join(analyses)}"
+            }), 202
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            logger.error(f"Combined parse error: {e}")
+            return jsonify({'error': 'Failed to process file'}), 500
+    
+    return jsonify({'error': 'Invalid file type'}), 400
+
+
+@app.route('/api/parse/stream', methods=['POST'])
+@jwt_required()
+@limiter.limit(security_config.RATELIMIT_PARSE)
+def parse_stream() -> tuple:
+    """
+    Parse a raw upload body while it is being received.
+    
+    The file is sent as the request body (not multipart) with its name in
+    the ``X-Filename`` header. Query parameters: ``analyses`` (as for
+    /api/parse/combined), ``username`` for vpn-shutdown, ``format`` for the
+    result files and ``save_copy=true`` to keep the upload in the upload folder. Fortinet logs are parsed block
+    by block as the body arrives and the results are returned directly.
+    """
+    original_name = request.headers.get('X-Filename', '')
+    analyses = parse_analysis_names(request.args.get('analyses', ''))
+    
+    if request.mimetype.startswith('multipart/'):
+        return jsonify({'error': 'Send the file as the raw request body'}), 400
+    
+    if not original_name or not allowed_file(original_name):
+        return jsonify({'error': 'Invalid file type'}), 400
+    
+    if not analyses or any(name not in COMBINED_ANALYSES for name in analyses):
+        return jsonify({
+            'error': f"Valid analyses required: {', '.join(COMBINED_ANALYSES)}"
+        }), 400
+    
+    username_filter = None
+    if 'vpn_shutdown' in analyses:
+        username_filter = sanitize_username(request.args.get('username', ''))
+        if not username_filter:
+            return jsonify({'error': 'Valid username filter is required'}), 400
+    
+    output_format = parse_output_format(request.args.get('format'))
+    if output_format is None:
+        return invalid_output_format()
+    
+    current_user = get_jwt_identity()
+    save_copy = request.args.get('save_copy', 'false').lower() == 'true'
+    
+    try:
+        safe_name = sanitize_filename(original_name)
+        ext = safe_name.rsplit('.', 1)[-1].lower()
+        copy_path = Path(app.config['UPLOAD_FOLDER']) / f"{uuid.uuid4()}.{ext}"
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    upload = UploadStream(
+        request.stream, original_name, copy_path=str(copy_path) if save_copy else None
+    )
+    # Set once the request succeeds; the copy (or CSV spool file) is removed otherwise
+    keep_copy = False
+    
+    try:
+        head = upload.sniff()
+        
+        # Compressed uploads are decompressed as they arrive
+        compression = detect_compression_bytes(head)
+        content = wrap_decompressor(upload, compression)
+        if compression is not None:
+            head = content.peek(len(head))
+        
+        file_format = csv_parser.detect_format_sample(
+            head.decode('utf-8', errors='replace'), original_name
+        )
+        
+        if file_format == 'csv':
+            # CSV exports are parsed by pandas from disk
+            if save_copy:
+                upload.drain()
+                upload.close()
+            else:
+                with open(copy_path, 'wb') as handle:
+                    upload.drain(handle)
+            
+            csv_parsers = {
+                'vpn': lambda: csv_parser.parse_csv_vpn_logs(str(copy_path)),
+                'firewall': lambda: csv_parser.parse_csv_firewall_logs(str(copy_path)),
+                'vpn_shutdown': lambda: csv_parser.parse_csv_vpn_shutdown_logs(str(copy_path), username_filter),
+            }
+            frames = {name: csv_parsers[name]() for name in analyses}
+        else:
+            frames = log_parser.analyze_stream(content, analyses, target_user=username_filter)
+            # The parser may stop before the end (e.g. trailing bytes after a
+            # compressed stream); the cache key is the digest of the whole upload
+            upload.drain()
+            upload.close()
+        
+        # Later uploads of the same content are answered from the cache
+        for name, df in frames.items():
+            params = {'format': file_format}
+            if name == 'vpn_shutdown':
+                params['user'] = username_filter.lower()
+            dataset_cache.store(dataset_cache.key_for_digest(upload.hexdigest(), name, params), df)
+        
+        security_logger.log_file_upload(
+            current_user,
+            original_name,
+            upload.bytes_received,
+            get_remote_address()
+        )
+        
+        results = save_analysis_results(frames, current_user, output_format)
+        
+        logger.info(
+            f"Stream parsing processed {', '.join(analyses)} for user {current_user}: "
+            f"{upload.bytes_received:,} bytes"
+        )
+        
+        keep_copy = save_copy
+        return jsonify({
+            'status': 'completed',
+            'format_detected': file_format,
+            'sha256': upload.hexdigest(),
+            'bytes': upload.bytes_received,
+            'saved_copy': copy_path.name if save_copy else None,
+            'results': results
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Stream parse error: {e}")
+        return jsonify({'error': 'Failed to process file'}), 500
+    finally:
+        upload.close()
+        if not keep_copy:
+            copy_path.unlink(missing_ok=True)
+
+
+@app.route('/api/parse/bundle', methods=['POST'])
+@jwt_required()
+@limiter.limit(security_config.RATELIMIT_PARSE)
+def parse_bundle() -> tuple:
+    """
+    Run analyses over several files or zip/tar archives of evidence.
+    
+    Files are sent as repeated ``files`` form fields. Each file (or archive
+    member) is format-detected and parsed separately, and the results are
+    merged into one output per analysis.
+    """
+    files = [file for file in request.files.getlist('files') if file.filename]
+    if not files:
+        return jsonify({'error': 'No files provided'}), 400
+    
+    analyses = parse_analysis_names(request.form.get('analyses', 'vpn,firewall'))
+    unknown = [name for name in analyses if name not in COMBINED_ANALYSES]
+    
+    if not analyses or unknown:
+        return jsonify({
+            'error': f"Valid analyses required: {', '.join(COMBINED_ANALYSES)}"
+        }), 400
+    
+    username_filter = None
+    if 'vpn_shutdown' in analyses:
+        username_filter = sanitize_username(request.form.get('username', ''))
+        if not username_filter:
+            return jsonify({'error': 'Valid username filter is required'}), 400
+    
+    output_format = parse_output_format(request.form.get('format'))
+    if output_format is None:
+        return invalid_output_format()
+    
+    allowed_extensions = ALLOWED_EXTENSIONS | ARCHIVE_EXTENSIONS
+    if not all(file.filename.rsplit('.', 1)[-1].lower() in allowed_extensions for file in files):
+        return jsonify({'error': 'Invalid file type'}), 400
+    
+    filepaths = []
+    try:
+        current_user = get_jwt_identity()
+        original_names = []
+        
+        for file in files:
+            filepath, original_name = secure_save_file(
+                file, app.config['UPLOAD_FOLDER'], allow_archives=True
+            )
+            filepaths.append(filepath)
+            original_names.append(original_name)
+            
+            security_logger.log_file_upload(
+                current_user,
+                original_name,
+                os.path.getsize(filepath),
+                get_remote_address()
+            )
+        
+        task = process_bundle_logs.delay(
+            filepaths, analyses, username_filter, current_user, original_names, output_format
+        )
+        
+        return jsonify({
+            'task_id': task.id,
+            'status': 'processing',
+            'message': f"Bundle parsing started: {len(filepaths)} files, {', '.join(analyses)}"
+        }), 202
+    except ValueError as e:
+        for filepath in filepaths:
+            Path(filepath).unlink(missing_ok=True)
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        for filepath in filepaths:
+            Path(filepath).unlink(missing_ok=True)
+        logger.error(f"Bundle parse error: {e}")
+        return jsonify({'error': 'Failed to process files'}), 500
+
+
 @app.route('/api/task/<task_id>', methods=['GET'])
 @jwt_required()
 def get_task_status(task_id: str) -> tuple:
@@ -414,9 +912,11 @@ def get_task_status(task_id: str) -> tuple:
             'error': str(task.info)
         }
     else:
+        info = task.info if isinstance(task.info, dict) else {'status': task.info}
         response = {
             'state': task.state,
-            'status': task.info
+            'status': info.get('status'),
+            'progress': info.get('progress')
         }
     
     return jsonify(response)
@@ -425,7 +925,14 @@ def get_task_status(task_id: str) -> tuple:
 @app.route('/api/download/<filename>', methods=['GET'])
 @jwt_required()
 def download_file(filename: str) -> tuple:
-    """Download processed CSV file."""
+    """
+    Download a result file.
+    
+    The optional ``format`` query parameter (csv, ndjson, parquet, feather)
+    returns the result converted to that format. Compressed results are sent
+    gzip-encoded when the client accepts it; ETags, conditional GETs and
+    byte ranges are supported.
+    """
     try:
         safe_filename = sanitize_filename(filename)
         filepath = Path('results') / safe_filename
@@ -443,9 +950,12 @@ def download_file(filename: str) -> tuple:
             )
             return jsonify({'error': 'Invalid file path'}), 403
         
-        security_logger.log_download(get_jwt_identity(), safe_filename, get_remote_address())
+        if request.args.get('format'):
+            filepath = convert_result(filepath, request.args['format'])
         
-        return send_file(filepath, as_attachment=True, download_name=safe_filename)
+        security_logger.log_download(get_jwt_identity(), filepath.name, get_remote_address())
+        
+        return send_result(filepath)
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -453,6 +963,100 @@ def download_file(filename: str) -> tuple:
         return jsonify({'error': 'Failed to download file'}), 500
 
 
+@app.route('/api/results/<filename>', methods=['GET'])
+@jwt_required()
+def get_result_page(filename: str) -> tuple:
+    """
+    Get one page of a result file.
+    
+    Query parameters: ``page`` (from 1), ``page_size`` (default 100, at
+    most 1000), ``sort`` (a column name) and ``order`` (asc or desc). Pages
+    are read from the result's column store, so only the requested rows are
+    loaded; results without a store get one on first access.
+    """
+    try:
+        safe_filename = sanitize_filename(filename)
+        filepath = Path('results') / safe_filename
+        
+        if not filepath.is_file():
+            return jsonify({'error': 'File not found'}), 404
+        
+        # Verify file is within results directory (prevent path traversal)
+        if not filepath.resolve().is_relative_to(Path('results').resolve()):
+            security_logger.log_security_violation(
+                'path_traversal',
+                get_jwt_identity(),
+                get_remote_address(),
+                f'Attempted to access: {filename}'
+            )
+            return jsonify({'error': 'Invalid file path'}), 403
+        
+        order = request.args.get('order', 'asc').lower()
+        if order not in ('asc', 'desc'):
+            return jsonify({'error': 'Order must be asc or desc'}), 400
+        
+        page = request.args.get('page', 1, type=int)
+        page_size = request.args.get('page_size', DEFAULT_PAGE_SIZE, type=int)
+        
+        pages = open_pages(filepath, config.PAGES_FOLDER)
+        result = pages.page(page, page_size, request.args.get('sort') or None, order == 'desc')
+        
+        return jsonify({'filename': safe_filename, **result}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Result page error: {e}")
+        return jsonify({'error': 'Failed to read result'}), 500
+
+
+@app.route('/api/query/<filename>', methods=['GET'])
+@jwt_required()
+def query_result(filename: str) -> tuple:
+    """
+    Find the rows of a result file matching filters.
+    
+    Query parameters (all optional, combined with AND): ``user``, ``ip``
+    (address or CIDR network), ``start`` and ``end`` (date or date and
+    time), ``message`` (text the message contains), plus ``page`` and
+    ``page_size``. Filters are answered from the indexes of the result's
+    column store without scanning the result.
+    """
+    try:
+        safe_filename = sanitize_filename(filename)
+        filepath = Path('results') / safe_filename
+        
+        if not filepath.is_file():
+            return jsonify({'error': 'File not found'}), 404
+        
+        # Verify file is within results directory (prevent path traversal)
+        if not filepath.resolve().is_relative_to(Path('results').resolve()):
+            security_logger.log_security_violation(
+                'path_traversal',
+                get_jwt_identity(),
+                get_remote_address(),
+                f'Attempted to access: {filename}'
+            )
+            return jsonify({'error': 'Invalid file path'}), 403
+        
+        query = ResultQuery(open_pages(filepath, config.PAGES_FOLDER))
+        result = query.query(
+            user=request.args.get('user'),
+            ip=request.args.get('ip'),
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            message=request.args.get('message'),
+            page=request.args.get('page', 1, type=int),
+            page_size=request.args.get('page_size', DEFAULT_PAGE_SIZE, type=int)
+        )
+        
+        return jsonify({'filename': safe_filename, **result}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Result query error: {e}")
+        return jsonify({'error': 'Failed to query result'}), 500
+
+
 @app.route('/api/history', methods=['GET'])
 @jwt_required()
 def get_parse_history() -> tuple:
@@ -465,7 +1069,13 @@ def get_parse_history() -> tuple:
 
 # Celery tasks
 @celery.task(bind=True)
-def process_vpn_logs(self, filepath: str, user: str, original_name: str) -> Dict[str, Any]:
+def process_vpn_logs(
+    self,
+    filepath: str,
+    user: str,
+    original_name: str,
+    output_format: str = 'csv'
+) -> Dict[str, Any]:
     """Process VPN logs asynchronously."""
     try:
         self.update_state(state='PROCESSING', meta={'status': 'Parsing VPN logs...'})
@@ -473,13 +1083,27 @@ def process_vpn_logs(self, filepath: str, user: str, original_name: str) -> Dict
         # Detect format and parse
         file_format = csv_parser.detect_format(filepath)
         
-        if file_format == 'csv':
-            df = csv_parser.parse_csv_vpn_logs(filepath)
-        else:
-            df = log_parser.parse_vpn_logs(filepath)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        result_filename = f'vpn_parsed_{user}_{timestamp}{output_suffix(output_format, config.COMPRESS_RESULTS)}'
+        result_path = Path('results') / result_filename
         
-        if df.empty:
+        def export(mirror):
+            if file_format == 'csv':
+                return write_result(
+                    csv_parser.parse_csv_vpn_logs(filepath), result_path, output_format, mirror=mirror
+                )
+            # Rows are written to the result file while the log is parsed
+            return log_parser.export_results(
+                filepath, 'vpn', str(result_path), output_format, workers=config.PARSE_WORKERS, mirror=mirror,
+                progress=task_progress(self, 'Parsing VPN logs...')
+            )
+        
+        result = export_analysis(filepath, 'vpn', {'format': file_format}, result_path, output_format, export)
+        
+        if not result.records:
             os.remove(filepath)
+            os.remove(result_path)
+            remove_pages(result_path, config.PAGES_FOLDER)
             return {
                 'status': 'completed',
                 'records': 0,
@@ -489,23 +1113,18 @@ def process_vpn_logs(self, filepath: str, user: str, original_name: str) -> Dict
                 'message': 'No valid records found in file'
             }
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        result_filename = f'vpn_parsed_{user}_{timestamp}.csv'
-        result_path = Path('results') / result_filename
-        
-        df.to_csv(result_path, index=False)
-        
         # Clean up uploaded file
         os.remove(filepath)
         
-        logger.info(f"VPN logs processed: {len(df)} records for user {user}")
+        logger.info(f"VPN logs processed: {result.records} records for user {user}")
         
         return {
             'status': 'completed',
-            'records': len(df),
+            'records': result.records,
             'filename': result_filename,
-            'preview': df.head(10).to_dict('records'),
-            'format_detected': file_format
+            'preview': result.preview,
+            'format_detected': file_format,
+            'output_format': output_format
         }
     except Exception as e:
         logger.error(f"VPN processing error: {e}")
@@ -513,22 +1132,58 @@ def process_vpn_logs(self, filepath: str, user: str, original_name: str) -> Dict
         raise
 
 
-@celery.task(bind=True)
-def process_firewall_logs(self, filepath: str, user: str, original_name: str) -> Dict[str, Any]:
-    """Process firewall logs asynchronously."""
+@celery.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def process_firewall_logs(
+    self,
+    filepath: str,
+    user: str,
+    original_name: str,
+    output_format: str = 'csv',
+    top: Optional[int] = None,
+    approximate: bool = False
+) -> Dict[str, Any]:
+    """
+    Process firewall logs asynchronously, optionally keeping only the top destinations.
+    
+    The task is acknowledged only once it finishes, so it is redelivered if
+    its worker dies; progress is checkpointed and the redelivered task
+    continues from the last checkpoint.
+    """
+    checkpoint = task_checkpoint(self)
     try:
         self.update_state(state='PROCESSING', meta={'status': 'Parsing firewall logs...'})
         
         # Detect format and parse
         file_format = csv_parser.detect_format(filepath)
         
-        if file_format == 'csv':
-            df = csv_parser.parse_csv_firewall_logs(filepath)
-        else:
-            df = log_parser.parse_firewall_logs(filepath)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        result_filename = f'firewall_parsed_{user}_{timestamp}{output_suffix(output_format, config.COMPRESS_RESULTS)}'
+        result_path = Path('results') / result_filename
         
-        if df.empty:
+        def export(mirror):
+            if file_format == 'csv':
+                df = csv_parser.parse_csv_firewall_logs(filepath)
+                if top is not None:
+                    # CSV totals are already in memory and sorted, so the exact top is cheap
+                    df = df.head(top)
+                return write_result(df, result_path, output_format, mirror=mirror)
+            return log_parser.export_results(
+                filepath, 'firewall', str(result_path), output_format, workers=config.PARSE_WORKERS,
+                mirror=mirror, top=top, approximate=approximate, checkpoint=checkpoint,
+                progress=task_progress(self, 'Parsing firewall logs...')
+            )
+        
+        params = {'format': file_format}
+        if top is not None:
+            params.update(top=top, approximate=approximate)
+        result = export_analysis(
+            filepath, 'firewall', params, result_path, output_format, export
+        )
+        
+        if not result.records:
             os.remove(filepath)
+            os.remove(result_path)
+            remove_pages(result_path, config.PAGES_FOLDER)
             return {
                 'status': 'completed',
                 'records': 0,
@@ -538,32 +1193,105 @@ def process_firewall_logs(self, filepath: str, user: str, original_name: str) ->
                 'message': 'No valid records found in file'
             }
         
+        # Clean up uploaded file
+        os.remove(filepath)
+        
+        logger.info(f"Firewall logs processed: {result.records} records for user {user}")
+        
+        return {
+            'status': 'completed',
+            'records': result.records,
+            'filename': result_filename,
+            'preview': result.preview,
+            'format_detected': file_format,
+            'output_format': output_format
+        }
+    except Exception as e:
+        logger.error(f"Firewall processing error: {e}")
+        self.update_state(state='FAILURE', meta={'error': str(e)})
+        raise
+    finally:
+        # Only a killed worker leaves its checkpoint behind
+        checkpoint.remove()
+
+
+@celery.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def process_firewall_timeline_logs(
+    self,
+    filepath: str,
+    user: str,
+    original_name: str,
+    output_format: str = 'csv',
+    bucket: str = 'hour'
+) -> Dict[str, Any]:
+    """Process firewall logs into a traffic timeline asynchronously, resumably (see process_firewall_logs)."""
+    checkpoint = task_checkpoint(self)
+    try:
+        self.update_state(state='PROCESSING', meta={'status': 'Building firewall timeline...'})
+        
+        file_format = csv_parser.detect_format(filepath)
+        if file_format == 'csv':
+            # CSV exports carry no per-line byte counts and times to bucket
+            os.remove(filepath)
+            raise ValueError('Firewall timelines need Fortinet format logs')
+        
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        result_filename = f'firewall_parsed_{user}_{timestamp}.csv'
+        result_filename = f'firewall_timeline_{user}_{timestamp}{output_suffix(output_format, config.COMPRESS_RESULTS)}'
         result_path = Path('results') / result_filename
         
-        df.to_csv(result_path, index=False)
+        result = export_analysis(
+            filepath, 'firewall_timeline', {'format': file_format, 'bucket': bucket_seconds(bucket)},
+            result_path, output_format,
+            lambda mirror: log_parser.export_results(
+                filepath, 'firewall_timeline', str(result_path), output_format,
+                workers=config.PARSE_WORKERS, mirror=mirror, bucket=bucket, checkpoint=checkpoint,
+                progress=task_progress(self, 'Building firewall timeline...')
+            )
+        )
+        
+        if not result.records:
+            os.remove(filepath)
+            os.remove(result_path)
+            remove_pages(result_path, config.PAGES_FOLDER)
+            return {
+                'status': 'completed',
+                'records': 0,
+                'filename': None,
+                'preview': [],
+                'format_detected': file_format,
+                'message': 'No valid records found in file'
+            }
         
-        # Clean up uploaded file
         os.remove(filepath)
         
-        logger.info(f"Firewall logs processed: {len(df)} records for user {user}")
+        logger.info(f"Firewall timeline processed: {result.records} records for user {user}")
         
         return {
             'status': 'completed',
-            'records': len(df),
+            'records': result.records,
             'filename': result_filename,
-            'preview': df.head(10).to_dict('records'),
-            'format_detected': file_format
+            'preview': result.preview,
+            'format_detected': file_format,
+            'output_format': output_format,
+            'bucket': bucket
         }
     except Exception as e:
-        logger.error(f"Firewall processing error: {e}")
+        logger.error(f"Firewall timeline processing error: {e}")
         self.update_state(state='FAILURE', meta={'error': str(e)})
         raise
+    finally:
+        checkpoint.remove()
 
 
 @celery.task(bind=True)
-def process_vpn_shutdown_logs(self, filepath: str, username_filter: str, user: str, original_name: str) -> Dict[str, Any]:
+def process_vpn_shutdown_logs(
+    self,
+    filepath: str,
+    username_filter: str,
+    user: str,
+    original_name: str,
+    output_format: str = 'csv'
+) -> Dict[str, Any]:
     """Process VPN shutdown sessions asynchronously."""
     try:
         self.update_state(state='PROCESSING', meta={'status': 'Parsing VPN shutdown sessions...'})
@@ -571,13 +1299,36 @@ def process_vpn_shutdown_logs(self, filepath: str, username_filter: str, user: s
         # Detect format and parse
         file_format = csv_parser.detect_format(filepath)
         
-        if file_format == 'csv':
-            df = csv_parser.parse_csv_vpn_shutdown_logs(filepath, username_filter)
-        else:
-            df = log_parser.parse_vpn_shutdown_sentbytes(filepath, username_filter)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        result_filename = (
+            f'vpn_shutdown_{username_filter}_{user}_{timestamp}'
+            f'{output_suffix(output_format, config.COMPRESS_RESULTS)}'
+        )
+        result_path = Path('results') / result_filename
         
-        if df.empty:
+        def export(mirror):
+            if file_format == 'csv':
+                return write_result(
+                    csv_parser.parse_csv_vpn_shutdown_logs(filepath, username_filter),
+                    result_path,
+                    output_format,
+                    mirror=mirror
+                )
+            return log_parser.export_results(
+                filepath, 'vpn_shutdown', str(result_path), output_format,
+                target_user=username_filter, workers=config.PARSE_WORKERS, mirror=mirror,
+                progress=task_progress(self, 'Parsing VPN shutdown sessions...')
+            )
+        
+        result = export_analysis(
+            filepath, 'vpn_shutdown', {'format': file_format, 'user': username_filter.lower()},
+            result_path, output_format, export
+        )
+        
+        if not result.records:
             os.remove(filepath)
+            os.remove(result_path)
+            remove_pages(result_path, config.PAGES_FOLDER)
             return {
                 'status': 'completed',
                 'records': 0,
@@ -588,25 +1339,20 @@ def process_vpn_shutdown_logs(self, filepath: str, username_filter: str, user: s
                 'message': f'No records found for user {username_filter}'
             }
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        result_filename = f'vpn_shutdown_{username_filter}_{user}_{timestamp}.csv'
-        result_path = Path('results') / result_filename
-        
-        df.to_csv(result_path, index=False)
-        
         # Clean up uploaded file
         os.remove(filepath)
         
-        total_mb = df['sent_bytes_in_MB'].sum() if 'sent_bytes_in_MB' in df.columns else 0
+        total_mb = result.sums.get('sent_bytes_in_MB', 0)
         
-        logger.info(f"VPN shutdown processed: {len(df)} records for user {user}, filter: {username_filter}")
+        logger.info(f"VPN shutdown processed: {result.records} records for user {user}, filter: {username_filter}")
         
         return {
             'status': 'completed',
-            'records': len(df),
+            'records': result.records,
             'filename': result_filename,
-            'preview': df.head(10).to_dict('records'),
+            'preview': result.preview,
             'format_detected': file_format,
+            'output_format': output_format,
             'total_mb': round(total_mb, 2)
         }
     except Exception as e:
@@ -615,6 +1361,125 @@ def process_vpn_shutdown_logs(self, filepath: str, username_filter: str, user: s
         raise
 
 
+@celery.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def process_combined_logs(
+    self,
+    filepath: str,
+    analyses: list,
+    username_filter: Optional[str],
+    user: str,
+    original_name: str,
+    output_format: str = 'csv'
+) -> Dict[str, Any]:
+    """Run several analyses over one file asynchronously, resumably (see process_firewall_logs)."""
+    checkpoint = task_checkpoint(self)
+    try:
+        self.update_state(state='PROCESSING', meta={'status': f"Parsing {', '.join(analyses)}..."})
+        
+        # Detect format and parse
+        file_format = csv_parser.detect_format(filepath)
+        
+        # Reuse cached results and parse only the analyses not cached yet
+        cache_keys = {
+            name: dataset_cache.key(filepath, name, {
+                'format': file_format,
+                **({'user': username_filter.lower()} if name == 'vpn_shutdown' else {})
+            })
+            for name in analyses
+        }
+        frames = {name: dataset_cache.load(key) for name, key in cache_keys.items()}
+        missing = [name for name, df in frames.items() if df is None]
+        
+        if missing and file_format == 'csv':
+            # CSV exports are loaded per analysis by the CSV parsers
+            csv_parsers = {
+                'vpn': lambda: csv_parser.parse_csv_vpn_logs(filepath),
+                'firewall': lambda: csv_parser.parse_csv_firewall_logs(filepath),
+                'vpn_shutdown': lambda: csv_parser.parse_csv_vpn_shutdown_logs(filepath, username_filter),
+            }
+            parsed = {name: csv_parsers[name]() for name in missing}
+        elif missing:
+            parsed = log_parser.analyze(
+                filepath, missing, target_user=username_filter, workers=config.PARSE_WORKERS,
+                checkpoint=checkpoint, progress=task_progress(self, f"Parsing {', '.join(missing)}...")
+            )
+        else:
+            parsed = {}
+        
+        for name, df in parsed.items():
+            dataset_cache.store(cache_keys[name], df)
+            frames[name] = df
+        
+        results = save_analysis_results(frames, user, output_format)
+        
+        # Clean up uploaded file
+        os.remove(filepath)
+        
+        logger.info(f"Combined parsing processed {', '.join(analyses)} for user {user}")
+        
+        return {
+            'status': 'completed',
+            'format_detected': file_format,
+            'results': results
+        }
+    except Exception as e:
+        logger.error(f"Combined processing error: {e}")
+        self.update_state(state='FAILURE', meta={'error': str(e)})
+        raise
+    finally:
+        checkpoint.remove()
+
+
+@celery.task(bind=True)
+def process_bundle_logs(
+    self,
+    filepaths: list,
+    analyses: list,
+    username_filter: Optional[str],
+    user: str,
+    original_names: list,
+    output_format: str = 'csv'
+) -> Dict[str, Any]:
+    """Run analyses over a bundle of uploaded files and archives asynchronously."""
+    try:
+        self.update_state(state='PROCESSING', meta={'status': f"Parsing {len(filepaths)} files..."})
+        
+        bundle = log_parser.analyze_bundle(
+            filepaths,
+            analyses,
+            target_user=username_filter,
+            workers=config.PARSE_WORKERS,
+            max_bytes=config.BUNDLE_MAX_MB * 1024 * 1024
+        )
+        
+        results = save_analysis_results(bundle.frames, user, output_format)
+        
+        # Report members under their uploaded names rather than the saved ones
+        upload_names = dict(zip(filepaths, original_names))
+        files = []
+        for member in bundle.members:
+            entry = member.to_dict()
+            entry['name'] = upload_names.get(member.name, member.name)
+            files.append(entry)
+        
+        logger.info(f"Bundle parsing processed {len(files)} files for user {user}")
+        
+        return {
+            'status': 'completed',
+            'files': files,
+            'files_failed': len(bundle.failed),
+            'results': results
+        }
+    except Exception as e:
+        logger.error(f"Bundle processing error: {e}")
+        self.update_state(state='FAILURE', meta={'error': str(e)})
+        raise
+    finally:
+        # Clean up uploaded files
+        for filepath in filepaths:
+            Path(filepath).unlink(missing_ok=True)
+
+
 @app.after_request
 def add_security_headers(response):
     """Add security headers to all responses."""
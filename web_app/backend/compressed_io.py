@@ -0,0 +1,226 @@
+"""
+Transparent reading of compressed log files.
+
+Evidence often arrives as gzip, bzip2 or xz archives. The helpers here detect
+the compression from the file's magic bytes (so renamed uploads still work)
+and open a streaming decompressor, so parsers read compressed files directly
+instead of inflating them to disk first. Multi-member gzip files (BGZF or
+concatenated members) can also be split at member starts for parallel
+decompression.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import struct
+from typing import BinaryIO, List, Optional, TextIO
+
+
+# Magic bytes at the start of each supported format
+COMPRESSION_MAGIC = {
+    'gzip': b'\x1f\x8b',
+    'bz2': b'BZh',
+    'xz': b'\xfd7zXZ\x00',
+}
+
+# File extensions of the supported formats
+COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.gzip': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+}
+
+# Start of a deflate gzip member header (ID1, ID2, CM=8)
+GZIP_MEMBER_MAGIC = b'\x1f\x8b\x08'
+
+# Read size when scanning for gzip member headers
+MEMBER_SCAN_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def detect_compression(file_path: str) -> Optional[str]:
+    """
+    Detect the compression of a file from its magic bytes.
+    
+    Args:
+        file_path: Path to the file
+    
+    Returns:
+        'gzip', 'bz2', 'xz', or None for uncompressed files
+    """
+    with open(file_path, 'rb') as file:
+        return detect_compression_bytes(file.read(6))
+
+
+def detect_compression_bytes(head: bytes) -> Optional[str]:
+    """
+    Detect the compression from the first bytes of a file or upload.
+    
+    Args:
+        head: Leading bytes (at least 6 for xz)
+    
+    Returns:
+        'gzip', 'bz2', 'xz', or None for uncompressed data
+    """
+    for compression, magic in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def strip_compression_suffix(filename: str) -> str:
+    """
+    Remove a compression extension from a file name.
+    
+    Args:
+        filename: File name, e.g. 'traffic.csv.gz'
+    
+    Returns:
+        Name without the compression extension, e.g. 'traffic.csv'
+    """
+    lower = filename.lower()
+    for suffix in COMPRESSION_EXTENSIONS:
+        if lower.endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+
+def wrap_decompressor(stream: BinaryIO, compression: Optional[str]) -> BinaryIO:
+    """
+    Wrap a binary stream in a streaming decompressor.
+    
+    The stream only needs a ``read`` method; it does not have to be seekable,
+    so uploads can be decompressed while they are received. Multi-member
+    gzip and multi-stream bzip2/xz inputs are read to the end.
+    
+    Args:
+        stream: Compressed binary stream
+        compression: 'gzip', 'bz2', 'xz', or None to return the stream as is
+    
+    Returns:
+        Binary stream of decompressed data
+    
+    Raises:
+        ValueError: If the compression is not supported
+    """
+    if compression is None:
+        return stream
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    if compression == 'bz2':
+        return bz2.BZ2File(stream, mode='rb')
+    if compression == 'xz':
+        return lzma.LZMAFile(stream, mode='rb')
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def open_binary(file_path: str) -> BinaryIO:
+    """
+    Open a possibly compressed file for binary reading.
+    
+    Args:
+        file_path: Path to the file
+    
+    Returns:
+        Binary stream of the (decompressed) content
+    """
+    compression = detect_compression(file_path)
+    if compression is None:
+        return open(file_path, 'rb')
+    return wrap_decompressor(open(file_path, 'rb'), compression)
+
+
+def open_text(file_path: str, encoding: str = 'utf-8', errors: str = 'replace') -> TextIO:
+    """
+    Open a possibly compressed file for text reading.
+    
+    Args:
+        file_path: Path to the file
+        encoding: Text encoding
+        errors: Decoding error handling
+    
+    Returns:
+        Text stream of the (decompressed) content
+    """
+    return io.TextIOWrapper(open_binary(file_path), encoding=encoding, errors=errors)
+
+
+def _bgzf_block_size(header: bytes) -> Optional[int]:
+    """Return the total block size from a BGZF member header, if present."""
+    if len(header) < 18 or not header.startswith(GZIP_MEMBER_MAGIC) or not header[3] & 0x04:
+        return None
+    
+    extra_length = struct.unpack('<H', header[10:12])[0]
+    extra = header[12:12 + extra_length]
+    position = 0
+    
+    while position + 4 <= len(extra):
+        subfield_id = extra[position:position + 2]
+        subfield_length = struct.unpack('<H', extra[position + 2:position + 4])[0]
+        if subfield_id == b'BC' and subfield_length == 2:
+            return struct.unpack('<H', extra[position + 4:position + 6])[0] + 1
+        position += 4 + subfield_length
+    
+    return None
+
+
+def gzip_member_candidates(file_path: str) -> List[int]:
+    """
+    Find byte offsets where gzip members may start.
+    
+    BGZF files record each block's size, so their members are found exactly
+    by hopping from header to header. For other multi-member files every
+    gzip header signature is reported; a signature can also occur by chance
+    inside compressed data, so callers must verify a candidate by
+    decompressing from it (see parse_engine's member scanning).
+    
+    Args:
+        file_path: Path to a gzip file
+    
+    Returns:
+        Sorted candidate offsets, starting with 0
+    """
+    offsets = [0]
+    
+    with open(file_path, 'rb') as file:
+        header = file.read(1024)
+        block_size = _bgzf_block_size(header)
+        
+        if block_size is not None:
+            position = 0
+            while True:
+                position += block_size
+                file.seek(position)
+                header = file.read(1024)
+                if not header:
+                    return offsets
+                block_size = _bgzf_block_size(header)
+                if block_size is None:
+                    # Not BGZF after all; fall back to the signature scan
+                    offsets = [0]
+                    break
+                offsets.append(position)
+        
+        file.seek(0)
+        position = 0
+        tail = b''
+        while True:
+            block = file.read(MEMBER_SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            
+            data = tail + block
+            base = position - len(tail)
+            index = data.find(GZIP_MEMBER_MAGIC, 1 if base == 0 else 0)
+            while index >= 0:
+                # Reserved flag bits must be zero in a real header
+                if index + 3 < len(data) and not data[index + 3] & 0xE0:
+                    offsets.append(base + index)
+                index = data.find(GZIP_MEMBER_MAGIC, index + 1)
+            
+            # Keep enough bytes to catch a header spanning two blocks
+            tail = data[-3:]
+            position += len(block)
+    
+    return sorted(set(offsets))
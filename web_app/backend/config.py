@@ -26,6 +26,18 @@ class Config:
         CELERY_BROKER_URL: Celery broker URL
         DEBUG: Debug mode flag
         TESTING: Testing mode flag
+        PARSE_WORKERS: Worker processes used to parse a single log file
+        INDEX_FOLDER: Directory for per-file VPN shutdown indexes
+        INDEX_MAX_MB: Size bound of the VPN shutdown indexes in megabytes
+        CACHE_FOLDER: Directory for cached parse results
+        CACHE_MAX_MB: Size bound of the parse result cache in megabytes
+        BUNDLE_MAX_MB: Total size that may be extracted from uploaded archives in megabytes
+        COMPRESS_RESULTS: Store CSV and NDJSON result files gzip-compressed
+        PAGES_FOLDER: Directory for the paged column stores of result files
+        CHECKPOINT_FOLDER: Directory for the progress checkpoints of parse tasks
+        CHECKPOINT_INTERVAL: Seconds between checkpoints of a running parse task
+        TASK_MAX_ATTEMPTS: Runs of a checkpointed parse task (first delivery
+            and redeliveries after its worker died) before it is failed
     """
     
     SECRET_KEY: str = field(default_factory=lambda: os.environ.get('SECRET_KEY', ''))
@@ -38,6 +50,17 @@ class Config:
     CELERY_BROKER_URL: str = field(default_factory=lambda: os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0'))
     DEBUG: bool = field(default_factory=lambda: os.environ.get('FLASK_DEBUG', 'False').lower() == 'true')
     TESTING: bool = False
+    PARSE_WORKERS: int = field(default_factory=lambda: int(os.environ.get('PARSE_WORKERS', '1')))
+    INDEX_FOLDER: str = field(default_factory=lambda: os.environ.get('INDEX_FOLDER', 'indexes'))
+    INDEX_MAX_MB: int = field(default_factory=lambda: int(os.environ.get('INDEX_MAX_MB', '1024')))
+    CACHE_FOLDER: str = field(default_factory=lambda: os.environ.get('CACHE_FOLDER', 'cache'))
+    CACHE_MAX_MB: int = field(default_factory=lambda: int(os.environ.get('CACHE_MAX_MB', '1024')))
+    BUNDLE_MAX_MB: int = field(default_factory=lambda: int(os.environ.get('BUNDLE_MAX_MB', '10240')))
+    COMPRESS_RESULTS: bool = field(default_factory=lambda: os.environ.get('COMPRESS_RESULTS', 'true').lower() == 'true')
+    PAGES_FOLDER: str = field(default_factory=lambda: os.environ.get('PAGES_FOLDER', 'pages'))
+    CHECKPOINT_FOLDER: str = field(default_factory=lambda: os.environ.get('CHECKPOINT_FOLDER', 'checkpoints'))
+    CHECKPOINT_INTERVAL: float = field(default_factory=lambda: float(os.environ.get('CHECKPOINT_INTERVAL', '60')))
+    TASK_MAX_ATTEMPTS: int = field(default_factory=lambda: int(os.environ.get('TASK_MAX_ATTEMPTS', '3')))
     
     def __post_init__(self):
         """Validate configuration after initialization."""
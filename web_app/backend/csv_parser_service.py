@@ -5,16 +5,31 @@ This module provides a service class for parsing log files in CSV format,
 with smart format detection and validation.
 """
 
+import io
+import itertools
 import logging
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-import ipaddress
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+import numpy as np
 
 try:
     import pandas as pd
 except ImportError:
     raise ImportError("pandas is required. Install with: pip install pandas")
 
+# Optional: multi-threaded CSV reads
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+    pa_csv = None
+
+from compressed_io import detect_compression, open_binary, open_text, strip_compression_suffix
+from ip_classifier import is_public_ip
+from log_time import EPOCH_COLUMN, add_epoch
+
 
 class CSVParserService:
     """
@@ -30,7 +45,7 @@ class CSVParserService:
         ...     df = parser.parse_csv_vpn_logs('logs.csv')
     """
     
-    # CSV column aliases
+    # CSV column aliases; the optional tz and eventtime columns only feed the epoch column
     VPN_COLUMN_ALIASES = {
         'user': ['user', 'username', 'login', 'login_user', 'user_name'],
         'date': ['date', 'login_date', 'login_date', 'date_time'],
@@ -39,6 +54,8 @@ class CSVParserService:
         'remip': ['remip', 'remote_ip', 'srcip', 'source_ip', 'client_ip'],
         'reason': ['reason', 'status', 'result', 'login_status', 'auth_result'],
         'msg': ['msg', 'message', 'description', 'log_message'],
+        'tz': ['tz', 'timezone', 'utc_offset'],
+        'eventtime': ['eventtime', 'event_time'],
     }
     
     FIREWALL_COLUMN_ALIASES = {
@@ -52,16 +69,49 @@ class CSVParserService:
         'time': ['time', 'shutdown_time', 'end_time'],
         'sentbyte': ['sentbyte', 'sent_bytes', 'bytes_sent', 'sentbytes'],
         'msg': ['msg', 'message', 'description'],
+        'tz': ['tz', 'timezone', 'utc_offset'],
+        'eventtime': ['eventtime', 'event_time'],
     }
     
-    def __init__(self, logger: Optional[logging.Logger] = None):
+    # Characters read from the start of a file for format detection
+    FORMAT_SAMPLE_SIZE = 64 * 1024
+    
+    # Rows read per batch; memory use depends on this, not on the file size
+    CHUNK_ROWS = 100000
+    
+    # Bytes parsed per batch by the pyarrow engine
+    ARROW_BLOCK_SIZE = 8 * 1024 * 1024
+    
+    # Columns left to the CSV reader's number parsing; all others are read as text
+    NUMERIC_COLUMNS = ('sentbyte',)
+    
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        chunk_rows: Optional[int] = None,
+        engine: Optional[str] = None
+    ):
         """
         Initialize the CSV parser service.
         
         Args:
             logger: Optional logger instance for debug output
+            chunk_rows: Rows read per batch (defaults to CHUNK_ROWS)
+            engine: 'pyarrow' or 'c'; defaults to pyarrow when it is installed
+        
+        Raises:
+            ValueError: If the engine is unknown or pyarrow is not installed
         """
         self.logger = logger or logging.getLogger(__name__)
+        self.chunk_rows = chunk_rows or self.CHUNK_ROWS
+        
+        if engine is None:
+            engine = 'pyarrow' if pa_csv is not None else 'c'
+        if engine not in ('pyarrow', 'c'):
+            raise ValueError(f"Unknown CSV engine: {engine}")
+        if engine == 'pyarrow' and pa_csv is None:
+            raise ValueError("The pyarrow CSV engine requires pyarrow. Install with: pip install pyarrow")
+        self.engine = engine
     
     def detect_format(self, file_path: str) -> str:
         """
@@ -85,49 +135,76 @@ class CSVParserService:
             raise FileNotFoundError(f"File not found: {file_path}")
         
         try:
-            with open(path, 'r', encoding='utf-8', errors='replace') as file:
-                first_line = file.readline().strip()
-                
-                # Check for extension
-                if path.suffix.lower() == '.csv':
-                    # Additional validation for CSV format
-                    if ',' in first_line or '\t' in first_line:
-                        self.logger.debug(f"Detected CSV format: {file_path}")
-                        return 'csv'
-                
-                # Check if it looks like CSV with common headers
-                csv_indicators = [
-                    'date,time,user',
-                    'username,password',
-                    'srcip,dstip',
-                    'source,destination',
-                    'timestamp',
-                ]
-                
-                first_lower = first_line.lower()
-                for indicator in csv_indicators:
-                    if indicator in first_lower:
-                        self.logger.debug(f"Detected CSV format by header: {file_path}")
-                        return 'csv'
-                
-                # Check if it looks like Fortinet log format
-                if 'date=' in first_line and 'time=' in first_line:
-                    self.logger.debug(f"Detected Fortinet format: {file_path}")
-                    return 'fortinet'
-                
-                # Try to parse as CSV and check structure
-                try:
-                    import pandas as pd
-                    df = pd.read_csv(path, nrows=1)
-                    if len(df.columns) > 1:
-                        self.logger.debug(f"Detected CSV format by parsing: {file_path}")
-                        return 'csv'
-                except Exception:
-                    pass
-                
-                self.logger.warning(f"Unknown format: {file_path}")
-                return 'unknown'
-                
+            with open_text(str(path)) as file:
+                sample = file.read(self.FORMAT_SAMPLE_SIZE)
+        except Exception as e:
+            self.logger.error(f"Error detecting format: {e}")
+            return 'unknown'
+        
+        return self.detect_format_sample(sample, path.name)
+    
+    def detect_format_sample(self, sample: str, filename: str) -> str:
+        """
+        Detect the format from the beginning of a file.
+        
+        Used by detect_format and for uploads that are parsed while they are
+        received, before the whole file is available.
+        
+        Args:
+            sample: Leading text of the file (at least the first line)
+            filename: File name, used for the extension check (a compression
+                extension such as .gz is ignored)
+        
+        Returns:
+            'csv' for CSV format, 'fortinet' for Fortinet format, 'unknown' if unclear
+        
+        Example:
+            >>> parser = CSVParserService()
+            >>> parser.detect_format_sample('date=2024-01-15 time=10:00:00 user="a"', 'fw.log')
+            'fortinet'
+        """
+        try:
+            first_line = sample.split('\n', 1)[0].strip()
+            
+            # Check for extension
+            if Path(strip_compression_suffix(filename)).suffix.lower() == '.csv':
+                # Additional validation for CSV format
+                if ',' in first_line or '\t' in first_line:
+                    self.logger.debug(f"Detected CSV format: {filename}")
+                    return 'csv'
+            
+            # Check if it looks like CSV with common headers
+            csv_indicators = [
+                'date,time,user',
+                'username,password',
+                'srcip,dstip',
+                'source,destination',
+                'timestamp',
+            ]
+            
+            first_lower = first_line.lower()
+            for indicator in csv_indicators:
+                if indicator in first_lower:
+                    self.logger.debug(f"Detected CSV format by header: {filename}")
+                    return 'csv'
+            
+            # Check if it looks like Fortinet log format
+            if 'date=' in first_line and 'time=' in first_line:
+                self.logger.debug(f"Detected Fortinet format: {filename}")
+                return 'fortinet'
+            
+            # Try to parse as CSV and check structure
+            try:
+                df = pd.read_csv(io.StringIO(sample), nrows=1)
+                if len(df.columns) > 1:
+                    self.logger.debug(f"Detected CSV format by parsing: {filename}")
+                    return 'csv'
+            except Exception:
+                pass
+            
+            self.logger.warning(f"Unknown format: {filename}")
+            return 'unknown'
+        
         except Exception as e:
             self.logger.error(f"Error detecting format: {e}")
             return 'unknown'
@@ -153,6 +230,149 @@ class CSVParserService:
         
         return df
     
+    def _project_columns(
+        self,
+        path: Path,
+        column_aliases: Dict[str, List[str]]
+    ) -> Tuple[int, Dict[int, str]]:
+        """
+        Resolve the column aliases against the header of a CSV file.
+        
+        Args:
+            path: Path to the CSV file (may be compressed)
+            column_aliases: Dictionary mapping standard names to aliases
+        
+        Returns:
+            Tuple of the number of columns in the header and a mapping of
+            the positions to read to their standard names, in file order
+        
+        Raises:
+            pd.errors.EmptyDataError: If the file has no header
+        """
+        header = pd.read_csv(path, nrows=0, compression=detect_compression(str(path)))
+        normalized = self._normalize_columns(header, column_aliases).columns
+        
+        selected: Dict[int, str] = {}
+        for position, name in enumerate(normalized):
+            # Only the first column with a standard name is used
+            if name in column_aliases and name not in selected.values():
+                selected[position] = name
+        
+        return len(normalized), selected
+    
+    def _read_csv_chunks(
+        self,
+        path: Path,
+        column_aliases: Dict[str, List[str]]
+    ) -> Tuple[List[str], Iterator[pd.DataFrame]]:
+        """
+        Read the columns named in column_aliases from a CSV file in batches.
+        
+        The header is read first and only the matching columns are parsed,
+        as text except for NUMERIC_COLUMNS. Batches hold chunk_rows rows
+        (ARROW_BLOCK_SIZE bytes with the pyarrow engine).
+        
+        Args:
+            path: Path to the CSV file (may be compressed)
+            column_aliases: Dictionary mapping standard names to aliases
+        
+        Returns:
+            Tuple of the standard column names found and an iterator over
+            DataFrames with those columns
+        
+        Raises:
+            pd.errors.EmptyDataError: If the file has no header
+        """
+        width, selected = self._project_columns(path, column_aliases)
+        columns = list(selected.values())
+        
+        if self.engine == 'pyarrow':
+            return columns, self._read_arrow_chunks(path, width, selected)
+        return columns, self._read_pandas_chunks(path, selected)
+    
+    def _read_pandas_chunks(self, path: Path, selected: Dict[int, str]) -> Iterator[pd.DataFrame]:
+        """Read the selected columns with the pandas C engine."""
+        with pd.read_csv(
+            path,
+            usecols=list(selected),
+            dtype={
+                position: str for position, name in selected.items()
+                if name not in self.NUMERIC_COLUMNS
+            },
+            on_bad_lines='warn',
+            compression=detect_compression(str(path)),
+            chunksize=self.chunk_rows
+        ) as reader:
+            for chunk in reader:
+                chunk.columns = list(selected.values())
+                yield chunk
+    
+    def _read_arrow_chunks(self, path: Path, width: int, selected: Dict[int, str]) -> Iterator[pd.DataFrame]:
+        """Read the selected columns with the pyarrow engine."""
+        # Name the columns by position so duplicate or odd headers do not matter
+        names = [f'c{position}' for position in range(width)]
+        
+        def skip_row(row) -> str:
+            self.logger.warning(f"Skipping malformed CSV line {row.number}: {row.text[:200]}")
+            return 'skip'
+        
+        with open_binary(str(path)) as stream:
+            reader = pa_csv.open_csv(
+                stream,
+                read_options=pa_csv.ReadOptions(
+                    column_names=names, skip_rows=1, block_size=self.ARROW_BLOCK_SIZE
+                ),
+                parse_options=pa_csv.ParseOptions(invalid_row_handler=skip_row),
+                convert_options=pa_csv.ConvertOptions(
+                    include_columns=[names[position] for position in selected],
+                    # Numbers are converted later with pd.to_numeric, so stray values are tolerated
+                    column_types={names[position]: pa.string() for position in selected},
+                    strings_can_be_null=True
+                )
+            )
+            for batch in reader:
+                chunk = batch.to_pandas()
+                chunk.columns = list(selected.values())
+                yield chunk
+    
+    def _first_chunk(
+        self,
+        chunks: Iterator[pd.DataFrame]
+    ) -> Tuple[Optional[pd.DataFrame], Iterator[pd.DataFrame]]:
+        """
+        Start reading batches and return the first one.
+        
+        Returns:
+            Tuple of the first batch (None if the file has no rows) and an
+            iterator over all batches, the first one included
+        """
+        first = next(chunks, None)
+        
+        if first is None or first.empty:
+            chunks.close()
+            return None, iter(())
+        
+        return first, itertools.chain([first], chunks)
+    
+    def _aggregate_firewall_chunk(self, chunk: pd.DataFrame) -> pd.Series:
+        """
+        Sum sent bytes per destination IP in one batch.
+        
+        Args:
+            chunk: DataFrame with dstip and sentbyte columns
+        
+        Returns:
+            Series of byte totals indexed by dstip, in order of first appearance
+        """
+        # Convert sentbyte to numeric, dropping missing and non-finite values
+        sentbyte = pd.to_numeric(chunk['sentbyte'], errors='coerce').to_numpy(dtype='float64')
+        valid = np.isfinite(sentbyte)
+        
+        # Missing addresses are dropped by the grouping
+        dstip = chunk['dstip'].astype(str).str.strip().to_numpy()[valid]
+        
+        return pd.Series(np.trunc(sentbyte[valid]).astype('int64')).groupby(dstip, sort=False).sum()
+    
     def is_public_ip(self, ip: str) -> bool:
         """
         Check if an IP address is public (not private/local).
@@ -163,17 +383,7 @@ class CSVParserService:
         Returns:
             True if IP is public, False otherwise
         """
-        try:
-            ip_obj = ipaddress.ip_address(str(ip))
-            return not (
-                ip_obj.is_private or
-                ip_obj.is_loopback or
-                ip_obj.is_link_local or
-                ip_obj.is_multicast or
-                ip_obj.is_reserved
-            )
-        except (ValueError, TypeError):
-            return False
+        return is_public_ip(str(ip))
     
     def parse_csv_vpn_logs(self, file_path: str) -> pd.DataFrame:
         """
@@ -197,25 +407,28 @@ class CSVParserService:
         self.logger.info(f"Parsing CSV VPN logs from: {file_path}")
         
         try:
-            df = pd.read_csv(path, on_bad_lines='warn')
-            
-            if df.empty:
-                self.logger.warning("CSV file is empty")
-                return pd.DataFrame(columns=['date', 'time', 'user', 'tunneltype', 'remip', 'reason', 'msg'])
-            
-            # Normalize column names
-            df = self._normalize_columns(df, self.VPN_COLUMN_ALIASES)
+            columns, chunks = self._read_csv_chunks(path, self.VPN_COLUMN_ALIASES)
             
             # Check for required columns
             required_columns = ['date', 'time', 'user']
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            missing_columns = [col for col in required_columns if col not in columns]
             
             if missing_columns:
                 raise ValueError(f"Required columns missing: {missing_columns}")
             
-            # Filter for successful logins if reason/status exists
-            if 'reason' in df.columns:
-                df = df[df['reason'].str.contains('success', case=False, na=False)]
+            first, chunks = self._first_chunk(chunks)
+            
+            if first is None:
+                self.logger.warning("CSV file is empty")
+                return pd.DataFrame(columns=['date', 'time', 'user', 'tunneltype', 'remip', 'reason', 'msg', EPOCH_COLUMN])
+            
+            # Filter for successful logins if reason/status exists, one batch at a time
+            matches = []
+            for chunk in chunks:
+                if 'reason' in chunk.columns:
+                    chunk = chunk[chunk['reason'].str.contains('success', case=False, na=False)]
+                matches.append(chunk)
+            df = pd.concat(matches, ignore_index=True)
             
             # Add missing columns with defaults
             defaults = {
@@ -229,9 +442,8 @@ class CSVParserService:
                 if col not in df.columns:
                     df[col] = default
             
-            # Select and order columns
-            columns = ['date', 'time', 'user', 'tunneltype', 'remip', 'reason', 'msg']
-            df = df[[col for col in columns if col in df.columns]]
+            # Add epoch seconds, then select and order columns
+            df = add_epoch(df, ['date', 'time', 'user', 'tunneltype', 'remip', 'reason', 'msg', EPOCH_COLUMN])
             
             self.logger.info(f"Parsed {len(df)} VPN records from CSV")
             
@@ -239,7 +451,7 @@ class CSVParserService:
             
         except pd.errors.EmptyDataError:
             self.logger.error("CSV file is empty")
-            return pd.DataFrame(columns=['date', 'time', 'user', 'tunneltype', 'remip', 'reason', 'msg'])
+            return pd.DataFrame(columns=['date', 'time', 'user', 'tunneltype', 'remip', 'reason', 'msg', EPOCH_COLUMN])
         except Exception as e:
             self.logger.error(f"Error parsing CSV VPN logs: {e}")
             raise
@@ -266,39 +478,32 @@ class CSVParserService:
         self.logger.info(f"Parsing CSV firewall logs from: {file_path}")
         
         try:
-            df = pd.read_csv(path, on_bad_lines='warn')
-            
-            if df.empty:
-                self.logger.warning("CSV file is empty")
-                return pd.DataFrame(columns=['dstip', 'total_sentbyte', 'size_mb'])
-            
-            # Normalize column names
-            df = self._normalize_columns(df, self.FIREWALL_COLUMN_ALIASES)
+            columns, chunks = self._read_csv_chunks(path, self.FIREWALL_COLUMN_ALIASES)
             
             # Check for required columns
-            if 'dstip' not in df.columns or 'sentbyte' not in df.columns:
+            if 'dstip' not in columns or 'sentbyte' not in columns:
                 raise ValueError("Required columns (dstip, sentbyte) not found in CSV")
             
-            # Convert sentbyte to numeric
-            df['sentbyte'] = pd.to_numeric(df['sentbyte'], errors='coerce')
-            df = df.dropna(subset=['sentbyte'])
+            first, chunks = self._first_chunk(chunks)
             
-            # Filter for public IPs and aggregate
-            public_ips_data: Dict[str, int] = {}
+            if first is None:
+                self.logger.warning("CSV file is empty")
+                return pd.DataFrame(columns=['dstip', 'total_sentbyte', 'size_mb'])
             
-            for _, row in df.iterrows():
-                dstip = str(row['dstip']).strip()
-                
-                if self.is_public_ip(dstip):
-                    try:
-                        sentbyte = int(row['sentbyte'])
-                        public_ips_data[dstip] = public_ips_data.get(dstip, 0) + sentbyte
-                    except (ValueError, TypeError):
-                        continue
+            # Aggregate each batch and merge the totals, so only one entry per IP is kept
+            ip_totals: Dict[str, int] = {}
+            
+            for chunk in chunks:
+                batch_totals = self._aggregate_firewall_chunk(chunk)
+                for dstip, sentbyte in zip(batch_totals.index, batch_totals.tolist()):
+                    ip_totals[dstip] = ip_totals.get(dstip, 0) + sentbyte
+            
+            # Classify each distinct address once
+            public_ips_data = [(dstip, total) for dstip, total in ip_totals.items() if self.is_public_ip(dstip)]
             
             # Create result DataFrame
             result_df = pd.DataFrame(
-                list(public_ips_data.items()),
+                public_ips_data,
                 columns=['dstip', 'total_sentbyte']
             )
             
@@ -348,29 +553,32 @@ class CSVParserService:
         self.logger.info(f"Filtering for user: {target_user}")
         
         try:
-            df = pd.read_csv(path, on_bad_lines='warn')
-            
-            if df.empty:
-                self.logger.warning("CSV file is empty")
-                return pd.DataFrame(columns=['date', 'time', 'user', 'sentbyte', 'sent_bytes_in_MB'])
-            
-            # Normalize column names
-            df = self._normalize_columns(df, self.SHUTDOWN_COLUMN_ALIASES)
+            columns, chunks = self._read_csv_chunks(path, self.SHUTDOWN_COLUMN_ALIASES)
             
             # Check for required columns
             required_columns = ['date', 'time', 'user', 'sentbyte']
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            missing_columns = [col for col in required_columns if col not in columns]
             
             if missing_columns:
                 raise ValueError(f"Required columns missing: {missing_columns}")
             
-            # Filter by user (case-insensitive)
-            df['user'] = df['user'].astype(str)
-            df = df[df['user'].str.lower() == target_user_clean]
+            first, chunks = self._first_chunk(chunks)
             
-            # Filter for shutdown sessions if msg column exists
-            if 'msg' in df.columns:
-                df = df[df['msg'].str.contains('shutdown', case=False, na=False)]
+            if first is None:
+                self.logger.warning("CSV file is empty")
+                return pd.DataFrame(columns=['date', 'time', 'user', 'sentbyte', 'sent_bytes_in_MB', EPOCH_COLUMN])
+            
+            matches = []
+            for chunk in chunks:
+                # Filter by user (case-insensitive)
+                chunk = chunk.assign(user=chunk['user'].astype(str))
+                chunk = chunk[chunk['user'].str.lower() == target_user_clean]
+                
+                # Filter for shutdown sessions if msg column exists
+                if 'msg' in chunk.columns:
+                    chunk = chunk[chunk['msg'].str.contains('shutdown', case=False, na=False)]
+                matches.append(chunk)
+            df = pd.concat(matches, ignore_index=True)
             
             # Convert sentbyte to numeric
             df['sentbyte'] = pd.to_numeric(df['sentbyte'], errors='coerce')
@@ -379,9 +587,8 @@ class CSVParserService:
             # Calculate MB
             df['sent_bytes_in_MB'] = df['sentbyte'] / (1024 * 1024)
             
-            # Select relevant columns
-            result_columns = ['date', 'time', 'user', 'sentbyte', 'sent_bytes_in_MB']
-            df = df[[col for col in result_columns if col in df.columns]]
+            # Add epoch seconds and select relevant columns
+            df = add_epoch(df, ['date', 'time', 'user', 'sentbyte', 'sent_bytes_in_MB', EPOCH_COLUMN])
             
             self.logger.info(f"Parsed {len(df)} shutdown sessions for user '{target_user}' from CSV")
             
@@ -389,7 +596,7 @@ class CSVParserService:
             
         except pd.errors.EmptyDataError:
             self.logger.error("CSV file is empty")
-            return pd.DataFrame(columns=['date', 'time', 'user', 'sentbyte', 'sent_bytes_in_MB'])
+            return pd.DataFrame(columns=['date', 'time', 'user', 'sentbyte', 'sent_bytes_in_MB', EPOCH_COLUMN])
         except Exception as e:
             self.logger.error(f"Error parsing CSV VPN shutdown logs: {e}")
             raise
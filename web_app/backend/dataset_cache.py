@@ -0,0 +1,448 @@
+"""
+Content-addressed cache of parsed datasets.
+
+Parsed results are stored on disk keyed by the SHA-256 of the evidence file,
+the parser version, the analysis name and its parameters, so re-running an
+analysis on the same content (a re-upload, a renamed copy, a second CLI run)
+loads the result instead of reparsing. Entries are columnar ``.npz`` files:
+numeric columns are stored as arrays, text columns dictionary-encoded as
+integer codes plus their distinct values. An entry holds one or more batches
+of rows, so results streamed to a file batch by batch are cached as they are
+written (see CacheEntryWriter). The cache is bounded in size and evicts the
+least recently used entries.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import zipfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import pandas as pd
+except ImportError:
+    raise ImportError("pandas is required. Install with: pip install pandas")
+
+from parse_engine import PARSER_VERSION, file_digest
+from result_writer import ExportResult, MirrorGroup, write_result
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_SUFFIX = '.npz'
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def _encode_frame(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Convert a DataFrame to named arrays for an .npz file."""
+    arrays: Dict[str, np.ndarray] = {}
+    meta: Dict[str, Any] = {'columns': [], 'dtypes': [], 'encoded': []}
+    
+    for position, column in enumerate(df.columns):
+        series = df[column]
+        meta['columns'].append(str(column))
+        meta['dtypes'].append(str(series.dtype))
+        
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Already dictionary-encoded; keep the category order
+            arrays[f'c{position}'] = series.cat.codes.to_numpy().astype(np.int32)
+            arrays[f'u{position}'] = np.asarray([str(value) for value in series.cat.categories], dtype=str)
+            meta['encoded'].append(True)
+        elif pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+            arrays[f'v{position}'] = series.to_numpy()
+            meta['encoded'].append(False)
+        else:
+            # Missing values get code -1 and are restored as NaN
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            arrays[f'c{position}'] = codes.astype(np.int32)
+            arrays[f'u{position}'] = np.asarray([str(value) for value in uniques], dtype=str)
+            meta['encoded'].append(True)
+    
+    arrays['meta'] = np.asarray(json.dumps(meta))
+    return arrays
+
+
+def _decode_frame(data: Any, prefix: str = '') -> pd.DataFrame:
+    """Rebuild a DataFrame from arrays written by _encode_frame, stored under prefix."""
+    meta = json.loads(str(data[f'{prefix}meta']))
+    columns = {}
+    
+    for position, (column, dtype, encoded) in enumerate(
+        zip(meta['columns'], meta['dtypes'], meta['encoded'])
+    ):
+        if encoded and dtype == 'category':
+            columns[column] = pd.Series(pd.Categorical.from_codes(
+                data[f'{prefix}c{position}'],
+                categories=pd.Index(data[f'{prefix}u{position}'].astype(object), dtype=str)
+            ))
+        elif encoded:
+            codes = data[f'{prefix}c{position}']
+            uniques = data[f'{prefix}u{position}'].astype(object)
+            values = uniques[codes] if len(uniques) else np.full(len(codes), np.nan, dtype=object)
+            values[codes < 0] = np.nan
+            columns[column] = pd.Series(values, dtype=object).astype(dtype)
+        else:
+            columns[column] = pd.Series(data[f'{prefix}v{position}'], dtype=dtype)
+    
+    return pd.DataFrame(columns, columns=meta['columns'])
+
+
+def _decode_batches(data: Any) -> pd.DataFrame:
+    """Rebuild the DataFrame of a cache entry from its batches."""
+    count = sum(1 for name in data.files if name.endswith('.meta'))
+    if not count:
+        raise KeyError('no batches')
+    
+    batches = [_decode_frame(data, f'{batch}.') for batch in range(count)]
+    if count == 1:
+        return batches[0]
+    
+    df = pd.concat(batches, ignore_index=True)
+    for column in df.columns:
+        # Batches have their own categories, so concat falls back to object
+        if isinstance(batches[0][column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    return df
+
+
+class CacheEntryWriter:
+    """
+    Cache entry written batch by batch.
+    
+    Has the write(df), close() and discard() of a result writer mirror, so a
+    result streamed to its output file is cached as it is written without
+    being held in memory. The entry only appears in the cache once close()
+    has written every batch; a writer that fails or receives no rows leaves
+    the cache unchanged.
+    
+    Example:
+        >>> with open_writer('vpn.csv', columns, mirror=cache.writer(key)) as writer:
+        ...     for batch in batches:
+        ...         writer.write(batch)
+    """
+    
+    def __init__(self, cache: 'DatasetCache', key: str):
+        """
+        Start a cache entry.
+        
+        Args:
+            cache: Cache the entry is added to
+            key: Key from DatasetCache.key()
+        """
+        self.cache = cache
+        self.key = key
+        self.batches = 0
+        self.closed = False
+        self._path = cache._path(key)
+        self._temp_path = self._path.with_name(f'.{key}.{os.getpid()}.tmp')
+        self._zip: Optional[zipfile.ZipFile] = None
+    
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Add a batch of rows to the entry.
+        
+        Args:
+            df: Rows with the same columns and dtypes as earlier batches
+        """
+        if self.closed:
+            return
+        
+        try:
+            if self._zip is None:
+                self._zip = zipfile.ZipFile(self._temp_path, 'w', allowZip64=True)
+            for name, array in _encode_frame(df).items():
+                with self._zip.open(f'{self.batches}.{name}.npy', 'w', force_zip64=True) as handle:
+                    np.lib.format.write_array(handle, array, allow_pickle=False)
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Could not cache dataset {self.key}: {e}")
+            self.discard()
+            return
+        
+        self.batches += 1
+    
+    def close(self) -> None:
+        """Add the finished entry to the cache and evict old entries beyond the size bound."""
+        if self.closed:
+            return
+        
+        if not self.batches:
+            self.discard()
+            return
+        
+        self.closed = True
+        try:
+            self._zip.close()
+            os.replace(self._temp_path, self._path)
+        except OSError as e:
+            logger.warning(f"Could not cache dataset {self.key}: {e}")
+            self._temp_path.unlink(missing_ok=True)
+            return
+        
+        self.cache.evict()
+    
+    def discard(self) -> None:
+        """Drop the entry, e.g. because the result it mirrors is incomplete."""
+        self.closed = True
+        if self._zip is not None:
+            try:
+                self._zip.close()
+            except OSError:
+                pass
+        self._temp_path.unlink(missing_ok=True)
+
+
+class DatasetCache:
+    """
+    Size-bounded, content-addressed cache of parsed DataFrames.
+    
+    Example:
+        >>> cache = DatasetCache('cache')
+        >>> df = cache.get_or_compute('vpn_logs.txt', 'vpn', {}, lambda: parser.parse_vpn_logs('vpn_logs.txt'))
+        >>> print(cache.stats())
+    """
+    
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize the cache.
+        
+        Args:
+            directory: Directory holding cache entries
+            max_bytes: Total size above which least recently used entries are evicted
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        
+        self.directory.mkdir(parents=True, exist_ok=True)
+    
+    def key(self, file_path: str, analysis: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Build the cache key for an analysis of a file.
+        
+        Args:
+            file_path: Path to the evidence file
+            analysis: Analysis name
+            params: Parameters that change the result (must be JSON serializable)
+        
+        Returns:
+            Hex key string
+        """
+        return self.key_for_digest(file_digest(file_path), analysis, params)
+    
+    def key_for_digest(self, digest: str, analysis: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Build the cache key from an already computed file digest.
+        
+        Args:
+            digest: SHA-256 hex digest of the evidence file
+            analysis: Analysis name
+            params: Parameters that change the result (must be JSON serializable)
+        
+        Returns:
+            Hex key string
+        """
+        identity = json.dumps(
+            {
+                'digest': digest,
+                'parser': PARSER_VERSION,
+                'analysis': analysis,
+                'params': params or {},
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+    
+    def _path(self, key: str) -> Path:
+        return self.directory / f'{key}{CACHE_SUFFIX}'
+    
+    def load(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Load a cached DataFrame.
+        
+        Args:
+            key: Key from key()
+        
+        Returns:
+            The cached DataFrame, or None on a miss
+        """
+        path = self._path(key)
+        
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                df = _decode_batches(data)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        
+        # Mark as recently used for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        
+        self.hits += 1
+        return df
+    
+    def store(self, key: str, df: pd.DataFrame) -> None:
+        """
+        Store a DataFrame and evict old entries beyond the size bound.
+        
+        Args:
+            key: Key from key()
+            df: DataFrame to cache
+        """
+        entry = self.writer(key)
+        entry.write(df)
+        entry.close()
+    
+    def writer(self, key: str) -> CacheEntryWriter:
+        """
+        Start an entry that is written batch by batch.
+        
+        Args:
+            key: Key from key()
+        
+        Returns:
+            CacheEntryWriter, usable as a result writer mirror
+        """
+        return CacheEntryWriter(self, key)
+    
+    def get_or_compute(
+        self,
+        file_path: str,
+        analysis: str,
+        params: Optional[Dict[str, Any]],
+        compute: Callable[[], pd.DataFrame]
+    ) -> pd.DataFrame:
+        """
+        Load an analysis result from the cache, computing and storing it on a miss.
+        
+        Args:
+            file_path: Path to the evidence file
+            analysis: Analysis name
+            params: Parameters that change the result
+            compute: Callable producing the DataFrame on a miss
+        
+        Returns:
+            The analysis result
+        """
+        key = self.key(file_path, analysis, params)
+        df = self.load(key)
+        
+        if df is not None:
+            logger.info(f"Dataset cache hit for {analysis} ({self.hits} hits, {self.misses} misses)")
+            return df
+        
+        logger.info(f"Dataset cache miss for {analysis} ({self.hits} hits, {self.misses} misses)")
+        df = compute()
+        self.store(key, df)
+        
+        return df
+    
+    def get_or_export(
+        self,
+        file_path: str,
+        analysis: str,
+        params: Optional[Dict[str, Any]],
+        result_path: Path,
+        output_format: str,
+        export: Callable[[Any], ExportResult],
+        mirror: Optional[Any] = None
+    ) -> ExportResult:
+        """
+        Write an analysis result file from the cache, exporting and caching it on a miss.
+        
+        On a hit the cached frame is written to result_path. On a miss
+        export(mirror) parses the file straight into result_path, passing
+        every written batch to the mirror it is given; the batches are
+        cached as they are written, so results streamed during parsing are
+        cached too.
+        
+        Args:
+            file_path: Path to the evidence file
+            analysis: Analysis name
+            params: Parameters that change the result
+            result_path: Output path (overwritten)
+            output_format: Output format name
+            export: Callable writing the result with a result writer mirror
+            mirror: Optional further sink for the written rows (e.g.
+                result_pages.PageWriter)
+        
+        Returns:
+            ExportResult for result_path
+        """
+        key = self.key(file_path, analysis, params)
+        df = self.load(key)
+        
+        if df is not None:
+            logger.info(f"Dataset cache hit for {analysis} ({self.hits} hits, {self.misses} misses)")
+            return write_result(df, result_path, output_format, mirror=mirror)
+        
+        logger.info(f"Dataset cache miss for {analysis} ({self.hits} hits, {self.misses} misses)")
+        entry = self.writer(key)
+        mirrors = MirrorGroup([entry] if mirror is None else [mirror, entry])
+        
+        try:
+            result = export(mirrors)
+        finally:
+            # Not closed if the export failed before writing
+            if not mirrors.closed:
+                mirrors.discard()
+        
+        if not entry.batches and result.frame is not None:
+            # Empty results write no batches
+            self.store(key, result.frame)
+        
+        return result
+    
+    def evict(self) -> int:
+        """
+        Remove least recently used entries until the cache fits max_bytes.
+        
+        Returns:
+            Number of entries removed
+        """
+        entries = []
+        for path in self.directory.glob(f'*{CACHE_SUFFIX}'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        
+        return removed
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters.
+        
+        Returns:
+            Dictionary with hits, misses, entries and total bytes
+        """
+        sizes = [path.stat().st_size for path in self.directory.glob(f'*{CACHE_SUFFIX}')]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(sizes),
+            'bytes': sum(sizes),
+        }
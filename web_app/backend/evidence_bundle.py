@@ -0,0 +1,431 @@
+"""
+Archive and multi-file evidence ingestion.
+
+Incident evidence usually arrives as zip or tar bundles of rotated FortiGate
+logs and CSV exports. This module expands archives, directories and plain
+files into a flat list of members, detects the format of each member,
+parses the members in a process pool and merges the per-member results into
+one DataFrame per analysis.
+
+Archive members are copied to a work directory under generated names, so
+member paths inside an archive can never escape it. Compressed members
+(e.g. rotated ``.log.gz`` files) are read directly by the parsers.
+"""
+
+import logging
+import re
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import pandas as pd
+except ImportError:
+    raise ImportError("pandas is required. Install with: pip install pandas")
+from pandas.api.types import union_categoricals
+
+from csv_parser_service import CSVParserService
+from log_time import EPOCH_COLUMN
+from parse_engine import (
+    READ_BLOCK_SIZE,
+    can_use_processes,
+    create_analysis,
+    is_public_ip,
+    run_analyses,
+    timeline_frame,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Total bytes extracted from archives before ingestion is refused
+DEFAULT_MAX_EXTRACT_BYTES = 10 * 1024 * 1024 * 1024
+# Members extracted from archives before ingestion is refused
+MAX_MEMBERS = 10000
+
+
+@dataclass
+class EvidenceMember:
+    """One evidence file of a bundle."""
+    
+    name: str
+    path: str
+    file_format: Optional[str] = None
+    analyses: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'format': self.file_format,
+            'analyses': self.analyses,
+            'error': self.error,
+        }
+
+
+@dataclass
+class BundleResult:
+    """Merged analysis results of a bundle and the members they came from."""
+    
+    frames: Dict[str, pd.DataFrame]
+    members: List[EvidenceMember] = field(default_factory=list)
+    
+    @property
+    def failed(self) -> List[EvidenceMember]:
+        """Members that could not be parsed."""
+        return [member for member in self.members if member.error]
+
+
+def is_archive(file_path: str) -> bool:
+    """
+    Check whether a file is a zip or tar archive (tar may be compressed).
+    
+    Args:
+        file_path: Path to the file
+    
+    Returns:
+        True for zip and tar archives
+    """
+    try:
+        return zipfile.is_zipfile(file_path) or tarfile.is_tarfile(file_path)
+    except (OSError, EOFError):
+        return False
+
+
+def _is_ignored(name: str) -> bool:
+    """Skip archive metadata and hidden files (e.g. __MACOSX/, .DS_Store)."""
+    parts = PurePosixPath(name.replace('\\', '/')).parts
+    return not parts or parts[0] == '__MACOSX' or parts[-1].startswith('.')
+
+
+def _member_filename(index: int, name: str) -> str:
+    """Generated on-disk name keeping the member's extensions for format detection."""
+    basename = PurePosixPath(name.replace('\\', '/')).name
+    return f"{index:05d}_{re.sub(r'[^A-Za-z0-9._-]', '_', basename)}"
+
+
+class _ExtractBudget:
+    """Running limits on extracted bytes and member count."""
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes_written = 0
+        self.members = 0
+    
+    def add_member(self) -> int:
+        self.members += 1
+        if self.members > MAX_MEMBERS:
+            raise ValueError(f"Bundle has more than {MAX_MEMBERS} files")
+        return self.members
+    
+    def copy(self, source: BinaryIO, target_path: Path) -> None:
+        # Sizes in archive headers can lie, so count the bytes actually written
+        with open(target_path, 'wb') as target:
+            for block in iter(lambda: source.read(READ_BLOCK_SIZE), b''):
+                self.bytes_written += len(block)
+                if self.bytes_written > self.max_bytes:
+                    raise ValueError(f"Bundle expands to more than {self.max_bytes} bytes")
+                target.write(block)
+
+
+def _extract_zip(file_path: str, target_dir: Path, budget: _ExtractBudget) -> List[EvidenceMember]:
+    members = []
+    
+    with zipfile.ZipFile(file_path) as archive:
+        for info in archive.infolist():
+            is_symlink = (info.external_attr >> 16) & 0o170000 == 0o120000
+            if info.is_dir() or is_symlink or _is_ignored(info.filename):
+                continue
+            
+            index = budget.add_member()
+            member = EvidenceMember(info.filename, str(target_dir / _member_filename(index, info.filename)))
+            
+            if info.flag_bits & 0x1:
+                member.error = 'Encrypted archive member'
+            else:
+                with archive.open(info) as source:
+                    budget.copy(source, Path(member.path))
+            members.append(member)
+    
+    return members
+
+
+def _extract_tar(file_path: str, target_dir: Path, budget: _ExtractBudget) -> List[EvidenceMember]:
+    members = []
+    
+    # Iterating streams through the archive, so compressed tars are read once
+    with tarfile.open(file_path, 'r:*') as archive:
+        for info in archive:
+            if not info.isfile() or _is_ignored(info.name):
+                continue
+            
+            index = budget.add_member()
+            member = EvidenceMember(info.name, str(target_dir / _member_filename(index, info.name)))
+            
+            source = archive.extractfile(info)
+            if source is None:
+                continue
+            with source:
+                budget.copy(source, Path(member.path))
+            members.append(member)
+    
+    return members
+
+
+def collect_members(
+    inputs: Sequence[str],
+    work_dir: str,
+    max_bytes: int = DEFAULT_MAX_EXTRACT_BYTES
+) -> List[EvidenceMember]:
+    """
+    Expand input files, directories and archives into evidence members.
+    
+    Plain files are used in place; directories contribute their files in
+    name order; zip and tar archives are extracted into work_dir. Nested
+    archives are not expanded.
+    
+    Args:
+        inputs: Paths to log files, CSV exports, directories or archives
+        work_dir: Directory for extracted archive members
+        max_bytes: Total bytes that may be extracted from archives
+    
+    Returns:
+        Members in input order
+    
+    Raises:
+        FileNotFoundError: If an input does not exist
+        ValueError: If the archives exceed the size or member limits
+    """
+    budget = _ExtractBudget(max_bytes)
+    target_dir = Path(work_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    members: List[EvidenceMember] = []
+    
+    for input_path in inputs:
+        path = Path(input_path)
+        
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {input_path}")
+        
+        if path.is_dir():
+            files = [
+                child for child in sorted(path.rglob('*'))
+                if child.is_file() and not _is_ignored(child.relative_to(path).as_posix())
+            ]
+        else:
+            files = [path]
+        
+        for file in files:
+            if zipfile.is_zipfile(file):
+                members.extend(_extract_zip(str(file), target_dir, budget))
+            elif is_archive(str(file)):
+                members.extend(_extract_tar(str(file), target_dir, budget))
+            else:
+                members.append(EvidenceMember(str(file), str(file)))
+    
+    return members
+
+
+def parse_member(
+    file_path: str,
+    analyses: Sequence[str],
+    target_user: Optional[str] = None,
+    ip_filter: Callable[[str], bool] = is_public_ip,
+    workers: int = 1
+) -> Tuple[str, Dict[str, pd.DataFrame]]:
+    """
+    Detect the format of one evidence file and run the analyses over it.
+    
+    CSV exports go through CSVParserService; analyses whose columns are
+    missing from an export are left out of its results. Everything else is
+    parsed as Fortinet key=value logs in a single pass.
+    
+    Args:
+        file_path: Path to the evidence file
+        analyses: Canonical analysis names: 'vpn', 'firewall', 'firewall_timeline', 'vpn_shutdown'
+        target_user: Username filter, required for 'vpn_shutdown'
+        ip_filter: Destination filter for Fortinet firewall logs
+        workers: Number of worker processes for this file
+    
+    Returns:
+        Tuple of (detected format, results by analysis name)
+    
+    Raises:
+        ValueError: If the vpn_shutdown analysis has no target user
+    """
+    csv_parser = CSVParserService()
+    file_format = csv_parser.detect_format(file_path)
+    
+    if file_format == 'csv':
+        csv_parsers = {
+            'vpn': lambda: csv_parser.parse_csv_vpn_logs(file_path),
+            'firewall': lambda: csv_parser.parse_csv_firewall_logs(file_path),
+            'vpn_shutdown': lambda: csv_parser.parse_csv_vpn_shutdown_logs(file_path, target_user),
+        }
+        frames = {}
+        for name in analyses:
+            if name not in csv_parsers:
+                logger.info(f"Skipping {name} for {file_path}: not available for CSV exports")
+                continue
+            try:
+                frames[name] = csv_parsers[name]()
+            except ValueError as e:
+                # An export usually holds one kind of log; the others do not apply
+                logger.info(f"Skipping {name} for {file_path}: {e}")
+        return file_format, frames
+    
+    runners = [create_analysis(name, target_user=target_user, ip_filter=ip_filter) for name in analyses]
+    run_analyses(file_path, runners, workers=workers)
+    
+    return file_format, {runner.name: runner.to_dataframe() for runner in runners}
+
+
+def _parse_member_safely(
+    file_path: str,
+    analyses: Sequence[str],
+    target_user: Optional[str],
+    ip_filter: Callable[[str], bool],
+    workers: int = 1
+) -> Tuple[Optional[str], Optional[Dict[str, pd.DataFrame]], Optional[str]]:
+    """Worker entry point: parse a member, reporting failures instead of raising."""
+    try:
+        file_format, frames = parse_member(file_path, analyses, target_user, ip_filter, workers)
+        return file_format, frames, None
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}"
+
+
+def merge_frames(name: str, frames: Sequence[pd.DataFrame], columns: Sequence[str]) -> pd.DataFrame:
+    """
+    Merge the per-member results of one analysis.
+    
+    Firewall totals are summed per destination (and time bucket, for
+    timelines) and re-sorted; row-based results are concatenated in member
+    order.
+    
+    Args:
+        name: Canonical analysis name
+        frames: Per-member results in member order
+        columns: Result columns, used when no member has results
+    
+    Returns:
+        Merged DataFrame
+    """
+    frames = [df for df in frames if not df.empty]
+    
+    if not frames:
+        return pd.DataFrame(columns=list(columns))
+    
+    df = pd.concat(frames, ignore_index=True)
+    
+    # Categorical columns with different categories concatenate to plain
+    # strings; combine them so the categories stay in order of first appearance
+    for column in df.columns:
+        if all(isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames):
+            df[column] = union_categoricals([frame[column] for frame in frames])
+    
+    if name == 'firewall':
+        df = df.groupby('dstip', sort=False, as_index=False)['total_sentbyte'].sum()
+        df['size_mb'] = df['total_sentbyte'] / (1024 * 1024)
+        df = df.sort_values(by='total_sentbyte', ascending=False)
+    elif name == 'firewall_timeline':
+        totals = ['total_sentbyte', 'total_rcvdbyte', 'lines']
+        df = timeline_frame(df.groupby([EPOCH_COLUMN, 'dstip'], sort=False, as_index=False)[totals].sum())
+    
+    return df.reset_index(drop=True)
+
+
+def parse_bundle(
+    inputs: Sequence[str],
+    analyses: Sequence[str],
+    target_user: Optional[str] = None,
+    workers: int = 1,
+    ip_filter: Callable[[str], bool] = is_public_ip,
+    max_bytes: int = DEFAULT_MAX_EXTRACT_BYTES,
+    work_dir: Optional[str] = None
+) -> BundleResult:
+    """
+    Parse a bundle of evidence files and merge the results per analysis.
+    
+    With more than one worker, members are parsed in a process pool (one
+    member per task); a bundle of a single file parses that file in chunks
+    instead. Members that fail to parse are reported in the result and do
+    not stop the others.
+    
+    Args:
+        inputs: Paths to log files, CSV exports, directories or archives
+        analyses: Analysis names: 'vpn', 'firewall', 'vpn_shutdown' ('vpn-shutdown' also accepted)
+        target_user: Username filter, required for 'vpn_shutdown'
+        workers: Number of worker processes
+        ip_filter: Destination filter for Fortinet firewall logs
+        max_bytes: Total bytes that may be extracted from archives
+        work_dir: Directory for extracted members (a temporary directory,
+            removed afterwards, if not given)
+    
+    Returns:
+        BundleResult with one merged DataFrame per analysis
+    
+    Raises:
+        FileNotFoundError: If an input does not exist
+        ValueError: If the analyses are invalid or the archives exceed the limits
+    
+    Example:
+        >>> result = parse_bundle(['incident.zip'], ['vpn', 'firewall'], workers=8)
+        >>> print(len(result.members), len(result.frames['firewall']))
+    """
+    runners = [create_analysis(name, target_user=target_user) for name in analyses]
+    names = [runner.name for runner in runners]
+    
+    if not runners or len(set(names)) != len(names):
+        raise ValueError("Analyses must be a non-empty list without duplicates")
+    
+    temp_dir = None
+    if work_dir is None:
+        temp_dir = tempfile.mkdtemp(prefix='forti-bundle-')
+        work_dir = temp_dir
+    
+    try:
+        members = collect_members(inputs, work_dir, max_bytes)
+        pending = [member for member in members if member.error is None]
+        logger.info(f"Parsing {len(pending)} evidence files for {', '.join(names)} with {workers} workers")
+        
+        if workers > 1 and len(pending) > 1 and can_use_processes():
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+                futures = [
+                    pool.submit(_parse_member_safely, member.path, names, target_user, ip_filter)
+                    for member in pending
+                ]
+                outcomes = [future.result() for future in futures]
+        else:
+            member_workers = workers if len(pending) == 1 else 1
+            outcomes = [
+                _parse_member_safely(member.path, names, target_user, ip_filter, member_workers)
+                for member in pending
+            ]
+        
+        partials: Dict[str, List[pd.DataFrame]] = {name: [] for name in names}
+        for member, (file_format, frames, error) in zip(pending, outcomes):
+            member.file_format = file_format
+            member.error = error
+            if error is not None:
+                logger.warning(f"Could not parse {member.name}: {error}")
+                continue
+            member.analyses = list(frames)
+            for name, df in frames.items():
+                partials[name].append(df)
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    merged = {
+        runner.name: merge_frames(runner.name, partials[runner.name], runner.columns)
+        for runner in runners
+    }
+    
+    return BundleResult(merged, members)
+
@@ -0,0 +1,197 @@
+"""
+Field extraction for Fortinet key=value log lines.
+
+This module holds the compiled field patterns and the extractor shared by
+LogParserService, simple_app and the CLI, so every parser walks a line the
+same way and stops as soon as the line can no longer match.
+"""
+
+import re
+from typing import Callable, Dict, List, Optional, Pattern, Sequence
+
+
+# One pre-compiled pattern per Fortinet field. Each pattern starts with a
+# literal key so the regex engine can use its fast substring search.
+FIELD_PATTERNS: Dict[str, Pattern[str]] = {
+    'date': re.compile(r'date=(\S+)'),
+    'time': re.compile(r'time=(\S+)'),
+    'user': re.compile(r'user="([^"]+)"'),
+    'tunneltype': re.compile(r'tunneltype="([^"]+)"'),
+    'remip': re.compile(r'remip=([\d\.]+)'),
+    'reason': re.compile(r'reason="([^"]+)"'),
+    'msg': re.compile(r'msg="([^"]+)"'),
+    'dstip': re.compile(r'dstip=([\d\.]+)'),
+    'sentbyte': re.compile(r'sentbyte=(\d+)'),
+    'rcvdbyte': re.compile(r'rcvdbyte=(\d+)'),
+    'tz': re.compile(r'tz="?([^"\s]+)'),
+    'eventtime': re.compile(r'eventtime=(\d+)'),
+}
+
+# Shutdown records match the user key case-insensitively
+USER_PATTERN_ICASE: Pattern[str] = re.compile(r'user="([^"]+)"', flags=re.IGNORECASE)
+
+VPN_LOGIN_FIELDS = ('date', 'time', 'user', 'tunneltype', 'remip', 'reason', 'msg')
+FIREWALL_FIELDS = ('dstip', 'sentbyte')
+FIREWALL_TIMELINE_FIELDS = ('date', 'time', 'dstip', 'sentbyte', 'rcvdbyte')
+SHUTDOWN_FIELDS = ('date', 'time', 'user', 'sentbyte', 'msg')
+# Timestamp details of newer FortiOS versions, read when present
+TIMESTAMP_FIELDS = ('tz', 'eventtime')
+
+SHUTDOWN_MESSAGE = "SSL tunnel shutdown"
+LOGIN_SUCCESS_REASON = "login successfully"
+
+
+class FieldExtractor:
+    """
+    Extract a fixed set of fields from a Fortinet log line.
+    
+    Fields are searched in scan order (``scan_first`` fields, then the rest)
+    and extraction stops at the first missing field or failed predicate, so
+    lines that cannot match cost one or two substring searches instead of
+    one search per output field. Optional fields are searched last, only on
+    lines that matched, and come back as None when missing.
+    
+    Example:
+        >>> extractor = FieldExtractor(FIREWALL_FIELDS, scan_first=('sentbyte',))
+        >>> extractor.extract('dstip=8.8.8.8 sentbyte=1500')
+        ['8.8.8.8', '1500']
+    """
+    
+    def __init__(
+        self,
+        fields: Sequence[str],
+        scan_first: Sequence[str] = (),
+        predicates: Optional[Dict[str, Callable[[str], bool]]] = None,
+        prefilter: Optional[str] = None,
+        patterns: Optional[Dict[str, Pattern[str]]] = None,
+        optional: Sequence[str] = (),
+    ):
+        """
+        Initialize the extractor.
+        
+        Args:
+            fields: Field names in output order
+            scan_first: Fields to search before the others (most selective first)
+            predicates: Optional per-field checks applied as soon as the field is found
+            prefilter: Optional substring every matching line must contain
+            patterns: Optional pattern overrides by field name
+            optional: Fields (among ``fields``) that may be missing
+        """
+        unknown = [name for name in fields if name not in FIELD_PATTERNS and name not in (patterns or {})]
+        if unknown:
+            raise ValueError(f"Unknown Fortinet fields: {unknown}")
+        
+        self.fields = tuple(fields)
+        self.prefilter = prefilter
+        
+        lookup = dict(FIELD_PATTERNS)
+        lookup.update(patterns or {})
+        predicates = predicates or {}
+        
+        scan_order = [name for name in scan_first if name in self.fields and name not in optional]
+        scan_order += [name for name in self.fields if name not in scan_order and name not in optional]
+        optional_order = [name for name in self.fields if name in optional]
+        
+        self._scan = [(lookup[name], predicates.get(name)) for name in scan_order]
+        self._optional = [lookup[name] for name in optional_order]
+        scan_order += optional_order
+        self._output_index = [scan_order.index(name) for name in self.fields]
+    
+    def extract(self, line: str) -> Optional[List[str]]:
+        """
+        Extract the configured fields from a line.
+        
+        Args:
+            line: Raw log line
+        
+        Returns:
+            Field values in output order, or None if any required field is
+            missing or rejected by its predicate
+        """
+        if self.prefilter is not None and self.prefilter not in line:
+            return None
+        
+        values = []
+        for pattern, predicate in self._scan:
+            match = pattern.search(line)
+            if match is None:
+                return None
+            value = match.group(1)
+            if predicate is not None and not predicate(value):
+                return None
+            values.append(value)
+        
+        for pattern in self._optional:
+            match = pattern.search(line)
+            values.append(None if match is None else match.group(1))
+        
+        return [values[i] for i in self._output_index]
+
+
+def vpn_login_extractor() -> FieldExtractor:
+    """
+    Build the extractor for successful VPN logins.
+    
+    Returns:
+        FieldExtractor yielding VPN_LOGIN_FIELDS and TIMESTAMP_FIELDS for
+        successful logins only
+    """
+    return FieldExtractor(
+        VPN_LOGIN_FIELDS + TIMESTAMP_FIELDS,
+        scan_first=('reason',),
+        predicates={'reason': lambda value: value.lower() == LOGIN_SUCCESS_REASON},
+        optional=TIMESTAMP_FIELDS,
+    )
+
+
+def firewall_extractor() -> FieldExtractor:
+    """
+    Build the extractor for firewall traffic (dstip, sentbyte).
+    
+    Returns:
+        FieldExtractor yielding FIREWALL_FIELDS
+    """
+    return FieldExtractor(FIREWALL_FIELDS)
+
+
+def firewall_timeline_extractor() -> FieldExtractor:
+    """
+    Build the extractor for firewall traffic over time.
+    
+    Returns:
+        FieldExtractor yielding FIREWALL_TIMELINE_FIELDS and TIMESTAMP_FIELDS;
+        rcvdbyte, tz and eventtime are None when missing
+    """
+    return FieldExtractor(
+        FIREWALL_TIMELINE_FIELDS + TIMESTAMP_FIELDS,
+        scan_first=('sentbyte', 'dstip'),
+        optional=('rcvdbyte',) + TIMESTAMP_FIELDS,
+    )
+
+
+def shutdown_extractor(target_user: Optional[str] = None) -> FieldExtractor:
+    """
+    Build the extractor for "SSL tunnel shutdown" sessions.
+    
+    Args:
+        target_user: Optional username filter (case-insensitive)
+    
+    Returns:
+        FieldExtractor yielding SHUTDOWN_FIELDS and TIMESTAMP_FIELDS
+    """
+    predicates: Dict[str, Callable[[str], bool]] = {
+        'msg': lambda value: value == SHUTDOWN_MESSAGE,
+    }
+    
+    if target_user is not None:
+        target = target_user.strip().lower()
+        predicates['user'] = lambda value: value.lower() == target
+    
+    return FieldExtractor(
+        SHUTDOWN_FIELDS + TIMESTAMP_FIELDS,
+        scan_first=('msg', 'user'),
+        predicates=predicates,
+        prefilter=f'msg="{SHUTDOWN_MESSAGE}"',
+        patterns={'user': USER_PATTERN_ICASE},
+        optional=TIMESTAMP_FIELDS,
+    )
@@ -0,0 +1,228 @@
+"""
+Top-K selection for per-key totals.
+
+Firewall analyses rank destination IPs by bytes sent, but analysts only look
+at the first few hundred. Two ways of getting them are provided:
+
+- top_items: exact top-K of a complete dict of totals by partial selection
+  (a heap of K entries) instead of sorting every key
+- SpaceSaving: approximate top-K in a fixed number of counters, for logs
+  with too many distinct keys to keep a total for each
+
+SpaceSaving is the weighted Space-Saving summary (Metwally et al., 2005).
+With ``capacity`` counters over a stream whose weights add up to N:
+
+- each kept count overstates the true total by at most its recorded error,
+  and every error is at most N / capacity
+- every key whose true total exceeds N / capacity is kept
+
+Summaries of separate chunks merge into one with the same bounds over the
+combined stream (Agarwal et al., "Mergeable summaries", 2012).
+"""
+
+import heapq
+from operator import itemgetter
+from typing import Dict, Hashable, List, Tuple
+
+
+# Counters kept per requested result row in approximate mode
+COUNTERS_PER_ROW = 10
+
+# Fewest counters used, so small K still gets tight bounds
+MIN_COUNTERS = 1024
+
+
+def sketch_capacity(top: int) -> int:
+    """
+    Number of Space-Saving counters used for an approximate top-K.
+    
+    Args:
+        top: Number of result rows (K)
+    
+    Returns:
+        Counter count
+    """
+    return max(top * COUNTERS_PER_ROW, MIN_COUNTERS)
+
+
+def top_items(totals: Dict[Hashable, int], top: int) -> List[Tuple[Hashable, int]]:
+    """
+    Exact top-K of a dict of totals, without sorting every key.
+    
+    Args:
+        totals: Total per key
+        top: Number of keys to return
+    
+    Returns:
+        (key, total) pairs, largest total first
+    """
+    return heapq.nlargest(top, totals.items(), key=itemgetter(1))
+
+
+class SpaceSaving:
+    """
+    Weighted Space-Saving summary of the heaviest keys in a stream.
+    
+    Keys are counted exactly until ``capacity`` keys are monitored. A new
+    key then takes over the counter with the smallest count and inherits it
+    as its error. The smallest counter is found through a heap holding one
+    entry per key; entries are refreshed lazily, because counts only grow.
+    
+    Example:
+        >>> sketch = SpaceSaving(1024)
+        >>> for dstip, sentbyte in flows:
+        ...     sketch.add(dstip, sentbyte)
+        >>> sketch.top(10)
+    """
+    
+    def __init__(self, capacity: int) -> None:
+        """
+        Initialize an empty summary.
+        
+        Args:
+            capacity: Number of counters
+        
+        Raises:
+            ValueError: If capacity is not positive
+        """
+        if capacity < 1:
+            raise ValueError(f"Capacity must be positive: {capacity}")
+        
+        self.capacity = capacity
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        # Sum of all weights added
+        self.total = 0
+        # (count when pushed, key), one entry per monitored key
+        self._heap: List[Tuple[int, Hashable]] = []
+    
+    def __len__(self) -> int:
+        return len(self.counts)
+    
+    def add(self, key: Hashable, weight: int = 1) -> None:
+        """
+        Add weight to a key's count.
+        
+        Args:
+            key: Key to count
+            weight: Non-negative amount to add
+        """
+        self.total += weight
+        counts = self.counts
+        
+        if key in counts:
+            counts[key] += weight
+            return
+        
+        if len(counts) < self.capacity:
+            counts[key] = weight
+            self.errors[key] = 0
+            heapq.heappush(self._heap, (weight, key))
+            return
+        
+        # Replace the smallest counter; its count bounds what key may have had
+        floor, evicted = self._pop_min()
+        del counts[evicted]
+        del self.errors[evicted]
+        counts[key] = floor + weight
+        self.errors[key] = floor
+        heapq.heappush(self._heap, (floor + weight, key))
+    
+    def _pop_min(self) -> Tuple[int, Hashable]:
+        """Remove and return the (count, key) of the smallest counter."""
+        heap = self._heap
+        counts = self.counts
+        while True:
+            count, key = heap[0]
+            current = counts[key]
+            if current == count:
+                return heapq.heappop(heap)
+            heapq.heapreplace(heap, (current, key))
+    
+    def min_count(self) -> int:
+        """
+        Smallest count kept, or 0 while there are free counters.
+        
+        Keys not in the summary have a true total of at most this value.
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        
+        floor = self._pop_min()
+        heapq.heappush(self._heap, floor)
+        return floor[0]
+    
+    @property
+    def max_error(self) -> int:
+        """Upper bound on the overcount of any kept key (N / capacity)."""
+        return self.total // self.capacity
+    
+    def merge(self, other: 'SpaceSaving') -> None:
+        """
+        Add another summary's stream into this one.
+        
+        Keys missing from one side are counted at that side's smallest
+        count, which is the most they can have had there; the largest
+        ``capacity`` results are kept.
+        
+        Args:
+            other: Summary of another part of the stream
+        """
+        floor, other_floor = self.min_count(), other.min_count()
+        merged = []
+        
+        for key in self.counts.keys() | other.counts.keys():
+            count = self.counts.get(key, floor) + other.counts.get(key, other_floor)
+            error = self.errors.get(key, floor) + other.errors.get(key, other_floor)
+            merged.append((count, error, key))
+        
+        kept = heapq.nlargest(self.capacity, merged, key=itemgetter(0))
+        self.counts = {key: count for count, _, key in kept}
+        self.errors = {key: error for _, error, key in kept}
+        self._heap = [(count, key) for count, _, key in kept]
+        heapq.heapify(self._heap)
+        self.total += other.total
+    
+    def top(self, top: int) -> List[Tuple[Hashable, int, int]]:
+        """
+        Heaviest keys kept in the summary.
+        
+        Args:
+            top: Number of keys to return
+        
+        Returns:
+            (key, count, error) triples, largest count first; the true total
+            of each key lies between count - error and count
+        """
+        return [
+            (key, count, self.errors[key])
+            for key, count in heapq.nlargest(top, self.counts.items(), key=itemgetter(1))
+        ]
+    
+    def guaranteed_top(self, top: int) -> List[Tuple[Hashable, int, int]]:
+        """
+        Heaviest keys that are certainly heavier than every key not kept.
+        
+        Once the counters are full, a key that took over a counter late
+        in the stream can show a count made up almost entirely of its
+        inherited error. Only keys whose guaranteed total (count - error)
+        exceeds min_count() are returned; while counters are free every
+        count is exact and all keys qualify.
+        
+        Args:
+            top: Number of keys to return
+        
+        Returns:
+            (key, count, error) triples as for top(); may be fewer than top
+        """
+        if len(self.counts) < self.capacity:
+            return self.top(top)
+        
+        floor = self.min_count()
+        guaranteed = (
+            (key, count) for key, count in self.counts.items() if count - self.errors[key] > floor
+        )
+        return [
+            (key, count, self.errors[key])
+            for key, count in heapq.nlargest(top, guaranteed, key=itemgetter(1))
+        ]
@@ -0,0 +1,197 @@
+"""
+Fast IP address classification for log parsing.
+
+Firewall analyses classify the destination IP of every log line. Building an
+``ipaddress`` object per line and checking several properties dominates the
+cost on traffic logs, so IPv4 addresses in dotted-quad form are converted to
+integers and looked up in a sorted table of address ranges instead, and
+recent answers are memoized. The table is derived from the ``ipaddress``
+module at import time, and anything that is not a plain dotted quad (IPv6,
+malformed input) is handed to ``ipaddress``, so results are identical to it.
+
+Two classifications are provided, matching the two rules used in the code
+base:
+
+- is_public_ip: not private, loopback, link-local, multicast or reserved
+  (web services and parse engine)
+- is_not_private_ip: not ``is_private`` (CLI, simple app, input validation)
+"""
+
+import bisect
+import ipaddress
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Networks whose edges can change a classification; the running Python's own
+# constants are added below, so the table follows its ipaddress rules
+_BOUNDARY_NETWORKS = (
+    '0.0.0.0/8', '10.0.0.0/8', '100.64.0.0/10', '127.0.0.0/8',
+    '169.254.0.0/16', '172.16.0.0/12', '192.0.0.0/24', '192.0.0.0/29',
+    '192.0.0.8/32', '192.0.0.9/32', '192.0.0.10/32', '192.0.0.170/31',
+    '192.0.2.0/24', '192.31.196.0/24', '192.52.193.0/24', '192.88.99.0/24',
+    '192.168.0.0/16', '192.175.48.0/24', '198.18.0.0/15', '198.51.100.0/24',
+    '203.0.113.0/24', '224.0.0.0/4', '240.0.0.0/4', '255.255.255.255/32',
+)
+
+_DIGITS = frozenset('0123456789')
+
+# Memoized answers per address string; cleared when full
+MAX_MEMO_ENTRIES = 1 << 16
+
+
+def _constant_networks() -> Iterable[ipaddress.IPv4Network]:
+    """Yield the IPv4 networks ipaddress uses for its properties, if exposed."""
+    constants = getattr(ipaddress.IPv4Address, '_constants', None)
+    for name in dir(constants) if constants is not None else ():
+        value = getattr(constants, name)
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for network in values:
+            if isinstance(network, ipaddress.IPv4Network):
+                yield network
+
+
+def _strict_public(address: ipaddress.IPv4Address) -> bool:
+    return not (
+        address.is_private or
+        address.is_loopback or
+        address.is_link_local or
+        address.is_multicast or
+        address.is_reserved
+    )
+
+
+def _build_table() -> Tuple[List[int], List[Tuple[bool, bool]]]:
+    """
+    Split the IPv4 space at every network edge and classify each range.
+    
+    Every property is a union or difference of the boundary networks, so it
+    is constant between two consecutive edges; classifying the first
+    address of each range with ipaddress gives the answer for all of it.
+    """
+    edges = {0}
+    networks = [ipaddress.IPv4Network(network) for network in _BOUNDARY_NETWORKS]
+    for network in list(networks) + list(_constant_networks()):
+        edges.add(int(network.network_address))
+        edges.add(int(network.broadcast_address) + 1)
+    edges.discard(1 << 32)
+    
+    starts: List[int] = []
+    flags: List[Tuple[bool, bool]] = []
+    for start in sorted(edges):
+        address = ipaddress.IPv4Address(start)
+        flag = (_strict_public(address), not address.is_private)
+        # Merge neighbouring ranges with the same answers
+        if flags and flags[-1] == flag:
+            continue
+        starts.append(start)
+        flags.append(flag)
+    
+    return starts, flags
+
+
+_RANGE_STARTS, _RANGE_FLAGS = _build_table()
+_PUBLIC_MEMO: Dict[str, bool] = {}
+_NOT_PRIVATE_MEMO: Dict[str, bool] = {}
+
+
+def ipv4_to_int(ip: str) -> Optional[int]:
+    """
+    Convert a dotted-quad IPv4 address to an integer.
+    
+    Only the canonical form accepted by ipaddress is converted: four decimal
+    octets of 0-255 without leading zeros or surrounding whitespace.
+    
+    Args:
+        ip: Address string
+    
+    Returns:
+        The address as an integer, or None if it is not a dotted quad
+    
+    Example:
+        >>> ipv4_to_int('10.0.0.1')
+        167772161
+    """
+    parts = ip.split('.')
+    if len(parts) != 4:
+        return None
+    
+    value = 0
+    for part in parts:
+        if not part or len(part) > 3 or not _DIGITS.issuperset(part) or (part[0] == '0' and len(part) > 1):
+            return None
+        octet = int(part)
+        if octet > 255:
+            return None
+        value = value << 8 | octet
+    
+    return value
+
+
+def _classify(ip: str) -> Tuple[bool, bool]:
+    """Return (strict public, not private) for an address string."""
+    value = ipv4_to_int(ip)
+    
+    if value is not None:
+        return _RANGE_FLAGS[bisect.bisect_right(_RANGE_STARTS, value) - 1]
+    
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False, False
+    
+    return _strict_public(address), not address.is_private
+
+
+def is_public_ip(ip: str) -> bool:
+    """
+    Check if an IP address is public (not private/local).
+    
+    Same result as checking is_private, is_loopback, is_link_local,
+    is_multicast and is_reserved with ipaddress; invalid addresses are not
+    public.
+    
+    Args:
+        ip: IP address string
+    
+    Returns:
+        True if IP is public, False otherwise
+    
+    Example:
+        >>> is_public_ip('8.8.8.8')
+        True
+        >>> is_public_ip('224.0.0.1')
+        False
+    """
+    result = _PUBLIC_MEMO.get(ip)
+    if result is None:
+        if len(_PUBLIC_MEMO) >= MAX_MEMO_ENTRIES:
+            _PUBLIC_MEMO.clear()
+        result = _PUBLIC_MEMO[ip] = _classify(ip)[0]
+    return result
+
+
+def is_not_private_ip(ip: str) -> bool:
+    """
+    Check if an IP address is not private.
+    
+    Same result as ``not ipaddress.ip_address(ip).is_private``; invalid
+    addresses give False.
+    
+    Args:
+        ip: IP address string
+    
+    Returns:
+        True if IP is valid and not private, False otherwise
+    
+    Example:
+        >>> is_not_private_ip('224.0.0.1')
+        True
+        >>> is_not_private_ip('10.0.0.1')
+        False
+    """
+    result = _NOT_PRIVATE_MEMO.get(ip)
+    if result is None:
+        if len(_NOT_PRIVATE_MEMO) >= MAX_MEMO_ENTRIES:
+            _NOT_PRIVATE_MEMO.clear()
+        result = _NOT_PRIVATE_MEMO[ip] = _classify(ip)[1]
+    return result
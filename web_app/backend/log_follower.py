@@ -0,0 +1,335 @@
+"""
+Follow a growing log file and update analyses incrementally.
+
+During live response a FortiGate syslog file keeps growing on a collector.
+LogFollower parses only the bytes appended since the previous poll and feeds
+them to the analyses, whose state is kept in a checkpoint file together with
+the byte offset reached, so a restarted follower continues where it stopped
+and the file is never reparsed.
+
+Only complete lines are parsed; a line still being written is left for the
+next poll. Log rotation is recognised in two forms:
+
+- rename (logrotate's default): the path now names a different file. The
+  rest of the old file is read if it is still in the same directory under a
+  name starting with the log's name (e.g. ``fortigate.log.1``), then the new
+  file is read from the start.
+- truncation (``copytruncate``): the file is shorter than the offset, or its
+  first bytes changed. It is read again from the start.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+try:
+    import pandas as pd
+except ImportError:
+    raise ImportError("pandas is required. Install with: pip install pandas")
+
+from compressed_io import detect_compression_bytes
+from parse_engine import Analysis, analysis_signature, iter_line_blocks
+
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+
+# Leading bytes hashed to tell a truncated or replaced file from the old one
+HEAD_BYTES = 4096
+
+# Seconds between polls
+DEFAULT_INTERVAL = 5.0
+
+# Bytes read per step when looking back for the last complete line
+_TAIL_BLOCK_SIZE = 64 * 1024
+
+
+@dataclass
+class FollowState:
+    """
+    Checkpointed position of a follower.
+    
+    Attributes:
+        path: Resolved path of the followed log
+        device: Device of the file being read (None before the first poll)
+        inode: Inode of the file being read (None before the first poll)
+        offset: Byte offset after the last complete line parsed
+        head_size: Number of leading bytes hashed in head_digest
+        head_digest: SHA-256 of the file's first head_size bytes
+        analyses: Analyses holding the results so far
+        lines_processed: Lines parsed over all polls
+        rotations: Rotations and truncations seen
+    """
+    
+    path: str
+    analyses: List[Analysis]
+    device: Optional[int] = None
+    inode: Optional[int] = None
+    offset: int = 0
+    head_size: int = 0
+    head_digest: str = ''
+    lines_processed: int = 0
+    rotations: int = 0
+    version: int = CHECKPOINT_VERSION
+
+
+@dataclass
+class PollResult:
+    """
+    Outcome of one poll.
+    
+    Attributes:
+        lines_processed: Lines parsed in this poll
+        bytes_read: Bytes consumed in this poll
+        rotated: The log was replaced by a new file
+        truncated: The log was truncated or overwritten in place
+        offset: Byte offset reached in the current file
+    """
+    
+    lines_processed: int = 0
+    bytes_read: int = 0
+    rotated: bool = False
+    truncated: bool = False
+    offset: int = 0
+    
+    @property
+    def changed(self) -> bool:
+        """Whether the analyses may have new results."""
+        return bool(self.lines_processed or self.rotated or self.truncated)
+
+
+class LogFollower:
+    """
+    Incremental parser for a log file that keeps growing.
+    
+    Example:
+        >>> follower = LogFollower('fortigate.log', [FirewallAnalysis()], 'fortigate.ckpt')
+        >>> for poll in follower.follow(interval=5):
+        ...     if poll.changed:
+        ...         print(follower.results()['firewall'].head())
+    """
+    
+    def __init__(
+        self,
+        file_path: str,
+        analyses: Sequence[Analysis],
+        checkpoint_path: Optional[str] = None
+    ) -> None:
+        """
+        Initialize the follower, resuming from a checkpoint if one exists.
+        
+        The checkpoint is a pickle of the analyses' state; only load
+        checkpoints written by this tool.
+        
+        Args:
+            file_path: Path to the log file
+            analyses: Empty analyses to update (ignored when resuming; the
+                checkpoint holds their state)
+            checkpoint_path: File to persist the state in after every poll
+                that changed it (None keeps it in memory only)
+        
+        Raises:
+            ValueError: If the checkpoint belongs to another file or other
+                analyses
+        """
+        self.path = Path(file_path).resolve()
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        
+        state = self._load_checkpoint(analyses)
+        self.state = state or FollowState(path=str(self.path), analyses=list(analyses))
+    
+    @property
+    def analyses(self) -> List[Analysis]:
+        """The analyses being updated."""
+        return self.state.analyses
+    
+    def results(self) -> Dict[str, pd.DataFrame]:
+        """Current result of each analysis, by analysis name."""
+        return {analysis.name: analysis.to_dataframe() for analysis in self.analyses}
+    
+    def _load_checkpoint(self, analyses: Sequence[Analysis]) -> Optional[FollowState]:
+        if self.checkpoint_path is None or not self.checkpoint_path.exists():
+            return None
+        
+        with open(self.checkpoint_path, 'rb') as handle:
+            state = pickle.load(handle)
+        
+        if not isinstance(state, FollowState) or state.version != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported follow checkpoint: {self.checkpoint_path}")
+        if state.path != str(self.path):
+            raise ValueError(f"Checkpoint {self.checkpoint_path} follows another file: {state.path}")
+        
+        expected = [analysis_signature(analysis) for analysis in analyses]
+        found = [analysis_signature(analysis) for analysis in state.analyses]
+        if expected != found:
+            raise ValueError(
+                f"Checkpoint {self.checkpoint_path} was written for other analyses: "
+                f"{', '.join(str(signature[0]) for signature in found)}"
+            )
+        
+        logger.info(f"Resuming {self.path} at byte {state.offset:,} from {self.checkpoint_path}")
+        return state
+    
+    def save(self) -> None:
+        """Write the checkpoint atomically."""
+        if self.checkpoint_path is None:
+            return
+        
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.checkpoint_path.with_name(f'{self.checkpoint_path.name}.{os.getpid()}.tmp')
+        with open(temp_path, 'wb') as handle:
+            pickle.dump(self.state, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.checkpoint_path)
+    
+    def poll(self) -> PollResult:
+        """
+        Parse the complete lines appended since the last poll.
+        
+        Returns:
+            PollResult of this poll
+        
+        Raises:
+            ValueError: If the log is compressed
+        """
+        result = PollResult(offset=self.state.offset)
+        
+        try:
+            handle = open(self.path, 'rb')
+        except FileNotFoundError:
+            # Between a rotation's rename and the creation of the new file
+            return result
+        
+        with handle:
+            info = os.fstat(handle.fileno())
+            state = self.state
+            
+            if state.inode is None:
+                if detect_compression_bytes(handle.read(6)):
+                    raise ValueError(f"Follow mode needs an uncompressed log: {self.path}")
+                self._start_file(info)
+            elif (info.st_dev, info.st_ino) != (state.device, state.inode):
+                self._finish_rotated(result)
+                self._start_file(info)
+                result.rotated = True
+            elif info.st_size < state.offset or not self._same_head(handle):
+                logger.warning(f"{self.path} was truncated; reading it again from the start")
+                self._start_file(info)
+                result.truncated = True
+            
+            end = self._complete_end(handle, state.offset, info.st_size)
+            self._feed(handle, state.offset, end, result)
+            state.offset = end
+            self._update_head(handle, info.st_size)
+        
+        if result.rotated or result.truncated:
+            self.state.rotations += 1
+        result.offset = self.state.offset
+        
+        if result.changed:
+            self.save()
+        return result
+    
+    def follow(
+        self,
+        interval: float = DEFAULT_INTERVAL,
+        max_polls: Optional[int] = None,
+        sleep: Callable[[float], None] = time.sleep
+    ) -> Iterator[PollResult]:
+        """
+        Poll the log repeatedly.
+        
+        Args:
+            interval: Seconds to wait between polls
+            max_polls: Stop after this many polls (None: run until the
+                caller stops iterating)
+            sleep: Function used to wait (tests pass a fake)
+        
+        Yields:
+            PollResult of each poll
+        """
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            yield self.poll()
+            polls += 1
+            if max_polls is None or polls < max_polls:
+                sleep(interval)
+    
+    def _start_file(self, info: os.stat_result) -> None:
+        state = self.state
+        state.device, state.inode = info.st_dev, info.st_ino
+        state.offset = 0
+        state.head_size = 0
+        state.head_digest = ''
+    
+    def _feed(self, handle, start: int, end: Optional[int], result: PollResult) -> None:
+        if end is not None and end <= start:
+            return
+        
+        feeds = [analysis.feed for analysis in self.analyses]
+        # iter_line_blocks only seeks for non-zero offsets
+        handle.seek(start)
+        for lines, consumed in iter_line_blocks(handle, start, end):
+            for line in lines:
+                for feed in feeds:
+                    feed(line)
+            result.lines_processed += len(lines)
+            result.bytes_read += consumed
+            self.state.lines_processed += len(lines)
+    
+    def _finish_rotated(self, result: PollResult) -> None:
+        """Read the rest of the file that was rotated away, if it can be found."""
+        state = self.state
+        
+        for entry in os.scandir(self.path.parent):
+            if not entry.name.startswith(self.path.name) or entry.name == self.path.name:
+                continue
+            try:
+                info = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if (info.st_dev, info.st_ino) != (state.device, state.inode):
+                continue
+            
+            with open(entry.path, 'rb') as handle:
+                if detect_compression_bytes(handle.read(6)):
+                    break
+                # The rotated file is complete, so its last line is too
+                self._feed(handle, state.offset, None, result)
+            logger.info(f"{self.path} was rotated; read the rest of {entry.name}")
+            return
+        
+        logger.warning(f"{self.path} was rotated and the old file was not found; its last lines may be missed")
+    
+    def _same_head(self, handle) -> bool:
+        if not self.state.head_size:
+            return True
+        handle.seek(0)
+        head = handle.read(self.state.head_size)
+        return hashlib.sha256(head).hexdigest() == self.state.head_digest
+    
+    def _update_head(self, handle, size: int) -> None:
+        head_size = min(size, HEAD_BYTES)
+        if head_size > self.state.head_size:
+            handle.seek(0)
+            self.state.head_digest = hashlib.sha256(handle.read(head_size)).hexdigest()
+            self.state.head_size = head_size
+    
+    @staticmethod
+    def _complete_end(handle, start: int, size: int) -> int:
+        """Offset just after the last newline in [start, size), or start if there is none."""
+        position = size
+        while position > start:
+            block_start = max(start, position - _TAIL_BLOCK_SIZE)
+            handle.seek(block_start)
+            block = handle.read(position - block_start)
+            cut = block.rfind(b'\n')
+            if cut >= 0:
+                return block_start + cut + 1
+            position = block_start
+        return start
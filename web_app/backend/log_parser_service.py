@@ -5,11 +5,30 @@ This module provides a service class for parsing Fortinet VPN and firewall logs
 with type hints, error handling, and logging support.
 """
 
-import re
 import logging
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-import ipaddress
+from typing import BinaryIO, Callable, Dict, Any, Iterator, List, Optional, Sequence
+
+from parse_engine import (
+    run_analyses,
+    scan_stream,
+    stream_analysis,
+    create_analysis,
+    Analysis,
+    VPNLoginAnalysis,
+    FirewallAnalysis,
+    FirewallTimelineAnalysis,
+    ShutdownAnalysis,
+    StatisticsAnalysis,
+    STREAM_BATCH_ROWS,
+)
+from result_writer import ExportResult, open_writer, resolve_format, write_result
+from shutdown_index import ShutdownIndex, ShutdownIndexStore
+from ip_classifier import is_public_ip
+from evidence_bundle import BundleResult, DEFAULT_MAX_EXTRACT_BYTES, parse_bundle
+from log_follower import DEFAULT_INTERVAL, LogFollower
+from scan_checkpoint import ScanCheckpoint
+from scan_progress import ScanProgress
 
 try:
     import pandas as pd
@@ -24,6 +43,7 @@ class LogParserService:
     This class provides methods to parse:
     - VPN login logs (successful logins)
     - Firewall traffic logs (aggregated by destination IP)
+    - Firewall traffic timelines (aggregated by destination IP and time bucket)
     - VPN shutdown sessions (filtered by user)
     
     Example:
@@ -32,48 +52,39 @@ class LogParserService:
         >>> print(f"Found {len(df)} successful logins")
     """
     
-    def __init__(self, logger: Optional[logging.Logger] = None):
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        shutdown_index: Optional[ShutdownIndexStore] = None
+    ):
         """
         Initialize the log parser service.
         
         Args:
             logger: Optional logger instance for debug output
+            shutdown_index: Optional index store; when set, VPN shutdown
+                lookups index all users of a file once and reuse the index
         """
         self.logger = logger or logging.getLogger(__name__)
-        
-        # Pre-compile regex patterns for better performance
-        self._vpn_patterns = {
-            'date': re.compile(r'date=(\S+)'),
-            'time': re.compile(r'time=(\S+)'),
-            'user': re.compile(r'user="([^"]+)"'),
-            'tunneltype': re.compile(r'tunneltype="([^"]+)"'),
-            'remip': re.compile(r'remip=([\d\.]+)'),
-            'reason': re.compile(r'reason="([^"]+)"'),
-            'msg': re.compile(r'msg="([^"]+)"')
-        }
-        
-        self._firewall_patterns = {
-            'dstip': re.compile(r'dstip=([\d\.]+)'),
-            'sentbyte': re.compile(r'sentbyte=(\d+)')
-        }
-        
-        self._shutdown_patterns = {
-            'date': re.compile(r'date=(\S+)'),
-            'time': re.compile(r'time=(\S+)'),
-            'user': re.compile(r'user="([^"]+)"', flags=re.IGNORECASE),
-            'sentbyte': re.compile(r'sentbyte=(\d+)'),
-            'msg': re.compile(r'msg="([^"]+)"')
-        }
+        self.shutdown_index = shutdown_index
     
-    def parse_vpn_logs(self, file_path: str) -> pd.DataFrame:
+    def parse_vpn_logs(
+        self,
+        file_path: str,
+        workers: int = 1,
+        progress: Optional[Callable[[ScanProgress], None]] = None
+    ) -> pd.DataFrame:
         """
         Parse VPN logs and extract successful login details.
         
         Args:
             file_path: Path to the VPN log file
+            workers: Number of worker processes (1 parses in this process)
+            progress: Optional function called with the parse progress
+                (see scan_progress)
             
         Returns:
-            DataFrame with columns: date, time, user, tunneltype, remip, reason, msg
+            DataFrame with columns: date, time, user, tunneltype, remip, reason, msg, epoch
             
         Raises:
             FileNotFoundError: If input file doesn't exist
@@ -83,7 +94,7 @@ class LogParserService:
             >>> parser = LogParserService()
             >>> df = parser.parse_vpn_logs('vpn_logs.txt')
             >>> print(df.columns.tolist())
-            ['date', 'time', 'user', 'tunneltype', 'remip', 'reason', 'msg']
+            ['date', 'time', 'user', 'tunneltype', 'remip', 'reason', 'msg', 'epoch']
         """
         path = Path(file_path)
         
@@ -95,56 +106,20 @@ class LogParserService:
         
         self.logger.info(f"Parsing VPN logs from: {file_path}")
         
-        extracted_data: List[List[str]] = []
-        lines_processed = 0
-        lines_matched = 0
+        analysis = VPNLoginAnalysis()
         
         try:
-            with open(path, 'r', encoding='utf-8', errors='replace') as file:
-                for line in file:
-                    lines_processed += 1
-                    
-                    # Extract all fields using pre-compiled patterns
-                    matches = {}
-                    for key, pattern in self._vpn_patterns.items():
-                        match = pattern.search(line)
-                        matches[key] = match.group(1) if match else None
-                    
-                    # Check if all required fields exist
-                    if all(matches.values()):
-                        reason = matches['reason']
-                        
-                        # Only keep successful logins
-                        if reason.lower() == "login successfully":
-                            extracted_data.append([
-                                matches['date'],
-                                matches['time'],
-                                matches['user'],
-                                matches['tunneltype'],
-                                matches['remip'],
-                                reason,
-                                matches['msg']
-                            ])
-                            lines_matched += 1
-                            
-                            if lines_processed % 50000 == 0:
-                                self.logger.debug(f"Processed {lines_processed:,} lines...")
-        
+            stats = run_analyses(str(path), [analysis], workers=workers, progress=progress)
         except Exception as e:
             self.logger.error(f"Error parsing VPN logs: {e}")
             raise
         
         self.logger.info(
-            f"VPN parsing complete: {lines_processed:,} lines processed, "
-            f"{lines_matched:,} successful logins found"
-        )
-        
-        df = pd.DataFrame(
-            extracted_data,
-            columns=['date', 'time', 'user', 'tunneltype', 'remip', 'reason', 'msg']
+            f"VPN parsing complete: {stats.lines_processed:,} lines processed, "
+            f"{analysis.lines_matched:,} successful logins found"
         )
         
-        return df
+        return analysis.to_dataframe()
     
     def is_public_ip(self, ip: str) -> bool:
         """
@@ -163,41 +138,53 @@ class LogParserService:
             >>> parser.is_public_ip('192.168.1.1')
             False
         """
-        try:
-            ip_obj = ipaddress.ip_address(ip)
-            # Check if it's private (includes local, link-local, etc.)
-            return not (
-                ip_obj.is_private or
-                ip_obj.is_loopback or
-                ip_obj.is_link_local or
-                ip_obj.is_multicast or
-                ip_obj.is_reserved
-            )
-        except ValueError:
-            self.logger.debug(f"Invalid IP address: {ip}")
-            return False
+        # Range-table lookup with the same results as the ipaddress checks
+        return is_public_ip(ip)
     
-    def parse_firewall_logs(self, file_path: str) -> pd.DataFrame:
+    def parse_firewall_logs(
+        self,
+        file_path: str,
+        workers: int = 1,
+        top: Optional[int] = None,
+        approximate: bool = False,
+        checkpoint: Optional[ScanCheckpoint] = None,
+        progress: Optional[Callable[[ScanProgress], None]] = None
+    ) -> pd.DataFrame:
         """
         Parse firewall logs and aggregate traffic by destination IP.
         
         This method filters out private/local IP addresses and calculates
         total bytes transferred to each public destination IP.
         
+        With ``top``, only the K destinations with the most bytes sent are
+        returned. ``approximate`` counts them in a fixed-size Space-Saving
+        summary instead of one total per destination, bounding memory on
+        logs with millions of destinations; totals may then be overstated by
+        at most the ``max_overcount`` column.
+        
         Args:
             file_path: Path to the firewall log file
+            workers: Number of worker processes (1 parses in this process)
+            top: Number of destinations to return (default: all)
+            approximate: Use the fixed-size summary (requires top)
+            checkpoint: Optional checkpoint to resume from and save progress
+                to (see scan_checkpoint)
+            progress: Optional function called with the parse progress
+                (see scan_progress)
             
         Returns:
-            DataFrame with columns: dstip, total_sentbyte, size_mb
+            DataFrame with columns: dstip, total_sentbyte, size_mb (and
+            max_overcount when approximate)
             Sorted by total_sentbyte in descending order
             
         Raises:
             FileNotFoundError: If input file doesn't exist
-            ValueError: If file format is invalid
+            ValueError: If file format is invalid, top is not positive or
+                approximate is set without top
             
         Example:
             >>> parser = LogParserService()
-            >>> df = parser.parse_firewall_logs('firewall_logs.txt')
+            >>> df = parser.parse_firewall_logs('firewall_logs.txt', workers=8, top=100, approximate=True)
             >>> print(df.head())
         """
         path = Path(file_path)
@@ -210,65 +197,95 @@ class LogParserService:
         
         self.logger.info(f"Parsing firewall logs from: {file_path}")
         
-        data: Dict[str, int] = {}
-        lines_processed = 0
-        lines_matched = 0
-        private_ips_skipped = 0
+        analysis = FirewallAnalysis(top=top, approximate=approximate)
         
         try:
-            with open(path, 'r', encoding='utf-8', errors='replace') as file:
-                for line in file:
-                    lines_processed += 1
-                    
-                    dstip_match = self._firewall_patterns['dstip'].search(line)
-                    sentbyte_match = self._firewall_patterns['sentbyte'].search(line)
-                    
-                    if dstip_match and sentbyte_match:
-                        dstip = dstip_match.group(1)
-                        
-                        # Validate IP format
-                        if not dstip.replace('.', '').isdigit():
-                            continue
-                        
-                        # Only include public IPs
-                        if self.is_public_ip(dstip):
-                            try:
-                                sentbyte = int(sentbyte_match.group(1))
-                                data[dstip] = data.get(dstip, 0) + sentbyte
-                                lines_matched += 1
-                            except ValueError:
-                                self.logger.debug(f"Invalid sentbyte value in line {lines_processed}")
-                                continue
-                        else:
-                            private_ips_skipped += 1
-                    
-                    if lines_processed % 50000 == 0:
-                        self.logger.debug(f"Processed {lines_processed:,} lines...")
-        
+            stats = run_analyses(str(path), [analysis], workers=workers, checkpoint=checkpoint, progress=progress)
         except Exception as e:
             self.logger.error(f"Error parsing firewall logs: {e}")
             raise
         
         self.logger.info(
-            f"Firewall parsing complete: {lines_processed:,} lines processed, "
-            f"{lines_matched:,} public IP entries found, "
-            f"{private_ips_skipped:,} private IPs skipped"
+            f"Firewall parsing complete: {stats.lines_processed:,} lines processed, "
+            f"{analysis.lines_matched:,} public IP entries found, "
+            f"{analysis.private_ips_skipped:,} private IPs skipped"
         )
         
-        df = pd.DataFrame(list(data.items()), columns=['dstip', 'total_sentbyte'])
+        return analysis.to_dataframe()
+    
+    def parse_firewall_timeline(
+        self,
+        file_path: str,
+        bucket: str = 'hour',
+        workers: int = 1,
+        checkpoint: Optional[ScanCheckpoint] = None,
+        progress: Optional[Callable[[ScanProgress], None]] = None
+    ) -> pd.DataFrame:
+        """
+        Parse firewall logs into sent and received bytes per destination IP and time bucket.
+        
+        The file is read once; each line is added to the totals of its
+        bucket, so memory depends on the number of (bucket, destination)
+        pairs rather than on the file size. Buckets are aligned to UTC and
+        line times follow the epoch column rules (eventtime, else date and
+        time in the tz offset).
+        
+        Args:
+            file_path: Path to the firewall log file
+            bucket: Bucket size: 'minute', 'hour', 'day' or a size such as '15m'
+            workers: Number of worker processes (1 parses in this process)
+            checkpoint: Optional checkpoint to resume from and save progress
+                to (see scan_checkpoint)
+            progress: Optional function called with the parse progress
+                (see scan_progress)
         
-        # Convert bytes to megabytes
-        df['size_mb'] = df['total_sentbyte'] / (1024 * 1024)
+        Returns:
+            DataFrame with columns: bucket, epoch, dstip, total_sentbyte,
+            total_rcvdbyte, lines, size_mb; ordered by bucket, then by
+            total_sentbyte in descending order
         
-        # Sort by total bytes in descending order
-        df = df.sort_values(by='total_sentbyte', ascending=False)
+        Raises:
+            FileNotFoundError: If input file doesn't exist
+            ValueError: If the file or the bucket size is invalid
         
-        return df.reset_index(drop=True)
+        Example:
+            >>> parser = LogParserService()
+            >>> df = parser.parse_firewall_timeline('firewall_logs.txt', bucket='15m', workers=8)
+            >>> print(df[df['dstip'] == '203.0.113.9'][['bucket', 'size_mb']])
+        """
+        path = Path(file_path)
+        
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        if not path.is_file():
+            raise ValueError(f"Not a file: {file_path}")
+        
+        analysis = FirewallTimelineAnalysis(bucket)
+        
+        self.logger.info(f"Building {bucket} firewall timeline from: {file_path}")
+        
+        try:
+            stats = run_analyses(str(path), [analysis], workers=workers, checkpoint=checkpoint, progress=progress)
+        except Exception as e:
+            self.logger.error(f"Error building firewall timeline: {e}")
+            raise
+        
+        self.logger.info(
+            f"Firewall timeline complete: {stats.lines_processed:,} lines processed, "
+            f"{analysis.lines_matched:,} public IP entries in {len(analysis.groups):,} rows, "
+            f"{analysis.private_ips_skipped:,} private IPs and "
+            f"{analysis.untimed_skipped:,} entries without a valid time skipped"
+        )
+        
+        return analysis.to_dataframe()
     
     def parse_vpn_shutdown_sentbytes(
         self, 
         file_path: str, 
-        target_user: str
+        target_user: str,
+        workers: int = 1,
+        progress: Optional[Callable[[ScanProgress], None]] = None
     ) -> pd.DataFrame:
         """
         Parse VPN shutdown sessions for a specific user.
@@ -279,9 +296,12 @@ class LogParserService:
         Args:
             file_path: Path to the VPN log file
             target_user: Username to filter (case-insensitive)
+            workers: Number of worker processes (1 parses in this process)
+            progress: Optional function called with the parse progress
+                (also while the shutdown index is built)
             
         Returns:
-            DataFrame with columns: date, time, user, sentbyte, sent_bytes_in_MB
+            DataFrame with columns: date, time, user, sentbyte, sent_bytes_in_MB, epoch
             
         Raises:
             FileNotFoundError: If input file doesn't exist
@@ -308,68 +328,533 @@ class LogParserService:
         self.logger.info(f"Parsing VPN shutdown sessions from: {file_path}")
         self.logger.info(f"Filtering for user: {target_user}")
         
-        extracted_data: List[List[Any]] = []
-        lines_processed = 0
-        lines_matched = 0
+        if self.shutdown_index is not None:
+            df = self.get_shutdown_index(str(path), workers=workers, progress=progress).lookup(target_user_clean)
+            self.logger.info(f"VPN shutdown index lookup: {len(df):,} sessions found for user '{target_user}'")
+            return df
         
-        try:
-            with open(path, 'r', encoding='utf-8', errors='replace') as file:
-                for line in file:
-                    lines_processed += 1
-                    
-                    # Check for shutdown message
-                    msg_match = self._shutdown_patterns['msg'].search(line)
-                    
-                    if msg_match and msg_match.group(1) == "SSL tunnel shutdown":
-                        # Filter by user
-                        user_match = self._shutdown_patterns['user'].search(line)
-                        
-                        if user_match and user_match.group(1).lower() == target_user_clean:
-                            date_match = self._shutdown_patterns['date'].search(line)
-                            time_match = self._shutdown_patterns['time'].search(line)
-                            sentbyte_match = self._shutdown_patterns['sentbyte'].search(line)
-                            
-                            if all([date_match, time_match, sentbyte_match]):
-                                try:
-                                    sentbyte = int(sentbyte_match.group(1))
-                                    extracted_data.append([
-                                        date_match.group(1),
-                                        time_match.group(1),
-                                        user_match.group(1),
-                                        sentbyte,
-                                        sentbyte / (1024 * 1024)
-                                    ])
-                                    lines_matched += 1
-                                except ValueError:
-                                    self.logger.debug(f"Invalid sentbyte value in line {lines_processed}")
-                                    continue
-                    
-                    if lines_processed % 50000 == 0:
-                        self.logger.debug(f"Processed {lines_processed:,} lines...")
+        analysis = ShutdownAnalysis(target_user_clean)
         
+        try:
+            stats = run_analyses(str(path), [analysis], workers=workers, progress=progress)
         except Exception as e:
             self.logger.error(f"Error parsing VPN shutdown logs: {e}")
             raise
         
         self.logger.info(
-            f"VPN shutdown parsing complete: {lines_processed:,} lines processed, "
-            f"{lines_matched:,} sessions found for user '{target_user}'"
+            f"VPN shutdown parsing complete: {stats.lines_processed:,} lines processed, "
+            f"{analysis.lines_matched:,} sessions found for user '{target_user}'"
+        )
+        
+        return analysis.to_dataframe()
+    
+    def get_shutdown_index(
+        self,
+        file_path: str,
+        workers: int = 1,
+        progress: Optional[Callable[[ScanProgress], None]] = None
+    ) -> ShutdownIndex:
+        """
+        Get the all-users VPN shutdown index for a log file.
+        
+        With an index store the index is built once per file content and
+        reused; without one it is built on every call.
+        
+        Args:
+            file_path: Path to the VPN log file
+            workers: Number of worker processes used if the index is built
+            progress: Optional progress callback used if the index is built
+        
+        Returns:
+            ShutdownIndex with the sessions of every user
+        
+        Raises:
+            FileNotFoundError: If input file doesn't exist
+        
+        Example:
+            >>> parser = LogParserService(shutdown_index=ShutdownIndexStore('indexes'))
+            >>> index = parser.get_shutdown_index('vpn_logs.txt')
+            >>> print(index.lookup('john.doe'))
+        """
+        path = Path(file_path)
+        
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        try:
+            if self.shutdown_index is not None:
+                return self.shutdown_index.get(str(path), workers=workers, progress=progress)
+            return ShutdownIndex.build(str(path), workers=workers, progress=progress)
+        except Exception as e:
+            self.logger.error(f"Error indexing VPN shutdown sessions: {e}")
+            raise
+    
+    def parse_vpn_shutdown_all_users(self, file_path: str, workers: int = 1) -> pd.DataFrame:
+        """
+        Summarize VPN shutdown sessions for every user in one pass.
+        
+        Args:
+            file_path: Path to the VPN log file
+            workers: Number of worker processes (1 parses in this process)
+        
+        Returns:
+            DataFrame with columns: user, sessions, sentbyte, sent_bytes_in_MB
+        
+        Raises:
+            FileNotFoundError: If input file doesn't exist
+        
+        Example:
+            >>> parser = LogParserService()
+            >>> df = parser.parse_vpn_shutdown_all_users('vpn_logs.txt')
+            >>> print(df.head())
+        """
+        self.logger.info(f"Indexing VPN shutdown sessions for all users from: {file_path}")
+        
+        df = self.get_shutdown_index(file_path, workers=workers).totals()
+        
+        self.logger.info(f"VPN shutdown sessions found for {len(df):,} users")
+        
+        return df
+    
+    def export_results(
+        self,
+        file_path: str,
+        analysis: str,
+        output_path: str,
+        output_format: Optional[str] = None,
+        target_user: Optional[str] = None,
+        workers: int = 1,
+        batch_rows: int = STREAM_BATCH_ROWS,
+        mirror: Optional[Any] = None,
+        bucket: Optional[str] = None,
+        top: Optional[int] = None,
+        approximate: bool = False,
+        checkpoint: Optional[ScanCheckpoint] = None,
+        progress: Optional[Callable[[ScanProgress], None]] = None,
+        statistics: bool = False
+    ) -> ExportResult:
+        """
+        Parse a log file and write one analysis result to a file.
+        
+        VPN login and shutdown rows are written to the output file in
+        batches while the log is being parsed, so large results are never
+        held in memory as a whole. Firewall totals and timelines are sorted
+        at the end and are written once parsing completes.
+        
+        Args:
+            file_path: Path to the log file
+            analysis: Analysis name: 'vpn', 'firewall', 'firewall_timeline'
+                or 'vpn_shutdown'
+            output_path: Output path (overwritten)
+            output_format: 'csv', 'ndjson', 'parquet' or 'feather'; None
+                uses the suffix of output_path (CSV for other suffixes)
+            target_user: Username filter, required for 'vpn_shutdown'
+            workers: Number of worker processes (1 parses in this process)
+            batch_rows: Rows buffered before a batch is written
+            mirror: Optional second sink that receives every written batch
+                (e.g. result_pages.PageWriter)
+            bucket: Bucket size for 'firewall_timeline' (default 'hour')
+            top: Number of destinations kept by 'firewall' (default: all)
+            approximate: Approximate top-K for 'firewall' (see
+                parse_firewall_logs)
+            checkpoint: Optional checkpoint for 'firewall' and
+                'firewall_timeline' (see scan_checkpoint); rows streamed to
+                the output file are not checkpointed
+            progress: Optional function called with the parse progress
+                (see scan_progress)
+            statistics: Also compute the statistics of get_statistics() in
+                the same pass; streamed rows are summarized while they are
+                parsed (see stream_statistics)
+        
+        Returns:
+            ExportResult with the record count, preview, column totals and
+            requested statistics; its frame is None when rows were streamed
+            during parsing
+        
+        Raises:
+            FileNotFoundError: If input file doesn't exist
+            ValueError: If the analysis name or output format is unknown, or
+                target_user is missing
+        
+        Example:
+            >>> parser = LogParserService()
+            >>> result = parser.export_results('vpn_logs.txt', 'vpn', 'vpn_logins.parquet', workers=8)
+            >>> print(f"{result.records:,} logins written to {result.path}")
+        """
+        runner = self._create_runners([analysis], target_user, bucket)[0]
+        output_format = resolve_format(output_format, output_path)
+        
+        if runner.name == 'firewall':
+            df = self.parse_firewall_logs(
+                file_path, workers=workers, top=top, approximate=approximate,
+                checkpoint=checkpoint, progress=progress
+            )
+        elif runner.name == 'firewall_timeline':
+            df = self.parse_firewall_timeline(
+                file_path, bucket=runner.bucket, workers=workers, checkpoint=checkpoint, progress=progress
+            )
+        elif runner.name == 'vpn_shutdown' and self.shutdown_index is not None:
+            # Index lookups return one user's sessions; there is nothing to stream
+            df = self.parse_vpn_shutdown_sentbytes(file_path, target_user, workers=workers, progress=progress)
+        else:
+            return self._stream_export(
+                file_path, runner, output_path, output_format, workers, batch_rows, mirror, progress, statistics
+            )
+        
+        result = write_result(df, output_path, output_format, mirror=mirror)
+        if statistics:
+            # The result is in memory, so its statistics are exact
+            result.statistics = self.get_statistics(df, runner.name)
+        return result
+    
+    def _stream_export(
+        self,
+        file_path: str,
+        runner: Analysis,
+        output_path: str,
+        output_format: str,
+        workers: int,
+        batch_rows: int,
+        mirror: Optional[Any],
+        progress: Optional[Callable[[ScanProgress], None]],
+        statistics: bool
+    ) -> ExportResult:
+        """Stream the rows of a VPN login or shutdown analysis to the output file."""
+        path = Path(file_path)
+        
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        if not path.is_file():
+            raise ValueError(f"Not a file: {file_path}")
+        
+        self.logger.info(f"Streaming {runner.name} results from {file_path} to {output_path}")
+        
+        # Summarizes the rows as they are parsed, since they are not kept
+        summary = [StatisticsAnalysis(runner.name, getattr(runner, 'target_user', None))] if statistics else []
+        
+        try:
+            with open_writer(output_path, runner.columns, output_format, mirror=mirror) as writer:
+                stats, df = stream_analysis(
+                    str(path), runner, writer, workers=workers, batch_rows=batch_rows, progress=progress,
+                    alongside=summary
+                )
+        except Exception as e:
+            self.logger.error(f"Error exporting {runner.name} results: {e}")
+            raise
+        
+        self.logger.info(
+            f"Export complete: {stats.lines_processed:,} lines processed, "
+            f"{writer.rows_written:,} rows written"
         )
         
-        df = pd.DataFrame(
-            extracted_data,
-            columns=['date', 'time', 'user', 'sentbyte', 'sent_bytes_in_MB']
+        result = writer.result(df)
+        if summary:
+            result.statistics = summary[0].statistics()
+        return result
+    
+    def stream_statistics(
+        self,
+        file_path: str,
+        log_type: str,
+        target_user: Optional[str] = None,
+        workers: int = 1,
+        bucket: str = 'hour'
+    ) -> Dict[str, Any]:
+        """
+        Compute result statistics while parsing, without building the result.
+        
+        Returns the statistics of get_statistics() for the result of
+        ``log_type``, accumulated line by line in fixed-size, mergeable
+        sketches, so no rows are held in memory however large the file is.
+        Distinct counts (within about 1%), quantiles (within 1%) and top
+        lists are estimates; sums, means and session counts are exact.
+        
+        Args:
+            file_path: Path to the log file
+            log_type: 'vpn', 'firewall', 'firewall_timeline' or 'vpn_shutdown'
+            target_user: Username filter for 'vpn_shutdown' (None: all users)
+            workers: Number of worker processes (1 parses in this process)
+            bucket: Bucket size for 'firewall_timeline'
+        
+        Returns:
+            Dictionary of statistics, with sentbyte quantiles (p50, p90,
+            p99) under 'sentbyte_quantiles' where lines carry sentbyte
+        
+        Raises:
+            FileNotFoundError: If input file doesn't exist
+            ValueError: If the log type or bucket size is invalid
+        
+        Example:
+            >>> parser = LogParserService()
+            >>> stats = parser.stream_statistics('firewall_logs.txt', 'firewall', workers=8)
+            >>> print(stats['total_records'], stats['sentbyte_quantiles']['p99'])
+        """
+        path = Path(file_path)
+        
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        if not path.is_file():
+            raise ValueError(f"Not a file: {file_path}")
+        
+        analysis = StatisticsAnalysis(log_type, target_user, bucket=bucket)
+        
+        self.logger.info(f"Computing {analysis.log_type} statistics from: {file_path}")
+        
+        try:
+            stats = run_analyses(str(path), [analysis], workers=workers)
+        except Exception as e:
+            self.logger.error(f"Error computing statistics: {e}")
+            raise
+        
+        self.logger.info(
+            f"Statistics complete: {stats.lines_processed:,} lines processed, "
+            f"{analysis.lines_matched:,} lines matched"
+        )
+        
+        return analysis.statistics()
+    
+    def analyze(
+        self,
+        file_path: str,
+        analyses: Sequence[str],
+        target_user: Optional[str] = None,
+        workers: int = 1,
+        checkpoint: Optional[ScanCheckpoint] = None,
+        progress: Optional[Callable[[ScanProgress], None]] = None
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Run several analyses over a log file in a single pass.
+        
+        The file is read and each line is checked once for every requested
+        analysis, instead of one full read per analysis.
+        
+        Args:
+            file_path: Path to the log file
+            analyses: Analysis names: 'vpn', 'firewall', 'vpn_shutdown'
+            target_user: Username filter, required for 'vpn_shutdown'
+            workers: Number of worker processes (1 parses in this process)
+            checkpoint: Optional checkpoint to resume from and save progress
+                to (see scan_checkpoint)
+            progress: Optional function called with the parse progress
+                (see scan_progress)
+        
+        Returns:
+            Dictionary mapping each analysis name to its result DataFrame
+        
+        Raises:
+            FileNotFoundError: If input file doesn't exist
+            ValueError: If an analysis name is unknown or no analysis is requested
+        
+        Example:
+            >>> parser = LogParserService()
+            >>> results = parser.analyze('fortigate.log', ['vpn', 'firewall'])
+            >>> print(len(results['vpn']), len(results['firewall']))
+        """
+        path = Path(file_path)
+        
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        if not path.is_file():
+            raise ValueError(f"Not a file: {file_path}")
+        
+        runners = self._create_runners(analyses, target_user)
+        
+        self.logger.info(f"Running {', '.join(runner.name for runner in runners)} on: {file_path}")
+        
+        try:
+            stats = run_analyses(str(path), runners, workers=workers, checkpoint=checkpoint, progress=progress)
+        except Exception as e:
+            self.logger.error(f"Error running combined analysis: {e}")
+            raise
+        
+        self.logger.info(
+            f"Combined parsing complete: {stats.lines_processed:,} lines processed, " +
+            ", ".join(f"{runner.name}={runner.lines_matched:,}" for runner in runners)
         )
         
-        return df.reset_index(drop=True)
+        return {runner.name: runner.to_dataframe() for runner in runners}
+    
+    def analyze_stream(
+        self,
+        stream: BinaryIO,
+        analyses: Sequence[str],
+        target_user: Optional[str] = None
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Run several analyses over a log stream as it is read.
+        
+        Used for uploads: lines are parsed while the rest of the request
+        body is still being received, without writing the file to disk.
+        
+        Args:
+            stream: Binary stream with a ``read(size)`` method
+            analyses: Analysis names: 'vpn', 'firewall', 'vpn_shutdown'
+            target_user: Username filter, required for 'vpn_shutdown'
+        
+        Returns:
+            Dictionary mapping each analysis name to its result DataFrame
+        
+        Raises:
+            ValueError: If an analysis name is unknown or no analysis is requested
+        
+        Example:
+            >>> parser = LogParserService()
+            >>> with open('fortigate.log', 'rb') as stream:
+            ...     results = parser.analyze_stream(stream, ['vpn'])
+        """
+        runners = self._create_runners(analyses, target_user)
+        
+        self.logger.info(f"Streaming {', '.join(runner.name for runner in runners)}")
+        
+        try:
+            stats = scan_stream(stream, runners)
+        except Exception as e:
+            self.logger.error(f"Error parsing log stream: {e}")
+            raise
+        
+        self.logger.info(
+            f"Stream parsing complete: {stats.lines_processed:,} lines, {stats.bytes_read:,} bytes, " +
+            ", ".join(f"{runner.name}={runner.lines_matched:,}" for runner in runners)
+        )
+        
+        return {runner.name: runner.to_dataframe() for runner in runners}
+    
+    def analyze_bundle(
+        self,
+        inputs: Sequence[str],
+        analyses: Sequence[str],
+        target_user: Optional[str] = None,
+        workers: int = 1,
+        max_bytes: int = DEFAULT_MAX_EXTRACT_BYTES
+    ) -> BundleResult:
+        """
+        Run several analyses over a bundle of evidence files.
+        
+        Inputs may be log files, CSV exports, directories or zip/tar
+        archives. The format of each file is detected separately, files are
+        parsed in parallel and the results are merged per analysis.
+        
+        Args:
+            inputs: Paths to the evidence files or archives
+            analyses: Analysis names: 'vpn', 'firewall', 'vpn_shutdown'
+            target_user: Username filter, required for 'vpn_shutdown'
+            workers: Number of worker processes (1 parses in this process)
+            max_bytes: Total bytes that may be extracted from archives
+        
+        Returns:
+            BundleResult with one merged DataFrame per analysis and the
+            per-file formats and errors
+        
+        Raises:
+            FileNotFoundError: If an input doesn't exist
+            ValueError: If the analyses are invalid or the archives exceed the limits
+        
+        Example:
+            >>> parser = LogParserService()
+            >>> result = parser.analyze_bundle(['incident.zip'], ['vpn', 'firewall'], workers=8)
+            >>> print(len(result.frames['vpn']))
+        """
+        self._create_runners(analyses, target_user)
+        
+        self.logger.info(f"Parsing evidence bundle: {', '.join(str(path) for path in inputs)}")
+        
+        try:
+            result = parse_bundle(inputs, analyses, target_user=target_user, workers=workers, max_bytes=max_bytes)
+        except Exception as e:
+            self.logger.error(f"Error parsing evidence bundle: {e}")
+            raise
+        
+        self.logger.info(
+            f"Bundle parsing complete: {len(result.members):,} files, {len(result.failed):,} failed, " +
+            ", ".join(f"{name}={len(df):,}" for name, df in result.frames.items())
+        )
+        
+        return result
+    
+    def follow(
+        self,
+        file_path: str,
+        analyses: Sequence[str],
+        checkpoint_path: Optional[str] = None,
+        target_user: Optional[str] = None,
+        interval: float = DEFAULT_INTERVAL,
+        max_polls: Optional[int] = None
+    ) -> Iterator[Dict[str, pd.DataFrame]]:
+        """
+        Follow a growing log file and yield updated results.
+        
+        Each poll parses only the lines appended since the previous one
+        (see log_follower), so the file is never reparsed. With a
+        checkpoint the analyses' state and byte offset survive restarts,
+        and log rotation by rename or truncation is handled.
+        
+        Args:
+            file_path: Path to the log file
+            analyses: Analysis names: 'vpn', 'firewall', 'firewall_timeline'
+                and/or 'vpn_shutdown'
+            checkpoint_path: File the state is saved in after every change
+            target_user: Username filter, required for 'vpn_shutdown'
+            interval: Seconds between polls
+            max_polls: Stop after this many polls (None: run until the
+                caller stops iterating)
+        
+        Yields:
+            Dictionary mapping each analysis name to its result so far,
+            after every poll that parsed new lines
+        
+        Raises:
+            ValueError: If an analysis name is unknown, the log is
+                compressed or the checkpoint belongs to other analyses
+        
+        Example:
+            >>> parser = LogParserService()
+            >>> for results in parser.follow('fortigate.log', ['vpn', 'firewall'], 'fortigate.ckpt'):
+            ...     print(results['firewall'].head())
+        """
+        follower = LogFollower(file_path, self._create_runners(analyses, target_user), checkpoint_path)
+        
+        self.logger.info(f"Following {file_path} from byte {follower.state.offset:,}")
+        
+        for poll in follower.follow(interval, max_polls):
+            if poll.changed:
+                self.logger.info(
+                    f"Follow update: {poll.lines_processed:,} new lines, offset {poll.offset:,}" +
+                    (", log rotated" if poll.rotated or poll.truncated else "")
+                )
+                yield follower.results()
+    
+    def _create_runners(
+        self,
+        analyses: Sequence[str],
+        target_user: Optional[str],
+        bucket: Optional[str] = None
+    ) -> List[Analysis]:
+        """Create one analysis per name, rejecting empty or duplicate lists."""
+        runners = [create_analysis(name, target_user=target_user, bucket=bucket) for name in analyses]
+        
+        if not runners:
+            raise ValueError("At least one analysis is required")
+        
+        names = [runner.name for runner in runners]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate analyses requested: {names}")
+        
+        return runners
     
     def get_statistics(self, df: pd.DataFrame, log_type: str) -> Dict[str, Any]:
         """
         Get statistics from parsed log data.
         
+        For files too large to hold the result in memory, use
+        stream_statistics(), which computes the same statistics while
+        parsing.
+        
         Args:
             df: Parsed DataFrame
-            log_type: Type of log ('vpn', 'firewall', 'vpn_shutdown')
+            log_type: Type of log ('vpn', 'firewall', 'firewall_timeline', 'vpn_shutdown')
             
         Returns:
             Dictionary of statistics
@@ -403,6 +888,15 @@ class LogParserService:
                 stats['avg_bytes_per_ip'] = df['total_sentbyte'].mean()
                 stats['top_destinations'] = df.head(5)[['dstip', 'size_mb']].to_dict('records')
             
+        elif log_type == 'firewall_timeline':
+            if 'total_sentbyte' in df.columns:
+                per_bucket = df.groupby('bucket', sort=True)['total_sentbyte'].sum()
+                stats['buckets'] = len(per_bucket)
+                stats['unique_destinations'] = df['dstip'].nunique()
+                stats['total_mb'] = df['size_mb'].sum()
+                stats['peak_bucket'] = per_bucket.idxmax()
+                stats['peak_bucket_mb'] = per_bucket.max() / (1024 * 1024)
+        
         elif log_type == 'vpn_shutdown':
             if 'sent_bytes_in_MB' in df.columns:
                 stats['total_mb'] = df['sent_bytes_in_MB'].sum()
@@ -0,0 +1,426 @@
+"""
+Epoch timestamps for parsed log rows.
+
+Fortinet lines carry the device-local ``date`` and ``time``, usually the
+device's UTC offset in ``tz`` (e.g. ``tz="+0200"``) and, on FortiOS 6.2 and
+later, ``eventtime`` as an epoch value in seconds, milliseconds,
+microseconds or nanoseconds. epoch_seconds() combines them into one int64
+column of seconds since the epoch (UTC). ``eventtime`` is used when it is
+present; otherwise ``date`` and ``time`` are read in the ``tz`` offset, or as
+UTC without one. Rows whose timestamp cannot be read get NO_EPOCH, which
+only serves to order them inside TimeIndex; result frames carry the column
+as a nullable Int64 (see epoch_column), so they show a missing value.
+
+Dates, times and offsets repeat on most rows, so each distinct string is
+parsed once (and remembered across batches); rows are then converted by
+array lookups. TimeIndex keeps rows in time order and selects time ranges by
+binary search; bucket_seconds() resolves the bucket sizes of time rollups.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+try:
+    import pandas as pd
+except ImportError:
+    raise ImportError("pandas is required. Install with: pip install pandas")
+
+
+# Column holding the epoch seconds of each row
+EPOCH_COLUMN = 'epoch'
+# Epoch of rows without a valid date and time, internal to the arrays here
+NO_EPOCH = np.iinfo(np.int64).min
+# Distinct date, time and offset strings remembered across batches
+PARSE_CACHE_SIZE = 65536
+
+# Named rollup bucket sizes, in seconds
+BUCKET_SIZES = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+_DAYS_BEFORE_EPOCH = np.datetime64('1970-01-01', 'D')
+# eventtime magnitudes of nanoseconds, microseconds and milliseconds
+_EVENTTIME_UNITS = ((10**17, 10**9), (10**14, 10**6), (10**11, 10**3))
+_BUCKET_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Length of the period a range bound names, by the precision it is given in
+_PRECISION_STEPS = {
+    'year': pd.DateOffset(years=1),
+    'month': pd.DateOffset(months=1),
+    'day': pd.DateOffset(days=1),
+    'hour': pd.Timedelta(hours=1),
+    'minute': pd.Timedelta(minutes=1),
+    'second': pd.Timedelta(seconds=1),
+}
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def date_seconds(value: str) -> Optional[int]:
+    """
+    Parse a log date (2024-01-15 or 2024/01/15) to the epoch seconds of its midnight.
+    
+    A time following the date (as in CSV exports' date_time columns) is ignored.
+    
+    Returns:
+        Seconds, or None if the value is not a date
+    """
+    day = value.strip().split(' ', 1)[0].split('T', 1)[0]
+    try:
+        day = np.datetime64(day.replace('/', '-'), 'D')
+    except ValueError:
+        return None
+    return int((day - _DAYS_BEFORE_EPOCH).astype(np.int64)) * 86400
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def clock_seconds(value: str) -> Optional[int]:
+    """
+    Parse a log time (10:30:00, fractions ignored) to seconds after midnight.
+    
+    Returns:
+        Seconds, or None if the value is not a time of day
+    """
+    parts = value.strip().split(':')
+    if len(parts) not in (2, 3):
+        return None
+    
+    try:
+        hours, minutes = int(parts[0]), int(parts[1])
+        seconds = int(float(parts[2])) if len(parts) == 3 else 0
+    except ValueError:
+        return None
+    
+    if not (0 <= hours < 24 and 0 <= minutes < 60 and 0 <= seconds < 61):
+        return None
+    return hours * 3600 + minutes * 60 + seconds
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def offset_seconds(value: str) -> Optional[int]:
+    """
+    Parse a UTC offset (+0200, -05:00, +02, UTC) to seconds east of UTC.
+    
+    Returns:
+        Seconds, or None if the value is not an offset
+    """
+    value = value.strip().strip('"')
+    if value.upper() in ('Z', 'UTC', 'GMT'):
+        return 0
+    if len(value) < 2 or value[0] not in '+-':
+        return None
+    
+    digits = value[1:].replace(':', '')
+    if not digits.isdigit() or len(digits) not in (2, 4):
+        return None
+    
+    seconds = int(digits[:2]) * 3600 + int(digits[2:] or 0) * 60
+    return -seconds if value[0] == '-' else seconds
+
+
+def eventtime_seconds(values: np.ndarray) -> np.ndarray:
+    """
+    Convert Fortinet eventtime values to epoch seconds.
+    
+    The unit is told by the magnitude: nanoseconds, microseconds,
+    milliseconds or seconds.
+    
+    Args:
+        values: int64 eventtimes; values of 0 or less mean "missing"
+    
+    Returns:
+        int64 seconds, NO_EPOCH where the value is missing
+    """
+    values = np.asarray(values, dtype=np.int64)
+    seconds = np.select(
+        [values >= limit for limit, _ in _EVENTTIME_UNITS],
+        [values // divisor for _, divisor in _EVENTTIME_UNITS],
+        default=values
+    )
+    return np.where(values > 0, seconds, NO_EPOCH)
+
+
+def line_epoch(
+    date: str,
+    time: str,
+    zone: Optional[str] = None,
+    eventtime: Optional[str] = None
+) -> Optional[int]:
+    """
+    Epoch seconds of one log line, by the rules of epoch_seconds().
+    
+    Used by analyses that aggregate by time as they read lines; the date,
+    time and offset parsing is memoized, so this costs a few lookups.
+    
+    Returns:
+        Seconds since the epoch, or None if the timestamp cannot be read
+    """
+    if eventtime:
+        value = int(eventtime)
+        if value > 0:
+            for limit, divisor in _EVENTTIME_UNITS:
+                if value >= limit:
+                    return value // divisor
+            return value
+    
+    day = date_seconds(date)
+    clock = clock_seconds(time)
+    if day is None or clock is None:
+        return None
+    
+    offset = offset_seconds(zone) if zone else None
+    return day + clock - (offset or 0)
+
+
+def bucket_seconds(bucket: Union[str, int]) -> int:
+    """
+    Resolve the size of a time rollup bucket.
+    
+    Buckets are aligned to the epoch, so day buckets run from midnight to
+    midnight UTC.
+    
+    Args:
+        bucket: 'minute', 'hour' or 'day', a count and unit such as '15m',
+            '6h', '30s' or '7d', or a number of seconds
+    
+    Returns:
+        Bucket size in seconds
+    
+    Raises:
+        ValueError: If the bucket is not understood or not positive
+    """
+    if isinstance(bucket, int):
+        seconds = bucket
+    else:
+        value = str(bucket).strip().lower()
+        if value in BUCKET_SIZES:
+            return BUCKET_SIZES[value]
+        
+        count, unit = value[:-1], value[-1:]
+        if value.isdigit():
+            count, unit = value, 's'
+        if unit not in _BUCKET_UNITS or not count.isdigit():
+            raise ValueError(
+                f"Invalid bucket: {bucket} (use {', '.join(BUCKET_SIZES)} or a size such as 15m, 6h or 30s)"
+            )
+        seconds = int(count) * _BUCKET_UNITS[unit]
+    
+    if seconds < 1:
+        raise ValueError(f"Bucket size must be positive: {bucket}")
+    return seconds
+
+
+def _lookup(values: Any, parse: Any) -> np.ndarray:
+    """Parse each distinct value once and gather the results per row (None → NO_EPOCH)."""
+    codes, uniques = pd.factorize(pd.Series(values, copy=False))
+    parsed = [parse(str(value)) for value in uniques]
+    table = np.array([NO_EPOCH if value is None else value for value in parsed] + [NO_EPOCH], dtype=np.int64)
+    # Missing values have code -1, which picks the trailing NO_EPOCH
+    return table[codes]
+
+
+def epoch_seconds(
+    dates: Any,
+    times: Any,
+    zones: Optional[Any] = None,
+    eventtimes: Optional[Any] = None
+) -> np.ndarray:
+    """
+    Combine log timestamp fields into epoch seconds.
+    
+    Args:
+        dates: Date per row (array-like of strings; Categoricals are cheapest)
+        times: Time of day per row
+        zones: Optional UTC offset per row (``tz``); missing offsets mean UTC
+        eventtimes: Optional ``eventtime`` per row (integers, or strings;
+            missing or non-numeric values fall back to date and time)
+    
+    Returns:
+        int64 array of seconds since the epoch, NO_EPOCH for rows whose
+        timestamp could not be read
+    
+    Example:
+        >>> epoch_seconds(['2024-01-15'], ['10:00:00'], zones=['+0200'])
+        array([1705305600])
+    """
+    days = _lookup(dates, date_seconds)
+    clock = _lookup(times, clock_seconds)
+    valid = (days != NO_EPOCH) & (clock != NO_EPOCH)
+    epochs = np.where(valid, days + np.where(valid, clock, 0), NO_EPOCH)
+    
+    if zones is not None:
+        offsets = _lookup(zones, offset_seconds)
+        epochs = np.where(valid & (offsets != NO_EPOCH), epochs - np.where(valid, offsets, 0), epochs)
+    
+    if eventtimes is not None:
+        if not (isinstance(eventtimes, np.ndarray) and eventtimes.dtype == np.int64):
+            eventtimes = pd.to_numeric(pd.Series(eventtimes), errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+        from_events = eventtime_seconds(eventtimes)
+        epochs = np.where(from_events != NO_EPOCH, from_events, epochs)
+    
+    return epochs
+
+
+def epoch_column(epochs: np.ndarray) -> pd.arrays.IntegerArray:
+    """
+    Epoch seconds as a result column, missing (pd.NA) where NO_EPOCH.
+    
+    Output files then hold an empty value instead of the sentinel.
+    """
+    epochs = np.asarray(epochs, dtype=np.int64)
+    return pd.arrays.IntegerArray(epochs, epochs == NO_EPOCH)
+
+
+def frame_epochs(df: pd.DataFrame) -> np.ndarray:
+    """
+    Epoch seconds of a frame with ``date`` and ``time`` columns.
+    
+    Optional ``tz`` and ``eventtime`` columns are honored.
+    """
+    return epoch_seconds(
+        df['date'],
+        df['time'],
+        zones=df['tz'] if 'tz' in df.columns else None,
+        eventtimes=df['eventtime'] if 'eventtime' in df.columns else None
+    )
+
+
+def parse_time(value: str, end: bool = False) -> int:
+    """
+    Parse a time range bound to epoch seconds.
+    
+    Args:
+        value: Year ("2024"), month ("2024-03"), date ("2024-03-01") or date
+            and time ("2024-03-01 13:45" or "2024-03-01 13:45:00"); times
+            without an offset are read as UTC
+        end: Whether this is the end of a range; the bound is then the last
+            second of the period given, e.g. the end of March for "2024-03"
+    
+    Returns:
+        Seconds since the epoch
+    
+    Raises:
+        ValueError: If the value is not a date or time
+    """
+    try:
+        timestamp = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid time: {value}")
+    
+    if timestamp is pd.NaT:
+        raise ValueError(f"Invalid time: {value}")
+    
+    if end:
+        # Calendar arithmetic before any offset is applied, so months keep their length
+        timestamp = timestamp + _PRECISION_STEPS[_precision(value)] - pd.Timedelta(seconds=1)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert(None)
+    
+    return timestamp.value // 10**9
+
+
+def _precision(value: str) -> str:
+    """Smallest unit a date or time is given in, 'year' to 'second'."""
+    date, _, clock = value.strip().replace('T', ' ', 1).partition(' ')
+    clock = re.split(r'[+\-zZ ]', clock.strip(), maxsplit=1)[0]
+    if clock:
+        return ('hour', 'minute', 'second')[min(clock.count(':'), 2)]
+    
+    fields = re.split(r'[-/]', date)
+    if len(fields) == 1 and len(date) > 4:
+        # Compact dates such as 20240301
+        return 'day'
+    return ('year', 'month', 'day')[min(len(fields), 3) - 1]
+
+
+class TimeIndex:
+    """
+    Rows in time order, for range selection by binary search.
+    
+    Example:
+        >>> index = TimeIndex.from_frame(df)
+        >>> march = df.take(index.select(parse_time('2024-03-01'), parse_time('2024-03-31', end=True)))
+    """
+    
+    def __init__(
+        self,
+        epochs: np.ndarray,
+        order: Optional[np.ndarray] = None,
+        sorted_epochs: Optional[np.ndarray] = None
+    ):
+        """
+        Build (or wrap) the index of a column of epoch seconds.
+        
+        Args:
+            epochs: Epoch seconds per row
+            order: Row positions in time order, if already computed
+            sorted_epochs: epochs[order], if already computed
+        """
+        self.epochs = epochs
+        self.order = np.argsort(epochs, kind='stable') if order is None else order
+        self.sorted_epochs = epochs[self.order] if sorted_epochs is None else sorted_epochs
+    
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, column: str = EPOCH_COLUMN) -> 'TimeIndex':
+        """Index the epoch column of a frame (missing values sort first, as NO_EPOCH)."""
+        return cls(df[column].to_numpy(dtype=np.int64, na_value=NO_EPOCH))
+    
+    def bounds(self, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Find the positions in time order of a range.
+        
+        Args:
+            start: First second of the range (rows without a time are never included)
+            end: Last second of the range, included
+        
+        Returns:
+            (first, stop) positions into order
+        """
+        start = NO_EPOCH + 1 if start is None else start
+        end = np.iinfo(np.int64).max if end is None else end
+        first = int(np.searchsorted(self.sorted_epochs, start, side='left'))
+        stop = int(np.searchsorted(self.sorted_epochs, end, side='right'))
+        return first, max(first, stop)
+    
+    def count(self, start: Optional[int] = None, end: Optional[int] = None) -> int:
+        """Count the rows in a range."""
+        first, stop = self.bounds(start, end)
+        return stop - first
+    
+    def select(self, start: Optional[int] = None, end: Optional[int] = None, in_time_order: bool = False) -> np.ndarray:
+        """
+        Get the rows in a range.
+        
+        Args:
+            start: First second of the range
+            end: Last second of the range, included
+            in_time_order: Return rows in time order instead of row order
+        
+        Returns:
+            Row positions as an int64 array
+        """
+        first, stop = self.bounds(start, end)
+        rows = np.asarray(self.order[first:stop], dtype=np.int64)
+        return rows if in_time_order else np.sort(rows)
+    
+    def contains(self, rows: np.ndarray, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """Boolean mask of the given rows that fall in a range."""
+        epochs = self.epochs[rows]
+        start = NO_EPOCH + 1 if start is None else start
+        end = np.iinfo(np.int64).max if end is None else end
+        return (epochs >= start) & (epochs <= end)
+
+
+def add_epoch(df: pd.DataFrame, columns: Sequence[str]) -> pd.DataFrame:
+    """
+    Add the epoch column to a parsed frame and order its columns.
+    
+    Args:
+        df: Rows with date and time (and optional tz and eventtime) columns
+        columns: Result columns, including EPOCH_COLUMN
+    
+    Returns:
+        Frame with exactly the result columns
+    """
+    epochs = frame_epochs(df) if len(df) else np.empty(0, dtype=np.int64)
+    df = df.assign(**{EPOCH_COLUMN: epoch_column(epochs)})
+    return df[list(columns)]
@@ -0,0 +1,1496 @@
+"""
+Chunked parse engine for Fortinet log files.
+
+This module splits a log file at newline-aligned byte offsets, feeds each
+line to one or more analyses and merges the partial results. Chunks can be
+scanned sequentially or in a process pool, so large files scale with the
+number of available cores.
+"""
+
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import pandas as pd
+except ImportError:
+    raise ImportError("pandas is required. Install with: pip install pandas")
+
+from fortinet_tokenizer import (
+    VPN_LOGIN_FIELDS,
+    vpn_login_extractor,
+    firewall_extractor,
+    firewall_timeline_extractor,
+    shutdown_extractor,
+)
+from compressed_io import detect_compression, gzip_member_candidates, open_binary
+from heavy_hitters import SpaceSaving, sketch_capacity, top_items
+from ip_classifier import is_public_ip
+from stream_stats import StreamStatistics
+from log_time import EPOCH_COLUMN, bucket_seconds, epoch_column, epoch_seconds, line_epoch
+from scan_progress import ProgressReporter, ScanProgress
+
+
+logger = logging.getLogger(__name__)
+
+# Read size for each scan step; lines are decoded a block at a time
+READ_BLOCK_SIZE = 4 * 1024 * 1024
+# Files smaller than this are never split
+MIN_CHUNK_SIZE = 16 * 1024 * 1024
+# Chunks per worker, so slow chunks do not leave other workers idle
+CHUNKS_PER_WORKER = 4
+# Multi-member gzip files smaller than this (compressed) are never split
+MIN_COMPRESSED_CHUNK_SIZE = 2 * 1024 * 1024
+# Rows a streaming analysis buffers before writing them to its sink
+STREAM_BATCH_ROWS = 100000
+# Bump when parsing rules change, so cached results are not reused
+PARSER_VERSION = '4'
+
+# Content digests by (path, size, mtime_ns), see file_digest()
+MAX_REMEMBERED_DIGESTS = 256
+_DIGESTS: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_digest(file_path: str, block_size: int = READ_BLOCK_SIZE) -> str:
+    """
+    Compute the SHA-256 digest of a file's content.
+    
+    Digests are remembered per (path, size, mtime), so asking again for an
+    unchanged file does not reread it.
+    
+    Args:
+        file_path: Path to the file
+        block_size: Read size in bytes
+    
+    Returns:
+        Hex digest string
+    """
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    
+    cached = _DIGESTS.get(key)
+    if cached is not None:
+        return cached
+    
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(block_size), b''):
+            digest.update(block)
+    
+    if len(_DIGESTS) >= MAX_REMEMBERED_DIGESTS:
+        _DIGESTS.clear()
+    _DIGESTS[key] = digest.hexdigest()
+    
+    return _DIGESTS[key]
+
+
+class DictionaryColumn:
+    """
+    Append-only string column stored as codes into its distinct values.
+    
+    Log fields such as user, date and msg repeat on most lines; each distinct
+    string is stored once and every row costs a 4-byte code. The column
+    becomes a pandas Categorical without copying the strings again.
+    
+    Example:
+        >>> column = DictionaryColumn()
+        >>> for value in ['ssl-web', 'ssl-web', 'ipsec']:
+        ...     column.append(value)
+        >>> column.values, list(column.codes)
+        (['ssl-web', 'ipsec'], [0, 0, 1])
+    """
+    
+    def __init__(self) -> None:
+        self.values: List[str] = []
+        self.codes = array('i')
+        self._lookup: Dict[str, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self.codes)
+    
+    def __iter__(self) -> Iterator[str]:
+        values = self.values
+        return (values[code] for code in self.codes)
+    
+    def append(self, value: str) -> None:
+        """Add a value at the end of the column."""
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+    
+    def extend(self, other: 'DictionaryColumn') -> None:
+        """Add the values of another column at the end of this one."""
+        if not other.codes:
+            return
+        
+        # Translate the other column's codes into this column's codes
+        lookup = self._lookup
+        remap = np.empty(len(other.values), dtype=np.intc)
+        for position, value in enumerate(other.values):
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(self.values)
+                self.values.append(value)
+            remap[position] = code
+        
+        self.codes.frombytes(remap[np.frombuffer(other.codes, dtype=np.intc)].tobytes())
+    
+    def to_categorical(self) -> pd.Categorical:
+        """Build a Categorical with categories in order of first appearance."""
+        return pd.Categorical.from_codes(
+            np.frombuffer(self.codes, dtype=np.intc) if self.codes else np.empty(0, dtype=np.intc),
+            categories=pd.Index(self.values, dtype=str)
+        )
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        # The lookup table is rebuilt on unpickling, which keeps worker results small
+        return {'values': self.values, 'codes': self.codes}
+    
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.values = state['values']
+        self.codes = state['codes']
+        self._lookup = {value: code for code, value in enumerate(self.values)}
+
+
+class Analysis:
+    """
+    Base class for a mergeable, line-by-line log analysis.
+    
+    Subclasses implement ``feed`` for a single line, ``merge`` to combine a
+    partial result from a later chunk, and ``to_dataframe`` for the final
+    result. Analyses are pickled to worker processes, so helpers that cannot
+    be pickled are created in ``_build`` and dropped from the pickled state.
+    """
+    
+    name = 'analysis'
+    columns: Tuple[str, ...] = ()
+    _transient: Tuple[str, ...] = ('_extractor',)
+    # Whether lines_matched counts towards the matches reported as progress
+    reports_matches = True
+    
+    def __init__(self) -> None:
+        self.lines_matched = 0
+        self._build()
+    
+    def _build(self) -> None:
+        """Create helpers that are not pickled (e.g. field extractors)."""
+    
+    def spawn(self) -> 'Analysis':
+        """Return an empty analysis with the same parameters."""
+        raise NotImplementedError
+    
+    def feed(self, line: str) -> None:
+        """Process a single log line."""
+        raise NotImplementedError
+    
+    def merge(self, other: 'Analysis') -> None:
+        """Merge the result of a later chunk into this analysis."""
+        raise NotImplementedError
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        """Build the result DataFrame."""
+        raise NotImplementedError
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        for key in self._transient:
+            state.pop(key, None)
+        return state
+    
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._build()
+
+
+class RowAnalysis(Analysis):
+    """
+    Analysis whose result is a list of rows in file order.
+    
+    Rows can be streamed to a sink (any object with a ``write(df)`` method,
+    e.g. result_writer.CsvResultWriter) instead of being held until the end:
+    after stream_to(), every batch_rows buffered rows are written out and
+    dropped. Because the main analysis only receives lines (sequential
+    scans) or partial results merged in chunk order (parallel scans), the
+    sink sees rows in file order.
+    
+    Each row also keeps the ``tz`` and ``eventtime`` of its line (see
+    log_time), from which the result's epoch column is computed.
+    """
+    
+    _transient: Tuple[str, ...] = ('_extractor', '_sink')
+    _sink = None
+    _batch_rows = STREAM_BATCH_ROWS
+    rows_streamed = 0
+    
+    def __init__(self) -> None:
+        self._clear_timestamps()
+        super().__init__()
+    
+    @property
+    def rows(self) -> List[List[Any]]:
+        """Rows held in memory as lists of values (built on access)."""
+        return self.to_dataframe().astype(object).values.tolist()
+    
+    @property
+    def pending_rows(self) -> int:
+        """Number of rows held in memory."""
+        raise NotImplementedError
+    
+    def _clear(self) -> None:
+        """Drop the rows held in memory."""
+        raise NotImplementedError
+    
+    def stream_to(self, sink: Any, batch_rows: int = STREAM_BATCH_ROWS) -> None:
+        """
+        Write rows to a sink in batches from now on.
+        
+        Args:
+            sink: Object with a ``write(df)`` method
+            batch_rows: Rows buffered before a batch is written
+        """
+        self._sink = sink
+        self._batch_rows = max(1, batch_rows)
+    
+    def flush(self) -> None:
+        """Write the rows held in memory to the sink."""
+        if self._sink is not None and self.pending_rows:
+            self.rows_streamed += self.pending_rows
+            self._sink.write(self.to_dataframe())
+            self._clear()
+    
+    def _flush_full_batch(self) -> None:
+        if self._sink is not None and self.pending_rows >= self._batch_rows:
+            self.flush()
+    
+    def _clear_timestamps(self) -> None:
+        self.zones = DictionaryColumn()
+        self.eventtimes = array('q')
+    
+    def _append_timestamp(self, zone: Optional[str], eventtime: Optional[str]) -> None:
+        self.zones.append(zone or '')
+        self.eventtimes.append(int(eventtime) if eventtime else 0)
+    
+    def _extend_timestamps(self, other: 'RowAnalysis') -> None:
+        self.zones.extend(other.zones)
+        self.eventtimes.extend(other.eventtimes)
+    
+    def _epochs(self, dates: pd.Categorical, times: pd.Categorical) -> pd.arrays.IntegerArray:
+        """Epoch seconds of the rows held in memory, missing where the time cannot be read."""
+        if not self.eventtimes:
+            return epoch_column(np.empty(0, dtype=np.int64))
+        return epoch_column(epoch_seconds(
+            dates, times, zones=self.zones.to_categorical(),
+            eventtimes=np.frombuffer(self.eventtimes, dtype=np.int64)
+        ))
+
+
+class VPNLoginAnalysis(RowAnalysis):
+    """Successful VPN logins, kept in file order as dictionary-encoded columns."""
+    
+    name = 'vpn'
+    fields = VPN_LOGIN_FIELDS
+    columns = VPN_LOGIN_FIELDS + (EPOCH_COLUMN,)
+    
+    def __init__(self) -> None:
+        self.data = [DictionaryColumn() for _ in self.fields]
+        super().__init__()
+    
+    def _build(self) -> None:
+        self._extractor = vpn_login_extractor()
+    
+    def spawn(self) -> 'VPNLoginAnalysis':
+        return VPNLoginAnalysis()
+    
+    @property
+    def pending_rows(self) -> int:
+        return len(self.data[0])
+    
+    def _clear(self) -> None:
+        self.data = [DictionaryColumn() for _ in self.fields]
+        self._clear_timestamps()
+    
+    def feed(self, line: str) -> None:
+        values = self._extractor.extract(line)
+        if values is not None:
+            for column, value in zip(self.data, values):
+                column.append(value)
+            self._append_timestamp(values[-2], values[-1])
+            self.lines_matched += 1
+            if self._sink is not None:
+                self._flush_full_batch()
+    
+    def merge(self, other: 'VPNLoginAnalysis') -> None:
+        for column, other_column in zip(self.data, other.data):
+            column.extend(other_column)
+        self._extend_timestamps(other)
+        self.lines_matched += other.lines_matched
+        self._flush_full_batch()
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        data = {name: column.to_categorical() for name, column in zip(self.fields, self.data)}
+        data[EPOCH_COLUMN] = self._epochs(data['date'], data['time'])
+        return pd.DataFrame(data, columns=list(self.columns))
+
+
+class FirewallAnalysis(Analysis):
+    """
+    Sent bytes aggregated per public destination IP.
+    
+    By default every destination gets an exact total. With ``top`` only the
+    K largest are returned, picked by partial selection rather than a full
+    sort. With ``approximate`` as well, totals are kept in a Space-Saving
+    summary of fixed size instead (see heavy_hitters), so memory no longer
+    grows with the number of distinct destinations; each total may then be
+    overstated by at most its ``max_overcount``.
+    """
+    
+    name = 'firewall'
+    columns = ('dstip', 'total_sentbyte', 'size_mb')
+    approximate_columns = ('dstip', 'total_sentbyte', 'size_mb', 'max_overcount')
+    
+    def __init__(
+        self,
+        ip_filter: Callable[[str], bool] = is_public_ip,
+        top: Optional[int] = None,
+        approximate: bool = False,
+        counters: Optional[int] = None
+    ) -> None:
+        """
+        Initialize the analysis.
+        
+        Args:
+            ip_filter: Predicate selecting destination IPs to keep; must be a
+                module-level function so it can be sent to worker processes
+            top: Return only the K destinations with the most bytes sent
+            approximate: Count in a fixed-size summary (requires top)
+            counters: Summary size in approximate mode (default
+                heavy_hitters.sketch_capacity(top))
+        
+        Raises:
+            ValueError: If top is not positive, or approximate lacks top
+        """
+        if top is not None and top < 1:
+            raise ValueError(f"Top must be positive: {top}")
+        if approximate and top is None:
+            raise ValueError("Approximate mode requires a top size")
+        
+        self.ip_filter = ip_filter
+        self.top = top
+        self.approximate = approximate
+        self.counters = counters
+        self.totals: Dict[str, int] = {}
+        self.sketch = SpaceSaving(counters or sketch_capacity(top)) if approximate else None
+        if approximate:
+            self.columns = self.approximate_columns
+        self.private_ips_skipped = 0
+        super().__init__()
+    
+    def _build(self) -> None:
+        self._extractor = firewall_extractor()
+    
+    def spawn(self) -> 'FirewallAnalysis':
+        return FirewallAnalysis(self.ip_filter, self.top, self.approximate, self.counters)
+    
+    def feed(self, line: str) -> None:
+        values = self._extractor.extract(line)
+        if values is None:
+            return
+        
+        dstip, sentbyte = values
+        
+        # Validate IP format
+        if not dstip.replace('.', '').isdigit():
+            return
+        
+        if self.ip_filter(dstip):
+            if self.sketch is not None:
+                self.sketch.add(dstip, int(sentbyte))
+            else:
+                self.totals[dstip] = self.totals.get(dstip, 0) + int(sentbyte)
+            self.lines_matched += 1
+        else:
+            self.private_ips_skipped += 1
+    
+    def merge(self, other: 'FirewallAnalysis') -> None:
+        if self.sketch is not None:
+            self.sketch.merge(other.sketch)
+        else:
+            totals = self.totals
+            for dstip, sentbyte in other.totals.items():
+                totals[dstip] = totals.get(dstip, 0) + sentbyte
+        self.lines_matched += other.lines_matched
+        self.private_ips_skipped += other.private_ips_skipped
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        if self.sketch is not None:
+            df = pd.DataFrame(
+                self.sketch.top(self.top), columns=['dstip', 'total_sentbyte', 'max_overcount']
+            ).astype({'total_sentbyte': 'int64', 'max_overcount': 'int64'})
+        elif self.top is not None:
+            # Already ordered; avoids sorting every destination
+            df = pd.DataFrame(top_items(self.totals, self.top), columns=['dstip', 'total_sentbyte'])
+        else:
+            df = pd.DataFrame(list(self.totals.items()), columns=['dstip', 'total_sentbyte'])
+            
+            # Sort by total bytes in descending order
+            df = df.sort_values(by='total_sentbyte', ascending=False)
+        
+        # Convert bytes to megabytes
+        df['size_mb'] = df['total_sentbyte'] / (1024 * 1024)
+        
+        return df[list(self.columns)].reset_index(drop=True)
+
+
+class FirewallTimelineAnalysis(Analysis):
+    """
+    Sent and received bytes per public destination IP and time bucket.
+    
+    Lines are added to their (bucket, destination) totals as they are read,
+    so memory grows with the number of rows of the rollup, not with the
+    size of the log. Partial results of chunks merge by adding totals.
+    """
+    
+    name = 'firewall_timeline'
+    columns = ('bucket', EPOCH_COLUMN, 'dstip', 'total_sentbyte', 'total_rcvdbyte', 'lines', 'size_mb')
+    
+    def __init__(self, bucket: str = 'hour', ip_filter: Callable[[str], bool] = is_public_ip) -> None:
+        """
+        Initialize the analysis.
+        
+        Args:
+            bucket: Bucket size, e.g. 'minute', 'hour', 'day' or '15m'
+                (see log_time.bucket_seconds)
+            ip_filter: Predicate selecting destination IPs to keep; must be a
+                module-level function so it can be sent to worker processes
+        
+        Raises:
+            ValueError: If the bucket size is invalid
+        """
+        self.bucket = bucket
+        self.bucket_size = bucket_seconds(bucket)
+        self.ip_filter = ip_filter
+        # (bucket start, dstip) -> row of the totals arrays
+        self.groups: Dict[Tuple[int, str], int] = {}
+        self.sentbytes = array('q')
+        self.rcvdbytes = array('q')
+        self.line_counts = array('q')
+        self.private_ips_skipped = 0
+        self.untimed_skipped = 0
+        super().__init__()
+    
+    def _build(self) -> None:
+        self._extractor = firewall_timeline_extractor()
+    
+    def spawn(self) -> 'FirewallTimelineAnalysis':
+        return FirewallTimelineAnalysis(self.bucket, self.ip_filter)
+    
+    def feed(self, line: str) -> None:
+        values = self._extractor.extract(line)
+        if values is None:
+            return
+        
+        date, time, dstip, sentbyte, rcvdbyte, zone, eventtime = values
+        
+        # Validate IP format
+        if not dstip.replace('.', '').isdigit():
+            return
+        
+        if not self.ip_filter(dstip):
+            self.private_ips_skipped += 1
+            return
+        
+        epoch = line_epoch(date, time, zone, eventtime)
+        if epoch is None:
+            self.untimed_skipped += 1
+            return
+        
+        self._add((epoch - epoch % self.bucket_size, dstip), int(sentbyte), int(rcvdbyte or 0), 1)
+        self.lines_matched += 1
+    
+    def _add(self, key: Tuple[int, str], sentbyte: int, rcvdbyte: int, lines: int) -> None:
+        row = self.groups.get(key)
+        if row is None:
+            self.groups[key] = len(self.sentbytes)
+            self.sentbytes.append(sentbyte)
+            self.rcvdbytes.append(rcvdbyte)
+            self.line_counts.append(lines)
+        else:
+            self.sentbytes[row] += sentbyte
+            self.rcvdbytes[row] += rcvdbyte
+            self.line_counts[row] += lines
+    
+    def merge(self, other: 'FirewallTimelineAnalysis') -> None:
+        for key, row in other.groups.items():
+            self._add(key, other.sentbytes[row], other.rcvdbytes[row], other.line_counts[row])
+        self.lines_matched += other.lines_matched
+        self.private_ips_skipped += other.private_ips_skipped
+        self.untimed_skipped += other.untimed_skipped
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        keys = list(self.groups)
+        rows = np.fromiter(self.groups.values(), dtype=np.int64, count=len(keys))
+        
+        df = pd.DataFrame({
+            EPOCH_COLUMN: np.fromiter((key[0] for key in keys), dtype=np.int64, count=len(keys)),
+            'dstip': [key[1] for key in keys],
+            'total_sentbyte': np.frombuffer(self.sentbytes, dtype=np.int64)[rows] if keys else rows,
+            'total_rcvdbyte': np.frombuffer(self.rcvdbytes, dtype=np.int64)[rows] if keys else rows,
+            'lines': np.frombuffer(self.line_counts, dtype=np.int64)[rows] if keys else rows,
+        })
+        return timeline_frame(df)
+
+
+def timeline_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Finish a firewall timeline from its per-(epoch, dstip) totals.
+    
+    Adds the readable bucket start and the size in MB, and orders buckets
+    by time, and destinations within a bucket by bytes sent.
+    
+    Args:
+        df: Frame with epoch, dstip, total_sentbyte, total_rcvdbyte and lines
+    
+    Returns:
+        Frame with FirewallTimelineAnalysis.columns
+    """
+    df = df.sort_values(by=[EPOCH_COLUMN, 'total_sentbyte', 'dstip'], ascending=[True, False, True])
+    df['bucket'] = pd.to_datetime(df[EPOCH_COLUMN], unit='s').dt.strftime('%Y-%m-%d %H:%M:%S')
+    df['size_mb'] = df['total_sentbyte'] / (1024 * 1024)
+    return df[list(FirewallTimelineAnalysis.columns)].reset_index(drop=True)
+
+
+class ShutdownAnalysis(RowAnalysis):
+    """VPN shutdown sessions for one user (or all users), kept in file order."""
+    
+    name = 'vpn_shutdown'
+    columns = ('date', 'time', 'user', 'sentbyte', 'sent_bytes_in_MB', EPOCH_COLUMN)
+    
+    def __init__(self, target_user: Optional[str]) -> None:
+        """
+        Initialize the analysis.
+        
+        Args:
+            target_user: Username to filter (case-insensitive), or None to
+                keep the sessions of every user
+        
+        Raises:
+            ValueError: If target_user is empty
+        """
+        if target_user is not None:
+            target_user = target_user.strip().lower()
+            if not target_user:
+                raise ValueError("Target username cannot be empty")
+        
+        self.target_user = target_user
+        self.dates = DictionaryColumn()
+        self.times = DictionaryColumn()
+        self.users = DictionaryColumn()
+        self.sentbytes = array('q')
+        super().__init__()
+    
+    def _build(self) -> None:
+        self._extractor = shutdown_extractor(self.target_user)
+    
+    def spawn(self) -> 'ShutdownAnalysis':
+        return ShutdownAnalysis(self.target_user)
+    
+    @property
+    def pending_rows(self) -> int:
+        return len(self.sentbytes)
+    
+    def _clear(self) -> None:
+        self.dates = DictionaryColumn()
+        self.times = DictionaryColumn()
+        self.users = DictionaryColumn()
+        self.sentbytes = array('q')
+        self._clear_timestamps()
+    
+    def feed(self, line: str) -> None:
+        values = self._extractor.extract(line)
+        if values is None:
+            return
+        
+        date, time, user, sentbyte_value, _, zone, eventtime = values
+        self.sentbytes.append(int(sentbyte_value))
+        self.dates.append(date)
+        self.times.append(time)
+        self.users.append(user)
+        self._append_timestamp(zone, eventtime)
+        self.lines_matched += 1
+        if self._sink is not None:
+            self._flush_full_batch()
+    
+    def merge(self, other: 'ShutdownAnalysis') -> None:
+        self.dates.extend(other.dates)
+        self.times.extend(other.times)
+        self.users.extend(other.users)
+        self.sentbytes.extend(other.sentbytes)
+        self._extend_timestamps(other)
+        self.lines_matched += other.lines_matched
+        self._flush_full_batch()
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        sentbyte = np.frombuffer(self.sentbytes, dtype=np.int64) if self.sentbytes else np.empty(0, dtype=np.int64)
+        dates = self.dates.to_categorical()
+        times = self.times.to_categorical()
+        return pd.DataFrame(
+            {
+                'date': dates,
+                'time': times,
+                'user': self.users.to_categorical(),
+                'sentbyte': sentbyte.copy(),
+                'sent_bytes_in_MB': sentbyte / (1024 * 1024),
+                EPOCH_COLUMN: self._epochs(dates, times),
+            },
+            columns=list(self.columns)
+        )
+
+
+class StatisticsAnalysis(Analysis):
+    """
+    Statistics of one analysis, accumulated line by line without its rows.
+    
+    The same lines are matched as by the analysis named ``log_type``, but
+    only mergeable accumulators are kept (see stream_stats): distinct
+    counts of users and IPs, running totals and quantiles of sentbyte, and
+    the most frequent users or heaviest destinations. Memory therefore does
+    not grow with the file, and partial results of chunks and workers
+    merge. ``statistics()`` returns the keys of
+    LogParserService.get_statistics; distinct counts, quantiles and top
+    lists are estimates. Top lists keep only keys the summary can vouch
+    for, so they may be shorter than the exact ones, and each destination
+    carries the most its size may be overstated by (``max_overcount_mb``).
+    """
+    
+    name = 'statistics'
+    columns = ('statistic', 'value')
+    _transient: Tuple[str, ...] = ('_extractor', '_feed')
+    # Matches the lines of another analysis, usually run alongside it
+    reports_matches = False
+    
+    def __init__(
+        self,
+        log_type: str,
+        target_user: Optional[str] = None,
+        ip_filter: Callable[[str], bool] = is_public_ip,
+        bucket: str = 'hour'
+    ) -> None:
+        """
+        Initialize the analysis.
+        
+        Args:
+            log_type: Analysis whose lines are summarized: 'vpn', 'firewall',
+                'firewall_timeline' or 'vpn_shutdown'
+            target_user: Username filter for 'vpn_shutdown' (None: all users)
+            ip_filter: Predicate selecting destination IPs to keep; must be a
+                module-level function so it can be sent to worker processes
+            bucket: Bucket size for 'firewall_timeline'
+        
+        Raises:
+            ValueError: If the log type or bucket size is invalid
+        """
+        canonical = ANALYSIS_ALIASES.get(log_type.strip().lower())
+        if canonical is None:
+            raise ValueError(f"Unknown analysis: {log_type}")
+        if target_user is not None:
+            target_user = target_user.strip().lower() or None
+        
+        self.log_type = canonical
+        self.target_user = target_user
+        self.ip_filter = ip_filter
+        self.bucket = bucket
+        self.bucket_size = bucket_seconds(bucket)
+        self.stats = StreamStatistics()
+        # Bytes sent per bucket start, for firewall timelines
+        self.bucket_totals: Dict[int, int] = {}
+        self.private_ips_skipped = 0
+        self.untimed_skipped = 0
+        super().__init__()
+    
+    def _build(self) -> None:
+        if self.log_type == 'vpn':
+            self._extractor = vpn_login_extractor()
+            self._feed = self._feed_vpn
+        elif self.log_type == 'firewall':
+            self._extractor = firewall_extractor()
+            self._feed = self._feed_firewall
+        elif self.log_type == 'firewall_timeline':
+            self._extractor = firewall_timeline_extractor()
+            self._feed = self._feed_timeline
+        else:
+            self._extractor = shutdown_extractor(self.target_user)
+            self._feed = self._feed_shutdown
+    
+    def spawn(self) -> 'StatisticsAnalysis':
+        return StatisticsAnalysis(self.log_type, self.target_user, self.ip_filter, self.bucket)
+    
+    def feed(self, line: str) -> None:
+        values = self._extractor.extract(line)
+        if values is not None:
+            self._feed(values)
+    
+    def _feed_vpn(self, values: Tuple[str, ...]) -> None:
+        user, remip = values[2], values[4]
+        self.stats.add_distinct('user', user)
+        self.stats.add_distinct('remip', remip)
+        self.stats.add_top('user', user)
+        self.lines_matched += 1
+    
+    def _keep_destination(self, dstip: str) -> bool:
+        if not dstip.replace('.', '').isdigit():
+            return False
+        if not self.ip_filter(dstip):
+            self.private_ips_skipped += 1
+            return False
+        return True
+    
+    def _feed_firewall(self, values: Tuple[str, ...]) -> None:
+        dstip, sentbyte = values
+        if self._keep_destination(dstip):
+            sentbyte = int(sentbyte)
+            self.stats.add_distinct('dstip', dstip)
+            self.stats.add_value('sentbyte', sentbyte)
+            self.stats.add_top('dstip', dstip, sentbyte)
+            self.lines_matched += 1
+    
+    def _feed_timeline(self, values: Tuple[str, ...]) -> None:
+        date, time, dstip, sentbyte, _, zone, eventtime = values
+        epoch = line_epoch(date, time, zone, eventtime)
+        if epoch is None:
+            self.untimed_skipped += 1
+            return
+        
+        if self._keep_destination(dstip):
+            sentbyte = int(sentbyte)
+            start = epoch - epoch % self.bucket_size
+            self.stats.add_distinct('dstip', dstip)
+            self.stats.add_distinct('row', f'{start} {dstip}')
+            self.stats.add_value('sentbyte', sentbyte)
+            self.bucket_totals[start] = self.bucket_totals.get(start, 0) + sentbyte
+            self.lines_matched += 1
+    
+    def _feed_shutdown(self, values: Tuple[str, ...]) -> None:
+        user, sentbyte = values[2], int(values[3])
+        self.stats.add_distinct('user', user)
+        self.stats.add_value('sentbyte', sentbyte)
+        self.lines_matched += 1
+    
+    def merge(self, other: 'StatisticsAnalysis') -> None:
+        self.stats.merge(other.stats)
+        for start, sentbyte in other.bucket_totals.items():
+            self.bucket_totals[start] = self.bucket_totals.get(start, 0) + sentbyte
+        self.lines_matched += other.lines_matched
+        self.private_ips_skipped += other.private_ips_skipped
+        self.untimed_skipped += other.untimed_skipped
+    
+    def statistics(self) -> Dict[str, Any]:
+        """
+        Statistics in the shape of LogParserService.get_statistics.
+        
+        Returns:
+            Dictionary of statistics; sentbyte quantiles (p50, p90, p99)
+            are added under 'sentbyte_quantiles'
+        """
+        stats = self.stats
+        mb = 1024 * 1024
+        result: Dict[str, Any] = {'total_records': self.lines_matched, 'log_type': self.log_type}
+        
+        if not self.lines_matched:
+            return result
+        
+        summary = stats.summary()
+        sentbyte = summary['values'].get('sentbyte')
+        if sentbyte is not None:
+            result['sentbyte_quantiles'] = {key: sentbyte[key] for key in ('p50', 'p90', 'p99')}
+        
+        if self.log_type == 'vpn':
+            result['unique_users'] = stats.distinct_count('user')
+            result['top_users'] = summary['top']['user']
+            result['unique_ips'] = stats.distinct_count('remip')
+        
+        elif self.log_type == 'firewall':
+            # One result row per destination
+            destinations = stats.distinct_count('dstip')
+            result['total_records'] = destinations
+            result['total_bytes'] = sentbyte['sum']
+            result['total_mb'] = sentbyte['sum'] / mb
+            result['avg_bytes_per_ip'] = sentbyte['sum'] / destinations
+            # Only destinations certainly among the heaviest, with their error
+            result['top_destinations'] = [
+                {'dstip': dstip, 'size_mb': total / mb, 'max_overcount_mb': error / mb}
+                for dstip, total, error in stats.top_keys('dstip')
+            ]
+        
+        elif self.log_type == 'firewall_timeline':
+            # One result row per (bucket, destination)
+            peak = max(self.bucket_totals, key=self.bucket_totals.get)
+            result['total_records'] = stats.distinct_count('row')
+            result['buckets'] = len(self.bucket_totals)
+            result['unique_destinations'] = stats.distinct_count('dstip')
+            result['total_mb'] = sentbyte['sum'] / mb
+            result['peak_bucket'] = pd.Timestamp(peak, unit='s').strftime('%Y-%m-%d %H:%M:%S')
+            result['peak_bucket_mb'] = self.bucket_totals[peak] / mb
+        
+        else:
+            result['total_mb'] = sentbyte['sum'] / mb
+            result['avg_session_mb'] = sentbyte['mean'] / mb
+            result['total_sessions'] = sentbyte['count']
+            result['unique_users'] = stats.distinct_count('user')
+        
+        return result
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(list(self.statistics().items()), columns=list(self.columns))
+
+
+# Analysis names accepted by create_analysis (API spelling included)
+ANALYSIS_ALIASES = {
+    'vpn': 'vpn',
+    'firewall': 'firewall',
+    'firewall_timeline': 'firewall_timeline',
+    'firewall-timeline': 'firewall_timeline',
+    'vpn_shutdown': 'vpn_shutdown',
+    'vpn-shutdown': 'vpn_shutdown',
+}
+
+
+def create_analysis(
+    name: str,
+    target_user: Optional[str] = None,
+    ip_filter: Optional[Callable[[str], bool]] = None,
+    bucket: Optional[str] = None,
+    top: Optional[int] = None,
+    approximate: bool = False,
+) -> Analysis:
+    """
+    Create an analysis by name.
+    
+    Args:
+        name: 'vpn', 'firewall', 'firewall_timeline' or 'vpn_shutdown'
+            (hyphenated spellings also accepted)
+        target_user: Username filter, required for 'vpn_shutdown'
+        ip_filter: Optional public-IP predicate for the firewall analyses
+        bucket: Bucket size for 'firewall_timeline' (default 'hour')
+        top: Top-K size for 'firewall' (default: every destination)
+        approximate: Approximate top-K for 'firewall' (see FirewallAnalysis)
+    
+    Returns:
+        New, empty analysis
+    
+    Raises:
+        ValueError: If the name is unknown or a required parameter is missing
+    """
+    canonical = ANALYSIS_ALIASES.get(name.strip().lower())
+    
+    if canonical == 'vpn':
+        return VPNLoginAnalysis()
+    if canonical == 'firewall':
+        return FirewallAnalysis(ip_filter or is_public_ip, top=top, approximate=approximate)
+    if canonical == 'firewall_timeline':
+        return FirewallTimelineAnalysis(bucket or 'hour', ip_filter or is_public_ip)
+    if canonical == 'vpn_shutdown':
+        if not target_user:
+            raise ValueError("A username is required for the vpn_shutdown analysis")
+        return ShutdownAnalysis(target_user)
+    
+    raise ValueError(f"Unknown analysis: {name}")
+
+
+def analysis_signature(analysis: Analysis) -> Tuple[Any, ...]:
+    """Name and parameters that must match for saved analysis state to be reused."""
+    return (
+        analysis.name,
+        getattr(analysis, 'log_type', None),
+        getattr(analysis, 'target_user', None),
+        getattr(analysis, 'bucket_size', None),
+        getattr(analysis, 'top', None),
+        getattr(analysis, 'approximate', None),
+    )
+
+
+@dataclass
+class ScanStats:
+    """
+    Counters for a scan over a file or a chunk of it.
+    
+    Attributes:
+        lines_processed: Number of lines read
+        bytes_read: Number of bytes consumed
+        chunks: Number of chunks scanned
+    """
+    
+    lines_processed: int = 0
+    bytes_read: int = 0
+    chunks: int = 0
+    
+    def merge(self, other: 'ScanStats') -> None:
+        """Add the counters of another scan."""
+        self.lines_processed += other.lines_processed
+        self.bytes_read += other.bytes_read
+        self.chunks += other.chunks
+
+
+def iter_line_blocks(
+    file,
+    start: int = 0,
+    end: Optional[int] = None,
+    block_size: int = READ_BLOCK_SIZE,
+) -> Iterator[Tuple[List[str], int]]:
+    """
+    Read a binary file as blocks of decoded lines.
+    
+    Blocks are cut after the last newline they contain, so multi-byte
+    characters are never split. Invalid UTF-8 is replaced, matching the
+    ``errors='replace'`` behaviour of the text readers.
+    
+    Args:
+        file: File object opened in binary mode, or any object with a
+            ``read(size)`` method (e.g. an upload stream) when start is 0
+        start: Byte offset of the first line to read
+        end: Byte offset to stop at (None for end of file)
+        block_size: Number of bytes to read per step
+    
+    Yields:
+        Tuple of (lines, number of bytes the lines occupied)
+    """
+    if start:
+        file.seek(start)
+    remaining = None if end is None else end - start
+    pending = b''
+    
+    while remaining is None or remaining > 0:
+        size = block_size if remaining is None else min(block_size, remaining)
+        data = file.read(size)
+        if not data:
+            break
+        if remaining is not None:
+            remaining -= len(data)
+        
+        data = pending + data
+        cut = data.rfind(b'\n')
+        if cut < 0:
+            pending = data
+            continue
+        
+        pending = data[cut + 1:]
+        yield data[:cut].decode('utf-8', errors='replace').split('\n'), cut + 1
+    
+    if pending:
+        yield [pending.decode('utf-8', errors='replace')], len(pending)
+
+
+def scan_range(
+    file_path: str,
+    analyses: Sequence[Analysis],
+    start: int = 0,
+    end: Optional[int] = None,
+    after_block: Optional[Callable[[ScanStats], None]] = None,
+) -> ScanStats:
+    """
+    Feed every line in a byte range to the given analyses.
+    
+    Args:
+        file_path: Path to the log file
+        analyses: Analyses to feed
+        start: Byte offset of the first line (must be a line start)
+        end: Byte offset to stop at (must be a line start, None for EOF)
+        after_block: Optional function called with the range's ScanStats
+            so far after every block
+    
+    Returns:
+        ScanStats for the range
+    """
+    with open(file_path, 'rb') as file:
+        return _feed_blocks(iter_line_blocks(file, start, end), analyses, after_block)
+
+
+def scan_stream(
+    stream,
+    analyses: Sequence[Analysis],
+    after_block: Optional[Callable[[ScanStats], None]] = None,
+) -> ScanStats:
+    """
+    Feed every line of a binary stream to the given analyses.
+    
+    The stream is read once, block by block, so lines are parsed while the
+    rest of the data is still arriving (e.g. an HTTP upload).
+    
+    Args:
+        stream: Object with a ``read(size)`` method returning bytes
+        analyses: Analyses to feed
+        after_block: Optional function called with the ScanStats so far
+            after every block
+    
+    Returns:
+        ScanStats for the stream
+    """
+    return _feed_blocks(iter_line_blocks(stream), analyses, after_block)
+
+
+def _feed_blocks(
+    blocks: Iterator[Tuple[List[str], int]],
+    analyses: Sequence[Analysis],
+    after_block: Optional[Callable[[ScanStats], None]] = None,
+) -> ScanStats:
+    stats = ScanStats(chunks=1)
+    feeds = [analysis.feed for analysis in analyses]
+    
+    for lines, consumed in blocks:
+        for line in lines:
+            for feed in feeds:
+                feed(line)
+        stats.lines_processed += len(lines)
+        stats.bytes_read += consumed
+        if after_block is not None:
+            after_block(stats)
+    
+    return stats
+
+
+def split_offsets(file_path: str, chunks: int, start: int = 0) -> List[Tuple[int, int]]:
+    """
+    Split a file into byte ranges that start and end on line boundaries.
+    
+    Args:
+        file_path: Path to the log file
+        chunks: Desired number of chunks
+        start: Byte offset of the first range (must be a line start)
+    
+    Returns:
+        List of (start, end) byte offsets covering the file from start
+    """
+    size = os.path.getsize(file_path)
+    if chunks <= 1 or size <= start:
+        return [(start, size)]
+    
+    boundaries = [start]
+    with open(file_path, 'rb') as file:
+        for i in range(1, chunks):
+            target = start + (size - start) * i // chunks
+            if target <= boundaries[-1]:
+                continue
+            file.seek(target - 1)
+            # Move to the start of the next line
+            file.readline()
+            position = file.tell()
+            if boundaries[-1] < position < size:
+                boundaries.append(position)
+    
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _scan_chunk(
+    file_path: str,
+    analyses: Sequence[Analysis],
+    start: int,
+    end: int,
+) -> Tuple[Sequence[Analysis], ScanStats]:
+    """Worker entry point: scan one chunk with empty copies of the analyses."""
+    stats = scan_range(file_path, analyses, start, end)
+    return analyses, stats
+
+
+class MemberBoundaryError(Exception):
+    """A gzip chunk did not start or end on a member boundary."""
+
+
+def split_gzip_members(file_path: str, chunks: int) -> List[Tuple[int, int]]:
+    """
+    Split a gzip file into byte ranges that start at gzip member headers.
+    
+    Args:
+        file_path: Path to a gzip file
+        chunks: Desired number of chunks
+    
+    Returns:
+        List of (start, end) byte offsets covering the whole file; a single
+        range if the file has one member or is too small to split
+    """
+    size = os.path.getsize(file_path)
+    chunks = min(chunks, size // MIN_COMPRESSED_CHUNK_SIZE)
+    if chunks <= 1:
+        return [(0, size)]
+    
+    candidates = gzip_member_candidates(file_path)
+    boundaries = [0]
+    for i in range(1, chunks):
+        index = bisect.bisect_left(candidates, size * i // chunks)
+        if index < len(candidates) and candidates[index] > boundaries[-1]:
+            boundaries.append(candidates[index])
+    
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _scan_gzip_members(
+    file_path: str,
+    analyses: Sequence[Analysis],
+    start: int,
+    end: int,
+    first: bool,
+) -> Tuple[Sequence[Analysis], ScanStats, Optional[bytes], bytes]:
+    """
+    Worker entry point: decompress and scan the gzip members in a byte range.
+    
+    Members do not end on line boundaries, so the text before the first
+    newline (unless this is the first chunk) and after the last newline is
+    returned instead of being parsed; the caller joins it with the
+    neighbouring chunks.
+    
+    Returns:
+        Tuple of (analyses, stats, head, tail); head is None if the range
+        contains no newline
+    
+    Raises:
+        MemberBoundaryError: If start or end is not a member boundary
+    """
+    stats = ScanStats(chunks=1)
+    feeds = [analysis.feed for analysis in analyses]
+    head: Optional[bytes] = b'' if first else None
+    pending = b''
+    decompressor = zlib.decompressobj(wbits=31)
+    in_member = False
+    
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        remaining = end - start
+        
+        while remaining > 0:
+            data = file.read(min(READ_BLOCK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            
+            output = []
+            while data:
+                try:
+                    output.append(decompressor.decompress(data))
+                except zlib.error as e:
+                    raise MemberBoundaryError(f"No gzip member at offset {start}: {e}") from e
+                in_member = True
+                if decompressor.eof:
+                    data = decompressor.unused_data
+                    decompressor = zlib.decompressobj(wbits=31)
+                    in_member = False
+                else:
+                    data = b''
+            
+            block = pending + b''.join(output)
+            if head is None:
+                newline = block.find(b'\n')
+                if newline < 0:
+                    pending = block
+                    continue
+                head, block = block[:newline], block[newline + 1:]
+            
+            cut = block.rfind(b'\n')
+            if cut < 0:
+                pending = block
+                continue
+            
+            pending = block[cut + 1:]
+            lines = block[:cut].decode('utf-8', errors='replace').split('\n')
+            for line in lines:
+                for feed in feeds:
+                    feed(line)
+            stats.lines_processed += len(lines)
+            stats.bytes_read += cut + 1
+    
+    if in_member:
+        raise MemberBoundaryError(f"gzip member runs past offset {end}")
+    
+    return analyses, stats, head, pending
+
+
+def _run_gzip_members(
+    file_path: str,
+    analyses: Sequence[Analysis],
+    ranges: List[Tuple[int, int]],
+    workers: int,
+) -> ScanStats:
+    """Scan member-aligned gzip ranges in a process pool and merge them in order."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                _scan_gzip_members, file_path,
+                [analysis.spawn() for analysis in analyses], start, end, start == 0
+            )
+            for start, end in ranges
+        ]
+        # Collect everything first, so a bad boundary leaves analyses untouched
+        results = [future.result() for future in futures]
+    
+    stats = ScanStats()
+    carry = b''
+    
+    def feed_joined(line: bytes) -> None:
+        joined = [analysis.spawn() for analysis in analyses]
+        text = line.decode('utf-8', errors='replace')
+        for analysis in joined:
+            analysis.feed(text)
+        for analysis, partial in zip(analyses, joined):
+            analysis.merge(partial)
+        stats.lines_processed += 1
+        stats.bytes_read += len(line) + 1
+    
+    for index, (partials, chunk_stats, head, tail) in enumerate(results):
+        if head is None:
+            # No newline in this chunk: it continues the line of the previous one
+            carry += tail
+        else:
+            if index > 0:
+                feed_joined(carry + head)
+            carry = tail
+        
+        # Lines joined across the boundary come before this chunk's lines
+        for analysis, partial in zip(analyses, partials):
+            analysis.merge(partial)
+        stats.merge(chunk_stats)
+    
+    if carry:
+        feed_joined(carry)
+        stats.bytes_read -= 1
+    
+    return stats
+
+
+def _run_compressed(
+    file_path: str,
+    compression: str,
+    analyses: Sequence[Analysis],
+    workers: int,
+    after_block: Optional[Callable[[ScanStats], None]] = None,
+) -> ScanStats:
+    """Run analyses over a compressed file, decompressing as a stream."""
+    if compression == 'gzip' and workers > 1:
+        ranges = split_gzip_members(file_path, workers * CHUNKS_PER_WORKER)
+        if len(ranges) > 1:
+            logger.info(f"Parsing {file_path} in {len(ranges)} gzip member chunks with {workers} workers")
+            try:
+                return _run_gzip_members(file_path, analyses, ranges, workers)
+            except MemberBoundaryError as e:
+                logger.warning(f"Parallel gzip decompression not possible, reading sequentially: {e}")
+    
+    with open_binary(file_path) as stream:
+        return scan_stream(stream, analyses, after_block)
+
+
+def can_use_processes() -> bool:
+    """
+    Check whether this process may start worker processes.
+    
+    Daemonic processes (e.g. Celery prefork children) cannot have children.
+    
+    Returns:
+        True if a process pool can be created
+    """
+    return not multiprocessing.current_process().daemon
+
+
+def run_analyses(
+    file_path: str,
+    analyses: Sequence[Analysis],
+    workers: int = 1,
+    checkpoint: Optional[Any] = None,
+    progress: Optional[Callable[[ScanProgress], None]] = None,
+) -> ScanStats:
+    """
+    Run analyses over a log file, optionally in parallel.
+    
+    With more than one worker, the file is split at newline-aligned byte
+    offsets and the chunks are parsed in a process pool. Partial results are
+    merged in chunk order, so row-based results keep the file order.
+    
+    gzip, bzip2 and xz files are decompressed while they are read. gzip
+    files with several members (e.g. BGZF or concatenated archives) are
+    split at member starts and decompressed in parallel.
+    
+    With a checkpoint (see scan_checkpoint.ScanCheckpoint), the scan
+    resumes from the state it saved last, and the analyses and the byte
+    offset reached are saved whenever ``checkpoint.due()``: after a block
+    when scanning in this process, after a merged chunk otherwise.
+    Compressed files are not checkpointed.
+    
+    ``progress`` is called with a scan_progress.ScanProgress (bytes and
+    lines read, matches, throughput and ETA) at most once per
+    scan_progress.DEFAULT_PROGRESS_INTERVAL seconds, and once more when the
+    scan completes. Parallel scans report as chunks are merged.
+    
+    Args:
+        file_path: Path to the log file
+        analyses: Empty analyses to feed; they receive the merged results
+        workers: Number of worker processes (1 scans in this process)
+        checkpoint: Optional object with ``restore(path, analyses)``,
+            ``due()`` and ``save(path, offset, analyses, stats)`` methods
+        progress: Optional function called with the scan's progress
+    
+    Returns:
+        ScanStats for the whole file, including parts scanned before a resume
+    
+    Example:
+        >>> firewall = FirewallAnalysis()
+        >>> stats = run_analyses('traffic.log', [firewall], workers=8)
+        >>> df = firewall.to_dataframe()
+    """
+    path = str(Path(file_path))
+    workers = max(1, int(workers or 1))
+    
+    if workers > 1 and not can_use_processes():
+        logger.warning("Parallel parsing unavailable in a daemonic process, using 1 worker")
+        workers = 1
+    
+    compression = detect_compression(path)
+    reporter = None
+    if progress is not None:
+        # Decompressed sizes are not known in advance
+        reporter = ProgressReporter(progress, None if compression else os.path.getsize(path))
+    
+    if compression is not None:
+        if checkpoint is not None:
+            logger.info(f"{path} is {compression}-compressed; parsing without checkpoints")
+        stats = _run_compressed(
+            path, compression, analyses, workers, _block_hook(path, analyses, 0, ScanStats(), None, reporter)
+        )
+    else:
+        stats = _run_file(path, analyses, workers, checkpoint, reporter)
+    
+    if reporter is not None:
+        reporter.finish(stats.bytes_read, stats.lines_processed, matched_lines(analyses))
+    return stats
+
+
+def matched_lines(analyses: Sequence[Analysis]) -> int:
+    """
+    Matches of all analyses so far (a line matched by two counts twice).
+    
+    Statistics analyses, which only summarize the lines of another
+    analysis, are not counted.
+    """
+    return sum(analysis.lines_matched for analysis in analyses if analysis.reports_matches)
+
+
+def _run_file(
+    path: str,
+    analyses: Sequence[Analysis],
+    workers: int,
+    checkpoint: Any,
+    reporter: Optional[ProgressReporter],
+) -> ScanStats:
+    """Run analyses over an uncompressed file, resuming from a checkpoint if there is one."""
+    offset, stats = 0, ScanStats()
+    if checkpoint is not None:
+        offset, stats = checkpoint.restore(path, analyses)
+    if reporter is not None:
+        reporter.resume_from(offset, stats.lines_processed)
+    
+    size = os.path.getsize(path)
+    chunk_count = min(workers * CHUNKS_PER_WORKER, max(1, (size - offset) // MIN_CHUNK_SIZE))
+    
+    if workers == 1 or chunk_count <= 1:
+        after_block = _block_hook(path, analyses, offset, stats, checkpoint, reporter)
+        stats.merge(scan_range(path, analyses, offset, after_block=after_block))
+        return stats
+    
+    ranges = split_offsets(path, chunk_count, offset)
+    logger.info(f"Parsing {path} in {len(ranges)} chunks with {workers} workers")
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_scan_chunk, path, [analysis.spawn() for analysis in analyses], start, end)
+            for start, end in ranges
+        ]
+        
+        # Merge in submission order so rows stay in file order
+        for future, (_, end) in zip(futures, ranges):
+            partials, chunk_stats = future.result()
+            for analysis, partial in zip(analyses, partials):
+                analysis.merge(partial)
+            stats.merge(chunk_stats)
+            if reporter is not None:
+                reporter.update(end, stats.lines_processed, matched_lines(analyses))
+            if checkpoint is not None and checkpoint.due():
+                checkpoint.save(path, end, analyses, stats)
+    
+    return stats
+
+
+def _block_hook(
+    path: str,
+    analyses: Sequence[Analysis],
+    start: int,
+    restored: ScanStats,
+    checkpoint: Any,
+    reporter: Optional[ProgressReporter],
+) -> Optional[Callable[[ScanStats], None]]:
+    """Per-block callback of a scan from start that reports progress and saves checkpoints when due."""
+    if checkpoint is None and reporter is None:
+        return None
+    
+    def after_block(scanned: ScanStats) -> None:
+        offset = start + scanned.bytes_read
+        if reporter is not None:
+            reporter.update(offset, restored.lines_processed + scanned.lines_processed, matched_lines(analyses))
+        if checkpoint is not None and checkpoint.due():
+            total = ScanStats()
+            total.merge(restored)
+            total.merge(scanned)
+            checkpoint.save(path, offset, analyses, total)
+    
+    return after_block
+
+
+def stream_analysis(
+    file_path: str,
+    analysis: RowAnalysis,
+    sink: Any,
+    workers: int = 1,
+    batch_rows: int = STREAM_BATCH_ROWS,
+    progress: Optional[Callable[[ScanProgress], None]] = None,
+    alongside: Sequence[Analysis] = (),
+) -> Tuple[ScanStats, Optional[pd.DataFrame]]:
+    """
+    Run a row analysis, writing its rows to a sink while the file is parsed.
+    
+    Args:
+        file_path: Path to the log file
+        analysis: Fresh row analysis
+        sink: Object with a ``write(df)`` method
+        workers: Number of worker processes (1 scans in this process)
+        batch_rows: Rows buffered before a batch is written
+        progress: Optional progress callback (see run_analyses)
+        alongside: Further fresh analyses fed in the same pass, e.g. a
+            StatisticsAnalysis of the streamed rows
+    
+    Returns:
+        Tuple of ScanStats and the complete result if it fit in a single
+        batch (None if rows were already written out during the scan)
+    
+    Example:
+        >>> with CsvResultWriter('vpn.csv', VPNLoginAnalysis.columns) as writer:
+        ...     stats, df = stream_analysis('vpn.log', VPNLoginAnalysis(), writer)
+    """
+    analysis.stream_to(sink, batch_rows)
+    stats = run_analyses(file_path, [analysis, *alongside], workers=workers, progress=progress)
+    
+    if analysis.rows_streamed:
+        analysis.flush()
+        return stats, None
+    
+    # Nothing was written yet: the whole result is in memory
+    df = analysis.to_dataframe()
+    sink.write(df)
+    return stats, df
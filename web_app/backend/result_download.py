@@ -0,0 +1,85 @@
+"""
+HTTP delivery of result files.
+
+CSV and NDJSON results are stored gzip-compressed. send_result() serves the
+stored bytes as they are, with ``Content-Encoding: gzip``, to clients that
+accept gzip, and decompresses them on the fly for clients that do not.
+Every response carries an ETag and Last-Modified, so conditional GETs are
+answered with 304 Not Modified. Byte ranges are supported on the stored
+bytes, so interrupted downloads can resume.
+"""
+
+import gzip
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from flask import Request, Response, request, send_file
+
+from compressed_io import strip_compression_suffix
+from result_writer import MEDIA_TYPES, is_gzipped, resolve_format
+
+# Bytes decompressed per chunk for clients that do not accept gzip
+STREAM_CHUNK_SIZE = 256 * 1024
+
+
+def accepts_gzip(req: Request) -> bool:
+    """Check whether a request accepts gzip content encoding."""
+    return req.accept_encodings['gzip'] > 0
+
+
+def send_result(path: Union[str, Path], download_name: Optional[str] = None) -> Response:
+    """
+    Send a result file as a download.
+    
+    Args:
+        path: Result file in the results folder
+        download_name: File name offered to the client; defaults to the
+            file name without a compression suffix
+    
+    Returns:
+        Response for the current request: the full file, a byte range,
+        or 304 Not Modified
+    
+    Example:
+        >>> return send_result(Path('results') / 'vpn_parsed_admin_20240115.csv.gz')
+    """
+    path = Path(path)
+    mimetype = MEDIA_TYPES[resolve_format(None, path)]
+    download_name = download_name or strip_compression_suffix(path.name)
+    
+    if not is_gzipped(path):
+        return send_file(path, mimetype=mimetype, as_attachment=True, download_name=download_name, conditional=True)
+    
+    # Both encodings of a file need their own ETag
+    stat = path.stat()
+    version = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+    
+    if accepts_gzip(request):
+        response = send_file(
+            path,
+            mimetype=mimetype,
+            as_attachment=True,
+            download_name=download_name,
+            conditional=True,
+            etag=f'{version}-gzip'
+        )
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(_decompress(path), mimetype=mimetype)
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+        response.headers['Accept-Ranges'] = 'none'
+        response.set_etag(f'{version}-identity')
+        response.last_modified = stat.st_mtime
+        response.make_conditional(request)
+    
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def _decompress(path: Path) -> Iterator[bytes]:
+    with gzip.open(path, 'rb') as handle:
+        while True:
+            chunk = handle.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,498 @@
+"""
+Paged access to saved results.
+
+A result file (CSV, NDJSON, ...) has to be read in full to show any part of
+it. Next to each result a column store is kept that can be read by memory
+map: numeric columns as raw arrays, text columns as one UTF-8 blob plus the
+end offset of every row. Reading a page touches only the rows on it, so any
+page of a multi-million-row result is returned in milliseconds.
+
+Sorting by a column uses a row permutation that is computed the first time
+the column is sorted on and stored with the columns.
+
+Text columns are also dictionary-encoded while they are written: every
+distinct value gets a code, the code of each row is stored, and on close the
+row numbers of each code (its postings) are stored in code order. Looking up
+the rows holding a value reads only that value's postings (see
+result_query).
+"""
+
+import json
+import logging
+import math
+import mmap
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+try:
+    import pandas as pd
+except ImportError:
+    raise ImportError("pandas is required. Install with: pip install pandas")
+
+from result_writer import WRITE_BATCH_ROWS, read_result
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when the stored column layout changes
+PAGES_VERSION = 2
+# Written last: a directory without it is incomplete
+META_FILE = 'meta.json'
+# Rows per page when none is requested
+DEFAULT_PAGE_SIZE = 100
+# Largest page that may be requested
+MAX_PAGE_SIZE = 1000
+
+
+def row_dtype(rows: int) -> np.dtype:
+    """Smallest unsigned type that holds the row numbers of a result."""
+    return np.dtype(np.uint32) if rows <= np.iinfo(np.uint32).max else np.dtype(np.int64)
+
+
+def save_array(path: Path, array: np.ndarray) -> None:
+    """Store an array next to the columns of a finished store."""
+    # Readers may open the store at the same time
+    temp_path = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+    with open(temp_path, 'wb') as handle:
+        np.save(handle, array)
+    os.replace(temp_path, path)
+
+
+class PageWriter:
+    """
+    Write result batches to a paged column store.
+    
+    Has the ``write(df)``/``close()`` interface of the result writers, so it
+    can mirror one (see result_writer.ResultWriter) and fill while the result
+    is being parsed. Files are written to a temporary directory that is moved
+    into place on close, so readers never see a partial store.
+    
+    Example:
+        >>> with open_writer('vpn.csv', columns, mirror=PageWriter('pages/vpn.csv')) as writer:
+        ...     writer.write(batch)
+    """
+    
+    def __init__(self, directory: Union[str, Path]):
+        """
+        Start a column store.
+        
+        Args:
+            directory: Directory of the store (replaced on close)
+        """
+        self.directory = Path(directory)
+        self.directory.parent.mkdir(parents=True, exist_ok=True)
+        self.rows = 0
+        self.closed = False
+        
+        self._temp = self.directory.with_name(f'.{self.directory.name}.{uuid.uuid4().hex}.tmp')
+        self._temp.mkdir()
+        self._columns: List[Dict[str, Any]] = []
+        self._files: List[Any] = []
+        self._offsets: List[Any] = []
+        self._codes: List[Any] = []
+        self._keys: List[Optional[Dict[str, int]]] = []
+        self._ends: List[int] = []
+    
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Append a batch of rows.
+        
+        Args:
+            df: Rows to append; the first batch fixes the columns and types
+        """
+        if df.empty:
+            return
+        
+        if not self._columns:
+            self._start(df)
+        
+        for position, spec in enumerate(self._columns):
+            column = df[spec['name']]
+            
+            if spec['kind'] == 'number':
+                self._files[position].write(column.to_numpy(dtype=spec['dtype'], na_value=np.nan).tobytes())
+                continue
+            
+            # Distinct values are converted once; missing values (code -1)
+            # are stored as empty text
+            batch_codes, uniques = pd.factorize(column)
+            values = [str(value) for value in uniques]
+            if (batch_codes == -1).any():
+                values.append('')
+            
+            encoded = [value.encode('utf-8') for value in values]
+            lengths = np.array([len(value) for value in encoded], dtype=np.int64)
+            ends = np.cumsum(lengths[batch_codes]) + self._ends[position]
+            self._files[position].write(b''.join([encoded[code] for code in batch_codes.tolist()]))
+            self._offsets[position].write(ends.tobytes())
+            self._ends[position] = int(ends[-1])
+            
+            # Batch codes are mapped to codes over the whole result
+            keys = self._keys[position]
+            lookup = np.array([keys.setdefault(value, len(keys)) for value in values], dtype=np.int32)
+            self._codes[position].write(lookup[batch_codes].tobytes())
+        
+        self.rows += len(df)
+    
+    def close(self) -> None:
+        """Finish the store and move it into place."""
+        if self.closed:
+            return
+        self.closed = True
+        
+        self._close_files()
+        
+        for position, keys in enumerate(self._keys):
+            if keys is not None:
+                self._write_postings(position, keys)
+        
+        meta = {'version': PAGES_VERSION, 'rows': self.rows, 'columns': self._columns}
+        with open(self._temp / META_FILE, 'w', encoding='utf-8') as handle:
+            json.dump(meta, handle)
+        
+        shutil.rmtree(self.directory, ignore_errors=True)
+        try:
+            os.replace(self._temp, self.directory)
+        except OSError:
+            # Another writer moved its store into place first
+            shutil.rmtree(self._temp, ignore_errors=True)
+    
+    def discard(self) -> None:
+        """Drop the store without moving it into place."""
+        self.closed = True
+        self._close_files()
+        shutil.rmtree(self._temp, ignore_errors=True)
+    
+    def _close_files(self) -> None:
+        for handle in self._files + self._offsets + self._codes:
+            if handle is not None:
+                handle.close()
+    
+    def _write_postings(self, position: int, keys: Dict[str, int]) -> None:
+        with open(self._temp / f'{position}.keys.json', 'w', encoding='utf-8') as handle:
+            json.dump(list(keys), handle)
+        
+        codes = np.fromfile(self._temp / f'{position}.codes', dtype=np.int32)
+        # Rows of each code, in result order, followed by the next code's rows
+        postings = np.argsort(codes, kind='stable').astype(row_dtype(self.rows))
+        starts = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(keys)))))
+        
+        np.save(self._temp / f'{position}.postings.npy', postings)
+        np.save(self._temp / f'{position}.starts.npy', starts.astype(np.int64))
+    
+    def _start(self, df: pd.DataFrame) -> None:
+        for position, name in enumerate(df.columns):
+            dtype = df[name].dtype
+            if pd.api.types.is_numeric_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype):
+                # Nullable (extension) numbers are stored as floats, NaN where missing
+                stored = np.dtype(np.float64) if pd.api.types.is_extension_array_dtype(dtype) else np.dtype(dtype)
+                spec = {'name': str(name), 'kind': 'number', 'dtype': stored.str}
+                self._offsets.append(None)
+                self._codes.append(None)
+                self._keys.append(None)
+            else:
+                spec = {'name': str(name), 'kind': 'text'}
+                self._offsets.append(open(self._temp / f'{position}.offsets', 'wb'))
+                self._codes.append(open(self._temp / f'{position}.codes', 'wb'))
+                self._keys.append({})
+            self._columns.append(spec)
+            self._files.append(open(self._temp / f'{position}.data', 'wb'))
+            self._ends.append(0)
+    
+    def __enter__(self) -> 'PageWriter':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class ResultPages:
+    """
+    Read pages of a result from its column store.
+    
+    Example:
+        >>> pages = ResultPages('pages/firewall_parsed_admin.csv.gz')
+        >>> page = pages.page(3, page_size=50, sort='total_sentbyte', descending=True)
+        >>> print(page['records'][0])
+    """
+    
+    def __init__(self, directory: Union[str, Path]):
+        """
+        Open a column store.
+        
+        Args:
+            directory: Directory written by PageWriter
+        
+        Raises:
+            FileNotFoundError: If the store does not exist or is incomplete
+            ValueError: If the store was written in another layout version
+        """
+        self.directory = Path(directory)
+        
+        with open(self.directory / META_FILE, encoding='utf-8') as handle:
+            meta = json.load(handle)
+        
+        if meta.get('version') != PAGES_VERSION:
+            raise ValueError(f"Unsupported result pages version: {meta.get('version')}")
+        
+        self.rows: int = meta['rows']
+        self.columns: List[Dict[str, Any]] = meta['columns']
+        self._positions = {spec['name']: position for position, spec in enumerate(self.columns)}
+    
+    @property
+    def column_names(self) -> List[str]:
+        """Names of the stored columns, in result order."""
+        return [spec['name'] for spec in self.columns]
+    
+    def page(
+        self,
+        page: int = 1,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        sort: Optional[str] = None,
+        descending: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Read one page of rows.
+        
+        Args:
+            page: Page number, starting at 1
+            page_size: Rows per page (at most MAX_PAGE_SIZE)
+            sort: Column to sort by, or None for result order
+            descending: Sort in descending order
+        
+        Returns:
+            Dictionary with the page position, the total row and page counts,
+            the column names and the page rows as records
+        
+        Raises:
+            ValueError: If the page, page size or sort column is invalid
+        """
+        if page < 1:
+            raise ValueError("Page must be 1 or greater")
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"Page size must be between 1 and {MAX_PAGE_SIZE}")
+        if sort is not None and sort not in self._positions:
+            raise ValueError(f"Unknown sort column: {sort}")
+        
+        start = min((page - 1) * page_size, self.rows)
+        stop = min(start + page_size, self.rows)
+        rows = self.row_numbers(start, stop, sort, descending)
+        
+        return {
+            'page': page,
+            'page_size': page_size,
+            'pages': max(1, math.ceil(self.rows / page_size)),
+            'rows': self.rows,
+            'sort': sort,
+            'order': 'desc' if descending else 'asc',
+            'columns': self.column_names,
+            'records': self.records(rows),
+        }
+    
+    def records(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Read rows as records.
+        
+        Args:
+            rows: Stored row numbers, in the order to return them
+        
+        Returns:
+            One dictionary per row; missing numbers are None
+        """
+        names = self.column_names
+        columns = [self._read_column(position, rows) for position in range(len(self.columns))]
+        return [dict(zip(names, values)) for values in zip(*columns)]
+    
+    def position(self, name: str) -> int:
+        """
+        Get the position of a column.
+        
+        Raises:
+            ValueError: If the result has no such column
+        """
+        if name not in self._positions:
+            raise ValueError(f"Unknown column: {name}")
+        return self._positions[name]
+    
+    def keys(self, name: str) -> List[str]:
+        """
+        Get the distinct values of a text column, in code order.
+        
+        Raises:
+            ValueError: If the column is unknown or not a text column
+        """
+        position = self._text_position(name)
+        with open(self.directory / f'{position}.keys.json', encoding='utf-8') as handle:
+            return json.load(handle)
+    
+    def codes(self, name: str) -> np.ndarray:
+        """Get the value code of every row of a text column (memory-mapped)."""
+        position = self._text_position(name)
+        return np.memmap(self.directory / f'{position}.codes', dtype=np.int32, mode='r', shape=(self.rows,))
+    
+    def numbers(self, name: str) -> np.ndarray:
+        """Get the values of a number column (memory-mapped)."""
+        position = self.position(name)
+        if self.columns[position]['kind'] != 'number':
+            raise ValueError(f"Not a number column: {name}")
+        return self._numbers(position)
+    
+    def posting_count(self, name: str, codes: np.ndarray) -> int:
+        """Count the rows holding any of the given codes of a text column."""
+        starts = np.load(self.directory / f'{self._text_position(name)}.starts.npy', mmap_mode='r')
+        codes = np.asarray(codes, dtype=np.int64)
+        return int((starts[codes + 1] - starts[codes]).sum())
+    
+    def postings(self, name: str, codes: np.ndarray) -> np.ndarray:
+        """
+        Get the rows holding any of the given codes of a text column.
+        
+        Args:
+            name: Text column
+            codes: Value codes (see keys())
+        
+        Returns:
+            Sorted row numbers as an int64 array
+        """
+        position = self._text_position(name)
+        starts = np.load(self.directory / f'{position}.starts.npy', mmap_mode='r')
+        postings = np.load(self.directory / f'{position}.postings.npy', mmap_mode='r')
+        
+        codes = np.asarray(codes, dtype=np.int64)
+        if len(codes) == 1:
+            return np.asarray(postings[starts[codes[0]]:starts[codes[0] + 1]], dtype=np.int64)
+        
+        # Gather the postings of all codes at once, then merge them
+        firsts = starts[codes]
+        lengths = starts[codes + 1] - firsts
+        offsets = np.cumsum(lengths) - lengths
+        indexes = np.arange(lengths.sum(), dtype=np.int64) + np.repeat(firsts - offsets, lengths)
+        return np.sort(postings[indexes].astype(np.int64))
+    
+    def _text_position(self, name: str) -> int:
+        position = self.position(name)
+        if self.columns[position]['kind'] != 'text':
+            raise ValueError(f"Not a text column: {name}")
+        return position
+    
+    def row_numbers(self, start: int, stop: int, sort: Optional[str] = None, descending: bool = False) -> np.ndarray:
+        """
+        Get the stored row numbers at positions start..stop of an ordering.
+        
+        Args:
+            start: First position
+            stop: Position after the last one
+            sort: Column to sort by, or None for result order
+            descending: Sort in descending order
+        
+        Returns:
+            Row numbers as an int64 array
+        """
+        if sort is None:
+            rows = np.arange(start, stop, dtype=np.int64)
+            return self.rows - 1 - rows if descending else rows
+        
+        order = self._sort_order(self._positions[sort])
+        if descending:
+            return np.asarray(order[self.rows - stop:self.rows - start][::-1])
+        return np.asarray(order[start:stop])
+    
+    def _sort_order(self, position: int) -> np.ndarray:
+        """Ascending row order of a column, computed once and stored."""
+        path = self.directory / f'{position}.order.npy'
+        
+        if not path.exists():
+            spec = self.columns[position]
+            if spec['kind'] == 'text':
+                # Sort the distinct values once and order rows by their rank
+                keys = np.array(self.keys(spec['name']), dtype=str)
+                ranks = np.empty(len(keys), dtype=np.int32)
+                ranks[np.argsort(keys, kind='stable')] = np.arange(len(keys), dtype=np.int32)
+                values = ranks[self.codes(spec['name'])]
+            else:
+                values = self._numbers(position)
+            save_array(path, np.argsort(values, kind='stable').astype(np.int64))
+        
+        return np.load(path, mmap_mode='r')
+    
+    def _numbers(self, position: int) -> np.ndarray:
+        dtype = np.dtype(self.columns[position]['dtype'])
+        return np.memmap(self.directory / f'{position}.data', dtype=dtype, mode='r', shape=(self.rows,))
+    
+    def _read_column(self, position: int, rows: np.ndarray) -> List[Any]:
+        data_path = self.directory / f'{position}.data'
+        
+        if not len(rows):
+            return []
+        
+        if self.columns[position]['kind'] == 'number':
+            values = self._numbers(position)[rows]
+            # NaN is not valid JSON
+            return [None if isinstance(value, float) and math.isnan(value) else value for value in values.tolist()]
+        
+        ends = np.memmap(self.directory / f'{position}.offsets', dtype=np.int64, mode='r', shape=(self.rows,))
+        starts = np.where(rows > 0, ends[np.maximum(rows - 1, 0)], 0)
+        stops = ends[rows]
+        
+        if int(ends[-1]) == 0:
+            values = [''] * len(rows)
+        else:
+            with open(data_path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                values = [data[begin:end].decode('utf-8') for begin, end in zip(starts.tolist(), stops.tolist())]
+        
+        return values
+
+
+def pages_path(pages_folder: Union[str, Path], result_path: Union[str, Path]) -> Path:
+    """Get the column store directory of a result file."""
+    return Path(pages_folder) / Path(result_path).name
+
+
+def open_pages(result_path: Union[str, Path], pages_folder: Union[str, Path]) -> ResultPages:
+    """
+    Open the column store of a result, building it from the file if needed.
+    
+    Results saved before their store was written (or whose store was
+    removed) are read once and stored.
+    
+    Args:
+        result_path: Result file
+        pages_folder: Folder holding the column stores
+    
+    Returns:
+        ResultPages for the result
+    
+    Raises:
+        FileNotFoundError: If the result file doesn't exist
+    """
+    directory = pages_path(pages_folder, result_path)
+    
+    try:
+        return ResultPages(directory)
+    except (FileNotFoundError, ValueError):
+        pass
+    
+    if not Path(result_path).is_file():
+        raise FileNotFoundError(f"Result not found: {result_path}")
+    
+    logger.info(f"Building result pages for {result_path}")
+    
+    df = read_result(result_path)
+    with PageWriter(directory) as writer:
+        for start in range(0, len(df), WRITE_BATCH_ROWS):
+            writer.write(df.iloc[start:start + WRITE_BATCH_ROWS])
+    
+    return ResultPages(directory)
+
+
+def remove_pages(result_path: Union[str, Path], pages_folder: Union[str, Path]) -> None:
+    """Remove the column store of a result, if there is one."""
+    shutil.rmtree(pages_path(pages_folder, result_path), ignore_errors=True)
@@ -0,0 +1,327 @@
+"""
+Indexed queries over saved results.
+
+Filters a result by user, IP address or CIDR network, time range and
+message text using the indexes of its column store (see result_pages):
+
+- user and message filters match the distinct values of a column and read
+  the postings of the matching values,
+- IP filters look networks up in a sorted array of the distinct IPv4
+  addresses,
+- time filters look the range up in the sorted row times (see
+  log_time.TimeIndex).
+
+The IP and time indexes are derived from the stored columns the first time
+they are needed and stored with them; row times come from the epoch column,
+or from the date and time columns of results saved without one. A query reads the rows of
+its most selective filter and checks only those rows against the others, so
+selective queries never scan the whole result.
+"""
+
+import ipaddress
+import logging
+import math
+import socket
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+try:
+    import pandas as pd
+except ImportError:
+    raise ImportError("pandas is required. Install with: pip install pandas")
+
+from log_time import EPOCH_COLUMN, NO_EPOCH, TimeIndex, epoch_seconds, parse_time
+from result_pages import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, ResultPages, save_array
+
+
+logger = logging.getLogger(__name__)
+
+# Columns searched by each filter; the first one the result has is used
+USER_COLUMNS = ('user',)
+IP_COLUMNS = ('remip', 'srcip', 'dstip')
+MESSAGE_COLUMNS = ('msg',)
+DATE_COLUMN = 'date'
+TIME_COLUMN = 'time'
+
+
+class RowFilter:
+    """
+    One condition of a query.
+    
+    A filter can list the rows it matches (rows()) or check given rows
+    (test()); count() tells how many rows it matches, so the query can
+    start from the most selective filter.
+    """
+    
+    def count(self) -> int:
+        raise NotImplementedError
+    
+    def rows(self) -> np.ndarray:
+        """Sorted row numbers matching the filter."""
+        raise NotImplementedError
+    
+    def test(self, rows: np.ndarray) -> np.ndarray:
+        """Boolean mask of the given rows that match the filter."""
+        raise NotImplementedError
+
+
+class CodeFilter(RowFilter):
+    """Rows whose text column holds one of a set of values."""
+    
+    def __init__(self, pages: ResultPages, column: str, codes: np.ndarray):
+        self.pages = pages
+        self.column = column
+        self.codes = np.asarray(codes, dtype=np.int32)
+    
+    def count(self) -> int:
+        return self.pages.posting_count(self.column, self.codes)
+    
+    def rows(self) -> np.ndarray:
+        return self.pages.postings(self.column, self.codes)
+    
+    def test(self, rows: np.ndarray) -> np.ndarray:
+        return np.isin(self.pages.codes(self.column)[rows], self.codes)
+
+
+class TimeFilter(RowFilter):
+    """Rows whose time falls in a range (both ends included)."""
+    
+    def __init__(self, index: TimeIndex, start: Optional[int], end: Optional[int]):
+        self.index = index
+        self.start = start
+        self.end = end
+    
+    def count(self) -> int:
+        return self.index.count(self.start, self.end)
+    
+    def rows(self) -> np.ndarray:
+        return self.index.select(self.start, self.end)
+    
+    def test(self, rows: np.ndarray) -> np.ndarray:
+        return self.index.contains(rows, self.start, self.end)
+
+
+class ResultQuery:
+    """
+    Filter a result through the indexes of its column store.
+    
+    Example:
+        >>> query = ResultQuery(open_pages('results/vpn_parsed_admin.csv.gz', 'pages'))
+        >>> found = query.query(user='jdoe', ip='203.0.113.0/24', start='2024-03-01', end='2024-03-31')
+        >>> print(found['matches'], found['records'][:3])
+    """
+    
+    def __init__(self, pages: ResultPages):
+        """
+        Args:
+            pages: Column store of the result
+        """
+        self.pages = pages
+    
+    def match(
+        self,
+        user: Optional[str] = None,
+        ip: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        message: Optional[str] = None
+    ) -> np.ndarray:
+        """
+        Find the rows matching all given filters.
+        
+        Args:
+            user: Username, matched case-insensitively
+            ip: IP address or CIDR network (e.g. "10.0.0.0/8")
+            start: First date or time of the range
+            end: Last date or time of the range
+            message: Text the message contains, matched case-insensitively
+        
+        Returns:
+            Matching row numbers, in result order
+        
+        Raises:
+            ValueError: If a filter is invalid or the result has no column for it
+        """
+        filters = self.filters(user, ip, start, end, message)
+        
+        if not filters:
+            return np.arange(self.pages.rows, dtype=np.int64)
+        
+        filters.sort(key=lambda row_filter: row_filter.count())
+        rows = filters[0].rows()
+        
+        for row_filter in filters[1:]:
+            if not len(rows):
+                break
+            rows = rows[row_filter.test(rows)]
+        
+        return rows
+    
+    def query(
+        self,
+        user: Optional[str] = None,
+        ip: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        message: Optional[str] = None,
+        page: int = 1,
+        page_size: int = DEFAULT_PAGE_SIZE
+    ) -> Dict[str, Any]:
+        """
+        Get one page of the rows matching all given filters.
+        
+        Args:
+            user: Username, matched case-insensitively
+            ip: IP address or CIDR network
+            start: First date or time of the range
+            end: Last date or time of the range
+            message: Text the message contains, matched case-insensitively
+            page: Page number, starting at 1
+            page_size: Rows per page (at most MAX_PAGE_SIZE)
+        
+        Returns:
+            Dictionary with the match count, the page position, the column
+            names and the page rows as records
+        
+        Raises:
+            ValueError: If a filter, the page or the page size is invalid
+        """
+        if page < 1:
+            raise ValueError("Page must be 1 or greater")
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"Page size must be between 1 and {MAX_PAGE_SIZE}")
+        
+        rows = self.match(user, ip, start, end, message)
+        first = (page - 1) * page_size
+        
+        return {
+            'matches': len(rows),
+            'page': page,
+            'page_size': page_size,
+            'pages': max(1, math.ceil(len(rows) / page_size)),
+            'columns': self.pages.column_names,
+            'records': self.pages.records(rows[first:first + page_size]),
+        }
+    
+    def filters(
+        self,
+        user: Optional[str] = None,
+        ip: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        message: Optional[str] = None
+    ) -> List[RowFilter]:
+        """Build the filters of a query (see match())."""
+        filters: List[RowFilter] = []
+        
+        if user:
+            column = self._column(USER_COLUMNS, 'user')
+            wanted = user.strip().lower()
+            filters.append(self._values(column, lambda value: value.lower() == wanted))
+        
+        if message:
+            column = self._column(MESSAGE_COLUMNS, 'message')
+            wanted = message.lower()
+            filters.append(self._values(column, lambda value: wanted in value.lower()))
+        
+        if ip:
+            filters.append(self._network(self._column(IP_COLUMNS, 'IP address'), ip))
+        
+        if start or end:
+            first = parse_time(start) if start else None
+            last = parse_time(end, end=True) if end else None
+            if first is not None and last is not None and first > last:
+                raise ValueError("Start of the time range is after its end")
+            filters.append(TimeFilter(self._time_index(), first, last))
+        
+        return filters
+    
+    def _column(self, candidates: tuple, label: str) -> str:
+        for name in candidates:
+            if name in self.pages.column_names:
+                return name
+        raise ValueError(f"Result has no {label} column")
+    
+    def _values(self, column: str, matches: Any) -> CodeFilter:
+        codes = [code for code, value in enumerate(self.pages.keys(column)) if matches(value)]
+        return CodeFilter(self.pages, column, np.array(codes, dtype=np.int32))
+    
+    def _network(self, column: str, value: str) -> CodeFilter:
+        try:
+            network = ipaddress.ip_network(value.strip(), strict=False)
+        except ValueError:
+            raise ValueError(f"Invalid IP address or network: {value}")
+        
+        if network.version == 6:
+            # IPv6 results are rare; their few distinct values are checked one by one
+            return self._values(column, lambda key: _in_network(key, network))
+        
+        addresses, codes = self._ipv4_index(column)
+        first = np.searchsorted(addresses, int(network.network_address), side='left')
+        stop = np.searchsorted(addresses, int(network.broadcast_address), side='right')
+        return CodeFilter(self.pages, column, codes[first:stop])
+    
+    def _ipv4_index(self, column: str) -> tuple:
+        """Distinct IPv4 addresses of a column, sorted, with their value codes."""
+        position = self.pages.position(column)
+        addresses_path = self.pages.directory / f'{position}.ipv4.npy'
+        codes_path = self.pages.directory / f'{position}.ipv4codes.npy'
+        
+        if not codes_path.exists():
+            packed = bytearray()
+            codes = []
+            for code, key in enumerate(self.pages.keys(column)):
+                try:
+                    packed += socket.inet_pton(socket.AF_INET, key)
+                except OSError:
+                    # Not an IPv4 address
+                    continue
+                codes.append(code)
+            
+            addresses = np.frombuffer(bytes(packed), dtype='>u4')
+            codes = np.array(codes, dtype=np.int32)
+            order = np.argsort(addresses, kind='stable')
+            
+            save_array(addresses_path, addresses[order].astype(np.uint32))
+            save_array(codes_path, codes[order])
+        
+        return np.load(addresses_path, mmap_mode='r'), np.load(codes_path, mmap_mode='r')
+    
+    def _time_index(self) -> TimeIndex:
+        """Row times in time order, computed once and stored."""
+        directory = self.pages.directory
+        paths = [directory / name for name in ('time.npy', 'time.order.npy', 'time.sorted.npy')]
+        
+        if not paths[2].exists():
+            logger.info(f"Building time index for {directory}")
+            index = TimeIndex(self._row_times())
+            
+            save_array(paths[0], index.epochs)
+            save_array(paths[1], index.order.astype(np.int64))
+            save_array(paths[2], index.sorted_epochs)
+        
+        return TimeIndex(*(np.load(path, mmap_mode='r') for path in paths))
+    
+    def _row_times(self) -> np.ndarray:
+        """Epoch seconds of every row."""
+        if EPOCH_COLUMN in self.pages.column_names:
+            epochs = np.asarray(self.pages.numbers(EPOCH_COLUMN))
+            if epochs.dtype.kind == 'f':
+                epochs = np.where(np.isnan(epochs), NO_EPOCH, epochs)
+            return epochs.astype(np.int64)
+        
+        # Results saved before the epoch column: convert the distinct dates and times
+        self._column((DATE_COLUMN,), 'date')
+        self._column((TIME_COLUMN,), 'time')
+        return epoch_seconds(*(
+            pd.Categorical.from_codes(self.pages.codes(name), categories=pd.Index(self.pages.keys(name), dtype=str))
+            for name in (DATE_COLUMN, TIME_COLUMN)
+        ))
+
+
+def _in_network(value: str, network: Union[ipaddress.IPv4Network, ipaddress.IPv6Network]) -> bool:
+    try:
+        return ipaddress.ip_address(value) in network
+    except ValueError:
+        return False
@@ -0,0 +1,212 @@
+"""
+Periodic checkpoints of a scan in progress.
+
+Parsing a multi-gigabyte log takes long enough that a worker can be
+restarted or killed before it finishes. A ScanCheckpoint passed to
+parse_engine.run_analyses saves the partial analyses and the byte offset
+reached to a local file at a fixed interval; a later run over the same file
+with the same checkpoint path restores them and parses only the rest.
+
+A checkpoint is only reused for the file it was written for, unchanged
+(same path, size and modification time), and for the same analyses.
+Anything else, including a damaged checkpoint file, is discarded and the
+scan starts from the beginning.
+
+Runs of a scan can also be counted (start_attempt), so a caller that
+restarts scans automatically can give up on one that keeps dying.
+"""
+
+import logging
+import os
+import pickle
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from parse_engine import Analysis, ScanStats, analysis_signature
+
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+
+# Seconds between checkpoints
+DEFAULT_CHECKPOINT_INTERVAL = 60.0
+
+
+@dataclass
+class ScanState:
+    """
+    Saved progress of a scan.
+    
+    Attributes:
+        path: Resolved path of the log file
+        size: File size when the scan started
+        mtime_ns: File modification time when the scan started
+        offset: Byte offset up to which the analyses are complete
+        analyses: Partial analyses covering bytes [0, offset)
+        stats: ScanStats for bytes [0, offset)
+    """
+    
+    path: str
+    size: int
+    mtime_ns: int
+    offset: int
+    analyses: List[Analysis]
+    stats: ScanStats = field(default_factory=ScanStats)
+    version: int = CHECKPOINT_VERSION
+
+
+class ScanCheckpoint:
+    """
+    Checkpoint file for one resumable scan.
+    
+    Example:
+        >>> checkpoint = ScanCheckpoint('checkpoints/job-42.ckpt')
+        >>> firewall = FirewallAnalysis()
+        >>> run_analyses('traffic.log', [firewall], checkpoint=checkpoint)
+        >>> save_result(firewall.to_dataframe())
+        >>> checkpoint.remove()
+    """
+    
+    def __init__(
+        self,
+        checkpoint_path: str,
+        interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        Initialize the checkpoint; nothing is read or written yet.
+        
+        The checkpoint is a pickle of the analyses' state; only use
+        checkpoint paths this application writes to.
+        
+        Args:
+            checkpoint_path: File to save the scan state in
+            interval: Seconds between saves (0 saves after every block)
+            clock: Time source (tests pass a fake)
+        """
+        self.path = Path(checkpoint_path)
+        self.attempts_path = self.path.with_name(f'{self.path.name}.attempts')
+        self.interval = interval
+        self._clock = clock
+        self._last_save = clock()
+        # Offset the last restore resumed from (0 if the scan started over)
+        self.resumed_from = 0
+        self.saves = 0
+    
+    def restore(self, file_path: str, analyses: Sequence[Analysis]) -> Tuple[int, ScanStats]:
+        """
+        Load the saved state of a scan over file_path into empty analyses.
+        
+        Args:
+            file_path: Path to the log file about to be scanned
+            analyses: Empty analyses, which receive the saved partial results
+        
+        Returns:
+            Tuple of the byte offset to continue from and the ScanStats of
+            the bytes before it; (0, empty stats) if there is nothing to
+            resume
+        """
+        self._last_save = self._clock()
+        self.resumed_from = 0
+        
+        state = self._load(file_path, analyses)
+        if state is None:
+            return 0, ScanStats()
+        
+        for analysis, saved in zip(analyses, state.analyses):
+            analysis.merge(saved)
+        
+        logger.info(f"Resuming {file_path} at byte {state.offset:,} from {self.path}")
+        self.resumed_from = state.offset
+        return state.offset, state.stats
+    
+    def _load(self, file_path: str, analyses: Sequence[Analysis]) -> Optional[ScanState]:
+        if not self.path.exists():
+            return None
+        
+        try:
+            with open(self.path, 'rb') as handle:
+                state = pickle.load(handle)
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            logger.warning(f"Discarding unreadable checkpoint {self.path}: {e}")
+            self.remove()
+            return None
+        
+        path = Path(file_path).resolve()
+        stat = path.stat()
+        reusable = (
+            isinstance(state, ScanState) and
+            state.version == CHECKPOINT_VERSION and
+            (state.path, state.size, state.mtime_ns) == (str(path), stat.st_size, stat.st_mtime_ns) and
+            [analysis_signature(analysis) for analysis in state.analyses] ==
+            [analysis_signature(analysis) for analysis in analyses]
+        )
+        if not reusable:
+            logger.warning(f"Discarding checkpoint {self.path}: written for another file or other analyses")
+            self.remove()
+            return None
+        
+        return state
+    
+    def due(self) -> bool:
+        """Whether the interval since the last save (or restore) has passed."""
+        return self._clock() - self._last_save >= self.interval
+    
+    def save(self, file_path: str, offset: int, analyses: Sequence[Analysis], stats: ScanStats) -> None:
+        """
+        Write the scan state atomically.
+        
+        Args:
+            file_path: Path to the log file being scanned
+            offset: Byte offset up to which the analyses are complete
+            analyses: Analyses covering bytes [0, offset)
+            stats: ScanStats for bytes [0, offset)
+        """
+        path = Path(file_path).resolve()
+        stat = path.stat()
+        state = ScanState(
+            path=str(path),
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            offset=offset,
+            analyses=list(analyses),
+            stats=stats,
+        )
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f'{self.path.name}.{os.getpid()}.tmp')
+        with open(temp_path, 'wb') as handle:
+            pickle.dump(state, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.path)
+        
+        self._last_save = self._clock()
+        self.saves += 1
+        logger.debug(f"Checkpoint of {path} at byte {offset:,} saved to {self.path}")
+    
+    def start_attempt(self) -> int:
+        """
+        Count a run of the scan, including runs that die before any save.
+        
+        The count is kept next to the checkpoint until remove().
+        
+        Returns:
+            Number of runs so far, this one included
+        """
+        try:
+            attempts = int(self.attempts_path.read_text()) + 1
+        except (OSError, ValueError):
+            attempts = 1
+        
+        self.attempts_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.attempts_path.with_name(f'{self.attempts_path.name}.{os.getpid()}.tmp')
+        temp_path.write_text(str(attempts))
+        os.replace(temp_path, self.attempts_path)
+        return attempts
+    
+    def remove(self) -> None:
+        """Delete the checkpoint and run count, once the scan has finished or failed."""
+        self.path.unlink(missing_ok=True)
+        self.attempts_path.unlink(missing_ok=True)
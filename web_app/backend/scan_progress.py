@@ -0,0 +1,147 @@
+"""
+Progress, throughput and ETA of a scan in progress.
+
+parse_engine.run_analyses reports progress through a callback that receives
+a ScanProgress. Calls are throttled by ProgressReporter to one per
+interval, plus a final call when the scan completes, so a callback may do
+something slow such as a Celery ``update_state`` or a terminal write.
+
+Progress is measured in bytes of the log file against its size. Compressed
+files are measured in decompressed bytes, whose total is not known in
+advance, so they have no percentage or ETA.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+
+# Seconds between progress callbacks
+DEFAULT_PROGRESS_INTERVAL = 1.0
+
+
+@dataclass
+class ScanProgress:
+    """
+    Snapshot of a scan.
+    
+    Attributes:
+        bytes_read: Bytes of the file scanned so far
+        total_bytes: Size of the file (None if not known)
+        lines_processed: Lines read so far
+        lines_matched: Matches so far, summed over all analyses
+        elapsed: Seconds since this scan started
+        bytes_per_second: Scan rate of this run (parts restored from a
+            checkpoint are not counted)
+        lines_per_second: Line rate of this run
+        done: Whether the scan has completed
+    """
+    
+    bytes_read: int
+    total_bytes: Optional[int]
+    lines_processed: int
+    lines_matched: int
+    elapsed: float
+    bytes_per_second: float
+    lines_per_second: float
+    done: bool = False
+    
+    @property
+    def percent(self) -> Optional[float]:
+        """Share of the file scanned, 0 to 100 (None if the size is not known)."""
+        if self.total_bytes is None:
+            return None
+        if not self.total_bytes:
+            return 100.0
+        return min(100.0, 100.0 * self.bytes_read / self.total_bytes)
+    
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated seconds until the scan completes (None if unknown)."""
+        if self.done:
+            return 0.0
+        if self.total_bytes is None or self.bytes_per_second <= 0:
+            return None
+        return max(0, self.total_bytes - self.bytes_read) / self.bytes_per_second
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain values, e.g. for Celery task metadata."""
+        percent, eta = self.percent, self.eta_seconds
+        return {
+            'bytes_read': self.bytes_read,
+            'total_bytes': self.total_bytes,
+            'lines_processed': self.lines_processed,
+            'lines_matched': self.lines_matched,
+            'percent': None if percent is None else round(percent, 1),
+            'elapsed_seconds': round(self.elapsed, 1),
+            'bytes_per_second': round(self.bytes_per_second),
+            'lines_per_second': round(self.lines_per_second),
+            'eta_seconds': None if eta is None else round(eta, 1),
+        }
+
+
+class ProgressReporter:
+    """
+    Throttles progress updates of one scan to a callback.
+    
+    Example:
+        >>> reporter = ProgressReporter(lambda p: print(f"{p.percent:.0f}%"), total_bytes=size)
+        >>> reporter.update(bytes_read, lines_processed, lines_matched)
+        >>> reporter.finish(size, lines_processed, lines_matched)
+    """
+    
+    def __init__(
+        self,
+        callback: Callable[[ScanProgress], None],
+        total_bytes: Optional[int] = None,
+        interval: float = DEFAULT_PROGRESS_INTERVAL,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        Initialize the reporter; the scan's clock starts now.
+        
+        Args:
+            callback: Function called with each ScanProgress
+            total_bytes: Size of the file (None if not known)
+            interval: Least seconds between two callbacks
+            clock: Time source (tests pass a fake)
+        """
+        self.callback = callback
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self._clock = clock
+        self._started = clock()
+        self._last_report: Optional[float] = None
+        # Position and lines the scan started from, e.g. after a resume
+        self._start_bytes = 0
+        self._start_lines = 0
+    
+    def resume_from(self, bytes_read: int, lines_processed: int) -> None:
+        """Exclude what an earlier run scanned from the rates."""
+        self._start_bytes = bytes_read
+        self._start_lines = lines_processed
+    
+    def update(self, bytes_read: int, lines_processed: int, lines_matched: int) -> None:
+        """Report progress if the interval since the last report has passed."""
+        now = self._clock()
+        if self._last_report is not None and now - self._last_report < self.interval:
+            return
+        self._report(now, bytes_read, lines_processed, lines_matched, False)
+    
+    def finish(self, bytes_read: int, lines_processed: int, lines_matched: int) -> None:
+        """Report the completed scan."""
+        self._report(self._clock(), bytes_read, lines_processed, lines_matched, True)
+    
+    def _report(self, now: float, bytes_read: int, lines_processed: int, lines_matched: int, done: bool) -> None:
+        self._last_report = now
+        elapsed = now - self._started
+        self.callback(ScanProgress(
+            bytes_read=bytes_read,
+            total_bytes=self.total_bytes,
+            lines_processed=lines_processed,
+            lines_matched=lines_matched,
+            elapsed=elapsed,
+            bytes_per_second=(bytes_read - self._start_bytes) / elapsed if elapsed > 0 else 0.0,
+            lines_per_second=(lines_processed - self._start_lines) / elapsed if elapsed > 0 else 0.0,
+            done=done,
+        ))
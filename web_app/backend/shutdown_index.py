@@ -0,0 +1,340 @@
+"""
+All-users VPN shutdown index.
+
+A single pass over a log file collects the "SSL tunnel shutdown" sessions of
+every user. The resulting index answers per-user lookups without rereading
+the file, and ShutdownIndexStore keeps indexes by file content digest in
+memory and, optionally, on disk so repeated lookups (and re-uploads of the
+same evidence) skip the scan entirely. Indexes on disk are bounded in total
+size; the least recently used are evicted.
+"""
+
+import gzip
+import json
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import pandas as pd
+except ImportError:
+    raise ImportError("pandas is required. Install with: pip install pandas")
+
+from log_time import EPOCH_COLUMN
+from parse_engine import ShutdownAnalysis, ScanStats, file_digest, run_analyses
+from scan_progress import ScanProgress
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when the stored index layout or the shutdown parsing rules change
+INDEX_VERSION = 4
+INDEX_SUFFIX = '.shutdown.json.gz'
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# Dictionary-encoded text columns of the stored index
+_TEXT_COLUMNS = ('date', 'time', 'user')
+
+
+class ShutdownIndex:
+    """
+    VPN shutdown sessions of every user in a log file.
+    
+    Sessions are kept in file order in the columnar frame built by
+    ShutdownAnalysis; per-user row positions make a lookup proportional to
+    that user's session count.
+    
+    Example:
+        >>> index = ShutdownIndex.build('vpn_logs.txt')
+        >>> df = index.lookup('john.doe')
+        >>> print(index.totals().head())
+    """
+    
+    columns = ShutdownAnalysis.columns
+    
+    def __init__(self, frame: pd.DataFrame, digest: Optional[str] = None):
+        """
+        Initialize the index.
+        
+        Args:
+            frame: Shutdown sessions (date, time, user, sentbyte, MB, epoch)
+                in file order, with categorical text columns
+            digest: Content digest of the source file, if known
+        """
+        self.frame = frame
+        self.digest = digest
+        
+        # Group row positions by lowercase user, in order of first appearance
+        codes, keys = pd.factorize(frame['user'].astype(str).str.lower())
+        order = np.argsort(codes, kind='stable')
+        bounds = np.cumsum(np.bincount(codes, minlength=len(keys)))[:-1] if len(keys) else []
+        self._positions: Dict[str, np.ndarray] = dict(zip(keys, np.split(order, bounds)))
+    
+    @classmethod
+    def build(
+        cls,
+        file_path: str,
+        workers: int = 1,
+        digest: Optional[str] = None,
+        progress: Optional[Callable[[ScanProgress], None]] = None
+    ) -> 'ShutdownIndex':
+        """
+        Scan a log file once and index the sessions of all users.
+        
+        Args:
+            file_path: Path to the log file
+            workers: Number of worker processes (1 parses in this process)
+            digest: Content digest of the file, if already computed
+            progress: Optional function called with the scan's progress
+        
+        Returns:
+            ShutdownIndex for the file
+        """
+        analysis = ShutdownAnalysis(None)
+        stats: ScanStats = run_analyses(str(file_path), [analysis], workers=workers, progress=progress)
+        
+        logger.info(
+            f"Indexed {analysis.lines_matched:,} shutdown sessions from "
+            f"{stats.lines_processed:,} lines"
+        )
+        
+        return cls(analysis.to_dataframe(), digest=digest)
+    
+    @property
+    def users(self) -> List[str]:
+        """Lowercase usernames with at least one session, sorted."""
+        return sorted(self._positions)
+    
+    def lookup(self, target_user: str) -> pd.DataFrame:
+        """
+        Get the sessions of one user.
+        
+        Args:
+            target_user: Username (case-insensitive)
+        
+        Returns:
+            DataFrame with columns: date, time, user, sentbyte, sent_bytes_in_MB, epoch
+        
+        Raises:
+            ValueError: If target_user is empty
+        """
+        key = target_user.strip().lower()
+        if not key:
+            raise ValueError("Target username cannot be empty")
+        
+        positions = self._positions.get(key, np.empty(0, dtype=np.intp))
+        df = self.frame.take(positions).reset_index(drop=True)
+        
+        # Keep only the categories this user's sessions use
+        for column in _TEXT_COLUMNS:
+            df[column] = df[column].cat.remove_unused_categories()
+        
+        return df
+    
+    def totals(self) -> pd.DataFrame:
+        """
+        Get per-user session counts and byte totals.
+        
+        Returns:
+            DataFrame with columns: user, sessions, sentbyte, sent_bytes_in_MB,
+            sorted by sentbyte in descending order
+        """
+        sentbytes = self.frame['sentbyte'].to_numpy()
+        records = []
+        for key, positions in self._positions.items():
+            sentbyte = int(sentbytes[positions].sum())
+            records.append([key, len(positions), sentbyte, sentbyte / (1024 * 1024)])
+        
+        df = pd.DataFrame(records, columns=['user', 'sessions', 'sentbyte', 'sent_bytes_in_MB'])
+        df = df.sort_values(by=['sentbyte', 'user'], ascending=[False, True])
+        
+        return df.reset_index(drop=True)
+    
+    def save(self, path: Path) -> None:
+        """
+        Write the index to a gzip-compressed JSON file.
+        
+        Text columns are stored as their distinct values and codes. The file
+        is written next to its final name and renamed into place, so
+        concurrent readers never see a partial index.
+        
+        Args:
+            path: Destination path
+        """
+        columns: Dict[str, Any] = {
+            column: {
+                'values': self.frame[column].cat.categories.tolist(),
+                'codes': self.frame[column].cat.codes.tolist(),
+            }
+            for column in _TEXT_COLUMNS
+        }
+        columns['sentbyte'] = self.frame['sentbyte'].tolist()
+        epochs = self.frame[EPOCH_COLUMN]
+        # Missing times are stored as null
+        columns[EPOCH_COLUMN] = epochs.astype(object).where(epochs.notna(), None).tolist()
+        
+        payload = {'version': INDEX_VERSION, 'digest': self.digest, 'columns': columns}
+        temp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as handle:
+            json.dump(payload, handle, separators=(',', ':'))
+        os.replace(temp_path, path)
+    
+    @classmethod
+    def load(cls, path: Path) -> Optional['ShutdownIndex']:
+        """
+        Read an index written by save().
+        
+        Args:
+            path: Index file path
+        
+        Returns:
+            ShutdownIndex, or None if the file is unreadable or from another version
+        """
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as handle:
+                payload = json.load(handle)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable shutdown index {path}: {e}")
+            return None
+        
+        if payload.get('version') != INDEX_VERSION:
+            return None
+        
+        columns = payload['columns']
+        data: Dict[str, Any] = {
+            column: pd.Categorical.from_codes(
+                np.asarray(columns[column]['codes'], dtype=np.intc),
+                categories=pd.Index(columns[column]['values'], dtype=str)
+            )
+            for column in _TEXT_COLUMNS
+        }
+        data['sentbyte'] = np.asarray(columns['sentbyte'], dtype=np.int64)
+        data['sent_bytes_in_MB'] = data['sentbyte'] / (1024 * 1024)
+        data[EPOCH_COLUMN] = pd.array(columns[EPOCH_COLUMN], dtype='Int64')
+        
+        return cls(pd.DataFrame(data, columns=list(cls.columns)), digest=payload.get('digest'))
+
+
+class ShutdownIndexStore:
+    """
+    Per-file shutdown indexes, reused across lookups.
+    
+    Indexes are keyed by the SHA-256 digest of the log file, so a renamed or
+    re-uploaded copy of the same file reuses the existing index. Recently
+    used indexes stay in memory; with a directory they are also persisted,
+    up to max_bytes in total.
+    
+    Example:
+        >>> store = ShutdownIndexStore('indexes')
+        >>> df = store.get('vpn_logs.txt').lookup('john.doe')
+    """
+    
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_memory_entries: int = 8,
+        max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        """
+        Initialize the store.
+        
+        Args:
+            directory: Optional directory for persisted indexes
+            max_memory_entries: Number of indexes kept in memory
+            max_bytes: Total size of persisted indexes above which least
+                recently used ones are evicted
+        """
+        self.directory = Path(directory) if directory else None
+        self.max_memory_entries = max_memory_entries
+        self.max_bytes = max_bytes
+        self._memory: 'OrderedDict[str, ShutdownIndex]' = OrderedDict()
+        
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+    
+    def _remember(self, digest: str, index: ShutdownIndex) -> None:
+        self._memory[digest] = index
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+    
+    def get(
+        self,
+        file_path: str,
+        workers: int = 1,
+        progress: Optional[Callable[[ScanProgress], None]] = None
+    ) -> ShutdownIndex:
+        """
+        Get the index for a file, building it on first use.
+        
+        Args:
+            file_path: Path to the log file
+            workers: Number of worker processes used if the index is built
+            progress: Optional progress callback used if the index is built
+        
+        Returns:
+            ShutdownIndex for the file
+        """
+        digest = file_digest(file_path)
+        
+        index = self._memory.get(digest)
+        if index is not None:
+            self._memory.move_to_end(digest)
+            return index
+        
+        index_path = self.directory / f'{digest}{INDEX_SUFFIX}' if self.directory else None
+        
+        if index_path is not None and index_path.exists():
+            index = ShutdownIndex.load(index_path)
+            if index is not None:
+                # Mark as recently used for eviction
+                try:
+                    os.utime(index_path)
+                except OSError:
+                    pass
+        
+        if index is None:
+            index = ShutdownIndex.build(file_path, workers=workers, digest=digest, progress=progress)
+            if index_path is not None:
+                index.save(index_path)
+                self.evict()
+        
+        self._remember(digest, index)
+        return index
+    
+    def evict(self) -> int:
+        """
+        Remove least recently used persisted indexes until they fit max_bytes.
+        
+        Indexes already in memory stay usable.
+        
+        Returns:
+            Number of index files removed
+        """
+        if self.directory is None:
+            return 0
+        
+        entries = []
+        for path in self.directory.glob(f'*{INDEX_SUFFIX}'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        
+        return removed
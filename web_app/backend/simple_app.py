@@ -5,7 +5,7 @@ This is a simplified version of the application for development and testing.
 For production, use app.py which includes full security hardening.
 """
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
@@ -15,7 +15,7 @@ from flask_talisman import Talisman
 import os
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional, Tuple
 import logging
 
 # Import utilities
@@ -26,6 +26,7 @@ from utils.security import (
     secure_save_file,
     get_secure_headers,
     ALLOWED_EXTENSIONS,
+    ARCHIVE_EXTENSIONS,
 )
 from utils.input_validation import validate_password
 from utils.logging_config import setup_logger, SecurityLogger
@@ -65,6 +66,11 @@ limiter = Limiter(
 if Config.is_production():
     Talisman(app, force_https=True)
 
+# Store CSV and NDJSON results gzip-compressed
+COMPRESS_RESULTS = os.environ.get('COMPRESS_RESULTS', 'true').lower() == 'true'
+# Paged column stores of the result files
+PAGES_FOLDER = os.environ.get('PAGES_FOLDER', 'pages')
+
 # Create necessary directories
 Path('uploads').mkdir(parents=True, exist_ok=True)
 Path('results').mkdir(parents=True, exist_ok=True)
@@ -108,6 +114,21 @@ def allowed_file(filename: str) -> bool:
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def parse_top(form: Dict[str, str]) -> Tuple[Optional[int], bool]:
+    """Read the firewall top-K form fields ``top`` and ``approximate`` (ValueError if invalid)."""
+    top = form.get('top') or None
+    approximate = str(form.get('approximate', 'false')).lower() == 'true'
+    
+    if top is not None:
+        if not str(top).isdigit() or int(top) < 1:
+            raise ValueError('top must be a positive integer')
+        top = int(top)
+    if approximate and top is None:
+        raise ValueError('approximate requires top')
+    
+    return top, approximate
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
@@ -170,6 +191,11 @@ def parse_vpn():
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
+    try:
+        output_format = resolve_format(request.form.get('format') or 'csv')
+    except ValueError:
+        return jsonify({'error': f"Valid output format required: {', '.join(available_formats())}"}), 400
+    
     if file and allowed_file(file.filename):
         try:
             filepath, original_name = secure_save_file(file, 'uploads')
@@ -184,15 +210,17 @@ def parse_vpn():
             # Detect format and parse
             file_format = csv_parser.detect_format(filepath)
             
-            if file_format == 'csv':
-                df = csv_parser.parse_csv_vpn_logs(filepath)
-            else:
-                # Use smart parser for Fortinet format
-                df = smart_parse_logs(filepath, 'vpn')
+            # Parse straight into the result file
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            result_filename = f'vpn_parsed_{timestamp}{output_suffix(output_format, COMPRESS_RESULTS)}'
+            result_path = Path('results') / result_filename
+            result = export_results(filepath, 'vpn', result_path, output_format)
             
             # Validate results
-            if df.empty:
+            if not result.records:
                 os.remove(filepath)
+                os.remove(result_path)
+                remove_pages(result_path, PAGES_FOLDER)
                 return jsonify({
                     'status': 'completed',
                     'records': 0,
@@ -202,23 +230,18 @@ def parse_vpn():
                     'message': 'No valid records found'
                 }), 200
             
-            # Save results
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            result_filename = f'vpn_parsed_{timestamp}.csv'
-            result_path = Path('results') / result_filename
-            df.to_csv(result_path, index=False)
-            
             # Clean up uploaded file
             os.remove(filepath)
             
-            logger.info(f"VPN logs parsed: {len(df)} records")
+            logger.info(f"VPN logs parsed: {result.records} records")
             
             return jsonify({
                 'status': 'completed',
-                'records': len(df),
+                'records': result.records,
                 'filename': result_filename,
-                'preview': df.head(10).to_dict('records') if len(df) > 0 else [],
-                'format_detected': file_format
+                'preview': result.preview,
+                'format_detected': file_format,
+                'output_format': output_format
             }), 200
             
         except ValueError as e:
@@ -241,6 +264,16 @@ def parse_firewall():
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
+    try:
+        output_format = resolve_format(request.form.get('format') or 'csv')
+    except ValueError:
+        return jsonify({'error': f"Valid output format required: {', '.join(available_formats())}"}), 400
+    
+    try:
+        top, approximate = parse_top(request.form)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     if file and allowed_file(file.filename):
         try:
             filepath, original_name = secure_save_file(file, 'uploads')
@@ -255,14 +288,19 @@ def parse_firewall():
             # Detect format and parse
             file_format = csv_parser.detect_format(filepath)
             
-            if file_format == 'csv':
-                df = csv_parser.parse_csv_firewall_logs(filepath)
-            else:
-                df = smart_parse_logs(filepath, 'firewall')
+            # Parse straight into the result file
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            result_filename = f'firewall_parsed_{timestamp}{output_suffix(output_format, COMPRESS_RESULTS)}'
+            result_path = Path('results') / result_filename
+            result = export_results(
+                filepath, 'firewall', result_path, output_format, top=top, approximate=approximate
+            )
             
             # Validate results
-            if df.empty:
+            if not result.records:
                 os.remove(filepath)
+                os.remove(result_path)
+                remove_pages(result_path, PAGES_FOLDER)
                 return jsonify({
                     'status': 'completed',
                     'records': 0,
@@ -272,23 +310,18 @@ def parse_firewall():
                     'message': 'No valid records found'
                 }), 200
             
-            # Save results
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            result_filename = f'firewall_parsed_{timestamp}.csv'
-            result_path = Path('results') / result_filename
-            df.to_csv(result_path, index=False)
-            
             # Clean up uploaded file
             os.remove(filepath)
             
-            logger.info(f"Firewall logs parsed: {len(df)} records")
+            logger.info(f"Firewall logs parsed: {result.records} records")
             
             return jsonify({
                 'status': 'completed',
-                'records': len(df),
+                'records': result.records,
                 'filename': result_filename,
-                'preview': df.head(10).to_dict('records') if len(df) > 0 else [],
-                'format_detected': file_format
+                'preview': result.preview,
+                'format_detected': file_format,
+                'output_format': output_format
             }), 200
             
         except ValueError as e:
@@ -300,6 +333,86 @@ def parse_firewall():
     return jsonify({'error': 'Invalid file type'}), 400
 
 
+@app.route('/api/parse/firewall-timeline', methods=['POST'])
+@limiter.limit("10 per minute")
+def parse_firewall_timeline_route():
+    """Parse firewall logs into traffic per destination and time bucket."""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    
+    try:
+        output_format = resolve_format(request.form.get('format') or 'csv')
+    except ValueError:
+        return jsonify({'error': f"Valid output format required: {', '.join(available_formats())}"}), 400
+    
+    bucket = request.form.get('bucket') or 'hour'
+    try:
+        bucket_seconds(bucket)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if file and allowed_file(file.filename):
+        try:
+            filepath, original_name = secure_save_file(file, 'uploads')
+            
+            security_logger.log_file_upload(
+                'anonymous',
+                original_name,
+                os.path.getsize(filepath),
+                get_remote_address()
+            )
+            
+            file_format = csv_parser.detect_format(filepath)
+            if file_format == 'csv':
+                # CSV exports carry no per-line byte counts and times to bucket
+                os.remove(filepath)
+                raise ValueError('Firewall timelines need Fortinet format logs')
+            
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            result_filename = f'firewall_timeline_{timestamp}{output_suffix(output_format, COMPRESS_RESULTS)}'
+            result_path = Path('results') / result_filename
+            result = export_results(filepath, 'firewall-timeline', result_path, output_format, bucket=bucket)
+            
+            if not result.records:
+                os.remove(filepath)
+                os.remove(result_path)
+                remove_pages(result_path, PAGES_FOLDER)
+                return jsonify({
+                    'status': 'completed',
+                    'records': 0,
+                    'filename': None,
+                    'preview': [],
+                    'format_detected': file_format,
+                    'message': 'No valid records found'
+                }), 200
+            
+            os.remove(filepath)
+            
+            logger.info(f"Firewall timeline parsed: {result.records} records")
+            
+            return jsonify({
+                'status': 'completed',
+                'records': result.records,
+                'filename': result_filename,
+                'preview': result.preview,
+                'format_detected': file_format,
+                'output_format': output_format,
+                'bucket': bucket
+            }), 200
+        
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            logger.error(f"Firewall timeline parse error: {e}")
+            return jsonify({'error': 'Failed to process file'}), 500
+    
+    return jsonify({'error': 'Invalid file type'}), 400
+
+
 @app.route('/api/parse/vpn-shutdown', methods=['POST'])
 @limiter.limit("10 per minute")
 def parse_vpn_shutdown():
@@ -316,6 +429,11 @@ def parse_vpn_shutdown():
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
+    try:
+        output_format = resolve_format(request.form.get('format') or 'csv')
+    except ValueError:
+        return jsonify({'error': f"Valid output format required: {', '.join(available_formats())}"}), 400
+    
     if file and allowed_file(file.filename):
         try:
             filepath, original_name = secure_save_file(file, 'uploads')
@@ -330,14 +448,17 @@ def parse_vpn_shutdown():
             # Detect format and parse
             file_format = csv_parser.detect_format(filepath)
             
-            if file_format == 'csv':
-                df = csv_parser.parse_csv_vpn_shutdown_logs(filepath, username_filter)
-            else:
-                df = smart_parse_logs(filepath, 'vpn-shutdown', username_filter)
+            # Parse straight into the result file
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            result_filename = f'vpn_shutdown_{username_filter}_{timestamp}{output_suffix(output_format, COMPRESS_RESULTS)}'
+            result_path = Path('results') / result_filename
+            result = export_results(filepath, 'vpn-shutdown', result_path, output_format, username_filter)
             
             # Validate results
-            if df.empty:
+            if not result.records:
                 os.remove(filepath)
+                os.remove(result_path)
+                remove_pages(result_path, PAGES_FOLDER)
                 return jsonify({
                     'status': 'completed',
                     'records': 0,
@@ -348,25 +469,20 @@ def parse_vpn_shutdown():
                     'message': f'No records found for user {username_filter}'
                 }), 200
             
-            # Save results
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            result_filename = f'vpn_shutdown_{username_filter}_{timestamp}.csv'
-            result_path = Path('results') / result_filename
-            df.to_csv(result_path, index=False)
-            
             # Clean up uploaded file
             os.remove(filepath)
             
-            total_mb = df['sent_bytes_in_MB'].sum() if 'sent_bytes_in_MB' in df.columns else 0
+            total_mb = result.sums.get('sent_bytes_in_MB', 0)
             
-            logger.info(f"VPN shutdown parsed: {len(df)} records, filter: {username_filter}")
+            logger.info(f"VPN shutdown parsed: {result.records} records, filter: {username_filter}")
             
             return jsonify({
                 'status': 'completed',
-                'records': len(df),
+                'records': result.records,
                 'filename': result_filename,
-                'preview': df.head(10).to_dict('records') if len(df) > 0 else [],
+                'preview': result.preview,
                 'format_detected': file_format,
+                'output_format': output_format,
                 'total_mb': round(total_mb, 2)
             }), 200
             
@@ -379,9 +495,109 @@ def parse_vpn_shutdown():
     return jsonify({'error': 'Invalid file type'}), 400
 
 
+@app.route('/api/parse/bundle', methods=['POST'])
+@limiter.limit("10 per minute")
+def parse_bundle_files():
+    """Parse several files or zip/tar archives and merge the results per analysis."""
+    files = [file for file in request.files.getlist('files') if file.filename]
+    if not files:
+        return jsonify({'error': 'No files provided'}), 400
+    
+    analyses = [
+        name.strip().lower().replace('-', '_')
+        for name in request.form.get('analyses', 'vpn,firewall').split(',') if name.strip()
+    ]
+    if not analyses or any(name not in ('vpn', 'firewall', 'vpn_shutdown') for name in analyses):
+        return jsonify({'error': 'Valid analyses required: vpn, firewall, vpn_shutdown'}), 400
+    
+    username_filter = None
+    if 'vpn_shutdown' in analyses:
+        username_filter = sanitize_username(request.form.get('username', ''))
+        if not username_filter:
+            return jsonify({'error': 'Valid username filter is required'}), 400
+    
+    try:
+        output_format = resolve_format(request.form.get('format') or 'csv')
+    except ValueError:
+        return jsonify({'error': f"Valid output format required: {', '.join(available_formats())}"}), 400
+    
+    allowed_extensions = ALLOWED_EXTENSIONS | ARCHIVE_EXTENSIONS
+    if not all(file.filename.rsplit('.', 1)[-1].lower() in allowed_extensions for file in files):
+        return jsonify({'error': 'Invalid file type'}), 400
+    
+    filepaths = []
+    try:
+        upload_names = {}
+        for file in files:
+            filepath, original_name = secure_save_file(file, 'uploads', allow_archives=True)
+            filepaths.append(filepath)
+            upload_names[filepath] = original_name
+            
+            security_logger.log_file_upload(
+                'anonymous',
+                original_name,
+                os.path.getsize(filepath),
+                get_remote_address()
+            )
+        
+        bundle = parse_bundle(
+            filepaths,
+            analyses,
+            target_user=username_filter,
+            workers=int(os.environ.get('PARSE_WORKERS', '1')),
+            ip_filter=is_public_ip
+        )
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        results = {}
+        for name, df in bundle.frames.items():
+            result_filename = None
+            if not df.empty:
+                result_filename = f'{name}_bundle_{timestamp}{output_suffix(output_format, COMPRESS_RESULTS)}'
+                result_path = Path('results') / result_filename
+                write_result(
+                    df, result_path, output_format, mirror=PageWriter(pages_path(PAGES_FOLDER, result_path))
+                )
+            
+            results[name] = {
+                'records': len(df),
+                'filename': result_filename,
+                'preview': df.head(10).to_dict('records')
+            }
+        
+        files_summary = []
+        for member in bundle.members:
+            entry = member.to_dict()
+            entry['name'] = upload_names.get(member.name, member.name)
+            files_summary.append(entry)
+        
+        logger.info(f"Bundle parsed: {len(files_summary)} files")
+        
+        return jsonify({
+            'status': 'completed',
+            'files': files_summary,
+            'files_failed': len(bundle.failed),
+            'results': results
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Bundle parse error: {e}")
+        return jsonify({'error': 'Failed to process files'}), 500
+    finally:
+        # Clean up uploaded files
+        for filepath in filepaths:
+            Path(filepath).unlink(missing_ok=True)
+
+
 @app.route('/api/download/<filename>', methods=['GET'])
 def download_file(filename: str):
-    """Download processed CSV file."""
+    """
+    Download a result file, converted to the ``format`` query parameter if given.
+    
+    Compressed results are sent gzip-encoded when the client accepts it.
+    """
     try:
         safe_filename = sanitize_filename(filename)
         filepath = Path('results') / safe_filename
@@ -399,9 +615,12 @@ def download_file(filename: str):
             )
             return jsonify({'error': 'Invalid file path'}), 403
         
-        security_logger.log_download('anonymous', safe_filename, get_remote_address())
+        if request.args.get('format'):
+            filepath = convert_result(filepath, request.args['format'])
+        
+        security_logger.log_download('anonymous', filepath.name, get_remote_address())
         
-        return send_file(filepath, as_attachment=True, download_name=safe_filename)
+        return send_result(filepath)
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -409,6 +628,93 @@ def download_file(filename: str):
         return jsonify({'error': 'Failed to download file'}), 500
 
 
+@app.route('/api/results/<filename>', methods=['GET'])
+def get_result_page(filename: str):
+    """
+    Get one page of a result file.
+    
+    Query parameters: ``page``, ``page_size``, ``sort`` and ``order`` (asc
+    or desc). Only the rows on the page are read.
+    """
+    try:
+        safe_filename = sanitize_filename(filename)
+        filepath = Path('results') / safe_filename
+        
+        if not filepath.is_file():
+            return jsonify({'error': 'File not found'}), 404
+        
+        # Prevent path traversal
+        if not filepath.resolve().is_relative_to(Path('results').resolve()):
+            security_logger.log_security_violation(
+                'path_traversal',
+                'anonymous',
+                get_remote_address(),
+                f'Attempted to access: {filename}'
+            )
+            return jsonify({'error': 'Invalid file path'}), 403
+        
+        order = request.args.get('order', 'asc').lower()
+        if order not in ('asc', 'desc'):
+            return jsonify({'error': 'Order must be asc or desc'}), 400
+        
+        page = request.args.get('page', 1, type=int)
+        page_size = request.args.get('page_size', DEFAULT_PAGE_SIZE, type=int)
+        
+        pages = open_pages(filepath, PAGES_FOLDER)
+        result = pages.page(page, page_size, request.args.get('sort') or None, order == 'desc')
+        
+        return jsonify({'filename': safe_filename, **result}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Result page error: {e}")
+        return jsonify({'error': 'Failed to read result'}), 500
+
+
+@app.route('/api/query/<filename>', methods=['GET'])
+def query_result(filename: str):
+    """
+    Find the rows of a result file matching filters.
+    
+    Query parameters: ``user``, ``ip`` (address or CIDR network), ``start``,
+    ``end``, ``message``, ``page`` and ``page_size``.
+    """
+    try:
+        safe_filename = sanitize_filename(filename)
+        filepath = Path('results') / safe_filename
+        
+        if not filepath.is_file():
+            return jsonify({'error': 'File not found'}), 404
+        
+        # Prevent path traversal
+        if not filepath.resolve().is_relative_to(Path('results').resolve()):
+            security_logger.log_security_violation(
+                'path_traversal',
+                'anonymous',
+                get_remote_address(),
+                f'Attempted to access: {filename}'
+            )
+            return jsonify({'error': 'Invalid file path'}), 403
+        
+        query = ResultQuery(open_pages(filepath, PAGES_FOLDER))
+        result = query.query(
+            user=request.args.get('user'),
+            ip=request.args.get('ip'),
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            message=request.args.get('message'),
+            page=request.args.get('page', 1, type=int),
+            page_size=request.args.get('page_size', DEFAULT_PAGE_SIZE, type=int)
+        )
+        
+        return jsonify({'filename': safe_filename, **result}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Result query error: {e}")
+        return jsonify({'error': 'Failed to query result'}), 500
+
+
 @app.route('/api/history', methods=['GET'])
 def get_parse_history():
     """Get parsing history."""
@@ -429,131 +735,214 @@ def add_security_headers(response):
 # Core Parsing Functions (Fortinet Format)
 # ========================
 
-import re
 import pandas as pd
-import ipaddress
 
+from compressed_io import open_text
+from evidence_bundle import parse_bundle
+from ip_classifier import is_not_private_ip
+from result_writer import (
+    ExportResult,
+    WRITE_BATCH_ROWS,
+    available_formats,
+    convert_result,
+    open_writer,
+    output_suffix,
+    resolve_format,
+    write_result,
+)
+from result_download import send_result
+from result_pages import DEFAULT_PAGE_SIZE, PageWriter, open_pages, pages_path, remove_pages
+from result_query import ResultQuery
+from log_time import EPOCH_COLUMN, add_epoch, bucket_seconds, line_epoch
+from parse_engine import FirewallTimelineAnalysis, timeline_frame
+from heavy_hitters import SpaceSaving, sketch_capacity, top_items
+from fortinet_tokenizer import (
+    TIMESTAMP_FIELDS,
+    VPN_LOGIN_FIELDS,
+    vpn_login_extractor,
+    firewall_extractor,
+    firewall_timeline_extractor,
+    shutdown_extractor,
+)
 
-def parse_vpn_logs(file_path: str):
-    """Parse VPN logs in Fortinet format."""
-    date_pattern = re.compile(r'date=(\S+)')
-    time_pattern = re.compile(r'time=(\S+)')
-    user_pattern = re.compile(r'user="([^"]+)"')
-    tunneltype_pattern = re.compile(r'tunneltype="([^"]+)"')
-    remip_pattern = re.compile(r'remip=([\d\.]+)')
-    reason_pattern = re.compile(r'reason="([^"]+)"')
-    msg_pattern = re.compile(r'msg="([^"]+)"')
 
+VPN_COLUMNS = ['date', 'time', 'user', 'tunneltype', 'remip', 'reason', 'msg', EPOCH_COLUMN]
+SHUTDOWN_COLUMNS = ['date', 'time', 'user', 'sentbyte', 'sent_bytes_in_MB', EPOCH_COLUMN]
+
+# Values extracted per line: the result columns' sources and the timestamp details
+VPN_FIELDS = list(VPN_LOGIN_FIELDS + TIMESTAMP_FIELDS)
+SHUTDOWN_FIELDS = ['date', 'time', 'user', 'sentbyte', 'sent_bytes_in_MB', *TIMESTAMP_FIELDS]
+
+
+def timestamped_batch(rows: list, fields: list, columns: list) -> pd.DataFrame:
+    """Build a result batch from extracted rows, adding their epoch seconds."""
+    return add_epoch(pd.DataFrame(rows, columns=fields), columns)
+
+
+def iter_vpn_log_batches(file_path: str, batch_rows: int = WRITE_BATCH_ROWS) -> Iterator[pd.DataFrame]:
+    """Parse VPN logs in Fortinet format, yielding batches of at most batch_rows rows."""
+    extractor = vpn_login_extractor()
     extracted_data = []
 
-    with open(file_path, 'r', encoding='utf-8') as file:
+    with open_text(file_path, errors='strict') as file:
         for line in file:
             try:
-                date_match = date_pattern.search(line)
-                time_match = time_pattern.search(line)
-                user_match = user_pattern.search(line)
-                tunneltype_match = tunneltype_pattern.search(line)
-                remip_match = remip_pattern.search(line)
-                reason_match = reason_pattern.search(line)
-                msg_match = msg_pattern.search(line)
-
-                if all([date_match, time_match, user_match, tunneltype_match, 
-                        remip_match, reason_match, msg_match]):
-                    reason = reason_match.group(1)
-                    if reason.lower() == "login successfully":
-                        extracted_data.append([
-                            date_match.group(1),
-                            time_match.group(1),
-                            user_match.group(1),
-                            tunneltype_match.group(1),
-                            remip_match.group(1),
-                            reason,
-                            msg_match.group(1)
-                        ])
+                values = extractor.extract(line)
+                if values is not None:
+                    extracted_data.append(values)
             except Exception as e:
                 logger.debug(f"Skipping malformed line: {e}")
                 continue
+            
+            if len(extracted_data) >= batch_rows:
+                yield timestamped_batch(extracted_data, VPN_FIELDS, VPN_COLUMNS)
+                extracted_data = []
+    
+    if extracted_data:
+        yield timestamped_batch(extracted_data, VPN_FIELDS, VPN_COLUMNS)
+
 
-    return pd.DataFrame(extracted_data, 
-                       columns=['date', 'time', 'user', 'tunneltype', 'remip', 'reason', 'msg'])
+def parse_vpn_logs(file_path: str):
+    """Parse VPN logs in Fortinet format."""
+    return concat_batches(iter_vpn_log_batches(file_path), VPN_COLUMNS)
 
 
 def is_public_ip(ip: str) -> bool:
     """Check if IP address is public."""
-    try:
-        return not ipaddress.ip_address(ip).is_private
-    except ValueError:
-        return False
+    return is_not_private_ip(ip)
 
 
-def parse_firewall_logs(file_path: str):
-    """Parse firewall logs in Fortinet format."""
-    dstip_pattern = re.compile(r'dstip=([\d\.]+)')
-    sentbyte_pattern = re.compile(r'sentbyte=(\d+)')
-    
+def parse_firewall_logs(file_path: str, top: Optional[int] = None, approximate: bool = False):
+    """Parse firewall logs in Fortinet format, optionally keeping only the top destinations."""
+    extractor = firewall_extractor()
     data = {}
+    # Fixed-size summary instead of one total per destination
+    sketch = SpaceSaving(sketch_capacity(top)) if approximate else None
     
-    with open(file_path, 'r', encoding='utf-8') as file:
+    with open_text(file_path, errors='strict') as file:
         for line in file:
             try:
-                dstip_match = dstip_pattern.search(line)
-                sentbyte_match = sentbyte_pattern.search(line)
+                values = extractor.extract(line)
                 
-                if dstip_match and sentbyte_match:
-                    dstip = dstip_match.group(1)
-                    sentbyte = int(sentbyte_match.group(1))
+                if values is not None:
+                    dstip = values[0]
+                    sentbyte = int(values[1])
                     
                     if is_public_ip(dstip):
-                        data[dstip] = data.get(dstip, 0) + sentbyte
+                        if sketch is not None:
+                            sketch.add(dstip, sentbyte)
+                        else:
+                            data[dstip] = data.get(dstip, 0) + sentbyte
             except Exception as e:
                 logger.debug(f"Skipping malformed line: {e}")
                 continue
     
+    if sketch is not None:
+        df = pd.DataFrame(sketch.top(top), columns=['dstip', 'total_sentbyte', 'max_overcount'])
+        df.insert(2, 'size_mb', df['total_sentbyte'] / (1024 * 1024))
+        return df
+    if top is not None:
+        df = pd.DataFrame(top_items(data, top), columns=['dstip', 'total_sentbyte'])
+        df['size_mb'] = df['total_sentbyte'] / (1024 * 1024)
+        return df
+    
     df = pd.DataFrame(list(data.items()), columns=['dstip', 'total_sentbyte'])
     df['size_mb'] = df['total_sentbyte'] / (1024 * 1024)
     return df.sort_values(by='total_sentbyte', ascending=False)
 
 
-def parse_vpn_shutdown_sentbytes(file_path: str, target_user: str):
-    """Parse VPN shutdown sessions for a specific user."""
-    date_pattern = re.compile(r'date=(\S+)')
-    time_pattern = re.compile(r'time=(\S+)')
-    user_pattern = re.compile(r'user="([^"]+)"', flags=re.IGNORECASE)
-    sentbyte_pattern = re.compile(r'sentbyte=(\d+)')
-    msg_pattern = re.compile(r'msg="([^"]+)"')
+def parse_firewall_timeline(file_path: str, bucket: str = 'hour'):
+    """Parse firewall logs in Fortinet format into traffic per destination and time bucket."""
+    extractor = firewall_timeline_extractor()
+    size = bucket_seconds(bucket)
+    data = {}
+    
+    with open_text(file_path, errors='strict') as file:
+        for line in file:
+            try:
+                values = extractor.extract(line)
+                
+                if values is not None:
+                    date, time, dstip, sentbyte, rcvdbyte, zone, eventtime = values
+                    epoch = line_epoch(date, time, zone, eventtime)
+                    
+                    if epoch is not None and is_public_ip(dstip):
+                        totals = data.setdefault((epoch - epoch % size, dstip), [0, 0, 0])
+                        totals[0] += int(sentbyte)
+                        totals[1] += int(rcvdbyte or 0)
+                        totals[2] += 1
+            except Exception as e:
+                logger.debug(f"Skipping malformed line: {e}")
+                continue
+    
+    if not data:
+        return pd.DataFrame(columns=list(FirewallTimelineAnalysis.columns))
+    
+    df = pd.DataFrame(
+        [(epoch, dstip, *totals) for (epoch, dstip), totals in data.items()],
+        columns=[EPOCH_COLUMN, 'dstip', 'total_sentbyte', 'total_rcvdbyte', 'lines']
+    )
+    return timeline_frame(df)
+
 
+def iter_vpn_shutdown_batches(
+    file_path: str,
+    target_user: str,
+    batch_rows: int = WRITE_BATCH_ROWS
+) -> Iterator[pd.DataFrame]:
+    """Parse VPN shutdown sessions for a specific user, yielding batches of at most batch_rows rows."""
+    extractor = shutdown_extractor(target_user)
     extracted_data = []
-    target_user_lower = target_user.lower()
 
-    with open(file_path, 'r', encoding='utf-8') as file:
+    with open_text(file_path, errors='strict') as file:
         for line in file:
             try:
-                msg_match = msg_pattern.search(line)
-                if msg_match and msg_match.group(1) == "SSL tunnel shutdown":
-                    user_match = user_pattern.search(line)
-                    if user_match and user_match.group(1).lower() == target_user_lower:
-                        date_match = date_pattern.search(line)
-                        time_match = time_pattern.search(line)
-                        sentbyte_match = sentbyte_pattern.search(line)
-                        
-                        if all([date_match, time_match, sentbyte_match]):
-                            sentbyte = int(sentbyte_match.group(1))
-                            extracted_data.append([
-                                date_match.group(1),
-                                time_match.group(1),
-                                user_match.group(1),
-                                sentbyte,
-                                sentbyte / (1024 * 1024)
-                            ])
+                values = extractor.extract(line)
+                if values is not None:
+                    date, time, user, sentbyte_value, _, zone, eventtime = values
+                    sentbyte = int(sentbyte_value)
+                    extracted_data.append([
+                        date,
+                        time,
+                        user,
+                        sentbyte,
+                        sentbyte / (1024 * 1024),
+                        zone,
+                        eventtime
+                    ])
             except Exception as e:
                 logger.debug(f"Skipping malformed line: {e}")
                 continue
+            
+            if len(extracted_data) >= batch_rows:
+                yield timestamped_batch(extracted_data, SHUTDOWN_FIELDS, SHUTDOWN_COLUMNS)
+                extracted_data = []
     
-    return pd.DataFrame(extracted_data, 
-                       columns=['date', 'time', 'user', 'sentbyte', 'sent_bytes_in_MB'])
+    if extracted_data:
+        yield timestamped_batch(extracted_data, SHUTDOWN_FIELDS, SHUTDOWN_COLUMNS)
 
 
-def smart_parse_logs(file_path: str, log_type: str, username_filter: str = None):
+def parse_vpn_shutdown_sentbytes(file_path: str, target_user: str):
+    """Parse VPN shutdown sessions for a specific user."""
+    return concat_batches(iter_vpn_shutdown_batches(file_path, target_user), SHUTDOWN_COLUMNS)
+
+
+def concat_batches(batches: Iterator[pd.DataFrame], columns: list) -> pd.DataFrame:
+    """Join parsed batches into one DataFrame (empty, with columns, if there are none)."""
+    frames = list(batches)
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def smart_parse_logs(
+    file_path: str,
+    log_type: str,
+    username_filter: str = None,
+    bucket: str = 'hour',
+    top: Optional[int] = None,
+    approximate: bool = False
+):
     """Smart log parser that handles multiple formats."""
     # First detect format
     file_format = csv_parser.detect_format(file_path)
@@ -565,21 +954,70 @@ def smart_parse_logs(file_path: str, log_type: str, username_filter: str = None)
         if log_type == 'vpn':
             return csv_parser.parse_csv_vpn_logs(file_path)
         elif log_type == 'firewall':
-            return csv_parser.parse_csv_firewall_logs(file_path)
+            # Already sorted by total_sentbyte
+            return csv_parser.parse_csv_firewall_logs(file_path).head(top)
         elif log_type == 'vpn-shutdown':
             return csv_parser.parse_csv_vpn_shutdown_logs(file_path, username_filter)
+        # CSV exports carry no per-line byte counts and times to bucket
     else:
         # Fortinet format
         if log_type == 'vpn':
             return parse_vpn_logs(file_path)
         elif log_type == 'firewall':
-            return parse_firewall_logs(file_path)
+            return parse_firewall_logs(file_path, top, approximate)
         elif log_type == 'vpn-shutdown':
             return parse_vpn_shutdown_sentbytes(file_path, username_filter)
+        elif log_type == 'firewall-timeline':
+            return parse_firewall_timeline(file_path, bucket)
     
     return pd.DataFrame()
 
 
+def export_results(
+    file_path: str,
+    log_type: str,
+    result_path: Path,
+    output_format: str = 'csv',
+    username_filter: str = None,
+    bucket: str = 'hour',
+    top: Optional[int] = None,
+    approximate: bool = False
+) -> ExportResult:
+    """
+    Parse a log file straight into a result file.
+    
+    Fortinet VPN login and shutdown rows are written in batches while the
+    file is read, so the full result is never held in memory. Firewall
+    totals and CSV exports are parsed first and then written in batches.
+    The rows are also written to the result's paged column store.
+    """
+    mirror = PageWriter(pages_path(PAGES_FOLDER, result_path))
+    
+    try:
+        if csv_parser.detect_format(file_path) != 'csv':
+            if log_type == 'vpn':
+                batches, columns = iter_vpn_log_batches(file_path), VPN_COLUMNS
+            elif log_type == 'vpn-shutdown':
+                batches, columns = iter_vpn_shutdown_batches(file_path, username_filter), SHUTDOWN_COLUMNS
+            else:
+                batches = None
+            
+            if batches is not None:
+                with open_writer(result_path, columns, output_format, mirror=mirror) as writer:
+                    for batch in batches:
+                        writer.write(batch)
+                return writer.result()
+        
+        return write_result(
+            smart_parse_logs(file_path, log_type, username_filter, bucket, top, approximate),
+            result_path, output_format, mirror=mirror
+        )
+    finally:
+        # Not closed if parsing failed before writing
+        if not mirror.closed:
+            mirror.discard()
+
+
 if __name__ == '__main__':
     debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     
@@ -0,0 +1,372 @@
+"""
+Mergeable statistics accumulated while a log is parsed.
+
+Result statistics used to be computed with ``nunique``, ``value_counts`` and
+``sum`` over the finished DataFrame, which needs every row in memory. The
+accumulators here are updated line by line, have a size that does not depend
+on the number of lines, and merge across file chunks and worker processes:
+
+- HyperLogLog: distinct counts (users, IPs) with ~0.8% standard error
+- QuantileSketch: quantiles of a value (e.g. sentbyte) within a relative
+  error, after the DDSketch design (Masson et al., 2019)
+- RunningStats: exact count, sum, minimum and maximum
+
+StreamStatistics groups named accumulators of each kind, together with
+Space-Saving summaries (see heavy_hitters) for the most frequent keys.
+"""
+
+import hashlib
+import math
+from functools import lru_cache
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from heavy_hitters import SpaceSaving
+
+
+# HyperLogLog registers: 2 ** precision; 14 gives ~0.8% standard error in 16 KiB
+DEFAULT_PRECISION = 14
+
+# Quantile estimates are within this fraction of the true value
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+# Counters per frequent-key summary
+TOP_COUNTERS = 1024
+
+# Quantiles reported by StreamStatistics.summary()
+SUMMARY_QUANTILES = (0.5, 0.9, 0.99)
+
+# Hashes of recently seen values; log values repeat a lot
+HASH_CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=HASH_CACHE_SIZE)
+def hash64(value: str) -> int:
+    """
+    Stable 64-bit hash of a string.
+    
+    Python's hash() is salted per process, so it cannot be used for
+    sketches built in separate worker processes and merged.
+    """
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8', 'surrogateescape'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """
+    Distinct-value counter in a fixed number of registers.
+    
+    Each value is hashed; the first ``precision`` bits pick a register,
+    which keeps the longest run of leading zeros seen in the other bits.
+    Small counts use linear counting, so they are nearly exact.
+    
+    Example:
+        >>> users = HyperLogLog()
+        >>> for user in ('alice', 'bob', 'alice'):
+        ...     users.add(user)
+        >>> users.count()
+        2
+    """
+    
+    def __init__(self, precision: int = DEFAULT_PRECISION) -> None:
+        """
+        Initialize an empty counter.
+        
+        Args:
+            precision: Number of register index bits (4 to 18)
+        
+        Raises:
+            ValueError: If precision is out of range
+        """
+        if not 4 <= precision <= 18:
+            raise ValueError(f"Precision must be between 4 and 18: {precision}")
+        
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+        self._shift = 64 - precision
+        self._mask = (1 << self._shift) - 1
+    
+    def add(self, value: str) -> None:
+        """Count a value."""
+        hashed = hash64(value)
+        index = hashed >> self._shift
+        rank = self._shift - (hashed & self._mask).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def merge(self, other: 'HyperLogLog') -> None:
+        """
+        Count the values of another counter too.
+        
+        Raises:
+            ValueError: If the precisions differ
+        """
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge precisions {self.precision} and {other.precision}")
+        merged = np.maximum(np.frombuffer(self.registers, dtype=np.uint8), np.frombuffer(other.registers, dtype=np.uint8))
+        self.registers = bytearray(merged.tobytes())
+    
+    def count(self) -> int:
+        """Estimated number of distinct values."""
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        size = len(registers)
+        zeros = int(np.count_nonzero(registers == 0))
+        
+        if zeros == size:
+            return 0
+        
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / float(np.sum(np.ldexp(1.0, -registers.astype(np.int32))))
+        if estimate <= 2.5 * size and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = size * math.log(size / zeros)
+        return int(round(estimate))
+
+
+class QuantileSketch:
+    """
+    Quantiles of non-negative values within a relative error.
+    
+    Values are counted in logarithmic bins: bin i holds values in
+    (gamma ** (i - 1), gamma ** i], so any reported quantile is within
+    ``relative_accuracy`` of a value of the right rank. Merging adds bin
+    counts, so sketches of separate chunks combine exactly.
+    """
+    
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> None:
+        """
+        Initialize an empty sketch.
+        
+        Args:
+            relative_accuracy: Relative error of the quantiles (0 to 1)
+        
+        Raises:
+            ValueError: If relative_accuracy is out of range
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"Relative accuracy must be between 0 and 1: {relative_accuracy}")
+        
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+    
+    def add(self, value: float) -> None:
+        """Count a value; values of 0 or below are counted as 0."""
+        self.count += 1
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+        
+        if value <= 0:
+            self.zero_count += 1
+            return
+        
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+    
+    def merge(self, other: 'QuantileSketch') -> None:
+        """
+        Count the values of another sketch too.
+        
+        Raises:
+            ValueError: If the accuracies differ
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches of different accuracy")
+        
+        bins = self.bins
+        for index, count in other.bins.items():
+            bins[index] = bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if other.count:
+            self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+            self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile.
+        
+        Args:
+            q: Quantile between 0 and 1 (0.5 is the median)
+        
+        Returns:
+            The estimate, or None if no values were counted
+        
+        Raises:
+            ValueError: If q is out of range
+        """
+        if not 0 <= q <= 1:
+            raise ValueError(f"Quantile must be between 0 and 1: {q}")
+        if not self.count:
+            return None
+        
+        rank = q * (self.count - 1)
+        if rank <= 0:
+            return self.minimum
+        if rank >= self.count - 1:
+            return self.maximum
+        
+        seen = self.zero_count
+        if seen > rank:
+            return max(self.minimum, 0)
+        
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                # Midpoint of the bin in relative terms
+                estimate = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(estimate, self.minimum), self.maximum)
+        return self.maximum
+
+
+class RunningStats:
+    """Exact count, sum, minimum and maximum of a value."""
+    
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+    
+    def add(self, value: float) -> None:
+        """Count a value."""
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+    
+    def merge(self, other: 'RunningStats') -> None:
+        """Count the values of another accumulator too."""
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+            self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+    
+    @property
+    def mean(self) -> Optional[float]:
+        """Mean of the values, or None if there are none."""
+        return self.total / self.count if self.count else None
+
+
+class StreamStatistics:
+    """
+    Named, mergeable accumulators for the statistics of one analysis.
+    
+    Accumulators are created on first use. ``distinct`` names count
+    distinct values, ``values`` names keep running totals and a quantile
+    sketch, and ``top`` names keep the most frequent (or heaviest) keys.
+    
+    Example:
+        >>> stats = StreamStatistics()
+        >>> stats.add_distinct('user', 'alice')
+        >>> stats.add_value('sentbyte', 1024)
+        >>> stats.add_top('user', 'alice')
+        >>> stats.summary()['values']['sentbyte']['sum']
+        1024
+    """
+    
+    def __init__(self) -> None:
+        self.distinct: Dict[str, HyperLogLog] = {}
+        self.values: Dict[str, Tuple[RunningStats, QuantileSketch]] = {}
+        self.top: Dict[str, SpaceSaving] = {}
+    
+    def add_distinct(self, name: str, value: str) -> None:
+        """Count a value towards the distinct count of name."""
+        counter = self.distinct.get(name)
+        if counter is None:
+            counter = self.distinct[name] = HyperLogLog()
+        counter.add(value)
+    
+    def add_value(self, name: str, value: float) -> None:
+        """Add a value to the running totals and quantiles of name."""
+        accumulators = self.values.get(name)
+        if accumulators is None:
+            accumulators = self.values[name] = (RunningStats(), QuantileSketch())
+        accumulators[0].add(value)
+        accumulators[1].add(value)
+    
+    def add_top(self, name: str, key: Hashable, weight: int = 1) -> None:
+        """Add weight to a key of the frequent-key summary of name."""
+        summary = self.top.get(name)
+        if summary is None:
+            summary = self.top[name] = SpaceSaving(TOP_COUNTERS)
+        summary.add(key, weight)
+    
+    def merge(self, other: 'StreamStatistics') -> None:
+        """Add the accumulators of another part of the log."""
+        for name, counter in other.distinct.items():
+            if name in self.distinct:
+                self.distinct[name].merge(counter)
+            else:
+                self.distinct[name] = counter
+        for name, (running, quantiles) in other.values.items():
+            if name in self.values:
+                self.values[name][0].merge(running)
+                self.values[name][1].merge(quantiles)
+            else:
+                self.values[name] = (running, quantiles)
+        for name, summary in other.top.items():
+            if name in self.top:
+                self.top[name].merge(summary)
+            else:
+                self.top[name] = summary
+    
+    def distinct_count(self, name: str) -> int:
+        """Estimated distinct values counted under name (0 if none)."""
+        counter = self.distinct.get(name)
+        return counter.count() if counter is not None else 0
+    
+    def top_keys(self, name: str, top: int = 5) -> List[Tuple[Hashable, int, int]]:
+        """
+        Most frequent keys of name that the summary can vouch for.
+        
+        Keys whose counts may be mostly overcount are left out (see
+        SpaceSaving.guaranteed_top), so fewer than top keys may be returned.
+        
+        Returns:
+            (key, count, error) triples, largest count first; the true
+            count of each key lies between count - error and count
+        """
+        summary = self.top.get(name)
+        if summary is None:
+            return []
+        return summary.guaranteed_top(top)
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        All statistics as plain values.
+        
+        Returns:
+            Dict with 'distinct' (name -> estimated count), 'values' (name ->
+            count, sum, min, max, mean and p50/p90/p99) and 'top' (name ->
+            up to five most frequent keys and their upper-bound counts, see
+            top_keys)
+        """
+        values = {}
+        for name, (running, quantiles) in self.values.items():
+            entry = {
+                'count': running.count,
+                'sum': running.total,
+                'min': running.minimum,
+                'max': running.maximum,
+                'mean': running.mean,
+            }
+            for q in SUMMARY_QUANTILES:
+                entry[f'p{round(q * 100)}'] = quantiles.quantile(q)
+            values[name] = entry
+        
+        return {
+            'distinct': {name: counter.count() for name, counter in self.distinct.items()},
+            'values': values,
+            'top': {name: {key: count for key, count, _ in self.top_keys(name)} for name in self.top},
+        }
@@ -8,12 +8,17 @@ from .security import (
     sanitize_filename,
     sanitize_username,
     validate_file_type,
+    validate_file_buffer,
     secure_save_file,
+    UploadStream,
     get_secure_headers,
     is_safe_path,
     SecurityError,
     ALLOWED_EXTENSIONS,
+    COMPRESSED_EXTENSIONS,
+    ARCHIVE_EXTENSIONS,
     ALLOWED_MIME_TYPES,
+    ARCHIVE_MIME_TYPES,
     MAX_FILE_SIZE,
 )
 
@@ -37,12 +42,17 @@ __all__ = [
     'sanitize_filename',
     'sanitize_username',
     'validate_file_type',
+    'validate_file_buffer',
     'secure_save_file',
+    'UploadStream',
     'get_secure_headers',
     'is_safe_path',
     'SecurityError',
     'ALLOWED_EXTENSIONS',
+    'COMPRESSED_EXTENSIONS',
+    'ARCHIVE_EXTENSIONS',
     'ALLOWED_MIME_TYPES',
+    'ARCHIVE_MIME_TYPES',
     'MAX_FILE_SIZE',
     # Input validation
     'validate_password',
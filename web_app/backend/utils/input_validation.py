@@ -9,6 +9,8 @@ import re
 import ipaddress
 from typing import Tuple, Optional
 
+from ip_classifier import is_not_private_ip
+
 
 def validate_password(password: str) -> Tuple[bool, str]:
     """Validate password meets security requirements.
@@ -89,10 +91,7 @@ def is_public_ip(ip: str) -> bool:
     Returns:
         True if IP is public, False otherwise
     """
-    try:
-        return not ipaddress.ip_address(ip).is_private
-    except ValueError:
-        return False
+    return is_not_private_ip(ip)
 
 
 def validate_log_content(content: str, max_size: int = 100 * 1024 * 1024) -> Tuple[bool, str]:
@@ -5,26 +5,42 @@ This module provides security-related functions for input validation,
 file handling, and protection against common web vulnerabilities.
 """
 
+import hashlib
 import os
 import re
 import uuid
 import magic
 from pathlib import Path
-from typing import Optional, Tuple, Set
+from typing import BinaryIO, Optional, Tuple, Set
 from werkzeug.utils import secure_filename as werkzeug_secure_filename
 
 
 # Allowed file extensions
-ALLOWED_EXTENSIONS: Set[str] = {'txt', 'log', 'csv'}
+ALLOWED_EXTENSIONS: Set[str] = {'txt', 'log', 'csv', 'gz', 'bz2', 'xz'}
+# Compressed formats, decompressed while parsing
+COMPRESSED_EXTENSIONS: Set[str] = {'gz', 'bz2', 'xz'}
+# Archive formats, accepted where bundles of evidence files are expected
+ARCHIVE_EXTENSIONS: Set[str] = {'zip', 'tar', 'tgz'}
 # Allowed MIME types
 ALLOWED_MIME_TYPES: Set[str] = {
     'text/plain',
     'text/csv',
     'application/octet-stream',
     'text/x-log',
+    'application/gzip',
+    'application/x-gzip',
+    'application/x-bzip2',
+    'application/x-xz',
+}
+# MIME types of archives
+ARCHIVE_MIME_TYPES: Set[str] = {
+    'application/zip',
+    'application/x-tar',
 }
 # Maximum file size (100MB)
 MAX_FILE_SIZE = 100 * 1024 * 1024
+# Bytes buffered from the start of a streamed upload for type detection
+SNIFF_SIZE = 64 * 1024
 
 
 def sanitize_filename(filename: str) -> str:
@@ -96,21 +112,25 @@ def sanitize_username(username: str, max_length: int = 64) -> Optional[str]:
     return username
 
 
-def validate_file_type(file_path: str, filename: str) -> Tuple[bool, str]:
+def validate_file_type(file_path: str, filename: str, allow_archives: bool = False) -> Tuple[bool, str]:
     """Validate file type by extension and MIME type.
     
     Args:
         file_path: Path to the file to validate
         filename: Original filename for extension check
+        allow_archives: Also accept zip and tar archives
         
     Returns:
         Tuple of (is_valid, error_message)
     """
+    allowed_extensions = ALLOWED_EXTENSIONS | ARCHIVE_EXTENSIONS if allow_archives else ALLOWED_EXTENSIONS
+    allowed_mime_types = ALLOWED_MIME_TYPES | ARCHIVE_MIME_TYPES if allow_archives else ALLOWED_MIME_TYPES
+    
     # Check extension
     ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
     
-    if ext not in ALLOWED_EXTENSIONS:
-        return False, f"File type .{ext} is not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+    if ext not in allowed_extensions:
+        return False, f"File type .{ext} is not allowed. Allowed types: {', '.join(allowed_extensions)}"
     
     # Check MIME type using python-magic
     try:
@@ -118,7 +138,7 @@ def validate_file_type(file_path: str, filename: str) -> Tuple[bool, str]:
         detected_type = mime.from_file(file_path)
         
         # Some systems report CSV as text/plain
-        if detected_type not in ALLOWED_MIME_TYPES:
+        if detected_type not in allowed_mime_types:
             return False, f"Detected file type '{detected_type}' is not allowed"
     except Exception as e:
         # If magic is not available, fall back to extension only
@@ -127,7 +147,155 @@ def validate_file_type(file_path: str, filename: str) -> Tuple[bool, str]:
     return True, ""
 
 
-def secure_save_file(file, upload_dir: str, prefix: str = '') -> Tuple[str, str]:
+def validate_file_buffer(data: bytes, filename: str) -> Tuple[bool, str]:
+    """Validate file type by extension and the MIME type of its first bytes.
+    
+    Streaming counterpart of validate_file_type for uploads that are not
+    written to disk first.
+    
+    Args:
+        data: Leading bytes of the file
+        filename: Original filename for extension check
+    
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    
+    if ext not in ALLOWED_EXTENSIONS:
+        return False, f"File type .{ext} is not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+    
+    try:
+        detected_type = magic.from_buffer(data, mime=True)
+        
+        if detected_type not in ALLOWED_MIME_TYPES:
+            return False, f"Detected file type '{detected_type}' is not allowed"
+    except Exception:
+        # If magic is not available, fall back to extension only
+        pass
+    
+    return True, ""
+
+
+class UploadStream:
+    """Read-through wrapper that validates an upload while it is received.
+    
+    The request body is read once, in blocks, by the parser. Each block is
+    counted against the size limit, added to a SHA-256 digest and, if a
+    copy path is given, written to disk. The first SNIFF_SIZE bytes are
+    buffered by sniff() so the type can be checked before parsing starts.
+    
+    Example:
+        >>> upload = UploadStream(request.stream, 'fortigate.log')
+        >>> head = upload.sniff()
+        >>> for block in iter(lambda: upload.read(65536), b''):
+        ...     pass
+        >>> print(upload.bytes_received, upload.hexdigest())
+    """
+    
+    def __init__(
+        self,
+        stream: BinaryIO,
+        filename: str,
+        max_size: int = MAX_FILE_SIZE,
+        copy_path: Optional[str] = None
+    ):
+        """Initialize the wrapper.
+        
+        Args:
+            stream: Readable binary stream (e.g. request.stream)
+            filename: Original filename, used for the extension check
+            max_size: Maximum number of bytes accepted
+            copy_path: Optional path to write a copy of the upload to
+        """
+        self.stream = stream
+        self.filename = filename
+        self.max_size = max_size
+        self.copy_path = copy_path
+        self.bytes_received = 0
+        self._digest = hashlib.sha256()
+        self._buffer = b''
+        self._copy = open(copy_path, 'wb') if copy_path else None
+    
+    def _receive(self, size: int) -> bytes:
+        data = self.stream.read(size)
+        if not data:
+            return b''
+        
+        self.bytes_received += len(data)
+        if self.bytes_received > self.max_size:
+            self.close()
+            raise ValueError(f"File size exceeds maximum ({self.max_size} bytes)")
+        
+        self._digest.update(data)
+        if self._copy is not None:
+            self._copy.write(data)
+        
+        return data
+    
+    def sniff(self) -> bytes:
+        """Buffer and validate the start of the upload.
+        
+        Returns:
+            Up to SNIFF_SIZE leading bytes (also returned again by read())
+        
+        Raises:
+            ValueError: If the extension or detected MIME type is not allowed
+        """
+        while len(self._buffer) < SNIFF_SIZE:
+            data = self._receive(SNIFF_SIZE - len(self._buffer))
+            if not data:
+                break
+            self._buffer += data
+        
+        is_valid, error = validate_file_buffer(self._buffer, self.filename)
+        if not is_valid:
+            self.close()
+            raise ValueError(error)
+        
+        return self._buffer
+    
+    def read(self, size: int = -1) -> bytes:
+        """Read the next bytes of the upload.
+        
+        Args:
+            size: Maximum number of bytes to return (-1 for the rest)
+        
+        Returns:
+            Bytes read; empty at the end of the upload
+        """
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+            return data + b''.join(iter(lambda: self._receive(SNIFF_SIZE), b''))
+        
+        if self._buffer:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+            return data
+        
+        return self._receive(size)
+    
+    def drain(self, target: Optional[BinaryIO] = None) -> None:
+        """Read the rest of the upload.
+        
+        Args:
+            target: Optional binary file to write the unread bytes to
+        """
+        for data in iter(lambda: self.read(SNIFF_SIZE * 16), b''):
+            if target is not None:
+                target.write(data)
+    
+    def hexdigest(self) -> str:
+        """Get the SHA-256 digest of the bytes received so far."""
+        return self._digest.hexdigest()
+    
+    def close(self) -> None:
+        """Close the saved copy, if any."""
+        if self._copy is not None:
+            self._copy.close()
+            self._copy = None
+
+
+def secure_save_file(file, upload_dir: str, prefix: str = '', allow_archives: bool = False) -> Tuple[str, str]:
     """Securely save an uploaded file.
     
     This function:
@@ -140,6 +308,7 @@ def secure_save_file(file, upload_dir: str, prefix: str = '') -> Tuple[str, str]
         file: Flask FileStorage object
         upload_dir: Directory to save the file
         prefix: Optional prefix for the filename
+        allow_archives: Also accept zip and tar archives
         
     Returns:
         Tuple of (filepath, original_filename)
@@ -155,10 +324,16 @@ def secure_save_file(file, upload_dir: str, prefix: str = '') -> Tuple[str, str]
     # Generate unique filename
     file_id = str(uuid.uuid4())
     ext = original_filename.rsplit('.', 1)[-1].lower()
+    allowed_extensions = ALLOWED_EXTENSIONS | ARCHIVE_EXTENSIONS if allow_archives else ALLOWED_EXTENSIONS
     
-    if ext not in ALLOWED_EXTENSIONS:
+    if ext not in allowed_extensions:
         raise ValueError(f"File type .{ext} not allowed")
     
+    # Keep the inner extension of compressed files (e.g. .csv.gz, .tar.gz)
+    parts = original_filename.lower().rsplit('.', 2)
+    if ext in COMPRESSED_EXTENSIONS and len(parts) == 3 and parts[1] in allowed_extensions - COMPRESSED_EXTENSIONS:
+        ext = f"{parts[1]}.{ext}"
+    
     # Create filename with optional prefix
     if prefix:
         new_filename = f"{prefix}_{file_id}.{ext}"
@@ -182,7 +357,7 @@ def secure_save_file(file, upload_dir: str, prefix: str = '') -> Tuple[str, str]
         raise ValueError(f"File size ({file_size} bytes) exceeds maximum ({MAX_FILE_SIZE} bytes)")
     
     # Validate file type
-    is_valid, error = validate_file_type(str(filepath), original_filename)
+    is_valid, error = validate_file_type(str(filepath), original_filename, allow_archives=allow_archives)
     if not is_valid:
         filepath.unlink()
         raise ValueError(error)
@@ -6,7 +6,7 @@ const API_URL = process.env.REACT_APP_API_URL || '';
 
 // Security constants
 const MAX_FILE_SIZE = 100 * 1024 * 1024; // 100MB
-const ALLOWED_EXTENSIONS = ['.txt', '.log', '.csv'];
+const ALLOWED_EXTENSIONS = ['.txt', '.log', '.csv', '.gz', '.bz2', '.xz'];
 
 /**
  * Sanitize filename to prevent path traversal
@@ -440,7 +440,7 @@ function SimpleApp() {
           <div className="file-upload-area">
             <input
               type="file"
-              accept=".txt,.log,.csv"
+              accept=".txt,.log,.csv,.gz,.bz2,.xz"
               onChange={handleFileChange}
               id="file-input"
             />
@@ -448,7 +448,7 @@ function SimpleApp() {
               {selectedFile ? (
                 <span>✅ {sanitizeFilename(selectedFile.name)} ({(selectedFile.size / (1024 * 1024)).toFixed(2)} MB)</span>
               ) : (
-                <span>Choose a log file (.txt, .log, .csv)</span>
+                <span>Choose a log file (.txt, .log, .csv, optionally .gz/.bz2/.xz)</span>
               )}
             </div>
           </div>
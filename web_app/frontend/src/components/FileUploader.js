@@ -3,7 +3,7 @@ import { useDropzone } from 'react-dropzone';
 import { Box, Typography, Paper } from '@mui/material';
 import { CloudUpload as UploadIcon } from '@mui/icons-material';
 
-function FileUploader({ onFileSelect, accept = '.txt,.log,.csv' }) {
+function FileUploader({ onFileSelect, accept = '.txt,.log,.csv,.gz,.bz2,.xz' }) {
   const onDrop = useCallback((acceptedFiles) => {
     if (acceptedFiles.length > 0) {
       onFileSelect(acceptedFiles[0]);
@@ -15,6 +15,9 @@ function FileUploader({ onFileSelect, accept = '.txt,.log,.csv' }) {
     accept: {
       'text/plain': ['.txt', '.log'],
       'text/csv': ['.csv'],
+      'application/gzip': ['.gz'],
+      'application/x-bzip2': ['.bz2'],
+      'application/x-xz': ['.xz'],
     },
     maxFiles: 1,
   });
@@ -45,7 +48,7 @@ function FileUploader({ onFileSelect, accept = '.txt,.log,.csv' }) {
         or click to select a file
       </Typography>
       <Typography variant="caption" color="text.secondary" sx={{ mt: 1, display: 'block' }}>
-        Supported formats: .txt, .log, .csv
+        Supported formats: .txt, .log, .csv (optionally compressed as .gz, .bz2, .xz)
       </Typography>
     </Paper>
   );